@@ -4,25 +4,57 @@ from NeuroRuler.CLI import {function}
 
 where NeuroRuler.CLI is the name of the package this __init__.py file is in."""
 
-import shutil
+import importlib
+import sys
 from pathlib import Path
-import pkg_resources
-import NeuroRuler.CLI.main as main
-import NeuroRuler.utils.parser as parser
 import NeuroRuler.utils.constants as constants
 
+SUBCOMMANDS: dict[str, str] = {
+    "cache": "NeuroRuler.CLI.cache",
+    "serve": "NeuroRuler.CLI.serve",
+    "client": "NeuroRuler.CLI.client",
+    "watch": "NeuroRuler.CLI.watch",
+    "merge": "NeuroRuler.CLI.merge",
+}
+"""Maps the first CLI argument to the module of a subcommand. The module's ``main`` function receives the remaining arguments.
+
+Modules are imported only when their subcommand is run.
+
+If the first argument isn't a subcommand, it's parsed as the usual measurement CLI."""
+
+CONFIG_FREE_SUBCOMMANDS: tuple[str, ...] = ("client",)
+"""Subcommands that don't read ``cli_config.json``. ``neuroruler client`` sends its options to the server,
+so it skips importing the measurement modules (and SimpleITK) that parsing the config needs."""
+
 
 def cli() -> None:
     """Run CLI.
 
     Will create ``cli_config.json`` using package's ``cli_config.json`` if it doesn't already exist.
+
+    If the first argument is in ``SUBCOMMANDS`` (e.g. ``neuroruler cache prune``), runs that subcommand.
     """
     if not constants.JSON_CLI_CONFIG_PATH.exists():
+        # Imported here since they're needed only once, and pkg_resources is slow to import
+        import shutil
+        import pkg_resources
+
         json_cli_from_package: Path = Path(
             pkg_resources.resource_filename(__name__, "../../cli_config.json")
         )
         shutil.copy(json_cli_from_package, constants.JSON_CLI_CONFIG_PATH)
 
+    if len(sys.argv) > 1 and sys.argv[1] in CONFIG_FREE_SUBCOMMANDS:
+        importlib.import_module(SUBCOMMANDS[sys.argv[1]]).main(sys.argv[2:])
+        return
+
+    # Imported here since they import SimpleITK, which neuroruler client doesn't need
+    import NeuroRuler.CLI.main as main
+    import NeuroRuler.utils.parser as parser
+
     parser.parse_cli_config()
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        importlib.import_module(SUBCOMMANDS[sys.argv[1]]).main(sys.argv[2:])
+        return
     parser.parse_cli()
     main.main()
@@ -0,0 +1,59 @@
+"""Defines ``main()`` for the ``cache`` subcommand, which manages the decoded volume cache.
+
+Usage: ``neuroruler cache prune [--max-size MB] [--cache-dir DIR]``
+
+Defaults come from ``VOLUME_CACHE_DIR`` and ``VOLUME_CACHE_MAX_MB`` in ``cli_config.json``."""
+
+import argparse
+from pathlib import Path
+from typing import Union
+
+import NeuroRuler.utils.cli_settings as cli_settings
+import NeuroRuler.utils.volume_cache as volume_cache
+
+BYTES_PER_MB: int = 1024 * 1024
+
+
+def main(argv: list[str]) -> None:
+    """Entrypoint of ``neuroruler cache``. ``parser.parse_cli_config()`` must be called first.
+
+    :param argv: Arguments after ``cache``
+    :type argv: list[str]
+    :return: None"""
+    parser = argparse.ArgumentParser(
+        prog="neuroruler cache",
+        description="Manage the cache of decoded .nii.gz and gzip NRRD images.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    prune_parser = subparsers.add_parser(
+        "prune",
+        help="remove least recently used images until the cache fits in --max-size",
+    )
+    prune_parser.add_argument(
+        "--max-size",
+        type=int,
+        help="size limit in MB, default is VOLUME_CACHE_MAX_MB; 0 empties the cache",
+    )
+    prune_parser.add_argument(
+        "--cache-dir", help="cache directory, default is VOLUME_CACHE_DIR"
+    )
+    args = parser.parse_args(argv)
+
+    cache_dir: Union[Path, None] = (
+        Path(args.cache_dir)
+        if args.cache_dir is not None
+        else cli_settings.VOLUME_CACHE_DIR
+    )
+    if cache_dir is None:
+        print(
+            "No cache directory. Set VOLUME_CACHE_DIR in cli_config.json or pass --cache-dir. Exiting."
+        )
+        exit(1)
+
+    max_mb: int = (
+        args.max_size if args.max_size is not None else cli_settings.VOLUME_CACHE_MAX_MB
+    )
+    freed: int = volume_cache.prune(cache_dir, max_mb * BYTES_PER_MB)
+    print(
+        f"Freed {freed / BYTES_PER_MB:.1f} MB. {cache_dir} now holds {volume_cache.size(cache_dir) / BYTES_PER_MB:.1f} MB."
+    )
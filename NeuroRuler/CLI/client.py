@@ -0,0 +1,217 @@
+"""Defines ``main()`` for the ``client`` subcommand, which sends a measurement to ``neuroruler serve``.
+
+Usage: ``neuroruler client [--host HOST] [--port PORT | --socket PATH] [CLI options] file``
+
+Accepts the same options as ``python cli.py`` and prints the same output, but the work is done by a running
+``neuroruler serve`` process. This module imports only the standard library and ``constants``, so neither
+the client nor scripts that import ``send_request`` to talk to the server pay for importing SimpleITK.
+``tests/test_import_time.py`` checks this."""
+
+import argparse
+import http.client
+import json
+import socket
+import sys
+from pathlib import Path
+from typing import Any, Union
+
+import NeuroRuler.utils.constants as constants
+
+# Same as serve.py. Not imported from there since that would import SimpleITK.
+DEFAULT_HOST: str = "127.0.0.1"
+DEFAULT_PORT: int = 8765
+DEFAULT_TIMEOUT: float = 300.0
+
+REQUEST_OPTIONS: tuple[str, ...] = (
+    "x",
+    "y",
+    "z",
+    "slice",
+    "conductance",
+    "iterations",
+    "step",
+    "filter",
+    "lower",
+    "upper",
+    "precision",
+)
+"""CLI options sent to the server. Same as ``serve.OPTION_TYPES``."""
+
+
+def get_argument_parser() -> argparse.ArgumentParser:
+    """Return the parser of ``neuroruler client``'s arguments: the measurement options of
+    ``parser.get_cli_argument_parser`` for a single file, and the server's address.
+
+    Not built from ``parser.get_cli_argument_parser`` since importing ``parser`` imports SimpleITK.
+
+    :return: Parser of client arguments
+    :rtype: argparse.ArgumentParser"""
+    arg_parser = argparse.ArgumentParser(
+        prog="neuroruler client",
+        description="Send a head circumference measurement to a running neuroruler serve.",
+    )
+    arg_parser.add_argument(
+        "-d", "--debug", help="print debug info", action="store_true"
+    )
+    arg_parser.add_argument(
+        "-r", "--raw", help='print just the "raw" circumference', action="store_true"
+    )
+    arg_parser.add_argument("-x", "--x", type=int, help="x rotation (in degrees)")
+    arg_parser.add_argument("-y", "--y", type=int, help="y rotation (in degrees)")
+    arg_parser.add_argument("-z", "--z", type=int, help="z rotation (in degrees)")
+    arg_parser.add_argument(
+        "-s", "--slice", type=int, help="slice (Z slice, 0-indexed)"
+    )
+    arg_parser.add_argument(
+        "-c", "--conductance", type=float, help="conductance smoothing parameter"
+    )
+    arg_parser.add_argument("-i", "--iterations", type=int, help="smoothing iterations")
+    arg_parser.add_argument(
+        "-t", "--step", type=float, help="time step (smoothing parameter)"
+    )
+    arg_parser.add_argument(
+        "-f",
+        "--filter",
+        help="which filter to use (Otsu, volume-otsu, or binary), default is Otsu. "
+        "volume-otsu uses one Otsu threshold computed from the whole volume's histogram",
+    )
+    arg_parser.add_argument(
+        "-l", "--lower", type=float, help="lower threshold for binary threshold"
+    )
+    arg_parser.add_argument(
+        "-u", "--upper", type=float, help="upper threshold for binary threshold"
+    )
+    arg_parser.add_argument(
+        "--precision",
+        choices=tuple(constants.PRECISION_NAMES),
+        help="pixel type used for smoothing and thresholding, overrides PRECISION",
+    )
+    arg_parser.add_argument(
+        "file",
+        help="file to compute circumference from, file format must be "
+        + ", ".join(constants.SUPPORTED_IMAGE_EXTENSIONS),
+    )
+
+    server_options = arg_parser.add_argument_group("server")
+    server_options.add_argument(
+        "--host", default=DEFAULT_HOST, help=f"default {DEFAULT_HOST}"
+    )
+    server_options.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help=f"default {DEFAULT_PORT}"
+    )
+    server_options.add_argument(
+        "--socket", help="connect to this Unix socket instead of --host and --port"
+    )
+    server_options.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help=f"seconds to wait for the result, default {DEFAULT_TIMEOUT}",
+    )
+    return arg_parser
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """``HTTPConnection`` over a Unix socket."""
+
+    def __init__(self, socket_path: str, timeout: float = DEFAULT_TIMEOUT):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path: str = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def connect(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: Union[str, None] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> http.client.HTTPConnection:
+    """Return a connection to the server. The connection is kept alive, so it can send several requests.
+
+    :param host:
+    :type host: str
+    :param port:
+    :type port: int
+    :param socket_path: If not None, connect to this Unix socket instead of ``host`` and ``port``
+    :type socket_path: str or None
+    :param timeout: In seconds
+    :type timeout: float
+    :return: Connection
+    :rtype: http.client.HTTPConnection"""
+    if socket_path is not None:
+        return UnixHTTPConnection(socket_path, timeout)
+    return http.client.HTTPConnection(host, port, timeout=timeout)
+
+
+def send_request(
+    connection: http.client.HTTPConnection,
+    method: str,
+    url: str,
+    body: Union[dict[str, Any], None] = None,
+) -> tuple[int, dict[str, Any]]:
+    """Send a request and return the decoded JSON response.
+
+    :param connection: Returned by ``connect``
+    :type connection: http.client.HTTPConnection
+    :param method: GET or POST
+    :type method: str
+    :param url: /measure or /health
+    :type url: str
+    :param body: JSON body
+    :type body: dict[str, Any] or None
+    :raise OSError: If the server can't be reached
+    :return: (HTTP status, response body)
+    :rtype: tuple[int, dict[str, Any]]"""
+    data: Union[bytes, None] = None if body is None else json.dumps(body).encode()
+    headers: dict[str, str] = (
+        {} if data is None else {"Content-Type": "application/json"}
+    )
+    connection.request(method, url, body=data, headers=headers)
+    response: http.client.HTTPResponse = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def main(argv: list[str]) -> None:
+    """Entrypoint of ``neuroruler client``.
+
+    :param argv: Arguments after ``client``
+    :type argv: list[str]
+    :return: None"""
+    args = get_argument_parser().parse_args(argv)
+
+    request: dict[str, Any] = {"path": str(Path(args.file).resolve())}
+    for name in REQUEST_OPTIONS:
+        if getattr(args, name) is not None:
+            request[name] = getattr(args, name)
+
+    connection: http.client.HTTPConnection = connect(
+        args.host, args.port, args.socket, args.timeout
+    )
+    try:
+        status, response = send_request(connection, "POST", "/measure", request)
+    except OSError as e:
+        where: str = (
+            args.socket if args.socket is not None else f"{args.host}:{args.port}"
+        )
+        print(f"Could not reach neuroruler serve at {where}: {e}", file=sys.stderr)
+        exit(1)
+    finally:
+        connection.close()
+
+    if args.debug:
+        print(f"Status {status}: {response}")
+    if response["status"] != "ok":
+        print(response["error"])
+        exit(1)
+    if args.raw:
+        print(response["circumference"])
+    else:
+        print(
+            constants.circumference_message(
+                response["circumference"], response["units"]
+            )
+        )
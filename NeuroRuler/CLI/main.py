@@ -4,74 +4,178 @@ See ``tests/test_cli.py`` for examples of how to use this script.
 
 Run with the ``-h`` option to see all CLI options."""
 
-import NeuroRuler.utils.constants as constants
-import NeuroRuler.utils.global_vars as global_vars
-import NeuroRuler.utils.imgproc as imgproc
-import NeuroRuler.utils.cli_settings as cli_settings
-import SimpleITK as sitk
-import numpy as np
+import sys
 from pathlib import Path
-from typing import Union
-
-from NeuroRuler.utils.img_helpers import (
-    initialize_globals,
-    get_curr_image,
-    get_curr_rotated_slice,
-    get_curr_physical_units,
-)
+from typing import Any, Union
 
+import NeuroRuler.utils.constants as constants
+import NeuroRuler.utils.cli_settings as cli_settings
+import NeuroRuler.utils.memory as memory
+import NeuroRuler.utils.results as results
+import NeuroRuler.utils.sharding as sharding
+import NeuroRuler.utils.volume_cache as volume_cache
+from NeuroRuler.utils.api import Measurement, Smoothing, measure
+from NeuroRuler.utils.constants import ThresholdFilter
+
+
+def measure_file(file: Union[str, Path]) -> Measurement:
+    """Measure ``file`` with the settings in ``cli_settings``.
+
+    :param file:
+    :type file: str or Path
+    :return: Result of ``api.measure``
+    :rtype: Measurement"""
+    return measure(
+        file,
+        theta=(cli_settings.THETA_X, cli_settings.THETA_Y, cli_settings.THETA_Z),
+        # -1 means the middle slice
+        slice=None if cli_settings.SLICE == -1 else cli_settings.SLICE,
+        smoothing=Smoothing(
+            cli_settings.CONDUCTANCE_PARAMETER,
+            cli_settings.SMOOTHING_ITERATIONS,
+            cli_settings.TIME_STEP,
+        ),
+        threshold=(
+            cli_settings.LOWER_BINARY_THRESHOLD,
+            cli_settings.UPPER_BINARY_THRESHOLD,
+        )
+        if cli_settings.THRESHOLD_FILTER == ThresholdFilter.Binary
+        else cli_settings.THRESHOLD_FILTER,
+        precision=cli_settings.PRECISION,
+        cache_dir=cli_settings.VOLUME_CACHE_DIR,
+        cache_max_mb=cli_settings.VOLUME_CACHE_MAX_MB,
+    )
 
-def main() -> None:
-    """Main entrypoint of CLI."""
-    file_path = Path(cli_settings.FILE)
-
-    initialize_globals([file_path])
 
-    # slice options
-    global_vars.THETA_X = cli_settings.THETA_X
-    global_vars.THETA_Y = cli_settings.THETA_Y
-    global_vars.THETA_Z = cli_settings.THETA_Z
-    if (
-        cli_settings.SLICE != -1
-    ):  # initialize_globals will init it to middle slice if -1
-        global_vars.SLICE = cli_settings.SLICE
+def print_memory_usage(file: Union[str, Path]) -> None:
+    """Print the memory taken by the image at ``file`` and the peak memory of this process. Used with ``--debug``.
 
-    # smoothing options
-    global_vars.SMOOTHING_FILTER.SetConductanceParameter(
-        cli_settings.CONDUCTANCE_PARAMETER
-    )
-    global_vars.SMOOTHING_FILTER.SetNumberOfIterations(
-        cli_settings.SMOOTHING_ITERATIONS
+    :param file:
+    :type file: str or Path
+    :return: None"""
+    peak: Union[int, None] = memory.peak_rss_bytes()
+    print(
+        f"Memory: image {memory.format_bytes(memory.file_image_nbytes(Path(file)))}, "
+        f"peak of process {'unknown' if peak is None else memory.format_bytes(peak)}"
     )
-    global_vars.SMOOTHING_FILTER.SetTimeStep(cli_settings.TIME_STEP)
 
-    rotated_slice: sitk.Image = get_curr_rotated_slice()
 
-    # Binary threshold setting application
-    # Won't be used if cli_settings.THRESHOLD_FILTER is Otsu, but applied anyway
-    global_vars.BINARY_THRESHOLD_FILTER.SetLowerThreshold(
-        cli_settings.LOWER_BINARY_THRESHOLD
-    )
-    global_vars.BINARY_THRESHOLD_FILTER.SetUpperThreshold(
-        cli_settings.UPPER_BINARY_THRESHOLD
-    )
-
-    binary_contour_slice: np.ndarray = imgproc.contour(
-        rotated_slice, cli_settings.THRESHOLD_FILTER
+def result_parameters() -> dict[str, Any]:
+    """Parameters of the rows written to results files, from ``cli_settings``.
+
+    :return: Returned by ``results.make_parameters``
+    :rtype: dict[str, Any]"""
+    return results.make_parameters(
+        (cli_settings.THETA_X, cli_settings.THETA_Y, cli_settings.THETA_Z),
+        cli_settings.SLICE,
+        (
+            cli_settings.CONDUCTANCE_PARAMETER,
+            cli_settings.SMOOTHING_ITERATIONS,
+            cli_settings.TIME_STEP,
+        ),
+        cli_settings.THRESHOLD_FILTER,
+        cli_settings.LOWER_BINARY_THRESHOLD,
+        cli_settings.UPPER_BINARY_THRESHOLD,
+        cli_settings.PRECISION,
     )
 
-    spacing: tuple = get_curr_image().GetSpacing()
-    units: Union[str, None] = get_curr_physical_units()
-    circumference: float = imgproc.length_of_contour_with_spacing(
-        binary_contour_slice, spacing[0], spacing[1]
-    )
 
+def main() -> None:
+    """Main entrypoint of CLI."""
+    if (
+        len(cli_settings.FILES) > 1
+        or cli_settings.OUTPUT is not None
+        or cli_settings.SHARD is not None
+    ):
+        main_batch()
+        return
+
+    result: Measurement = measure_file(cli_settings.FILES[0])
+    if cli_settings.DEBUG:
+        print(result)
+        print_memory_usage(cli_settings.FILES[0])
     if cli_settings.RAW:
-        print(circumference)
+        print(result.circumference)
     else:
+        print(constants.circumference_message(result.circumference, result.units))
+
+
+def main_batch() -> None:
+    """Measure every file in ``cli_settings.FILES``, appending each result to ``cli_settings.OUTPUT`` (if set)
+    as soon as it's computed. With ``cli_settings.SHARD``, only that shard's files are measured.
+
+    Unlike a single file, a file that can't be measured doesn't stop the batch. Its error is printed and written
+    to the results file, and the exit status is 1 at the end."""
+    files: list[str] = cli_settings.FILES
+    if cli_settings.SHARD is not None:
+        files = sharding.shard_files(files, cli_settings.SHARD)
         print(
-            f"Calculated Circumference: {round(circumference, constants.NUM_DIGITS_TO_ROUND_TO)} {units if units is not None else constants.MESSAGE_TO_SHOW_IF_UNITS_NOT_FOUND}"
+            f"Shard {cli_settings.SHARD}: {len(files)} of {len(set(cli_settings.FILES))} file(s)",
+            flush=True,
         )
+    parameters: dict[str, Any] = result_parameters()
+    completed: set[tuple[str, ...]] = (
+        results.completed_keys(cli_settings.OUTPUT) if cli_settings.RESUME else set()
+    )
+    writer: Union[results.ResultsWriter, None] = (
+        None
+        if cli_settings.OUTPUT is None
+        else results.ResultsWriter(cli_settings.OUTPUT)
+    )
+    num_failed: int = 0
+    num_skipped: int = 0
+    try:
+        for file in files:
+            path: Path = Path(file)
+            try:
+                fingerprint: str = volume_cache.fingerprint(
+                    path, constants.Z_ORIENTATION_STR
+                )
+            except OSError:
+                # measure() reports the missing file
+                fingerprint = ""
+            if (
+                fingerprint
+                and results.result_key(results.make_row(path, fingerprint, parameters))
+                in completed
+            ):
+                num_skipped += 1
+                if cli_settings.DEBUG:
+                    print(f"{file}: already in {cli_settings.OUTPUT}, skipped")
+                continue
+
+            try:
+                result: Measurement = measure_file(file)
+            except Exception as e:
+                num_failed += 1
+                error: str = getattr(e, "message", str(e))
+                print(f"{file}: {error}", file=sys.stderr)
+                row: dict[str, Any] = results.make_row(
+                    path, fingerprint, parameters, error=error
+                )
+            else:
+                if cli_settings.DEBUG:
+                    print(result)
+                    print_memory_usage(file)
+                print(
+                    f"{file}: {result.circumference}"
+                    if cli_settings.RAW
+                    else f"{file}: {constants.circumference_message(result.circumference, result.units)}"
+                )
+                row = results.make_row(
+                    path, fingerprint, parameters, result.circumference, result.units
+                )
+            if writer is not None:
+                writer.write(row)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if num_skipped:
+        print(f"Skipped {num_skipped} file(s) already in {cli_settings.OUTPUT}")
+    if num_failed:
+        print(f"{num_failed} of {len(files)} file(s) failed", file=sys.stderr)
+        exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,118 @@
+"""Defines ``main()`` for the ``merge`` subcommand, which combines the results files of a sharded batch.
+
+Usage: ``neuroruler merge -o RESULTS shard_results ... [--inputs FILE ... | --manifest LIST]``
+
+After an array job where task ``i`` ran ``python cli.py --shard i/N -o shard_i.csv <all files>``,
+``neuroruler merge -o all.csv shard_*.csv --inputs <all files>`` writes one row per input, sorted by path,
+and exits with status 1 if an input has no row, has rows from more than one shard, or a row isn't an input.
+Failed measurements count as covered; their rows have status ``error``.
+
+The merged file is written next to ``-o`` and renamed over it at the end, so it's never left half written.
+Rows read from CSV have string values, so merge CSV into CSV to keep the values as they were."""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Union
+
+import NeuroRuler.utils.exceptions as exceptions
+import NeuroRuler.utils.results as results
+import NeuroRuler.utils.sharding as sharding
+
+
+def read_manifest(path: Path) -> list[str]:
+    """Return the paths in ``path``, one per line. Blank lines and lines starting with ``#`` are ignored.
+
+    :param path:
+    :type path: Path
+    :return: Paths
+    :rtype: list[str]"""
+    with open(path, "r") as f:
+        return [
+            line.strip()
+            for line in f
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+
+def main(argv: list[str]) -> None:
+    """Entrypoint of ``neuroruler merge``.
+
+    :param argv: Arguments after ``merge``
+    :type argv: list[str]
+    :return: None"""
+    parser = argparse.ArgumentParser(
+        prog="neuroruler merge",
+        description="Combine the results files of cli.py --shard runs and check every input was measured once.",
+    )
+    parser.add_argument(
+        "shard_results", nargs="+", help="results files (.jsonl or .csv) of the shards"
+    )
+    parser.add_argument(
+        "-o", "--output", required=True, help="merged results file (.jsonl or .csv)"
+    )
+    parser.add_argument(
+        "--inputs",
+        nargs="+",
+        default=[],
+        help="every file given to the shards, to check that each has exactly one row",
+    )
+    parser.add_argument(
+        "--manifest",
+        help="text file listing the inputs, one per line, instead of --inputs",
+    )
+    args = parser.parse_args(argv)
+
+    output: Path = Path(args.output)
+    if output.suffix.lower() not in results.SUFFIXES:
+        parser.error(f"--output must end with {' or '.join(results.SUFFIXES)}")
+    shard_results: list[Path] = [Path(file) for file in args.shard_results]
+    for path in shard_results:
+        if not path.is_file():
+            parser.error(f"{path} doesn't exist")
+        if path.resolve() == output.resolve():
+            parser.error(f"--output {output} is also an input")
+
+    inputs: Union[list[str], None] = None
+    if args.inputs or args.manifest is not None:
+        inputs = list(args.inputs)
+        if args.manifest is not None:
+            inputs += read_manifest(Path(args.manifest))
+
+    merged, report = sharding.merge_rows(
+        {path: list(results.read_rows(path)) for path in shard_results}, inputs
+    )
+
+    temp: Path = output.with_name(f".tmp-{output.name}")
+    temp.unlink(missing_ok=True)
+    try:
+        with results.ResultsWriter(temp) as writer:
+            for row in merged:
+                writer.write(row)
+        os.replace(temp, output)
+    except (OSError, exceptions.InvalidResultsFile):
+        temp.unlink(missing_ok=True)
+        raise
+
+    num_failed: int = sum(row.get("status") != results.STATUS_OK for row in merged)
+    print(
+        f"Wrote {len(merged)} row(s) from {len(shard_results)} file(s) to {output}"
+        + (f", {num_failed} failed" if num_failed else "")
+    )
+    for path in report.missing:
+        print(f"Missing: {path}", file=sys.stderr)
+    for path, files in report.duplicated.items():
+        print(
+            f"Duplicated: {path} in {', '.join(str(file) for file in files)}",
+            file=sys.stderr,
+        )
+    for path in report.unexpected:
+        print(f"Not an input: {path}", file=sys.stderr)
+    if not report.ok:
+        print(
+            f"{len(report.missing)} missing, {len(report.duplicated)} duplicated, "
+            f"{len(report.unexpected)} unexpected",
+            file=sys.stderr,
+        )
+        exit(1)
@@ -0,0 +1,505 @@
+"""Defines ``main()`` for the ``serve`` subcommand, a long-running measurement daemon.
+
+Usage: ``neuroruler serve [--host HOST] [--port PORT | --socket PATH] [--workers N] [--image-cache-mb MB]``
+
+Every ``python cli.py`` invocation pays for starting Python and importing SimpleITK, OpenCV, and numpy,
+which dominates when a pipeline measures one image at a time. The daemon pays that once,
+keeps recently read images in memory, and measures images on a pool of worker threads.
+
+The API is JSON over HTTP, on localhost or on a Unix socket:
+
+- ``POST /measure`` with a JSON object containing ``path`` and, optionally, the options in ``OPTION_TYPES``,
+  which have the same names and meanings as the long options of ``python cli.py``.
+  Missing options default to ``cli_config.json``, same as the CLI.
+  Responds with ``{"status": "ok", "path": ..., "circumference": ..., "units": ...}``. On failure, responds with
+  ``{"status": "error", "error": ...}`` and status 400 (invalid request), 422 (invalid slice), or 500.
+- ``GET /health`` responds with ``{"status": "ok", ...}`` and some statistics.
+
+See ``client.py`` for the client."""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Union
+
+import SimpleITK as sitk
+
+import NeuroRuler.utils.cli_settings as cli_settings
+import NeuroRuler.utils.constants as constants
+import NeuroRuler.utils.exceptions as exceptions
+import NeuroRuler.utils.global_vars as global_vars
+import NeuroRuler.utils.api as api
+import NeuroRuler.utils.volume_cache as volume_cache
+from NeuroRuler.utils.constants import ThresholdFilter
+from NeuroRuler.utils.img_helpers import image_nbytes, read_z_oriented_image
+
+DEFAULT_HOST: str = "127.0.0.1"
+DEFAULT_PORT: int = 8765
+DEFAULT_WORKERS: int = min(4, os.cpu_count() or 1)
+DEFAULT_IMAGE_CACHE_MB: int = 1024
+
+MAX_REQUEST_BYTES: int = 65536
+"""Requests with a larger body are rejected."""
+
+OPTION_TYPES: dict[str, type] = {
+    "x": int,
+    "y": int,
+    "z": int,
+    "slice": int,
+    "conductance": float,
+    "iterations": int,
+    "step": float,
+    "filter": str,
+    "lower": float,
+    "upper": float,
+    "precision": str,
+}
+"""Optional fields of a measure request. Same names as the long options of ``parser.parse_cli``."""
+
+
+class ImageCache:
+    """Thread-safe LRU cache of Z-oriented images.
+
+    Keyed by ``volume_cache.fingerprint``, so a file that's modified after being cached is read again.
+    """
+
+    def __init__(self, max_bytes: int):
+        """:param max_bytes: Memory limit of cached images
+        :type max_bytes: int"""
+        self.max_bytes: int = max_bytes
+        self._lock: threading.Lock = threading.Lock()
+        self._images: OrderedDict[str, sitk.Image] = OrderedDict()
+        self._nbytes: int = 0
+
+    def get(self, path: Path) -> sitk.Image:
+        """Return the Z-oriented image at ``path``, reading it if it isn't cached.
+
+        :param path:
+        :type path: Path
+        :return: Image oriented for the Z view
+        :rtype: sitk.Image"""
+        key: str = volume_cache.fingerprint(path, constants.Z_ORIENTATION_STR)
+        with self._lock:
+            img: Union[sitk.Image, None] = self._images.get(key)
+            if img is not None:
+                self._images.move_to_end(key)
+                return img
+        # Read without holding the lock so other workers aren't blocked.
+        # Two workers may read the same new image at once, which is harmless.
+        img = read_z_oriented_image(path)
+        nbytes: int = image_nbytes(img)
+        with self._lock:
+            if key not in self._images and nbytes <= self.max_bytes:
+                self._images[key] = img
+                self._nbytes += nbytes
+                while self._nbytes > self.max_bytes:
+                    _, evicted = self._images.popitem(last=False)
+                    self._nbytes -= image_nbytes(evicted)
+        return img
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._images)
+
+
+def parse_request(request: Any) -> tuple[Path, dict[str, Any]]:
+    """Validate a measure request like ``parser.parse_cli`` validates CLI arguments.
+
+    :param request: Decoded JSON body
+    :type request: Any
+    :raise exceptions.InvalidRequest: If the request is malformed or its options are invalid
+    :return: (path, options), where options holds only the options present in the request
+    :rtype: tuple[Path, dict[str, Any]]"""
+    if not isinstance(request, dict):
+        raise exceptions.InvalidRequest("body must be a JSON object")
+    if not isinstance(request.get("path"), str):
+        raise exceptions.InvalidRequest('"path" must be a string')
+    path_str: str = request["path"]
+    if not any(
+        pattern.match(path_str)
+        for pattern in constants.SUPPORTED_IMAGE_EXTENSIONS_REGEX
+    ):
+        raise exceptions.InvalidRequest(
+            f"unsupported file extension, supported formats are {', '.join(constants.SUPPORTED_IMAGE_EXTENSIONS)}"
+        )
+    path: Path = Path(path_str)
+    if not path.is_file():
+        raise exceptions.InvalidRequest(f"no such file {path_str}")
+
+    options: dict[str, Any] = {}
+    for name, value in request.items():
+        if name == "path" or value is None:
+            continue
+        if name not in OPTION_TYPES:
+            raise exceptions.InvalidRequest(f'unknown option "{name}"')
+        expected: type = OPTION_TYPES[name]
+        # bool is a subclass of int, and an int is a valid float
+        valid: bool = not isinstance(value, bool) and (
+            isinstance(value, expected)
+            or (expected is float and isinstance(value, int))
+        )
+        if not valid:
+            raise exceptions.InvalidRequest(f'"{name}" must be {expected.__name__}')
+        options[name] = value
+
+    if "filter" in options:
+        if options["filter"].lower() in ("otsu", "volume-otsu"):
+            if "lower" in options or "upper" in options:
+                raise exceptions.InvalidRequest(
+                    "Otsu threshold filter automatically calculates threshold values, don't specify lower or upper"
+                )
+        elif options["filter"].lower() == "binary":
+            if "lower" not in options or "upper" not in options:
+                raise exceptions.InvalidRequest(
+                    "must specify lower and upper if using binary threshold"
+                )
+        else:
+            raise exceptions.InvalidRequest(
+                '"filter" must be "otsu", "volume-otsu", or "binary"'
+            )
+    if "precision" in options and options["precision"] not in constants.PRECISION_NAMES:
+        raise exceptions.InvalidRequest(
+            f'"precision" must be {" or ".join(constants.PRECISION_NAMES)}'
+        )
+    return path, options
+
+
+def measure(
+    path: Path, options: dict[str, Any], img: sitk.Image
+) -> tuple[float, Union[str, None]]:
+    """Compute the circumference of ``img`` the same way ``CLI.main.main`` does. Safe to call from any thread.
+
+    :param path: Path of ``img``
+    :type path: Path
+    :param options: Validated options returned by ``parse_request``. Missing options default to ``cli_settings``.
+    :type options: dict[str, Any]
+    :param img: Z-oriented image
+    :type img: sitk.Image
+    :raise exceptions.InvalidRequest: If the slice or a rotation is out of bounds
+    :raise exceptions.ComputeCircumferenceOfInvalidSlice: If the slice isn't a valid brain slice
+    :return: (circumference, units or None)
+    :rtype: tuple[float, str or None]"""
+    threshold: Union[ThresholdFilter, tuple[float, float]] = (
+        (cli_settings.LOWER_BINARY_THRESHOLD, cli_settings.UPPER_BINARY_THRESHOLD)
+        if cli_settings.THRESHOLD_FILTER == ThresholdFilter.Binary
+        else cli_settings.THRESHOLD_FILTER
+    )
+    if "filter" in options:
+        threshold = {
+            "otsu": ThresholdFilter.Otsu,
+            "volume-otsu": ThresholdFilter.VolumeOtsu,
+        }.get(options["filter"].lower(), (options.get("lower"), options.get("upper")))
+    slice_num: int = options.get("slice", cli_settings.SLICE)
+
+    try:
+        result: api.Measurement = api.measure(
+            img,
+            theta=(
+                options.get("x", cli_settings.THETA_X),
+                options.get("y", cli_settings.THETA_Y),
+                options.get("z", cli_settings.THETA_Z),
+            ),
+            # -1 means the middle slice
+            slice=None if slice_num == -1 else slice_num,
+            smoothing=api.Smoothing(
+                options.get("conductance", cli_settings.CONDUCTANCE_PARAMETER),
+                options.get("iterations", cli_settings.SMOOTHING_ITERATIONS),
+                options.get("step", cli_settings.TIME_STEP),
+            ),
+            threshold=threshold,
+            precision=constants.PRECISION_NAMES[options["precision"]]
+            if "precision" in options
+            else cli_settings.PRECISION,
+        )
+    except (exceptions.SliceOutOfBounds, exceptions.RotationOutOfBounds) as e:
+        raise exceptions.InvalidRequest(f"{e.message} ({path.name})")
+    return result.circumference, result.units
+
+
+class MeasurementServer:
+    """State shared by all connections: the worker pool and the image cache."""
+
+    def __init__(self, num_workers: int, image_cache_bytes: int):
+        """:param num_workers: Number of measurements computed at once
+        :type num_workers: int
+        :param image_cache_bytes: Memory limit of cached images
+        :type image_cache_bytes: int"""
+        self.num_workers: int = num_workers
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=num_workers, thread_name_prefix="NeuroRuler-serve"
+        )
+        self.image_cache: ImageCache = ImageCache(image_cache_bytes)
+        self._lock: threading.Lock = threading.Lock()
+        self.num_requests: int = 0
+        self.num_errors: int = 0
+
+    def handle_measure(self, request: Any) -> tuple[HTTPStatus, dict[str, Any]]:
+        """Compute a measure request on the worker pool and wait for the result.
+
+        :param request: Decoded JSON body
+        :type request: Any
+        :return: (HTTP status, response body)
+        :rtype: tuple[HTTPStatus, dict[str, Any]]"""
+        status, response = self.executor.submit(self._measure, request).result()
+        with self._lock:
+            self.num_requests += 1
+            if status != HTTPStatus.OK:
+                self.num_errors += 1
+        return status, response
+
+    def _measure(self, request: Any) -> tuple[HTTPStatus, dict[str, Any]]:
+        """Runs on a worker thread.
+
+        :param request: Decoded JSON body
+        :type request: Any
+        :return: (HTTP status, response body)
+        :rtype: tuple[HTTPStatus, dict[str, Any]]"""
+        try:
+            path, options = parse_request(request)
+            img: sitk.Image = self.image_cache.get(path)
+            circumference, units = measure(path, options, img)
+        except exceptions.InvalidRequest as e:
+            return HTTPStatus.BAD_REQUEST, {"status": "error", "error": e.message}
+        except exceptions.ComputeCircumferenceOfInvalidSlice as e:
+            return HTTPStatus.UNPROCESSABLE_ENTITY, {
+                "status": "error",
+                "error": e.message,
+            }
+        except Exception as e:
+            # E.g. the file can't be read by SimpleITK
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {
+                "status": "error",
+                "error": str(e),
+            }
+        return HTTPStatus.OK, {
+            "status": "ok",
+            "path": str(path),
+            "circumference": circumference,
+            "units": units,
+        }
+
+    def health(self) -> dict[str, Any]:
+        """:return: Response body of ``GET /health``
+        :rtype: dict[str, Any]"""
+        with self._lock:
+            num_requests, num_errors = self.num_requests, self.num_errors
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "workers": self.num_workers,
+            "images_cached": len(self.image_cache),
+            "requests": num_requests,
+            "errors": num_errors,
+        }
+
+    def shutdown(self) -> None:
+        """:return: None"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Handles one connection. ``self.server.measurement_server`` is the shared ``MeasurementServer``."""
+
+    server_version = "NeuroRuler"
+    # Keep connections open between requests from the same client
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self.send_json(HTTPStatus.OK, self.server.measurement_server.health())
+        else:
+            self.send_json(
+                HTTPStatus.NOT_FOUND, {"status": "error", "error": "not found"}
+            )
+
+    def do_POST(self) -> None:
+        if self.path != "/measure":
+            self.send_json(
+                HTTPStatus.NOT_FOUND, {"status": "error", "error": "not found"}
+            )
+            return
+        try:
+            length: int = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_REQUEST_BYTES:
+            self.close_connection = True
+            self.send_json(
+                HTTPStatus.BAD_REQUEST,
+                {"status": "error", "error": "invalid Content-Length"},
+            )
+            return
+        try:
+            request: Any = json.loads(self.rfile.read(length))
+        except ValueError:
+            self.send_json(
+                HTTPStatus.BAD_REQUEST,
+                {"status": "error", "error": "body is not valid JSON"},
+            )
+            return
+        self.send_json(*self.server.measurement_server.handle_measure(request))
+
+    def send_json(self, status: HTTPStatus, body: dict[str, Any]) -> None:
+        """Send ``body`` as the JSON response.
+
+        :param status:
+        :type status: HTTPStatus
+        :param body:
+        :type body: dict[str, Any]
+        :return: None"""
+        data: bytes = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self) -> str:
+        # client_address is an empty string for Unix sockets
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if cli_settings.DEBUG:
+            super().log_message(format, *args)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """``ThreadingHTTPServer`` for a Unix socket."""
+
+    daemon_threads = True
+
+
+def remove_stale_socket(socket_path: Path) -> None:
+    """Remove ``socket_path`` if it's left over from a server that exited without cleaning up.
+
+    :param socket_path:
+    :type socket_path: Path
+    :raise OSError: If another server is listening on ``socket_path``
+    :return: None"""
+    if not socket_path.exists():
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        try:
+            s.connect(str(socket_path))
+        except ConnectionRefusedError:
+            socket_path.unlink()
+            return
+    raise OSError(f"Another server is already listening on {socket_path}")
+
+
+def bind_unix_server(socket_path: Path) -> UnixHTTPServer:
+    """Return a server listening on a new Unix socket at ``socket_path`` that only the current user may connect to.
+
+    The socket file is created with mode 0600 by clearing the other bits of the umask while binding,
+    so there's no moment when it's open to other users, as there would be when ``chmod`` is called after binding.
+
+    :param socket_path: Mustn't exist
+    :type socket_path: Path
+    :return: Server
+    :rtype: UnixHTTPServer"""
+    # The umask is process-wide. No other thread is running yet, so none creates files with it.
+    old_umask: int = os.umask(0o177)
+    try:
+        return UnixHTTPServer(str(socket_path), RequestHandler)
+    finally:
+        os.umask(old_umask)
+
+
+def main(argv: list[str]) -> None:
+    """Entrypoint of ``neuroruler serve``. ``parser.parse_cli_config()`` must be called first.
+
+    :param argv: Arguments after ``serve``
+    :type argv: list[str]
+    :return: None"""
+    parser = argparse.ArgumentParser(
+        prog="neuroruler serve",
+        description="Keep a warm process that measures head circumference for requests sent by neuroruler client.",
+    )
+    parser.add_argument(
+        "--host",
+        default=DEFAULT_HOST,
+        help=f"address to listen on, default {DEFAULT_HOST} (localhost only)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"port to listen on, default {DEFAULT_PORT}",
+    )
+    parser.add_argument(
+        "--socket", help="listen on this Unix socket instead of --host and --port"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"number of measurements computed at once, default {DEFAULT_WORKERS}",
+    )
+    parser.add_argument(
+        "--image-cache-mb",
+        type=int,
+        default=DEFAULT_IMAGE_CACHE_MB,
+        help=f"memory limit of images kept in memory between requests, default {DEFAULT_IMAGE_CACHE_MB}",
+    )
+    parser.add_argument("-d", "--debug", help="log requests", action="store_true")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.debug:
+        cli_settings.DEBUG = True
+
+    global_vars.VOLUME_CACHE_DIR = cli_settings.VOLUME_CACHE_DIR
+    global_vars.VOLUME_CACHE_MAX_BYTES = cli_settings.VOLUME_CACHE_MAX_MB * 1024 * 1024
+    # Each filter is multithreaded. Split the cores between workers instead of oversubscribing them.
+    sitk.ProcessObject.SetGlobalDefaultNumberOfThreads(
+        max(1, (os.cpu_count() or 1) // args.workers)
+    )
+
+    measurement_server: MeasurementServer = MeasurementServer(
+        args.workers, args.image_cache_mb * 1024 * 1024
+    )
+    socket_path: Union[Path, None] = None
+    if args.socket is not None:
+        socket_path = Path(args.socket)
+        try:
+            remove_stale_socket(socket_path)
+        except OSError as e:
+            print(f"{e}. Exiting.")
+            exit(1)
+        # Only the current user may send requests
+        server: socketserver.BaseServer = bind_unix_server(socket_path)
+        print(
+            f"Serving on Unix socket {socket_path} with {args.workers} worker(s)",
+            flush=True,
+        )
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), RequestHandler)
+        print(
+            f"Serving on http://{args.host}:{server.server_address[1]} with {args.workers} worker(s)",
+            flush=True,
+        )
+    server.measurement_server = measurement_server
+
+    # Clean up (e.g. remove the socket file) when stopped by a service manager, not just on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        measurement_server.shutdown()
+        if socket_path is not None:
+            socket_path.unlink(missing_ok=True)
@@ -0,0 +1,503 @@
+"""Defines ``main()`` for the ``watch`` subcommand, which measures images as they appear in a directory.
+
+Usage: ``neuroruler watch [-o RESULTS] [--workers N] [--queue-size N] [--settle SECONDS] [--poll] dir``
+
+For scanner exports that drop new ``.nrrd``/``.nii.gz`` files into a directory all day.
+Files in the directory are measured with the settings in ``cli_config.json``, and each result is appended to
+a results file (see ``results.py``) as soon as it's computed. Files already in the directory when the watch starts
+are measured too, unless the results file already has a successful row for them, so restarting resumes.
+
+- New files are detected with inotify on Linux, or by rescanning the directory every ``--poll-interval`` seconds
+  elsewhere (or with ``--poll``, e.g. for network file systems, where inotify misses remote writes).
+- A file is measured only once its size and modification time haven't changed for ``--settle`` seconds,
+  so a file that's still being written isn't read. Names starting with ``.`` (temporary files) are ignored.
+- Ready files go into a queue of at most ``--queue-size`` paths that ``--workers`` threads measure.
+  When the queue is full, the watcher waits for a worker instead of reading more events, so a burst of
+  thousands of files holds only their paths (never more than ``--workers`` images) in memory.
+  If the kernel's event queue overflows meanwhile, the directory is rescanned.
+
+Stop with Ctrl+C or SIGTERM. Images being measured are finished and written before exiting.
+Queued files that weren't started are measured after a restart."""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterator, Union
+
+import SimpleITK as sitk
+
+import NeuroRuler.utils.cli_settings as cli_settings
+import NeuroRuler.utils.constants as constants
+import NeuroRuler.utils.results as results
+import NeuroRuler.utils.volume_cache as volume_cache
+from NeuroRuler.CLI.main import measure_file, result_parameters
+from NeuroRuler.utils.api import Measurement
+
+DEFAULT_WORKERS: int = min(4, os.cpu_count() or 1)
+DEFAULT_QUEUE_SIZE: int = 64
+DEFAULT_SETTLE_SECONDS: float = 2.0
+DEFAULT_POLL_INTERVAL_SECONDS: float = 1.0
+DEFAULT_OUTPUT: Path = constants.OUTPUT_DIR / "watch_results.jsonl"
+
+# From <sys/inotify.h>
+IN_MODIFY: int = 0x00000002
+IN_CLOSE_WRITE: int = 0x00000008
+IN_MOVED_TO: int = 0x00000080
+IN_CREATE: int = 0x00000100
+IN_DELETE_SELF: int = 0x00000400
+IN_Q_OVERFLOW: int = 0x00004000
+INOTIFY_EVENT: struct.Struct = struct.Struct("iIII")
+"""wd, mask, cookie, len, followed by ``len`` bytes of null-padded name"""
+INOTIFY_READ_BYTES: int = 65536
+
+
+def is_image(path: Path) -> bool:
+    """Return True if ``path`` has a supported image extension and isn't a hidden (e.g. temporary) file.
+
+    :param path:
+    :type path: Path
+    :return: Whether ``path`` should be measured
+    :rtype: bool"""
+    return not path.name.startswith(".") and any(
+        pattern.match(path.name)
+        for pattern in constants.SUPPORTED_IMAGE_EXTENSIONS_REGEX
+    )
+
+
+class PollingWatcher:
+    """Detects changed files by listing the directory. Works on any file system."""
+
+    def __init__(
+        self, directory: Path, interval: float = DEFAULT_POLL_INTERVAL_SECONDS
+    ):
+        """:param directory:
+        :type directory: Path
+        :param interval: Seconds between scans
+        :type interval: float"""
+        self.directory: Path = directory
+        self.interval: float = interval
+        self._stats: dict[Path, tuple[int, int]] = {}
+        self._next_scan: float = 0.0
+
+    def events(self, timeout: float) -> list[Path]:
+        """Wait up to ``timeout`` seconds and return the files that are new or changed since the last scan.
+
+        :param timeout: Seconds
+        :type timeout: float
+        :return: Changed image files
+        :rtype: list[Path]"""
+        wait: float = self._next_scan - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if wait > timeout:
+                return []
+        self._next_scan = time.monotonic() + self.interval
+        stats: dict[Path, tuple[int, int]] = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                path: Path = Path(entry.path)
+                if not is_image(path):
+                    continue
+                try:
+                    stat: os.stat_result = entry.stat()
+                except FileNotFoundError:
+                    continue
+                stats[path] = (stat.st_size, stat.st_mtime_ns)
+        changed: list[Path] = [
+            path for path, stat in stats.items() if self._stats.get(path) != stat
+        ]
+        self._stats = stats
+        return changed
+
+    def close(self) -> None:
+        """:return: None"""
+
+
+class InotifyWatcher:
+    """Detects changed files with Linux inotify, so there's no scanning between events.
+
+    An event queue overflow makes the next ``events`` call return every image in the directory.
+    """
+
+    def __init__(self, directory: Path):
+        """:param directory:
+        :type directory: Path
+        :raise OSError: If inotify isn't available (e.g. not Linux) or the directory can't be watched
+        """
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.directory: Path = directory
+        self._fd: int = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if (
+            libc.inotify_add_watch(
+                self._fd,
+                os.fsencode(directory),
+                IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF,
+            )
+            < 0
+        ):
+            errno: int = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def events(self, timeout: float) -> list[Path]:
+        """Wait up to ``timeout`` seconds and return the files that were created, written, or moved in.
+
+        :param timeout: Seconds
+        :type timeout: float
+        :raise FileNotFoundError: If the watched directory was deleted
+        :return: Changed image files
+        :rtype: list[Path]"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        changed: dict[Path, None] = {}
+        while True:
+            try:
+                data: bytes = os.read(self._fd, INOTIFY_READ_BYTES)
+            except BlockingIOError:
+                break
+            offset: int = 0
+            while offset < len(data):
+                _, mask, _, name_length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name: bytes = data[offset : offset + name_length].rstrip(b"\0")
+                offset += name_length
+                if mask & IN_DELETE_SELF:
+                    raise FileNotFoundError(f"{self.directory} was deleted")
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped, so every file may have changed
+                    changed.update(
+                        dict.fromkeys(
+                            p for p in self.directory.iterdir() if is_image(p)
+                        )
+                    )
+                elif name:
+                    path: Path = self.directory / os.fsdecode(name)
+                    if is_image(path):
+                        changed[path] = None
+        return list(changed)
+
+    def close(self) -> None:
+        """:return: None"""
+        os.close(self._fd)
+
+
+class Debouncer:
+    """Holds changed files until their size and modification time have been stable for ``settle`` seconds."""
+
+    def __init__(self, settle: float, clock: Callable[[], float] = time.monotonic):
+        """:param settle: Seconds a file must stay unchanged before it's ready
+        :type settle: float
+        :param clock: Returns the current time in seconds, replaceable for testing
+        :type clock: Callable[[], float]"""
+        self.settle: float = settle
+        self.clock: Callable[[], float] = clock
+        self._pending: dict[Path, tuple[tuple[int, int], float]] = {}
+        """Path -> (last (size, mtime) seen, time it was first seen)"""
+
+    def touch(self, path: Path) -> None:
+        """Record that ``path`` changed. Restarts its settle time.
+
+        :param path:
+        :type path: Path
+        :return: None"""
+        self._pending[path] = ((-1, -1), self.clock())
+
+    def ready(self) -> Iterator[Path]:
+        """Yield pending files that haven't changed for ``settle`` seconds, and stop tracking them.
+        Files that were deleted are dropped.
+
+        :return: Files ready to be measured
+        :rtype: Iterator[Path]"""
+        now: float = self.clock()
+        for path, (last_stat, since) in list(self._pending.items()):
+            try:
+                stat: os.stat_result = path.stat()
+            except FileNotFoundError:
+                del self._pending[path]
+                continue
+            current: tuple[int, int] = (stat.st_size, stat.st_mtime_ns)
+            if current != last_stat:
+                self._pending[path] = (current, now)
+            elif now - since >= self.settle:
+                del self._pending[path]
+                yield path
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+class Ingester:
+    """Measures queued files on a pool of worker threads and writes their rows to a results file.
+
+    Skips files whose fingerprint and parameters already have a successful row, so a file that's touched
+    without being changed, or that was measured before a restart, isn't measured again.
+    """
+
+    def __init__(
+        self,
+        writer: results.ResultsWriter,
+        num_workers: int,
+        queue_size: int,
+        measure_path: Callable[[Path], Measurement] = measure_file,
+    ):
+        """:param writer: Results file. Its existing successful rows are skipped.
+        :type writer: results.ResultsWriter
+        :param num_workers:
+        :type num_workers: int
+        :param queue_size: Maximum number of files waiting for a worker
+        :type queue_size: int
+        :param measure_path: Measures one file
+        :type measure_path: Callable[[Path], Measurement]"""
+        self.writer: results.ResultsWriter = writer
+        self.measure_path: Callable[[Path], Measurement] = measure_path
+        self.parameters: dict = result_parameters()
+        self._lock: threading.Lock = threading.Lock()
+        self._done: set[tuple[str, ...]] = results.completed_keys(writer.path)
+        self.num_measured: int = 0
+        self.num_failed: int = 0
+        self.queue: queue.Queue[Union[Path, None]] = queue.Queue(maxsize=queue_size)
+        self._workers: list[threading.Thread] = [
+            threading.Thread(
+                target=self._work, name=f"NeuroRuler-watch-{i}", daemon=True
+            )
+            for i in range(num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, path: Path, stop: threading.Event) -> bool:
+        """Queue ``path``, waiting while the queue is full (backpressure).
+
+        :param path:
+        :type path: Path
+        :param stop: Stop waiting when this is set
+        :type stop: threading.Event
+        :return: Whether ``path`` was queued
+        :rtype: bool"""
+        while not stop.is_set():
+            try:
+                self.queue.put(path, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _work(self) -> None:
+        """Runs on each worker thread until it gets None.
+
+        :return: None"""
+        while True:
+            path: Union[Path, None] = self.queue.get()
+            if path is None:
+                return
+            try:
+                self._measure(path)
+            finally:
+                self.queue.task_done()
+
+    def _measure(self, path: Path) -> None:
+        """:param path:
+        :type path: Path
+        :return: None"""
+        try:
+            fingerprint: str = volume_cache.fingerprint(
+                path, constants.Z_ORIENTATION_STR
+            )
+        except FileNotFoundError:
+            # Deleted after it was queued
+            return
+        key: tuple[str, ...] = results.result_key(
+            results.make_row(path, fingerprint, self.parameters)
+        )
+        with self._lock:
+            if key in self._done:
+                return
+            # Claim it so another worker doesn't measure the same version of the file
+            self._done.add(key)
+        try:
+            result: Measurement = self.measure_path(path)
+        except Exception as e:
+            error: str = getattr(e, "message", str(e))
+            with self._lock:
+                self.num_failed += 1
+                # Measure it again if it's rewritten or the watch is restarted
+                self._done.discard(key)
+            print(f"{path}: {error}", file=sys.stderr, flush=True)
+            row: dict = results.make_row(
+                path, fingerprint, self.parameters, error=error
+            )
+        else:
+            with self._lock:
+                self.num_measured += 1
+            print(
+                f"{path}: {result.circumference}"
+                if cli_settings.RAW
+                else f"{path}: {constants.circumference_message(result.circumference, result.units)}",
+                flush=True,
+            )
+            row = results.make_row(
+                path, fingerprint, self.parameters, result.circumference, result.units
+            )
+        self.writer.write(row)
+
+    def shutdown(self) -> None:
+        """Stop the workers once they finish the images they're measuring. Files still in the queue are dropped,
+        and measured when the watch is restarted since they have no row.
+
+        :return: None"""
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+            self.queue.task_done()
+        for _ in self._workers:
+            self.queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+
+def watch(
+    directory: Path,
+    ingester: Ingester,
+    watcher: Union[InotifyWatcher, PollingWatcher],
+    settle: float,
+    stop: threading.Event,
+) -> None:
+    """Queue every image in ``directory``, then every image that changes, once it has settled, until ``stop`` is set.
+
+    :param directory:
+    :type directory: Path
+    :param ingester:
+    :type ingester: Ingester
+    :param watcher:
+    :type watcher: InotifyWatcher or PollingWatcher
+    :param settle: Seconds a file must stay unchanged before it's queued
+    :type settle: float
+    :param stop:
+    :type stop: threading.Event
+    :return: None"""
+    debouncer: Debouncer = Debouncer(settle)
+    for path in sorted(directory.iterdir()):
+        if is_image(path):
+            debouncer.touch(path)
+    while not stop.is_set():
+        # Check pending files often enough to respect the settle time, but don't spin when there are none
+        timeout: float = min(settle / 2, 0.5) if len(debouncer) else 0.5
+        for path in watcher.events(timeout):
+            debouncer.touch(path)
+        for path in debouncer.ready():
+            if not ingester.submit(path, stop):
+                return
+
+
+def main(argv: list[str]) -> None:
+    """Entrypoint of ``neuroruler watch``. ``parser.parse_cli_config()`` must be called first.
+
+    :param argv: Arguments after ``watch``
+    :type argv: list[str]
+    :return: None"""
+    parser = argparse.ArgumentParser(
+        prog="neuroruler watch",
+        description="Measure images as they appear in a directory, with the settings in cli_config.json.",
+    )
+    parser.add_argument("dir", help="directory to watch")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=str(DEFAULT_OUTPUT),
+        help=f"results file (.jsonl or .csv), default {DEFAULT_OUTPUT}",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"number of images measured at once, default {DEFAULT_WORKERS}",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help=f"maximum number of files waiting for a worker, default {DEFAULT_QUEUE_SIZE}",
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=DEFAULT_SETTLE_SECONDS,
+        help=f"seconds a file must stay unchanged before it's measured, default {DEFAULT_SETTLE_SECONDS}",
+    )
+    parser.add_argument(
+        "--poll",
+        help="rescan the directory instead of using inotify",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL_SECONDS,
+        help=f"seconds between rescans with --poll, default {DEFAULT_POLL_INTERVAL_SECONDS}",
+    )
+    parser.add_argument(
+        "-r", "--raw", help='print just the "raw" circumference', action="store_true"
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.queue_size < 1:
+        parser.error("--workers and --queue-size must be at least 1")
+    if Path(args.output).suffix.lower() not in results.SUFFIXES:
+        parser.error(f"--output must end with {' or '.join(results.SUFFIXES)}")
+    directory: Path = Path(args.dir)
+    if not directory.is_dir():
+        parser.error(f"{directory} is not a directory")
+    cli_settings.RAW = args.raw or cli_settings.RAW
+
+    # Each filter is multithreaded. Split the cores between workers instead of oversubscribing them.
+    sitk.ProcessObject.SetGlobalDefaultNumberOfThreads(
+        max(1, (os.cpu_count() or 1) // args.workers)
+    )
+    watcher: Union[InotifyWatcher, PollingWatcher]
+    if args.poll:
+        watcher = PollingWatcher(directory, args.poll_interval)
+    else:
+        try:
+            watcher = InotifyWatcher(directory)
+        except OSError as e:
+            print(
+                f"{e}, rescanning every {args.poll_interval} seconds instead",
+                file=sys.stderr,
+            )
+            watcher = PollingWatcher(directory, args.poll_interval)
+
+    stop: threading.Event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    print(
+        f"Watching {directory} with {args.workers} worker(s), writing to {args.output}",
+        flush=True,
+    )
+    with results.ResultsWriter(Path(args.output)) as writer:
+        ingester: Ingester = Ingester(writer, args.workers, args.queue_size)
+        try:
+            watch(directory, ingester, watcher, args.settle, stop)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop.set()
+            watcher.close()
+            ingester.shutdown()
+    print(
+        f"Measured {ingester.num_measured} image(s), {ingester.num_failed} failed",
+        flush=True,
+    )
@@ -2,12 +2,13 @@
 
 import platform
 import string
-from typing import Union
+from collections import OrderedDict
+from typing import Hashable, Union
 
 import SimpleITK as sitk
 import numpy as np
 
-from PyQt6.QtGui import QImage, QColor, QPixmap, QIcon, QFont
+from PyQt6.QtGui import QImage, QColor, QPixmap, QIcon, QFont, QPainter, QPen, QPolygonF
 from PyQt6 import QtWidgets
 from PyQt6.QtWidgets import (
     QApplication,
@@ -20,7 +21,7 @@ from PyQt6.QtWidgets import (
     QWidget,
     QMessageBox,
 )
-from PyQt6.QtCore import QSize
+from PyQt6.QtCore import QPointF, QSize
 from PyQt6.QtCore import Qt
 
 import qimage2ndarray
@@ -28,10 +29,13 @@ import qimage2ndarray
 import NeuroRuler.utils.exceptions as exceptions
 import NeuroRuler.utils.gui_settings as user_settings
 from NeuroRuler.utils.constants import deprecated
+from NeuroRuler.utils.imgproc import ContourPolyline
 
 MACOS: bool = "macOS" in platform.platform()
 WINDOW_TITLE_PADDING: int = 12
 """Used in InformationDialog to add width to the dialog to prevent the window title from being truncated."""
+OVERLAY_PEN_WIDTH: float = 2.0
+"""Width in screen pixels of the contour and slice indicator drawn by ``draw_overlays_QPixmap``"""
 
 
 # tl;dr QColor can have alpha (e.g., if we wanted contour color to be transparent)
@@ -63,10 +67,14 @@ def mask_QImage(q_img: QImage, binary_mask: np.ndarray, color: QColor) -> None:
     """Given 2D ``q_img`` and 2D ``binary_mask`` of the same shape, apply ``binary_mask`` on ``q_img``
     to change ``q_img`` pixels corresponding to ``binary_mask``=1 to ``color``. Mutates ``q_img``.
 
-    QImage and numpy use [reversed w,h order](https://stackoverflow.com/a/68220805/18479243).
+    ``binary_mask`` is indexed [row, column] like the arrays returned by ``sitk.GetArrayFromImage`` and
+    ``imgproc.contour``, so it shouldn't be transposed. QImage and numpy use
+    [reversed w,h order](https://stackoverflow.com/a/68220805/18479243).
 
     This function checks that
-    ``q_img.size().width() == binary_mask.shape[0]`` and ``q_img.size().height() == binary_mask.shape[1]``.
+    ``q_img.size().height() == binary_mask.shape[0]`` and ``q_img.size().width() == binary_mask.shape[1]``.
+
+    ``q_img`` must be a 32-bit format, e.g. the RV of ``sitk_slice_to_qimage``.
 
     :param q_img:
     :type q_img: QImage
@@ -78,29 +86,256 @@ def mask_QImage(q_img: QImage, binary_mask: np.ndarray, color: QColor) -> None:
     :return: None
     :rtype: None"""
     if (
-        q_img.size().width() != binary_mask.shape[0]
-        or q_img.size().height() != binary_mask.shape[1]
+        q_img.size().height() != binary_mask.shape[0]
+        or q_img.size().width() != binary_mask.shape[1]
+    ):
+        raise exceptions.ArraysDifferentShape
+    # A 0|1 uint8 array can be reinterpreted as bool without copying
+    mask: np.ndarray = (
+        binary_mask.view(np.bool_)
+        if binary_mask.dtype == np.uint8
+        else binary_mask != 0
+    )
+    qimage2ndarray.rgb_view(q_img)[mask] = (color.red(), color.green(), color.blue())
+
+
+def draw_overlays_QPixmap(
+    pixmap: QPixmap,
+    source_size: QSize,
+    contour: Union[ContourPolyline, None],
+    indicator_row: Union[int, None],
+    color: QColor,
+) -> None:
+    """Draw ``contour`` and a horizontal slice indicator at ``indicator_row`` on ``pixmap``,
+    which shows an image of ``source_size`` scaled to ``pixmap``'s size. Mutates ``pixmap``.
+
+    Both are drawn as antialiased vector lines of ``OVERLAY_PEN_WIDTH`` pixels after scaling,
+    so they stay sharp at any zoom. The center of source pixel (x, y) is drawn at
+    ((x + 0.5) * width scale, (y + 0.5) * height scale).
+
+    :param pixmap: Scaled image
+    :type pixmap: QPixmap
+    :param source_size: Size of the unscaled image
+    :type source_size: QSize
+    :param contour: Contour of the unscaled image. None to not draw a contour.
+    :type contour: ContourPolyline or None
+    :param indicator_row: Row of the unscaled image, 0 is the top row. None to not draw an indicator.
+    :type indicator_row: int or None
+    :param color:
+    :type color: QColor
+    :raise: exceptions.ArraysDifferentShape if ``contour`` was found in a slice of a different shape
+    :return: None
+    :rtype: None"""
+    if contour is not None and contour.shape != (
+        source_size.height(),
+        source_size.width(),
     ):
         raise exceptions.ArraysDifferentShape
-    for i in range(binary_mask.shape[0]):
-        for j in range(binary_mask.shape[1]):
-            if binary_mask[i][j]:
-                q_img.setPixelColor(i, j, color)
+    draw_contour: bool = contour is not None and len(contour.points) > 0
+    if not draw_contour and indicator_row is None:
+        return
+    x_scale: float = pixmap.width() / source_size.width()
+    y_scale: float = pixmap.height() / source_size.height()
+
+    painter: QPainter = QPainter(pixmap)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    pen: QPen = QPen(color, OVERLAY_PEN_WIDTH)
+    pen.setCosmetic(True)
+    painter.setPen(pen)
+    if draw_contour:
+        painter.drawPolygon(
+            QPolygonF(
+                [
+                    QPointF((x + 0.5) * x_scale, (y + 0.5) * y_scale)
+                    for x, y in contour.to_list()
+                ]
+            )
+        )
+    if indicator_row is not None:
+        y: float = (indicator_row + 0.5) * y_scale
+        painter.drawLine(QPointF(0, y), QPointF(pixmap.width(), y))
+    painter.end()
+
+
+def color_row_QImage(q_img: QImage, row: int, color: QColor) -> None:
+    """Set every pixel in ``row`` of ``q_img`` to ``color``. Mutates ``q_img``.
+
+    ``q_img`` must be a 32-bit format, e.g. the RV of ``sitk_slice_to_qimage``.
+
+    :param q_img:
+    :type q_img: QImage
+    :param row: 0 is the top row
+    :type row: int
+    :param color:
+    :type color: QColor
+    :return: None
+    :rtype: None"""
+    qimage2ndarray.rgb_view(q_img)[row] = (color.red(), color.green(), color.blue())
+
 
+_QIMAGE_BUFFERS: dict[tuple[int, int], QImage] = {}
+"""RGB32 QImage reused by ``sitk_slice_to_qimage`` for each (height, width)"""
+_SCRATCH_BUFFERS: dict[tuple[tuple[int, int], np.dtype], np.ndarray] = {}
+"""Buffer for normalizing pixels, reused by ``sitk_slice_to_qimage`` for each (shape, dtype)"""
 
-def sitk_slice_to_qimage(sitk_slice: sitk.Image) -> QImage:
+
+def sitk_slice_to_qimage(sitk_slice: sitk.Image, reuse: bool = True) -> QImage:
     """Convert a 2D sitk.Image slice to a QImage.
 
-    This function calls sitk.GetArrayFromImage, which returns the transpose.
-    It also calls qimage2ndarray.array2qimage with normalize=True, normalizing
-    the pixels to 0..255.
+    Reads the slice through sitk.GetArrayViewFromImage, which is indexed like the transpose, without copying it.
+    Normalizes the pixels to 0..255 like qimage2ndarray.array2qimage with normalize=True.
+
+    If ``reuse``, the QImage and the buffer used for normalizing are reused by the next call with a slice of the
+    same size and ``reuse``, so the RV is only valid until then. Don't convert the RV itself to a QPixmap, since the
+    QPixmap would share its buffer and the next call would have to detach (copy) it. Scale it first, which creates
+    a new QImage. Otherwise, the RV is a new QImage that isn't shared, e.g. for a view kept next to the main one.
 
     :param sitk_slice: 2D slice
     :type sitk_slice: sitk.Image
+    :param reuse: Whether to write into the QImage reused for slices of this size
+    :type reuse: bool
     :return: 0..255 normalized QImage
     :rtype: QImage"""
-    slice_np: np.ndarray = sitk.GetArrayFromImage(sitk_slice)
-    return qimage2ndarray.array2qimage(slice_np, normalize=True)
+    slice_np: np.ndarray = sitk.GetArrayViewFromImage(sitk_slice)
+    height, width = slice_np.shape
+    q_img: Union[QImage, None] = _QIMAGE_BUFFERS.get(slice_np.shape) if reuse else None
+    if q_img is None:
+        q_img = QImage(width, height, QImage.Format.Format_RGB32)
+        # RGB32 pixels must be 0xffRRGGBB. The color channels are overwritten, so this is the only write to alpha.
+        q_img.fill(QColor(0, 0, 0))
+        if reuse:
+            _QIMAGE_BUFFERS[slice_np.shape] = q_img
+
+    # Same types as array2qimage's normalization, e.g. float64 for integer pixels
+    dtype: np.dtype = np.result_type(slice_np.dtype, 255.0)
+    scratch: Union[np.ndarray, None] = _SCRATCH_BUFFERS.get((slice_np.shape, dtype))
+    if scratch is None:
+        scratch = np.empty(slice_np.shape, dtype)
+        _SCRATCH_BUFFERS[(slice_np.shape, dtype)] = scratch
+    low, high = slice_np.min(), slice_np.max()
+    np.subtract(slice_np, low, out=scratch, casting="unsafe")
+    if high != low:
+        # Computed in dtype so integer pixels can't overflow
+        np.multiply(scratch, 255.0 / np.subtract(high, low, dtype=dtype), out=scratch)
+    qimage2ndarray.rgb_view(q_img)[...] = scratch[..., None]
+    return q_img
+
+
+def display_buffers_nbytes(in_use: Union[QImage, None] = None) -> int:
+    """Memory held by the QImage and normalization buffers reused by ``sitk_slice_to_qimage``.
+
+    :param in_use: QImage returned by ``sitk_slice_to_qimage`` that's still displayed (e.g. ``UNSCALED_QIMAGE``)
+        and accounted for by the caller. Not counted.
+    :type in_use: QImage or None
+    :return: Bytes of all buffers except ``in_use``
+    :rtype: int"""
+    return sum(
+        q_img.sizeInBytes() for q_img in _QIMAGE_BUFFERS.values() if q_img is not in_use
+    ) + sum(scratch.nbytes for scratch in _SCRATCH_BUFFERS.values())
+
+
+def evict_display_buffers(nbytes: int, in_use: Union[QImage, None] = None) -> int:
+    """Drop buffers reused by ``sitk_slice_to_qimage``, oldest first, until at least ``nbytes`` have been freed.
+
+    The next call with a slice of a dropped size allocates a new buffer. ``in_use`` isn't dropped,
+    since dropping it wouldn't free its memory.
+
+    :param nbytes:
+    :type nbytes: int
+    :param in_use: QImage returned by ``sitk_slice_to_qimage`` that's still displayed, e.g. ``UNSCALED_QIMAGE``
+    :type in_use: QImage or None
+    :return: Bytes freed
+    :rtype: int"""
+    freed: int = 0
+    for buffers in (_SCRATCH_BUFFERS, _QIMAGE_BUFFERS):
+        for key in list(buffers):
+            if freed >= nbytes:
+                return freed
+            if buffers[key] is in_use:
+                continue
+            buffer = buffers.pop(key)
+            freed += (
+                buffer.nbytes
+                if isinstance(buffer, np.ndarray)
+                else buffer.sizeInBytes()
+            )
+    return freed
+
+
+def pixmap_nbytes(pixmap: QPixmap) -> int:
+    """:param pixmap:
+    :type pixmap: QPixmap
+    :return: Bytes of ``pixmap``'s pixels
+    :rtype: int"""
+    return (
+        0 if pixmap.isNull() else pixmap.width() * pixmap.height() * pixmap.depth() // 8
+    )
+
+
+class ScaledPixmapCache:
+    """The last smoothly scaled pixmap for each of the ``max_sizes`` most recently used target sizes.
+
+    Keyed by what was scaled (e.g. ``prefetch.PrefetchKey`` of the slice) and the target size,
+    so rendering the same slice again at the same size doesn't scale it again.
+
+    Pixmaps returned by ``get`` are shared with the cache. Copy one before painting on it.
+    """
+
+    def __init__(self, max_sizes: int):
+        """:param max_sizes: Number of target sizes to keep a pixmap for
+        :type max_sizes: int"""
+        self.max_sizes: int = max_sizes
+        self._pixmaps: OrderedDict[
+            tuple[int, int], tuple[Hashable, QPixmap]
+        ] = OrderedDict()
+
+    def get(self, key: Hashable, size: QSize) -> Union[QPixmap, None]:
+        """:param key: Identifies the unscaled image
+        :type key: Hashable
+        :param size: Target size
+        :type size: QSize
+        :return: Pixmap of ``key`` scaled to ``size``, or None if not cached
+        :rtype: QPixmap or None"""
+        size_key: tuple[int, int] = (size.width(), size.height())
+        entry: Union[tuple[Hashable, QPixmap], None] = self._pixmaps.get(size_key)
+        if entry is None or entry[0] != key:
+            return None
+        self._pixmaps.move_to_end(size_key)
+        return entry[1]
+
+    def put(self, key: Hashable, size: QSize, pixmap: QPixmap) -> None:
+        """Cache ``pixmap``, replacing the pixmap of another key at ``size``.
+
+        :param key: Identifies the unscaled image
+        :type key: Hashable
+        :param size: Target size that ``pixmap`` was scaled to
+        :type size: QSize
+        :param pixmap:
+        :type pixmap: QPixmap
+        :return: None"""
+        size_key: tuple[int, int] = (size.width(), size.height())
+        self._pixmaps[size_key] = (key, pixmap)
+        self._pixmaps.move_to_end(size_key)
+        while len(self._pixmaps) > self.max_sizes:
+            self._pixmaps.popitem(last=False)
+
+    def nbytes(self) -> int:
+        """:return: Bytes of all cached pixmaps
+        :rtype: int"""
+        return sum(pixmap_nbytes(pixmap) for _, pixmap in self._pixmaps.values())
+
+    def evict(self, nbytes: int) -> int:
+        """Drop pixmaps, least recently used first, until at least ``nbytes`` have been freed.
+
+        :param nbytes:
+        :type nbytes: int
+        :return: Bytes freed
+        :rtype: int"""
+        freed: int = 0
+        while self._pixmaps and freed < nbytes:
+            _, (_, pixmap) = self._pixmaps.popitem(last=False)
+            freed += pixmap_nbytes(pixmap)
+        return freed
 
 
 class ErrorMessageBox(QMessageBox):
@@ -2,8 +2,8 @@
 
 Loads ``NeuroRuler/GUI/mainwindow.ui``, made in QtDesigner.
 
-Loads ``.qss`` stylesheets and ``resources.py`` (icons) files, generated
-by BreezeStyleSheets. Our fork of the repo: https://github.com/NIRALUser/BreezeStyleSheets.
+Loads ``.qss`` stylesheets and ``resources.rcc`` (icons) files, generated
+by BreezeStyleSheets (see ``theme_resources.py``). Our fork of the repo: https://github.com/NIRALUser/BreezeStyleSheets.
 
 If adding a new GUI element (in the GUI or in the menubar, whatever), you'll have to modify
 modify __init__ and settings_view_toggle.
@@ -12,22 +12,25 @@ Edge cases: If this element should be disabled after enable_elements or enabled
 then you will need to modify those."""
 
 
-import importlib
 import sys
 import os
+import functools
 import json
+import time
 import webbrowser
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Union
+from typing import Callable, Union
 
 import SimpleITK as sitk
 import numpy as np
 from typing import Any
 
-from PyQt6.QtGui import QPixmap, QAction, QImage, QIcon, QResizeEvent
+from PyQt6.QtGui import QPixmap, QAction, QColor, QImage, QIcon, QResizeEvent
 from PyQt6.QtWidgets import (
     QApplication,
     QDialog,
+    QColorDialog,
     QLabel,
     QMainWindow,
     QFileDialog,
@@ -35,13 +38,16 @@ from PyQt6.QtWidgets import (
     QVBoxLayout,
     QWidget,
     QMessageBox,
+    QProgressBar,
+    QPushButton,
+    QSizePolicy,
 )
 from PyQt6.uic.load_ui import loadUi
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QEvent, QObject, QSize, QTimer, pyqtSignal
 
 import pprint
 import pkg_resources
-from NeuroRuler.utils.constants import View, ThresholdFilter
+from NeuroRuler.utils.constants import View, ThresholdFilter, LoadStatus
 import NeuroRuler.utils.constants as constants
 
 # Note, do not use imports like
@@ -49,11 +55,24 @@ import NeuroRuler.utils.constants as constants
 # This would make the global variables not work
 import NeuroRuler.utils.global_vars as global_vars
 import NeuroRuler.utils.imgproc as imgproc
+import NeuroRuler.utils.latency as latency
 import NeuroRuler.utils.gui_settings as settings
+import NeuroRuler.utils.prefetch as prefetch
+import NeuroRuler.utils.planes as planes
+import NeuroRuler.utils.pyramid as pyramid
+import NeuroRuler.utils.histogram as histogram
+import NeuroRuler.utils.memory as memory
+import NeuroRuler.utils.profiling as profiling
+import NeuroRuler.utils.results as results
+import NeuroRuler.utils.volume_cache as volume_cache
 from NeuroRuler.GUI.helpers import (
     string_to_QColor,
-    mask_QImage,
+    draw_overlays_QPixmap,
     sitk_slice_to_qimage,
+    display_buffers_nbytes,
+    evict_display_buffers,
+    pixmap_nbytes,
+    ScaledPixmapCache,
     ErrorMessageBox,
     InformationDialog,
 )
@@ -61,6 +80,8 @@ from NeuroRuler.GUI.helpers import (
 from NeuroRuler.utils.img_helpers import (
     initialize_globals,
     update_images,
+    read_for_image_dict,
+    add_to_image_dict,
     get_curr_image,
     get_curr_image_size,
     get_curr_rotated_slice,
@@ -68,6 +89,8 @@ from NeuroRuler.utils.img_helpers import (
     get_curr_metadata,
     get_curr_binary_thresholded_slice,
     get_curr_otsu_slice,
+    get_curr_volume_otsu_slice,
+    get_curr_histogram,
     get_curr_physical_units,
     get_curr_path,
     get_curr_properties_tuple,
@@ -75,6 +98,7 @@ from NeuroRuler.utils.img_helpers import (
 )
 
 import NeuroRuler.utils.img_helpers as img_helpers
+from NeuroRuler.GUI.theme_resources import register_theme_resources
 
 
 PATH_TO_UI_FILE: Path = Path("NeuroRuler") / "GUI" / "mainwindow.ui"
@@ -101,16 +125,67 @@ DOCUMENTATION_LINK: str = "https://NeuroRuler.readthedocs.io/en/latest/"
 DEFAULT_IMAGE_TEXT: str = "Select images using File > Open!"
 DEFAULT_IMAGE_NUM_LABEL_TEXT: str = "Image 0 of 0"
 DEFAULT_IMAGE_STATUS_TEXT: str = "Image path is displayed here."
-
-UNSCALED_QPIXMAP: QPixmap
-"""Unscaled QPixmap from which the scaled version is rendered in the GUI.
-
-When any slice (rotated, smoothed, previewed) is rendered from an unscaled QImage, this variable is set to the
-QPixmap generated from that unscaled QImage.
+PREFETCH_IDLE_MS: int = 300
+"""Neighboring images are prefetched after the user hasn't changed anything for this long."""
+MEMORY_UPDATE_MS: int = 1000
+"""Interval of updating the memory usage in the status bar and enforcing the memory budget."""
+RESIZE_SETTLE_MS: int = 150
+"""While the window is being resized, the image is scaled quickly. It's scaled smoothly once
+the window hasn't been resized for this long."""
+SCALED_PIXMAP_CACHE_SIZES: int = 4
+"""Number of window sizes for which the last smoothly scaled slice is kept"""
+PLANE_CACHE_MAX_MB: int = 64
+"""Memory limit of the rotated planes cached for all views, see ``planes.PlaneCache``"""
+FRAME_BUDGET_MS: float = 33.0
+"""Target latency of one interaction (30 frames per second). In the tri-planar layout, if rendering the main view
+takes longer, the other two views are rendered once pending events (e.g. more slider moves) are handled.
+With ``--debug``, interactions that take longer are printed."""
+
+UNSCALED_QIMAGE: QImage
+"""Unscaled QImage from which the scaled version is rendered in the GUI.
+
+When any slice (rotated, smoothed, previewed) is rendered, this variable is set to its unscaled QImage,
+which is the buffer reused by ``sitk_slice_to_qimage``. Only the scaled image is converted to a QPixmap,
+so the unscaled image's buffer is never shared with a QPixmap and can be reused without copying.
 
 This variable will not change on resizeEvent. resizeEvent will scale this. Otherwise, if scaling
 self.image's pixmap (which is already scaled), there would be loss of detail."""
 OUTPUT_SLICE_EXTENSION: str = "png"
+OUTPUT_RESULTS_PATH: Path = constants.OUTPUT_DIR / "results.jsonl"
+"""Results file that JSON export appends a row to for each image, in the format of ``python cli.py -o``"""
+
+
+def interaction(name: str) -> Callable:
+    """Decorator of ``MainWindow`` slots that times them as ``name`` interactions in ``MainWindow.latency``,
+    from the signal until the image is painted (see ``MainWindow.eventFilter``).
+
+    Only calls by a signal are timed, so calls from other methods (e.g. ``next_img`` while exporting)
+    aren't counted as interactions. Slots called by a timed slot or by ``render_all_sliders``
+    (e.g. ``rotate_x`` when Reset sets the sliders) aren't timed separately.
+
+    :param name: Type of interaction, e.g. rotate
+    :type name: str
+    :return: Decorator
+    :rtype: Callable"""
+
+    def decorator(slot: Callable[["MainWindow"], None]) -> Callable:
+        @functools.wraps(slot)
+        def timed_slot(self: "MainWindow") -> None:
+            outermost: bool = self.interaction_depth == 0
+            if outermost and self.sender() is not None:
+                self.latency.begin(name)
+            self.interaction_depth += 1
+            try:
+                slot(self)
+            finally:
+                self.interaction_depth -= 1
+            if outermost and self.latency.is_pending():
+                # Make sure the image is painted, even if the interaction didn't change it
+                self.image.update()
+
+        return timed_slot
+
+    return decorator
 
 
 class MainWindow(QMainWindow):
@@ -118,6 +193,11 @@ class MainWindow(QMainWindow):
 
     Settings mode and circumference mode."""
 
+    image_read: pyqtSignal = pyqtSignal(int, object, object)
+    """Emitted by the loading worker thread when it finishes reading an image, with
+    (``load_generation`` when the read was submitted, path, future of ``read_for_image_dict``).
+    Its slot ``add_read_image`` runs on the GUI thread."""
+
     def __init__(self):
         """Load main file and connect GUI events to methods/functions.
 
@@ -145,6 +225,11 @@ class MainWindow(QMainWindow):
         self.action_show_properties.triggered.connect(display_properties)
         self.action_show_direction.triggered.connect(display_direction)
         self.action_show_spacing.triggered.connect(display_spacing)
+        self.action_profile.toggled.connect(self.toggle_profiling)
+        self.action_show_latency.toggled.connect(self.toggle_latency_readout)
+        self.action_show_overlays.toggled.connect(lambda: self.render_scaled_views())
+        self.action_tri_planar.toggled.connect(self.toggle_tri_planar)
+        self.action_contour_color.triggered.connect(self.choose_contour_color)
         self.action_export_json.triggered.connect(self.export_json)
         self.action_export_png.triggered.connect(
             lambda: self.export_curr_slice_as_img("png")
@@ -184,7 +269,11 @@ class MainWindow(QMainWindow):
         self.reset_button.clicked.connect(self.reset_settings)
         self.smoothing_preview_button.clicked.connect(self.render_smooth_slice)
         self.otsu_radio_button.clicked.connect(self.disable_binary_threshold_inputs)
+        self.volume_otsu_radio_button.clicked.connect(
+            self.disable_binary_threshold_inputs
+        )
         self.binary_radio_button.clicked.connect(self.enable_binary_threshold_inputs)
+        self.suggest_threshold_button.clicked.connect(self.suggest_binary_thresholds)
         self.threshold_preview_button.clicked.connect(self.render_threshold)
         self.x_view_radio_button.clicked.connect(self.update_view)
         self.y_view_radio_button.clicked.connect(self.update_view)
@@ -192,6 +281,137 @@ class MainWindow(QMainWindow):
 
         self.export_button.clicked.connect(self.export_json)
 
+        self.overlay_contour: Union[imgproc.ContourPolyline, None] = None
+        """Contour drawn over the displayed slice, or None. Set by ``render_curr_slice``."""
+        self.overlay_indicator_row: Union[int, None] = None
+        """Row of ``UNSCALED_QIMAGE`` where the slice indicator is drawn, or None. Set by ``render_curr_slice``."""
+        self.unscaled_key: Union[prefetch.PrefetchKey, None] = None
+        """Identifies the slice in ``UNSCALED_QIMAGE`` for ``scaled_pixmap_cache``, or None if it shouldn't be cached
+        (e.g. smoothing and threshold previews)."""
+        self.scaled_pixmap_cache: ScaledPixmapCache = ScaledPixmapCache(
+            SCALED_PIXMAP_CACHE_SIZES
+        )
+        # Restarted on every resize event, so the smooth rescale happens once the window stops changing size
+        self.resize_timer: QTimer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(RESIZE_SETTLE_MS)
+        self.resize_timer.timeout.connect(self.settle_resize)
+
+        self.plane_cache: planes.PlaneCache = planes.PlaneCache(
+            PLANE_CACHE_MAX_MB * 1024 * 1024
+        )
+        # Tri-planar layout: the two views other than global_vars.VIEW, next to self.image
+        self.plane_labels: list[QLabel] = []
+        self.plane_qimages: list[Union[QImage, None]] = [None, None]
+        """Unscaled copies of the slices shown in ``plane_labels``"""
+        self.plane_indicator_rows: list[Union[int, None]] = [None, None]
+        self.tri_planar_panel: QWidget = QWidget()
+        plane_layout: QVBoxLayout = QVBoxLayout(self.tri_planar_panel)
+        for _ in range(2):
+            plane_label: QLabel = QLabel()
+            plane_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            plane_label.setSizePolicy(
+                QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding
+            )
+            plane_label.setMinimumSize(QSize(1, 1))
+            plane_layout.addWidget(plane_label)
+            self.plane_labels.append(plane_label)
+        self.horizontalLayout.addWidget(self.tri_planar_panel)
+        # Main image area gets two thirds of the width
+        self.horizontalLayout.setStretch(
+            self.horizontalLayout.indexOf(self.tri_planar_panel) - 1, 2
+        )
+        self.horizontalLayout.setStretch(
+            self.horizontalLayout.indexOf(self.tri_planar_panel), 1
+        )
+        self.tri_planar_panel.hide()
+        # Renders the other two views once pending events are handled, if the main view used up the frame budget
+        self.planes_timer: QTimer = QTimer(self)
+        self.planes_timer.setSingleShot(True)
+        self.planes_timer.setInterval(0)
+        self.planes_timer.timeout.connect(self.render_tri_planar_views)
+
+        self.latency: latency.LatencyTelemetry = latency.LatencyTelemetry()
+        self.interaction_depth: int = 0
+        """Number of ``interaction`` slots being called, see ``interaction``"""
+        self.latency_label: QLabel = QLabel()
+        self.latency_label.hide()
+        # Interactions end when self.image is painted
+        self.image.installEventFilter(self)
+
+        self.profiler: profiling.InteractionProfiler = profiling.InteractionProfiler()
+        self.profiled_paths: list[Path] = []
+        """Images shown while profiling, in order"""
+
+        # Images are decoded on this thread, so the GUI (including the Cancel button) stays responsive.
+        # One worker, since ITK's readers and filters are already multithreaded.
+        self.load_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="NeuroRuler-load"
+        )
+        self.load_queue: list[Path] = []
+        """Paths of the batch selected in ``browse_files`` that haven't been submitted to ``load_executor``"""
+        self.load_future: Union[Future, None] = None
+        """Read of the image being loaded, or None if not loading"""
+        self.load_generation: int = 0
+        """Incremented when loading is canceled, so a read that was already running is dropped"""
+        self.image_loader_extend: bool = False
+        self.differing_images: list[Path] = []
+        """Paths of images with differing properties found so far in the batch being loaded."""
+        # Queued even when emitted on the GUI thread (by a canceled read), so loading never recurses
+        self.image_read.connect(self.add_read_image, Qt.ConnectionType.QueuedConnection)
+        self.load_progress_bar: QProgressBar = QProgressBar()
+        self.load_progress_bar.setFormat("Loading images %v/%m")
+        self.load_progress_bar.hide()
+        self.load_cancel_button: QPushButton = QPushButton("Cancel")
+        self.load_cancel_button.setStatusTip("Stop loading the remaining images.")
+        self.load_cancel_button.clicked.connect(self.cancel_loading_images)
+        self.load_cancel_button.hide()
+        self.statusbar.addPermanentWidget(self.load_progress_bar)
+        self.statusbar.addPermanentWidget(self.load_cancel_button)
+
+        self.prefetcher: prefetch.Prefetcher = prefetch.Prefetcher(
+            settings.PREFETCH_MAX_MB * 1024 * 1024
+        )
+        # Restarted after every render, so prefetching waits until the user pauses (e.g. stops dragging a slider)
+        self.prefetch_timer: QTimer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(PREFETCH_IDLE_MS)
+        self.prefetch_timer.timeout.connect(self.prefetch_neighbors)
+        self.pyramids: pyramid.PyramidBuilder = pyramid.PyramidBuilder(
+            settings.PYRAMID_MAX_MB * 1024 * 1024
+        )
+        self.prefetch_timer.timeout.connect(self.build_pyramids)
+        self.main_view_level: int = 0
+        """Pyramid level of the slice in ``UNSCALED_QIMAGE``. Set by ``render_curr_slice``."""
+
+        self.memory_governor: memory.MemoryGovernor = memory.MemoryGovernor(
+            memory.default_budget_bytes(settings.MEMORY_BUDGET_MB)
+        )
+        self.memory_governor.add_source("images", memory.image_dict_nbytes)
+        self.memory_governor.add_source("histograms", memory.histogram_dict_nbytes)
+        self.memory_governor.add_source("display", self.displayed_nbytes)
+        # Evicted in this order
+        self.memory_governor.add_cache("prefetch", self.prefetcher)
+        self.memory_governor.add_cache("planes", self.plane_cache)
+        self.memory_governor.add_cache("scaled pixmaps", self.scaled_pixmap_cache)
+        self.memory_governor.add_cache("pyramids", self.pyramids)
+        self.memory_governor.add_cache(
+            "display buffers",
+            # The displayed QImage is one of the buffers. It's counted under "display" and can't be evicted.
+            memory.FunctionCache(
+                lambda: display_buffers_nbytes(displayed_qimage()),
+                lambda nbytes: evict_display_buffers(nbytes, displayed_qimage()),
+            ),
+        )
+        self.memory_label: QLabel = QLabel()
+        self.statusbar.addPermanentWidget(self.latency_label)
+        self.statusbar.addPermanentWidget(self.memory_label)
+        self.memory_timer: QTimer = QTimer(self)
+        self.memory_timer.setInterval(MEMORY_UPDATE_MS)
+        self.memory_timer.timeout.connect(self.update_memory_usage)
+        self.memory_timer.start()
+        self.update_memory_usage()
+
     def enable_elements(self) -> None:
         """Called after File > Open.
 
@@ -222,6 +442,7 @@ class MainWindow(QMainWindow):
         self.upper_threshold_input.setEnabled(True)
         self.lower_threshold_input.setEnabled(True)
 
+    @interaction("apply")
     def settings_export_view_toggle(self) -> None:
         """Called when clicking Apply (in settings mode) or Adjust (in circumference mode).
 
@@ -255,9 +476,9 @@ class MainWindow(QMainWindow):
             self.update_smoothing_settings(True)
             self.update_binary_filter_settings(True)
             # Ignore the type annotation warning here.
-            # render_curr_slice() must return np.ndarray since not settings_view_enabled here
-            binary_contour_slice: np.ndarray = self.render_curr_slice()
-            self.render_circumference(binary_contour_slice)
+            # render_curr_slice() must return a ContourPolyline since not settings_view_enabled here
+            contour: imgproc.ContourPolyline = self.render_curr_slice()
+            self.render_circumference(contour)
 
         # Open button is always enabled.
         # If pressing it in circumference mode, then browse_files() will toggle to settings view.
@@ -276,7 +497,9 @@ class MainWindow(QMainWindow):
         self.reset_button.setEnabled(settings_view_enabled)
         self.smoothing_preview_button.setEnabled(settings_view_enabled)
         self.otsu_radio_button.setEnabled(settings_view_enabled)
+        self.volume_otsu_radio_button.setEnabled(settings_view_enabled)
         self.binary_radio_button.setEnabled(settings_view_enabled)
+        self.suggest_threshold_button.setEnabled(settings_view_enabled)
         self.lower_threshold.setEnabled(settings_view_enabled)
         self.lower_threshold_input.setEnabled(settings_view_enabled)
         self.upper_threshold.setEnabled(settings_view_enabled)
@@ -302,6 +525,32 @@ class MainWindow(QMainWindow):
             settings_view_enabled and self.binary_radio_button.isChecked()
         )
 
+    def suggest_binary_thresholds(self) -> None:
+        """Called when the Suggest button is clicked.
+
+        Selects the binary filter and sets the lower and upper thresholds to the values suggested by
+        the current image's histogram (``histogram.suggest_binary_thresholds``), which the user can then adjust.
+
+        :return: None
+        """
+        (
+            global_vars.LOWER_BINARY_THRESHOLD,
+            global_vars.UPPER_BINARY_THRESHOLD,
+        ) = histogram.suggest_binary_thresholds(get_curr_histogram())
+        self.binary_radio_button.click()
+        self.update_binary_filter_settings(False)
+
+    def get_threshold_filter(self) -> ThresholdFilter:
+        """Return the threshold filter selected by the threshold radio buttons.
+
+        :return: Selected filter
+        :rtype: ThresholdFilter"""
+        if self.otsu_radio_button.isChecked():
+            return ThresholdFilter.Otsu
+        if self.volume_otsu_radio_button.isChecked():
+            return ThresholdFilter.VolumeOtsu
+        return ThresholdFilter.Binary
+
     def disable_binary_threshold_inputs(self) -> None:
         """Called when Otsu filter button is clicked.
 
@@ -319,6 +568,7 @@ class MainWindow(QMainWindow):
 
         :return: None
         """
+        self.cancel_loading_images()
         central_widget = self.findChildren(QWidget, "centralwidget")[0]
         menubar = self.menuBar()
 
@@ -331,6 +581,11 @@ class MainWindow(QMainWindow):
                 action.setEnabled(False)
 
         self.action_open.setEnabled(True)
+        self.overlay_contour = None
+        self.overlay_indicator_row = None
+        self.plane_qimages = [None, None]
+        for plane_label in self.plane_labels:
+            plane_label.clear()
         self.circumference_label.setText(DEFAULT_CIRCUMFERENCE_LABEL_TEXT)
         self.image.setEnabled(True)
         self.image.clear()
@@ -351,6 +606,10 @@ class MainWindow(QMainWindow):
 
         Opens file menu.
 
+        Only the first image is read before this returns (and rendered if not ``extend``).
+        The rest are read on a worker thread by ``read_next_image``, with a progress bar and Cancel button
+        in the status bar. Images with differing properties are displayed in an error dialog after loading finishes.
+
         Renders various elements depending on the value of ``extend``.
 
         If called in circumference mode, then will toggle to settings mode.
@@ -384,40 +643,183 @@ class MainWindow(QMainWindow):
         # Convert to list[Path]. Slight inefficiency but worth.
         path_list = list(map(Path, path_list))
 
-        differing_images: list[Path]
+        # Re-opening or adding images while a previous batch is loading discards the rest of that batch
+        self.cancel_loading_images()
+        if not extend:
+            self.prefetcher.clear()
+            self.plane_cache.clear()
+            self.pyramids.clear()
 
         if not extend:
-            differing_images = initialize_globals(path_list)
+            # The first image is read here. The remaining images are read in the background
+            initialize_globals(path_list[:1])
             # Set view to z because initialize_globals calls update_images, which orients loaded images
             # for the axial view
             self.set_view_z()
             self.render_all_sliders()
             self.enable_elements()
             self.render_curr_slice()
-            if differing_images:
-                newline: str = "\n"
-                error_message_box(
-                    f"The image(s) you uploaded have differing properties.\n"
-                    f"The first one and all images with properties matching the first one have been loaded.\n"
-                    f"The name(s) of the ones with differing properties are\n\n"
-                    f"{newline.join([path.name for path in differing_images])}"
-                )
+            remaining: list[Path] = path_list[1:]
         else:
             # Doesn't need to re-render sliders to set max value of slice slider.
             # update_images won't change max value of slice slicer.
             # Does not need to render current slice. Images are added to the end of the dict.
             # And adding duplicate key doesn't change key order.
-            differing_images = update_images(path_list)
-            if differing_images:
-                newline: str = "\n"
-                error_message_box(
-                    f"You have uploaded image(s) with properties that differ from those of the currently loaded ones.\n"
-                    f"These image(s) have not been loaded:\n\n"
-                    f"{newline.join([path.name for path in differing_images])}"
-                )
+            remaining: list[Path] = path_list
         # When extending, image num must be updated
         self.render_image_num_and_path()
 
+        self.image_loader_extend = extend
+        self.differing_images = []
+        if not remaining:
+            self.finish_loading_images()
+            return
+        self.load_queue = remaining
+        self.load_progress_bar.setMaximum(len(remaining))
+        self.load_progress_bar.setValue(0)
+        self.load_progress_bar.show()
+        self.load_cancel_button.show()
+        self.read_next_image()
+
+    def read_next_image(self) -> None:
+        """Submit the next image of the batch selected in ``browse_files`` to ``load_executor``.
+        ``add_read_image`` receives it once it's read.
+
+        Only one image is read at a time, so canceling or exceeding the memory budget stops loading
+        after at most one more read.
+
+        :return: None"""
+        path: Path = self.load_queue.pop(0)
+        generation: int = self.load_generation
+        self.load_future = self.load_executor.submit(
+            read_for_image_dict,
+            path,
+            global_vars.VOLUME_CACHE_DIR,
+            global_vars.VOLUME_CACHE_MAX_BYTES,
+        )
+        # Called on the worker thread. The signal is queued to the GUI thread.
+        self.load_future.add_done_callback(
+            lambda future: self.image_read.emit(generation, path, future)
+        )
+
+    def add_read_image(self, generation: int, path: Path, future: Future) -> None:
+        """Connected to ``image_read``. Adds an image read by ``read_next_image`` to ``IMAGE_DICT``
+        and reads the next one.
+
+        :param generation: ``load_generation`` when the read was submitted
+        :type generation: int
+        :param path:
+        :type path: Path
+        :param future: Future of ``read_for_image_dict``
+        :type future: Future
+        :return: None"""
+        if generation != self.load_generation or future.cancelled():
+            return
+        try:
+            img, histogram = future.result()
+        except Exception:
+            # Stop loading, then raise like reading on the GUI thread would
+            self.cancel_loading_images()
+            raise
+        _, status = add_to_image_dict(path, img, histogram)
+        if status == LoadStatus.Differing:
+            self.differing_images.append(path)
+        self.load_progress_bar.setValue(self.load_progress_bar.value() + 1)
+        if global_vars.IMAGE_DICT:
+            self.render_image_num_and_path()
+        if self.update_memory_usage() > 0:
+            num_not_loaded: int = len(self.load_queue)
+            self.cancel_loading_images()
+            if num_not_loaded:
+                error_message_box(
+                    f"The loaded images use more than the memory budget of "
+                    f"{memory.format_bytes(self.memory_governor.max_bytes)}, "
+                    f"so the last {num_not_loaded} image(s) weren't loaded.\n"
+                    f"Remove images or raise MEMORY_BUDGET_MB in gui_config.json (or use the --memory-budget option)."
+                )
+            return
+        if self.load_queue:
+            self.read_next_image()
+        else:
+            self.finish_loading_images()
+
+    def cancel_loading_images(self) -> None:
+        """Called when the loading Cancel button is clicked. Also called before loading a new batch
+        and when the last image is removed.
+
+        Stops loading the current batch. Images that have already been loaded stay loaded.
+        An image being read is dropped when its read finishes.
+
+        :return: None"""
+        if self.load_future is None:
+            return
+        self.load_generation += 1
+        self.load_future.cancel()
+        self.finish_loading_images()
+
+    def finish_loading_images(self) -> None:
+        """Called when the batch selected in ``browse_files`` has been loaded or loading was canceled.
+
+        Hides the progress bar and displays the paths of images with differing properties, if any.
+
+        :return: None"""
+        self.load_queue = []
+        self.load_future = None
+        self.load_progress_bar.hide()
+        self.load_cancel_button.hide()
+        self.update_memory_usage()
+        if settings.DEBUG:
+            for path, nbytes in memory.image_dict_usage().items():
+                print(f"{path.name}: {memory.format_bytes(nbytes)}")
+            print(self.memory_governor.summary())
+        differing_images: list[Path] = self.differing_images
+        self.differing_images = []
+        if not differing_images:
+            return
+        newline: str = "\n"
+        if not self.image_loader_extend:
+            error_message_box(
+                f"The image(s) you uploaded have differing properties.\n"
+                f"The first one and all images with properties matching the first one have been loaded.\n"
+                f"The name(s) of the ones with differing properties are\n\n"
+                f"{newline.join([path.name for path in differing_images])}"
+            )
+        else:
+            error_message_box(
+                f"You have uploaded image(s) with properties that differ from those of the currently loaded ones.\n"
+                f"These image(s) have not been loaded:\n\n"
+                f"{newline.join([path.name for path in differing_images])}"
+            )
+
+    def displayed_nbytes(self) -> int:
+        """Memory held by ``UNSCALED_QIMAGE`` and the scaled pixmap displayed in ``self.image``.
+
+        :return: Bytes of the displayed images
+        :rtype: int"""
+        nbytes: int = pixmap_nbytes(self.image.pixmap())
+        q_img: Union[QImage, None] = displayed_qimage()
+        if q_img is not None:
+            nbytes += q_img.sizeInBytes()
+        for plane_label, q_img in zip(self.plane_labels, self.plane_qimages):
+            nbytes += pixmap_nbytes(plane_label.pixmap())
+            if q_img is not None:
+                nbytes += q_img.sizeInBytes()
+        return nbytes
+
+    def update_memory_usage(self) -> int:
+        """Connected to ``memory_timer``. Also called after each image is loaded.
+
+        Evicts from caches if over the memory budget and shows the memory usage in the status bar.
+
+        :return: Bytes still over budget after evicting, see ``memory.MemoryGovernor.enforce``
+        :rtype: int"""
+        over: int = self.memory_governor.enforce()
+        summary: str = self.memory_governor.summary()
+        self.memory_label.setText(summary.split(" (")[0])
+        self.memory_label.setToolTip(summary)
+        return over
+
+    @interaction("view")
     def update_view(self) -> None:
         """Called when clicking on any of the three view radio buttons.
 
@@ -434,7 +836,7 @@ class MainWindow(QMainWindow):
         else:
             global_vars.VIEW = constants.View.Z
 
-        self.orient_curr_image()
+        # The image isn't re-oriented. The plane of the new view is sampled from it directly
         self.render_curr_slice()
 
     def set_view_z(self) -> None:
@@ -535,96 +937,468 @@ class MainWindow(QMainWindow):
             global_vars.UPPER_BINARY_THRESHOLD
         )
 
-    def render_scaled_qpixmap_from_qimage(self, q_img: QImage) -> None:
-        """Convert q_img to QPixmap and set self.image's pixmap to that pixmap scaled to self.image's size.
+    def render_scaled_qpixmap_from_qimage(
+        self,
+        q_img: QImage,
+        contour: Union[imgproc.ContourPolyline, None] = None,
+        indicator_row: Union[int, None] = None,
+        key: Union[prefetch.PrefetchKey, None] = None,
+    ) -> None:
+        """Scale q_img to self.image's size and set self.image's pixmap to the scaled image.
 
-        Sets UNSCALED_PIXMAP to the unscaled pixmap generated from the q_img.
+        Sets UNSCALED_QIMAGE to q_img and the overlays drawn over it to ``contour`` and ``indicator_row``.
+        If ``key`` isn't None, the scaled image is cached under ``key``, and a cached one is used if present.
 
         :param q_img:
         :type q_img: QImage
+        :param contour: Contour of q_img, or None
+        :type contour: imgproc.ContourPolyline or None
+        :param indicator_row: Row of q_img where the slice indicator is drawn, or None
+        :type indicator_row: int or None
+        :param key: Identifies the slice in q_img, or None to not cache it
+        :type key: prefetch.PrefetchKey or None
         :return: None"""
-        global UNSCALED_QPIXMAP
-        UNSCALED_QPIXMAP = QPixmap(q_img)
-        self.image.setPixmap(
-            UNSCALED_QPIXMAP.scaled(
-                self.image.size(),
-                aspectRatioMode=Qt.AspectRatioMode.KeepAspectRatio,
-                transformMode=Qt.TransformationMode.SmoothTransformation,
+        global UNSCALED_QIMAGE
+        UNSCALED_QIMAGE = q_img
+        self.overlay_contour = contour
+        self.overlay_indicator_row = indicator_row
+        self.unscaled_key = key
+        self.render_scaled_unscaled_qimage()
+
+    def render_scaled_unscaled_qimage(self, fast: bool = False) -> None:
+        """Set self.image's pixmap to UNSCALED_QIMAGE scaled to self.image's size,
+        then draw the overlays on the scaled pixmap if View > Show Overlays is checked.
+
+        The overlays are vector lines drawn at screen resolution, so changing their color,
+        hiding them, or resizing the window doesn't resample or recontour the slice.
+
+        :param fast: Scale with ``Qt.TransformationMode.FastTransformation`` and don't cache the result.
+            Used while the window is being resized.
+        :type fast: bool
+        :return: None"""
+        if not global_vars.IMAGE_DICT or "UNSCALED_QIMAGE" not in globals():
+            return
+        size: QSize = self.image.size()
+        cacheable: bool = not fast and self.unscaled_key is not None
+        pixmap: Union[QPixmap, None] = (
+            self.scaled_pixmap_cache.get(self.unscaled_key, size) if cacheable else None
+        )
+        if pixmap is None:
+            with self.latency.stage("scale"):
+                pixmap = QPixmap.fromImage(
+                    UNSCALED_QIMAGE.scaled(
+                        size,
+                        aspectRatioMode=Qt.AspectRatioMode.KeepAspectRatio,
+                        transformMode=Qt.TransformationMode.FastTransformation
+                        if fast
+                        else Qt.TransformationMode.SmoothTransformation,
+                    )
+                )
+            if cacheable:
+                self.scaled_pixmap_cache.put(self.unscaled_key, size, pixmap)
+        if self.action_show_overlays.isChecked():
+            if cacheable:
+                # Keep the cached pixmap free of overlays
+                pixmap = pixmap.copy()
+            draw_overlays_QPixmap(
+                pixmap,
+                UNSCALED_QIMAGE.size(),
+                self.overlay_contour,
+                self.overlay_indicator_row,
+                string_to_QColor(settings.CONTOUR_COLOR),
+            )
+        self.image.setPixmap(pixmap)
+
+    def render_scaled_views(self, fast: bool = False) -> None:
+        """Scale every displayed view to the size of its label, see ``render_scaled_unscaled_qimage``.
+
+        :param fast: Scale quickly and don't cache the result
+        :type fast: bool
+        :return: None"""
+        self.render_scaled_unscaled_qimage(fast)
+        if self.action_tri_planar.isChecked():
+            self.render_scaled_plane_labels(fast)
+
+    def render_scaled_plane_labels(self, fast: bool = False) -> None:
+        """Set the pixmaps of ``plane_labels`` to ``plane_qimages`` scaled to their size, with overlays.
+
+        :param fast: Scale with ``Qt.TransformationMode.FastTransformation``
+        :type fast: bool
+        :return: None"""
+        for plane_label, q_img, indicator_row in zip(
+            self.plane_labels, self.plane_qimages, self.plane_indicator_rows
+        ):
+            if q_img is None:
+                continue
+            pixmap: QPixmap = QPixmap.fromImage(
+                q_img.scaled(
+                    plane_label.size(),
+                    aspectRatioMode=Qt.AspectRatioMode.KeepAspectRatio,
+                    transformMode=Qt.TransformationMode.FastTransformation
+                    if fast
+                    else Qt.TransformationMode.SmoothTransformation,
+                )
+            )
+            if self.action_show_overlays.isChecked():
+                draw_overlays_QPixmap(
+                    pixmap,
+                    q_img.size(),
+                    None,
+                    indicator_row,
+                    string_to_QColor(settings.CONTOUR_COLOR),
+                )
+            plane_label.setPixmap(pixmap)
+
+    def toggle_tri_planar(self, checked: bool) -> None:
+        """Called when clicking View > Tri-Planar. Shows or hides the other two views next to ``self.image``.
+
+        :param checked:
+        :type checked: bool
+        :return: None"""
+        self.tri_planar_panel.setVisible(checked)
+        if checked and global_vars.IMAGE_DICT:
+            self.render_tri_planar_views()
+        else:
+            self.plane_qimages = [None, None]
+            for plane_label in self.plane_labels:
+                plane_label.clear()
+
+    def render_tri_planar_views(self) -> None:
+        """Render the two views other than global_vars.VIEW in ``plane_labels``, with the Z slice indicator
+        in the X and Y views. The planes come from ``sample_curr_plane``, like the main view's.
+
+        :return: None"""
+        if not self.action_tri_planar.isChecked() or not global_vars.IMAGE_DICT:
+            return
+        other_views: list[View] = [view for view in View if view != global_vars.VIEW]
+        for i, view in enumerate(other_views):
+            plane, level = self.sample_curr_plane(view, self.plane_labels[i].size())
+            # Not the reused buffer, which may be UNSCALED_QIMAGE if the plane has the main slice's size
+            self.plane_qimages[i] = sitk_slice_to_qimage(plane, reuse=False)
+            self.plane_indicator_rows[i] = (
+                None if view == View.Z else z_indicator_row(plane, level)
             )
+            self.plane_labels[i].setStatusTip(f"{view.name} view")
+        self.render_scaled_plane_labels()
+
+    def choose_contour_color(self) -> None:
+        """Called when clicking View > Contour Color.
+
+        Sets ``settings.CONTOUR_COLOR`` to the color picked in a dialog and redraws the overlays.
+
+        :return: None"""
+        color: QColor = QColorDialog.getColor(
+            string_to_QColor(settings.CONTOUR_COLOR), self, "Contour Color"
         )
+        if not color.isValid():
+            return
+        # rrggbb, the format of CONTOUR_COLOR in gui_config.json
+        settings.CONTOUR_COLOR = color.name()[1:]
+        self.render_scaled_views()
 
     def resizeEvent(self, event: QResizeEvent) -> None:
         """This method is called every time the window is resized. Overrides PyQt6's resizeEvent.
 
-        Sets pixmap to UNSCALED_QPIXMAP scaled to self.image's size.
+        Sets pixmap to UNSCALED_QIMAGE quickly scaled to self.image's size, then restarts ``resize_timer``,
+        which scales it smoothly once the window stops changing size.
 
         :param event:
         :type event: QResizeEvent
         :return: None"""
         if global_vars.IMAGE_DICT:
-            self.image.setPixmap(
-                UNSCALED_QPIXMAP.scaled(
-                    self.image.size(),
-                    aspectRatioMode=Qt.AspectRatioMode.KeepAspectRatio,
-                    transformMode=Qt.TransformationMode.SmoothTransformation,
-                )
-            )
+            self.latency.begin("resize")
+            self.render_scaled_views(fast=True)
+            self.resize_timer.start()
         QMainWindow.resizeEvent(self, event)
 
-    def render_curr_slice(self) -> Union[np.ndarray, None]:
+    def settle_resize(self) -> None:
+        """Connected to ``resize_timer``. Scales the views smoothly to their new size.
+
+        If the main view was sampled from a pyramid level that doesn't match its new size,
+        renders the slice again from the right level instead.
+
+        :return: None"""
+        if SETTINGS_VIEW_ENABLED and self.main_view_level != self.pyramid_level(
+            global_vars.VIEW,
+            self.image.size(),
+            len(self.pyramids.levels(get_curr_path())),
+        ):
+            self.render_curr_slice()
+            return
+        self.render_scaled_views()
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        """Overrides PyQt6's eventFilter. Installed on self.image.
+
+        When self.image is painted, ends the pending interactions (see ``interaction``)
+        and updates the latency readout.
+
+        :param watched:
+        :type watched: QObject
+        :param event:
+        :type event: QEvent
+        :return: False, so the event is handled as usual
+        :rtype: bool"""
+        if (
+            watched is self.image
+            and event.type() == QEvent.Type.Paint
+            and self.latency.is_pending()
+        ):
+            ended: list[str] = self.latency.end()
+            if self.action_show_latency.isChecked():
+                self.render_latency_readout(ended[-1])
+        return QMainWindow.eventFilter(self, watched, event)
+
+    def render_latency_readout(self, interaction_name: str) -> None:
+        """Show the latency percentiles of ``interaction_name`` in the status bar,
+        and of every interaction in its tooltip.
+
+        :param interaction_name: Type of a recorded interaction
+        :type interaction_name: str
+        :return: None"""
+        histogram: latency.LatencyHistogram = self.latency.interactions[
+            interaction_name
+        ]
+        over_target: bool = histogram.percentile(95) > latency.INTERACTION_TARGET_MS
+        self.latency_label.setText(
+            self.latency.readout(interaction_name) + (" (slow)" if over_target else "")
+        )
+        self.latency_label.setToolTip(
+            "\n".join(
+                self.latency.readout(name) for name in sorted(self.latency.interactions)
+            )
+        )
+
+    def toggle_latency_readout(self, checked: bool) -> None:
+        """Called when clicking Advanced > Show Latency. Shows or hides the latency readout in the status bar.
+
+        :param checked:
+        :type checked: bool
+        :return: None"""
+        self.latency_label.setVisible(checked)
+        if checked:
+            self.latency_label.setText("Latency: interact with the image")
+
+    def export_latency(self) -> None:
+        """Connected to ``QApplication.aboutToQuit``. Writes the latency summary to ``constants.OUTPUT_DIR``
+        if any interaction was timed, see ``latency.LatencyTelemetry.export_json``.
+
+        :return: None"""
+        if self.latency.count() == 0:
+            return
+        metadata: dict[str, Any] = {
+            "num_images_loaded": len(global_vars.IMAGE_DICT),
+            "tri_planar": self.action_tri_planar.isChecked(),
+            "environment": profiling.environment(),
+        }
+        if global_vars.IMAGE_DICT:
+            metadata["image_size"] = list(get_curr_image_size())
+        path: Path = self.latency.export_json(constants.OUTPUT_DIR, metadata)
+        if settings.DEBUG:
+            print(f"Latency summary saved to {path}")
+
+    def render_curr_slice(self) -> Union[imgproc.ContourPolyline, None]:
         """Resamples the currently selected image using its rotation and slice settings,
         then renders the resulting slice (scaled to the size of self.image) in the GUI.
 
         DOES NOT set text for ``image_num_label`` and file path labels.
 
-        If ``not SETTINGS_VIEW_ENABLED``, also calls ``imgproc.contour()`` and outlines
-        the contour of the QImage (mutating it).
+        If ``not SETTINGS_VIEW_ENABLED``, also calls ``imgproc.contour()`` and draws
+        the contour over the slice. Otherwise, if the view isn't Z, draws the Z slice indicator.
+        Both are overlays drawn on the scaled pixmap (see ``render_scaled_unscaled_qimage``),
+        so the QImage isn't mutated.
 
-        Additionally, also returns a view of the binary contoured slice if ``not SETTINGS_VIEW_ENABLED``.
+        Additionally, also returns the contour if ``not SETTINGS_VIEW_ENABLED``.
         This saves work when computing circumference.
 
-        :return: np.ndarray if ``not SETTINGS_VIEW_ENABLED`` else None
-        :rtype: np.ndarray or None"""
+        :return: ContourPolyline if ``not SETTINGS_VIEW_ENABLED`` else None
+        :rtype: imgproc.ContourPolyline or None"""
 
+        start: float = time.perf_counter()
         if not SETTINGS_VIEW_ENABLED:
             self.set_view_z()
 
-        rotated_slice: sitk.Image = get_curr_rotated_slice()
+        key: prefetch.PrefetchKey = self.get_prefetch_key(get_curr_path())
+        prefetched: Union[prefetch.PrefetchedSlice, None] = self.prefetcher.get(key)
+        level: int = 0
+        if prefetched is not None:
+            rotated_slice: sitk.Image = prefetched.rotated_slice
+        else:
+            # Contouring needs full resolution
+            rotated_slice, level = self.sample_curr_plane(
+                global_vars.VIEW,
+                self.image.size(),
+                full_resolution=not SETTINGS_VIEW_ENABLED,
+            )
+        self.main_view_level = level
         q_img: QImage = sitk_slice_to_qimage(rotated_slice)
-        rv_dummy_var: np.ndarray = np.zeros(0)
+        contour: Union[imgproc.ContourPolyline, None] = None
+        z_indicator: Union[int, None] = None
 
         if not SETTINGS_VIEW_ENABLED:
+            if prefetched is not None and prefetched.contour is not None:
+                contour = prefetched.contour
+            else:
+                contour = self.contour_curr_slice(rotated_slice)
+
+        elif global_vars.VIEW != constants.View.Z:
+            z_indicator = z_indicator_row(rotated_slice, level)
+
+        # The contour settings don't change the slice, so both modes share scaled pixmaps.
+        # Slices of pyramid levels aren't cached since the key doesn't identify the level.
+        self.render_scaled_qpixmap_from_qimage(
+            q_img,
+            contour,
+            z_indicator,
+            key._replace(contour_settings=None) if level == 0 else None,
+        )
+        if self.action_tri_planar.isChecked():
+            if (time.perf_counter() - start) * 1000 < FRAME_BUDGET_MS:
+                self.render_tri_planar_views()
+            else:
+                self.planes_timer.start()
+        self.prefetch_timer.start()
+
+        elapsed_ms: float = (time.perf_counter() - start) * 1000
+        if settings.DEBUG and elapsed_ms > FRAME_BUDGET_MS:
+            print(
+                f"Rendering took {elapsed_ms:.1f} ms, over the frame budget of {FRAME_BUDGET_MS:.0f} ms"
+            )
+
+        return contour
+
+    def sample_curr_plane(
+        self, view: View, display_size: QSize, full_resolution: bool = False
+    ) -> tuple[sitk.Image, int]:
+        """Return the plane of the current image shown in ``view`` with the current settings, from ``plane_cache``.
+
+        Unless ``full_resolution``, the plane is sampled from the coarsest level of the image's pyramid
+        that has enough pixels for ``display_size`` (see ``pyramid.level_for_display``), if its pyramid is built.
+
+        :param view: Need not be ``global_vars.VIEW``
+        :type view: View
+        :param display_size: Size of the label the plane is shown in
+        :type display_size: QSize
+        :param full_resolution: Whether to sample the full resolution image, e.g. for contouring
+        :type full_resolution: bool
+        :return: (2D rotated slice, pyramid level it was sampled from)
+        :rtype: tuple[sitk.Image, int]"""
+        path: Path = get_curr_path()
+        levels: list[sitk.Image] = [] if full_resolution else self.pyramids.levels(path)
+        level: int = self.pyramid_level(view, display_size, len(levels))
+        with self.latency.stage("resample"):
+            plane: sitk.Image = self.plane_cache.get_or_sample(
+                planes.key_from_globals(path, view, level),
+                get_curr_image(),
+                levels[level - 1] if level else None,
+            )
+        return plane, level
+
+    def pyramid_level(self, view: View, display_size: QSize, num_levels: int) -> int:
+        """:param view:
+        :type view: View
+        :param display_size: Size of the label the plane of ``view`` is shown in
+        :type display_size: QSize
+        :param num_levels: Number of levels of the current image's pyramid
+        :type num_levels: int
+        :return: Pyramid level to sample the current image's plane in ``view`` from, 0 being full resolution
+        :rtype: int"""
+        if num_levels == 0:
+            return 0
+        plane_size: list[int] = [
+            size
+            for axis, size in enumerate(get_curr_image_size())
+            if axis != view.value
+        ]
+        return pyramid.level_for_display(
+            (plane_size[0], plane_size[1]),
+            (display_size.width(), display_size.height()),
+            num_levels,
+        )
+
+    def contour_curr_slice(self, rotated_slice: sitk.Image) -> imgproc.ContourPolyline:
+        """Contour ``rotated_slice`` with the threshold filter selected in the GUI.
+
+        :param rotated_slice: Rotated slice of the current image
+        :type rotated_slice: sitk.Image
+        :return: Contour of ``rotated_slice``
+        :rtype: imgproc.ContourPolyline"""
+        with self.latency.stage("contour"):
             if self.otsu_radio_button.isChecked():
                 binary_contour_slice: np.ndarray = imgproc.contour(
-                    rotated_slice, ThresholdFilter.Otsu
+                    rotated_slice,
+                    ThresholdFilter.Otsu,
+                    precision=global_vars.PRECISION,
+                    writable=False,
+                )
+            elif self.volume_otsu_radio_button.isChecked():
+                # Needs the thresholds of the current image, which are in its prefetch key
+                binary_contour_slice: np.ndarray = prefetch.contour_with_settings(
+                    rotated_slice,
+                    self.get_prefetch_key(get_curr_path()).contour_settings,
+                    writable=False,
                 )
             else:
                 binary_contour_slice: np.ndarray = imgproc.contour(
-                    rotated_slice, ThresholdFilter.Binary
+                    rotated_slice,
+                    ThresholdFilter.Binary,
+                    precision=global_vars.PRECISION,
+                    writable=False,
                 )
-            rv_dummy_var = binary_contour_slice
-            mask_QImage(
-                q_img,
-                np.transpose(binary_contour_slice),
-                string_to_QColor(settings.CONTOUR_COLOR),
-            )
+            return imgproc.ContourPolyline.from_binary_contour(binary_contour_slice)
 
-        elif global_vars.VIEW != constants.View.Z:
-            z_indicator: np.ndarray = np.zeros(
-                (rotated_slice.GetSize()[1], rotated_slice.GetSize()[0])
-            )
-            z_indicator[get_curr_image_size()[2] - global_vars.SLICE - 1, :] = 1
-            mask_QImage(
-                q_img,
-                np.transpose(z_indicator),
-                string_to_QColor(settings.CONTOUR_COLOR),
+    def get_prefetch_key(self, path: Path) -> prefetch.PrefetchKey:
+        """Return the key of the slice of the image at ``path`` that ``render_curr_slice`` would render
+        with the current settings.
+
+        :param path:
+        :type path: Path
+        :return: Key for ``path``
+        :rtype: prefetch.PrefetchKey"""
+        threshold_filter: Union[ThresholdFilter, None] = None
+        if not SETTINGS_VIEW_ENABLED:
+            threshold_filter = self.get_threshold_filter()
+        return prefetch.key_from_globals(path, threshold_filter)
+
+    def get_prefetched_slice(self) -> Union[prefetch.PrefetchedSlice, None]:
+        """Return the prefetched result for the current image and settings, or None if it isn't ready.
+
+        :return: Prefetched result or None
+        :rtype: prefetch.PrefetchedSlice or None"""
+        return self.prefetcher.get(self.get_prefetch_key(get_curr_path()))
+
+    def prefetch_neighbors(self) -> None:
+        """Connected to ``prefetch_timer``. Schedules background work on the ``settings.PREFETCH_DEPTH`` images
+        on each side of the current image, using the current settings.
+
+        :return: None"""
+        if settings.PREFETCH_DEPTH == 0 or not global_vars.IMAGE_DICT:
+            return
+        paths: list[Path] = img_helpers.get_all_paths()
+        jobs: list[tuple[prefetch.PrefetchKey, sitk.Image]] = [
+            (self.get_prefetch_key(paths[i]), global_vars.IMAGE_DICT[paths[i]])
+            for i in prefetch.neighbor_indices(
+                global_vars.CURR_IMAGE_INDEX, len(paths), settings.PREFETCH_DEPTH
             )
+        ]
+        self.prefetcher.schedule(jobs)
 
-        self.render_scaled_qpixmap_from_qimage(q_img)
+    def build_pyramids(self) -> None:
+        """Connected to ``prefetch_timer``. Builds the pyramids of the current image and the
+        ``settings.PREFETCH_DEPTH`` images on each side of it in the background, current image first.
 
-        if not SETTINGS_VIEW_ENABLED:
-            return rv_dummy_var
+        :return: None"""
+        if settings.PYRAMID_MAX_MB == 0 or not global_vars.IMAGE_DICT:
+            return
+        paths: list[Path] = img_helpers.get_all_paths()
+        indices: list[int] = [global_vars.CURR_IMAGE_INDEX] + prefetch.neighbor_indices(
+            global_vars.CURR_IMAGE_INDEX, len(paths), settings.PREFETCH_DEPTH
+        )
+        self.pyramids.schedule(
+            [(paths[i], global_vars.IMAGE_DICT[paths[i]]) for i in indices]
+        )
 
+    @interaction("smoothing preview")
     def render_smooth_slice(self) -> None:
         """Renders smooth slice in GUI. Allows user to preview result of smoothing settings.
 
@@ -636,6 +1410,7 @@ class MainWindow(QMainWindow):
         q_img: QImage = sitk_slice_to_qimage(smooth_slice)
         self.render_scaled_qpixmap_from_qimage(q_img)
 
+    @interaction("threshold preview")
     def render_threshold(self) -> None:
         """Render filtered image slice on UI.
 
@@ -644,23 +1419,25 @@ class MainWindow(QMainWindow):
         self.set_view_z()
         if self.otsu_radio_button.isChecked():
             filter_img: sitk.Image = get_curr_otsu_slice()
+        elif self.volume_otsu_radio_button.isChecked():
+            filter_img: sitk.Image = get_curr_volume_otsu_slice()
         else:
             self.update_binary_filter_settings(True)
             filter_img: sitk.Image = get_curr_binary_thresholded_slice()
         q_img: QImage = sitk_slice_to_qimage(filter_img)
         self.render_scaled_qpixmap_from_qimage(q_img)
 
-    def render_circumference(self, binary_contour_slice: np.ndarray) -> float:
+    def render_circumference(self, contour: imgproc.ContourPolyline) -> float:
         """Called after pressing Apply or when
         (not SETTINGS_VIEW_ENABLED and (pressing Next or Previous or Remove Image))
 
-        Computes circumference from binary_contour_slice and renders circumference label.
+        Computes circumference from contour and renders circumference label.
 
-        binary_contour_slice is always the return value of render_curr_slice since render_curr_slice must have
+        contour is always the return value of render_curr_slice since render_curr_slice must have
         already been called. If calling this function, render_curr_slice must have been called first.
 
-        :param binary_contour_slice: Result of previously calling render_curr_slice when ``not SETTINGS_VIEW_ENABLED``
-        :type binary_contour_slice: np.ndarray
+        :param contour: Result of previously calling render_curr_slice when ``not SETTINGS_VIEW_ENABLED``
+        :type contour: imgproc.ContourPolyline
         :return: circumference
         :rtype: float"""
         if SETTINGS_VIEW_ENABLED:
@@ -674,13 +1451,15 @@ class MainWindow(QMainWindow):
         if settings.DEBUG:
             print(f"Computing circumference, and this is the spacing: {spacing}")
 
-        # TODO
-        # binary_contour_slice is the transpose of the rotated_slice
-        # Thus, should pass spacing values in the reverse order?
-        circumference: float = imgproc.length_of_contour_with_spacing(
-            binary_contour_slice, spacing[0], spacing[1]
-        )
-        # circumference: float = imgproc.length_of_contour(binary_contour_slice)
+        prefetched: Union[prefetch.PrefetchedSlice, None] = self.get_prefetched_slice()
+        if (
+            prefetched is not None
+            and prefetched.contour is contour
+            and prefetched.circumference is not None
+        ):
+            circumference: float = prefetched.circumference
+        else:
+            circumference: float = contour.length_with_spacing(spacing[0], spacing[1])
         self.circumference_label.setText(
             f"Calculated Circumference: {round(circumference, constants.NUM_DIGITS_TO_ROUND_TO)} {units if units is not None else constants.MESSAGE_TO_SHOW_IF_UNITS_NOT_FOUND}"
         )
@@ -720,6 +1499,10 @@ class MainWindow(QMainWindow):
         self.image_path_label.setText(str(get_curr_path().name))
         self.image_path_label.setStatusTip(str(get_curr_path()))
         self.image.setStatusTip(str(get_curr_path()))
+        if self.profiler.is_running() and (
+            not self.profiled_paths or self.profiled_paths[-1] != get_curr_path()
+        ):
+            self.profiled_paths.append(get_curr_path())
 
     def render_all_sliders(self) -> None:
         """Sets all slider values to the global rotation and slice values.
@@ -732,16 +1515,22 @@ class MainWindow(QMainWindow):
         Also updates rotation and slice num labels.
 
         :return: None"""
-        self.x_slider.setValue(global_vars.THETA_X)
-        self.y_slider.setValue(global_vars.THETA_Y)
-        self.z_slider.setValue(global_vars.THETA_Z)
-        self.slice_slider.setMaximum(get_curr_image().GetSize()[View.Z.value] - 1)
-        self.slice_slider.setValue(global_vars.SLICE)
+        # Setting the sliders calls their slots, which shouldn't be timed as interactions by themselves
+        self.interaction_depth += 1
+        try:
+            self.x_slider.setValue(global_vars.THETA_X)
+            self.y_slider.setValue(global_vars.THETA_Y)
+            self.z_slider.setValue(global_vars.THETA_Z)
+            self.slice_slider.setMaximum(get_curr_image().GetSize()[View.Z.value] - 1)
+            self.slice_slider.setValue(global_vars.SLICE)
+        finally:
+            self.interaction_depth -= 1
         self.x_rotation_label.setText(f"X rotation: {global_vars.THETA_X}°")
         self.y_rotation_label.setText(f"Y rotation: {global_vars.THETA_Y}°")
         self.z_rotation_label.setText(f"Z rotation: {global_vars.THETA_Z}°")
         self.slice_num_label.setText(f"Slice: {global_vars.SLICE}")
 
+    @interaction("rotate")
     def rotate_x(self) -> None:
         """Called when the user updates the x slider.
 
@@ -753,6 +1542,7 @@ class MainWindow(QMainWindow):
         self.render_curr_slice()
         self.x_rotation_label.setText(f"X rotation: {x_slider_val}°")
 
+    @interaction("rotate")
     def rotate_y(self) -> None:
         """Called when the user updates the y slider.
 
@@ -764,6 +1554,7 @@ class MainWindow(QMainWindow):
         self.render_curr_slice()
         self.y_rotation_label.setText(f"Y rotation: {y_slider_val}°")
 
+    @interaction("rotate")
     def rotate_z(self) -> None:
         """Called when the user updates the z slider.
 
@@ -775,6 +1566,7 @@ class MainWindow(QMainWindow):
         self.render_curr_slice()
         self.z_rotation_label.setText(f"Z rotation: {z_slider_val}°")
 
+    @interaction("slice")
     def slice_update(self) -> None:
         """Called when the user updates the slice slider.
 
@@ -786,6 +1578,7 @@ class MainWindow(QMainWindow):
         self.render_curr_slice()
         self.slice_num_label.setText(f"Slice: {slice_slider_val}")
 
+    @interaction("reset")
     def reset_settings(self) -> None:
         """Called when Reset is clicked.
 
@@ -800,6 +1593,7 @@ class MainWindow(QMainWindow):
         self.render_curr_slice()
         self.render_all_sliders()
 
+    @interaction("navigate")
     def next_img(self) -> None:
         """Called when Next button is clicked.
 
@@ -807,15 +1601,14 @@ class MainWindow(QMainWindow):
 
         :return: None"""
         img_helpers.next_img()
-        # TODO: This feels inefficient...
-        self.orient_curr_image()
-        binary_contour_or_none: Union[np.ndarray, None] = self.render_curr_slice()
+        contour_or_none: Union[imgproc.ContourPolyline, None] = self.render_curr_slice()
         self.render_image_num_and_path()
 
         if not SETTINGS_VIEW_ENABLED:
-            # Ignore the type annotation warning. binary_contour_or_none must be binary_contour since not SETTINGS_VIEW_ENABLED
-            self.render_circumference(binary_contour_or_none)
+            # Ignore the type annotation warning. contour_or_none must be a contour since not SETTINGS_VIEW_ENABLED
+            self.render_circumference(contour_or_none)
 
+    @interaction("navigate")
     def previous_img(self) -> None:
         """Called when Previous button is clicked.
 
@@ -823,14 +1616,12 @@ class MainWindow(QMainWindow):
 
         :return: None"""
         img_helpers.previous_img()
-        # TODO: This feels inefficient...
-        self.orient_curr_image()
-        binary_contour_or_none: Union[np.ndarray, None] = self.render_curr_slice()
+        contour_or_none: Union[imgproc.ContourPolyline, None] = self.render_curr_slice()
         self.render_image_num_and_path()
 
         if not SETTINGS_VIEW_ENABLED:
-            # Ignore the type annotation warning. binary_contour_or_none must be binary_contour since not SETTINGS_VIEW_ENABLED
-            self.render_circumference(binary_contour_or_none)
+            # Ignore the type annotation warning. contour_or_none must be a contour since not SETTINGS_VIEW_ENABLED
+            self.render_circumference(contour_or_none)
 
     # TODO: Due to the images now being a dict, we can
     # easily let the user remove a range of images if they want
@@ -841,18 +1632,19 @@ class MainWindow(QMainWindow):
         in ``IMAGE_GROUPS``, it's removed from ``IMAGE_GROUPS`` as well.
 
         :return: None"""
+        self.pyramids.discard(get_curr_path())
         img_helpers.del_curr_img()
 
         if len(global_vars.IMAGE_DICT) == 0:
             self.disable_elements()
             return
 
-        binary_contour_or_none: Union[np.ndarray, None] = self.render_curr_slice()
+        contour_or_none: Union[imgproc.ContourPolyline, None] = self.render_curr_slice()
         self.render_image_num_and_path()
 
         if not SETTINGS_VIEW_ENABLED:
-            # Ignore the type annotation warning. binary_contour_or_none must be binary_contour since not SETTINGS_VIEW_ENABLED
-            self.render_circumference(binary_contour_or_none)
+            # Ignore the type annotation warning. contour_or_none must be a contour since not SETTINGS_VIEW_ENABLED
+            self.render_circumference(contour_or_none)
 
     def test_stuff(self) -> None:
         """Connected to Debug > Test stuff. Dummy button and function for easily testing stuff.
@@ -889,7 +1681,7 @@ class MainWindow(QMainWindow):
         output_path: Path = constants.OUTPUT_DIR / file_stem
 
         if not output_path.exists():
-            output_path.mkdir()
+            output_path.mkdir(parents=True)
 
         path: str = str(
             output_path
@@ -986,6 +1778,9 @@ class MainWindow(QMainWindow):
             elif data["threshold_filter"] == "Otsu":
                 self.otsu_radio_button.click()
                 self.disable_binary_threshold_inputs()
+            elif data["threshold_filter"] == "VolumeOtsu":
+                self.volume_otsu_radio_button.click()
+                self.disable_binary_threshold_inputs()
             else:
                 print("Invalid threshold_filter in imported JSON")
                 exit(1)
@@ -997,54 +1792,138 @@ class MainWindow(QMainWindow):
         smoothing_conductance, smoothing_iterations, smoothing_time_step, threshold_filter, upper_binary_threshold, lower_binary_threshold,
         and circumference
 
+        Each image's circumference is also appended to ``OUTPUT_RESULTS_PATH`` as soon as it's computed.
+
         :return: `None`"""
 
         global_vars.CURR_IMAGE_INDEX = 0
         self.render_image_num_and_path()
-        for image_num in range(len(global_vars.IMAGE_DICT)):
-            curr_path: Path = get_curr_path()
-            stem: str = constants.get_path_stem(curr_path)
-            binary_contour_slice: np.ndarray = self.render_curr_slice()
-            circumference: float = self.render_circumference(binary_contour_slice)
-            output_dir: Path = constants.OUTPUT_DIR / stem
-            if not output_dir.exists():
-                output_dir.mkdir()
-
-            self.export_curr_slice_as_img(OUTPUT_SLICE_EXTENSION)
-
-            data: dict[str, Any] = {
-                "input_image_path": str(curr_path),
-                "output_contoured_slice_path": str(
-                    Path.cwd()
-                    / output_dir
-                    / (stem + f"_contoured.{OUTPUT_SLICE_EXTENSION}")
-                ),
-                "circumference": circumference,
-                "x_rotation": global_vars.THETA_X,
-                "y_rotation": global_vars.THETA_Y,
-                "z_rotation": global_vars.THETA_Z,
-                "slice": global_vars.SLICE,
-                "smoothing_conductance": global_vars.CONDUCTANCE_PARAMETER,
-                "smoothing_iterations": global_vars.SMOOTHING_ITERATIONS,
-                "smoothing_time_step": global_vars.TIME_STEP,
-                "threshold_filter": "Otsu"
-                if self.otsu_radio_button.isChecked()
-                else "Binary",
-                "upper_binary_threshold": global_vars.UPPER_BINARY_THRESHOLD,
-                "lower_binary_threshold": global_vars.LOWER_BINARY_THRESHOLD,
-            }
-            # Otsu doesn't use the upper/lower binary thresholds set in the GUI
-            if data["threshold_filter"] == "Otsu":
-                data.pop("upper_binary_threshold")
-                data.pop("lower_binary_threshold")
-
-            with open(output_dir / (stem + "_settings.json"), "w") as outfile:
-                json.dump(data, outfile, indent=4)
-
-            self.next_img()
+        with results.ResultsWriter(OUTPUT_RESULTS_PATH) as results_writer:
+            for image_num in range(len(global_vars.IMAGE_DICT)):
+                self.export_curr_image_json(results_writer)
+                self.next_img()
+
+    def export_curr_image_json(self, results_writer: results.ResultsWriter) -> None:
+        """Export the settings JSON and contoured slice of the current image, and append its row to ``results_writer``.
+
+        :param results_writer:
+        :type results_writer: results.ResultsWriter
+        :return: `None`"""
+        curr_path: Path = get_curr_path()
+        stem: str = constants.get_path_stem(curr_path)
+        contour: imgproc.ContourPolyline = self.render_curr_slice()
+        circumference: float = self.render_circumference(contour)
+        output_dir: Path = constants.OUTPUT_DIR / stem
+        if not output_dir.exists():
+            output_dir.mkdir(parents=True)
+
+        self.export_curr_slice_as_img(OUTPUT_SLICE_EXTENSION)
+
+        data: dict[str, Any] = {
+            "input_image_path": str(curr_path),
+            "output_contoured_slice_path": str(
+                Path.cwd()
+                / output_dir
+                / (stem + f"_contoured.{OUTPUT_SLICE_EXTENSION}")
+            ),
+            "circumference": circumference,
+            "x_rotation": global_vars.THETA_X,
+            "y_rotation": global_vars.THETA_Y,
+            "z_rotation": global_vars.THETA_Z,
+            "slice": global_vars.SLICE,
+            "smoothing_conductance": global_vars.CONDUCTANCE_PARAMETER,
+            "smoothing_iterations": global_vars.SMOOTHING_ITERATIONS,
+            "smoothing_time_step": global_vars.TIME_STEP,
+            "threshold_filter": self.get_threshold_filter().name,
+            "upper_binary_threshold": global_vars.UPPER_BINARY_THRESHOLD,
+            "lower_binary_threshold": global_vars.LOWER_BINARY_THRESHOLD,
+        }
+        # Otsu and VolumeOtsu don't use the upper/lower binary thresholds set in the GUI
+        if data["threshold_filter"] != "Binary":
+            data.pop("upper_binary_threshold")
+            data.pop("lower_binary_threshold")
+
+        with open(output_dir / (stem + "_settings.json"), "w") as outfile:
+            json.dump(data, outfile, indent=4)
+
+        results_writer.write(
+            results.make_row(
+                curr_path,
+                volume_cache.fingerprint(curr_path, constants.Z_ORIENTATION_STR),
+                self.current_parameters(),
+                circumference,
+                get_curr_physical_units(),
+            )
+        )
+
+    def current_parameters(self) -> dict[str, Any]:
+        """Parameters of the current settings, named like the CLI options.
+
+        :return: Returned by ``results.make_parameters``
+        :rtype: dict[str, Any]"""
+        return results.make_parameters(
+            (global_vars.THETA_X, global_vars.THETA_Y, global_vars.THETA_Z),
+            global_vars.SLICE,
+            (
+                global_vars.CONDUCTANCE_PARAMETER,
+                global_vars.SMOOTHING_ITERATIONS,
+                global_vars.TIME_STEP,
+            ),
+            self.get_threshold_filter(),
+            global_vars.LOWER_BINARY_THRESHOLD,
+            global_vars.UPPER_BINARY_THRESHOLD,
+            global_vars.PRECISION,
+        )
+
+    def toggle_profiling(self, checked: bool) -> None:
+        """Called when clicking Advanced > Profile Interactions.
+
+        Starts profiling, or stops and saves the profile and report to ``constants.OUTPUT_DIR``
+        with the images shown and the current settings (see ``profiling.InteractionProfiler``).
+
+        :param checked:
+        :type checked: bool
+        :return: None"""
+        if checked:
+            self.profiled_paths = [get_curr_path()] if global_vars.IMAGE_DICT else []
+            self.profiler.start()
+            self.statusbar.showMessage(
+                "Profiling. Click Advanced > Profile Interactions again to stop."
+            )
+            return
+        if not self.profiler.is_running():
+            return
+
+        metadata: dict[str, Any] = {
+            "image_paths": [str(path) for path in self.profiled_paths],
+            "num_images_loaded": len(global_vars.IMAGE_DICT),
+            "mode": "settings" if SETTINGS_VIEW_ENABLED else "circumference",
+            "view": global_vars.VIEW.name,
+            "tri_planar": self.action_tri_planar.isChecked(),
+        }
+        name: str = "no_image"
+        if global_vars.IMAGE_DICT:
+            metadata["image_size"] = list(get_curr_image_size())
+            metadata["pixel_type"] = get_curr_image().GetPixelIDTypeAsString()
+            metadata["parameters"] = self.current_parameters()
+            name = constants.get_path_stem(get_curr_path())
+        metadata["memory"] = self.memory_governor.usage()
+        pstats_path, report_path = self.profiler.stop(
+            constants.OUTPUT_DIR, name, metadata
+        )
+        self.statusbar.clearMessage()
+        information_dialog(
+            "Profile saved",
+            f"Profile: {pstats_path}\nReport: {report_path}\n\n"
+            f"Sort and browse the profile with python -m pstats {pstats_path}",
+        )
 
     def orient_curr_image(self) -> None:
-        """Orient the current image for the current view (global_vars.VIEW) by applying ORIENT_FILTER on it.
+        """Orient the current image for the current view (global_vars.VIEW).
+
+        Images are loaded oriented for View.Z and views sample their planes from any orientation
+        (see ``img_helpers.get_rotated_plane``), so this is only needed before computing a circumference,
+        where it doesn't copy the image.
 
         This mutates the image.
 
@@ -1052,6 +1931,27 @@ class MainWindow(QMainWindow):
         img_helpers.orient_curr_image(global_vars.VIEW)
 
 
+def displayed_qimage() -> Union[QImage, None]:
+    """:return: ``UNSCALED_QIMAGE`` if an image is displayed, else None
+    :rtype: QImage or None"""
+    if global_vars.IMAGE_DICT and "UNSCALED_QIMAGE" in globals():
+        return UNSCALED_QIMAGE
+    return None
+
+
+def z_indicator_row(plane: sitk.Image, level: int) -> int:
+    """Row of a plane of the current image in the X or Y view where the Z slice indicator is drawn.
+
+    :param plane: 2D rotated slice in the X or Y view
+    :type plane: sitk.Image
+    :param level: Pyramid level ``plane`` was sampled from, see ``MainWindow.sample_curr_plane``
+    :type level: int
+    :return: Row of ``plane``
+    :rtype: int"""
+    row: int = get_curr_image_size()[2] - global_vars.SLICE - 1
+    return min(row >> level, plane.GetSize()[1] - 1)
+
+
 def error_message_box(message: str) -> None:
     """Creates a message box with an error message and red warning icon.
 
@@ -1162,12 +2062,15 @@ def display_spacing() -> None:
 def main() -> None:
     """Main entrypoint of GUI."""
     global_vars.GROUP_MAX_SPACING_DIFF = settings.GROUP_MAX_SPACING_DIFF
+    global_vars.VOLUME_CACHE_DIR = settings.VOLUME_CACHE_DIR
+    global_vars.VOLUME_CACHE_MAX_BYTES = settings.VOLUME_CACHE_MAX_MB * 1024 * 1024
+    global_vars.PRECISION = settings.PRECISION
 
-    # This import can't go at the top of the file
-    # because gui.py.parse_gui_cli() has to set THEME_NAME before the import occurs
-    # This imports globally
-    # For example, NeuroRuler/GUI/helpers.py can access resource files without having to import there
-    importlib.import_module(f"NeuroRuler.GUI.themes.{settings.THEME_NAME}.resources")
+    # This can't go at the top of the file
+    # because gui.py.parse_gui_cli() has to set THEME_NAME before resources are registered
+    # This registers globally
+    # For example, NeuroRuler/GUI/helpers.py can access resource files without having to import anything
+    register_theme_resources(settings.THEME_NAME)
 
     app = QApplication(sys.argv)
 
@@ -1185,6 +2088,13 @@ def main() -> None:
     # app.setStyle("Fusion")
 
     MAIN_WINDOW: MainWindow = MainWindow()
+    app.aboutToQuit.connect(MAIN_WINDOW.prefetcher.shutdown)
+    app.aboutToQuit.connect(MAIN_WINDOW.pyramids.shutdown)
+    app.aboutToQuit.connect(MAIN_WINDOW.cancel_loading_images)
+    app.aboutToQuit.connect(
+        functools.partial(MAIN_WINDOW.load_executor.shutdown, wait=False)
+    )
+    app.aboutToQuit.connect(MAIN_WINDOW.export_latency)
 
     with open(constants.THEME_DIR / settings.THEME_NAME / "stylesheet.qss", "r") as f:
         MAIN_WINDOW.setStyleSheet(f.read())
@@ -0,0 +1,148 @@
+"""Register a theme's icons from a compiled Qt resource bundle (``resources.rcc``).
+
+BreezeStyleSheets generates each theme's icons as ``resources.py``, a ~5,000-line module of byte literals.
+Importing that module at startup means parsing, compiling, or unmarshalling it. Instead, the GUI registers
+``resources.rcc``, the same resource tree in Qt's binary format, with ``QResource.registerResource``,
+which memory-maps the file.
+
+``resources.rcc`` files are shipped next to ``resources.py``. After regenerating a theme, rebuild them with
+
+    python -m NeuroRuler.GUI.theme_resources
+
+If a theme has no ``resources.rcc`` (e.g. a newly generated theme), it's built from ``resources.py`` on first use.
+
+Resource paths are unchanged, e.g. ``:/dark-nr/help.svg``."""
+
+import ast
+import os
+import struct
+from pathlib import Path
+
+import NeuroRuler.utils.constants as constants
+
+RCC_NAME: str = "resources.rcc"
+SOURCE_NAME: str = "resources.py"
+
+RCC_MAGIC: bytes = b"qres"
+RCC_FORMAT_VERSION: int = 2
+"""Format version matching ``qt_resource_struct_v2`` in ``resources.py``, supported by Qt >= 5.8."""
+RCC_HEADER_FORMAT: str = ">4s4I"
+"""Magic, format version, then offsets of the tree, data, and names, as big-endian 32-bit ints."""
+
+USER_CACHE_DIR: Path = Path.home() / ".cache" / "NeuroRuler" / "themes"
+"""Where lazily built bundles go if the theme directory isn't writable (e.g. a system-wide install)."""
+
+
+def read_resource_blobs(source: Path) -> tuple[bytes, bytes, bytes]:
+    """Read the tree, names, and data blobs from a ``resources.py`` generated by pyrcc, without importing it.
+
+    Importing would register the resources as a side effect.
+
+    :param source: Path of ``resources.py``
+    :type source: Path
+    :raise ValueError: If ``source`` doesn't define the blobs
+    :return: (qt_resource_struct_v2, qt_resource_name, qt_resource_data)
+    :rtype: tuple[bytes, bytes, bytes]"""
+    names: tuple[str, str, str] = (
+        "qt_resource_struct_v2",
+        "qt_resource_name",
+        "qt_resource_data",
+    )
+    blobs: dict[str, bytes] = {}
+    for node in ast.parse(source.read_text()).body:
+        if (
+            isinstance(node, ast.Assign)
+            and len(node.targets) == 1
+            and isinstance(node.targets[0], ast.Name)
+            and node.targets[0].id in names
+        ):
+            blobs[node.targets[0].id] = ast.literal_eval(node.value)
+    missing: list[str] = [name for name in names if name not in blobs]
+    if missing:
+        raise ValueError(f"{source} doesn't define {', '.join(missing)}")
+    return blobs[names[0]], blobs[names[1]], blobs[names[2]]
+
+
+def build_rcc(source: Path, destination: Path) -> None:
+    """Convert ``resources.py`` at ``source`` to a binary resource bundle at ``destination``.
+
+    The bundle is written to a temporary file and renamed, so a partially written bundle is never loaded.
+
+    :param source: Path of ``resources.py``
+    :type source: Path
+    :param destination: Path of the ``.rcc`` file
+    :type destination: Path
+    :return: None"""
+    tree, names, data = read_resource_blobs(source)
+    header_size: int = struct.calcsize(RCC_HEADER_FORMAT)
+    tree_offset: int = header_size
+    data_offset: int = tree_offset + len(tree)
+    names_offset: int = data_offset + len(data)
+    header: bytes = struct.pack(
+        RCC_HEADER_FORMAT,
+        RCC_MAGIC,
+        RCC_FORMAT_VERSION,
+        tree_offset,
+        data_offset,
+        names_offset,
+    )
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    tmp: Path = destination.with_name(f"{destination.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(header + tree + data + names)
+    os.replace(tmp, destination)
+
+
+def get_rcc_path(theme_name: str) -> Path:
+    """Return the path of ``theme_name``'s resource bundle, building it from ``resources.py`` if it doesn't exist.
+
+    :param theme_name: Name of a directory in ``constants.THEME_DIR``
+    :type theme_name: str
+    :raise FileNotFoundError: If the theme has neither ``resources.rcc`` nor ``resources.py``
+    :return: Path of the bundle
+    :rtype: Path"""
+    theme_dir: Path = constants.THEME_DIR / theme_name
+    rcc: Path = theme_dir / RCC_NAME
+    if rcc.exists():
+        return rcc
+    source: Path = theme_dir / SOURCE_NAME
+    if not source.exists():
+        raise FileNotFoundError(
+            f"Theme {theme_name} has no {RCC_NAME} or {SOURCE_NAME}"
+        )
+    cached: Path = USER_CACHE_DIR / theme_name / RCC_NAME
+    if cached.exists() and cached.stat().st_mtime >= source.stat().st_mtime:
+        return cached
+    try:
+        build_rcc(source, rcc)
+        return rcc
+    except OSError:
+        build_rcc(source, cached)
+        return cached
+
+
+def register_theme_resources(theme_name: str) -> None:
+    """Register ``theme_name``'s icons so they're accessible at ``:/{theme_name}/...``.
+
+    :param theme_name: Name of a directory in ``constants.THEME_DIR``
+    :type theme_name: str
+    :raise RuntimeError: If Qt can't load the bundle
+    :return: None"""
+    from PyQt6.QtCore import QResource
+
+    rcc: Path = get_rcc_path(theme_name)
+    if not QResource.registerResource(str(rcc)):
+        raise RuntimeError(f"Failed to register Qt resource bundle {rcc}")
+
+
+def main() -> None:
+    """Rebuild ``resources.rcc`` for every theme that has a ``resources.py``."""
+    for theme_name in constants.THEMES:
+        source: Path = constants.THEME_DIR / theme_name / SOURCE_NAME
+        if source.exists():
+            rcc: Path = constants.THEME_DIR / theme_name / RCC_NAME
+            build_rcc(source, rcc)
+            print(f"Built {rcc} ({rcc.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""NeuroRuler measures head circumference of MRI and CT images.
+
+``measure``, ``Measurement``, ``Smoothing``, and ``Timings`` are defined in ``NeuroRuler.utils.api``,
+and ``Precision`` and ``ThresholdFilter`` (arguments of ``measure``) in ``NeuroRuler.utils.constants``.
+They're imported on first access so that importing a NeuroRuler subpackage (e.g. the CLI) doesn't import
+SimpleITK through this file."""
+
+import importlib
+from typing import Any
+
+LAZY_EXPORTS: dict[str, str] = {
+    "measure": "NeuroRuler.utils.api",
+    "Measurement": "NeuroRuler.utils.api",
+    "Smoothing": "NeuroRuler.utils.api",
+    "Timings": "NeuroRuler.utils.api",
+    "Precision": "NeuroRuler.utils.constants",
+    "ThresholdFilter": "NeuroRuler.utils.constants",
+}
+
+__all__ = list(LAZY_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value: Any = getattr(importlib.import_module(LAZY_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,233 @@
+"""Python API for measuring head circumference, for notebooks and pipelines.
+
+``measure()`` is re-exported as ``NeuroRuler.measure``::
+
+    import NeuroRuler
+
+    result = NeuroRuler.measure("data/IBIS_Case1_V06_t1w_RAI.nrrd", theta=(4, 0, 0))
+    print(result.circumference, result.units)
+
+    # A volume already in memory, indexed [z, y, x]
+    result = NeuroRuler.measure(array, spacing=(1.0, 1.0, 1.2), origin=(0.0, 0.0, 0.0))
+
+Unlike ``CLI.main.main()``, nothing here reads or writes ``global_vars`` or the settings modules.
+Every setting is an argument, and every filter is created per call, so ``measure()``
+can be called from many threads at once. SimpleITK releases the GIL while filters execute."""
+
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import NamedTuple, Union
+
+import numpy as np
+import SimpleITK as sitk
+
+import NeuroRuler.utils.exceptions as exceptions
+import NeuroRuler.utils.imgproc as imgproc
+from NeuroRuler.utils.histogram import compute_histogram, suggest_binary_thresholds
+from NeuroRuler.utils.constants import (
+    View,
+    ThresholdFilter,
+    Precision,
+    ROTATION_MIN,
+    ROTATION_MAX,
+    degrees_to_radians,
+)
+from NeuroRuler.utils.img_helpers import (
+    get_center_of_rotation,
+    get_middle_dimension,
+    get_physical_units,
+    get_rotated_slice,
+    image_from_array,
+    load_z_oriented_image,
+    orient_image,
+)
+from NeuroRuler.utils.prefetch import ContourSettings, contour_with_settings
+
+
+class Smoothing(NamedTuple):
+    """Settings of the gradient anisotropic diffusion filter applied before thresholding.
+
+    Defaults are the same as ``cli_config.json``."""
+
+    conductance: float = 3.0
+    iterations: int = 5
+    time_step: float = 0.0625
+
+
+class Timings(NamedTuple):
+    """Seconds spent in each step of ``measure()``."""
+
+    load: float
+    """Reading (if given a path) and orienting the image"""
+    resample: float
+    """Rotating and slicing"""
+    contour: float
+    """Smoothing, thresholding, hole filling, and island removal. Includes the volume's histogram
+    for ``ThresholdFilter.VolumeOtsu``."""
+    length: float
+    """Finding contours and computing the arc length of the parent contour"""
+
+    @property
+    def total(self) -> float:
+        return self.load + self.resample + self.contour + self.length
+
+
+@dataclass(frozen=True)
+class Measurement:
+    """Result of ``measure()``."""
+
+    circumference: float
+    """In ``units``"""
+    units: Union[str, None]
+    """Physical units from the image's metadata, or None if it doesn't say (e.g. NRRD)"""
+    spacing: tuple[float, float]
+    """(x, y) pixel spacing of the slice used to compute ``circumference``"""
+    slice_num: int
+    """0-indexed slice along the inferior-superior axis"""
+    num_contours: int
+    """Contours detected in the processed slice. The circumference is the length of the outermost one."""
+    timings: Timings
+
+
+def measure(
+    source: Union[str, os.PathLike, sitk.Image, np.ndarray],
+    *,
+    spacing: Union[tuple[float, float, float], None] = None,
+    origin: Union[tuple[float, float, float], None] = None,
+    direction: Union[tuple[float, ...], None] = None,
+    theta: tuple[int, int, int] = (0, 0, 0),
+    slice: Union[int, None] = None,
+    smoothing: Smoothing = Smoothing(),
+    threshold: Union[ThresholdFilter, tuple[float, float]] = ThresholdFilter.Otsu,
+    precision: Precision = Precision.Float64,
+    cache_dir: Union[str, os.PathLike, None] = None,
+    cache_max_mb: int = 4096,
+) -> Measurement:
+    """Compute the head circumference of an image. Gives the same result as ``python cli.py`` with the same settings.
+
+    Safe to call from several threads at once.
+
+    Images and arrays in memory go through the same orient, resample, and contour steps as files.
+    A ``sitk.Image`` that's already oriented for the Z view (LPS) isn't copied.
+    An array is copied once into a ``sitk.Image`` (see ``img_helpers.image_from_array``).
+
+    :param source: Path of an image file, an image, or a 3D array indexed [z, y, x]
+    :type source: str or os.PathLike or sitk.Image or np.ndarray
+    :param spacing: (x, y, z) spacing of an array ``source``. Defaults to (1, 1, 1).
+    :type spacing: tuple[float, float, float] or None
+    :param origin: (x, y, z) origin of an array ``source``. Defaults to (0, 0, 0).
+    :type origin: tuple[float, float, float] or None
+    :param direction: 9 direction cosines (row-major) of an array ``source``. Defaults to identity.
+    :type direction: tuple[float, ...] or None
+    :param theta: (x, y, z) rotation in degrees
+    :type theta: tuple[int, int, int]
+    :param slice: 0-indexed slice along the inferior-superior axis. None means the middle slice.
+    :type slice: int or None
+    :param smoothing:
+    :type smoothing: Smoothing
+    :param threshold: ``ThresholdFilter.Otsu``, ``ThresholdFilter.VolumeOtsu`` (one Otsu threshold computed
+        from the whole volume's histogram), or (lower, upper) thresholds for a binary threshold
+    :type threshold: ThresholdFilter or tuple[float, float]
+    :param precision: Pixel type used for smoothing and thresholding. Float64 is the reference.
+    :type precision: Precision
+    :param cache_dir: Directory of the decoded volume cache (see ``volume_cache.py``). None disables the cache.
+    :type cache_dir: str or os.PathLike or None
+    :param cache_max_mb: Size limit of the cache
+    :type cache_max_mb: int
+    :raise exceptions.RotationOutOfBounds: If a rotation is out of bounds
+    :raise exceptions.SliceOutOfBounds: If ``slice`` is out of bounds
+    :raise exceptions.ComputeCircumferenceOfInvalidSlice: If the slice isn't a valid brain slice
+    :raise FileNotFoundError: If ``source`` is a path that doesn't exist
+    :raise ValueError: If ``spacing``, ``origin``, or ``direction`` is given for a ``source`` that isn't an array,
+        or an array ``source`` isn't 3D
+    :return: Circumference and details about how it was computed
+    :rtype: Measurement"""
+    for axis, theta_axis in zip("XYZ", theta):
+        if not ROTATION_MIN <= theta_axis <= ROTATION_MAX:
+            raise exceptions.RotationOutOfBounds(theta_axis, axis)
+    if isinstance(threshold, ThresholdFilter):
+        if threshold == ThresholdFilter.Binary:
+            raise ValueError(
+                "Pass (lower, upper) thresholds instead of ThresholdFilter.Binary"
+            )
+        # VolumeOtsu's thresholds are filled in once the image is loaded
+        contour_settings: ContourSettings = ContourSettings(
+            threshold, *smoothing, 0.0, 0.0, precision
+        )
+    else:
+        lower, upper = threshold
+        contour_settings = ContourSettings(
+            ThresholdFilter.Binary, *smoothing, lower, upper, precision
+        )
+
+    is_array: bool = isinstance(source, np.ndarray)
+    if not is_array and (spacing, origin, direction) != (None, None, None):
+        raise ValueError(
+            "spacing, origin, and direction are only used for numpy array input"
+        )
+
+    start: float = time.perf_counter()
+    if is_array:
+        img: sitk.Image = orient_image(
+            image_from_array(source, spacing, origin, direction), View.Z
+        )
+    elif isinstance(source, sitk.Image):
+        img = orient_image(source, View.Z)
+    else:
+        path: Path = Path(source)
+        if not path.is_file():
+            raise FileNotFoundError(f"No such file {path}")
+        img = load_z_oriented_image(
+            path,
+            None if cache_dir is None else Path(cache_dir),
+            cache_max_mb * 1024 * 1024,
+        )
+
+    num_slices: int = img.GetSize()[View.Z.value]
+    slice_num: int = get_middle_dimension(img, View.Z) if slice is None else slice
+    if not 0 <= slice_num < num_slices:
+        raise exceptions.SliceOutOfBounds(slice_num, num_slices)
+
+    loaded: float = time.perf_counter()
+    transform: sitk.Euler3DTransform = sitk.Euler3DTransform()
+    transform.SetCenter(get_center_of_rotation(img))
+    transform.SetRotation(*(degrees_to_radians(theta_axis) for theta_axis in theta))
+    rotated_slice: sitk.Image = get_rotated_slice(
+        img,
+        transform,
+        View.Z,
+        slice_num,
+        get_middle_dimension(img, View.X),
+        get_middle_dimension(img, View.Y),
+    )
+
+    resampled: float = time.perf_counter()
+    if contour_settings.threshold_filter == ThresholdFilter.VolumeOtsu:
+        lower, upper = suggest_binary_thresholds(compute_histogram(img))
+        contour_settings = contour_settings._replace(
+            lower_threshold=lower, upper_threshold=upper
+        )
+    binary_contour: np.ndarray = contour_with_settings(
+        rotated_slice, contour_settings, writable=False
+    )
+
+    contoured: float = time.perf_counter()
+    img_spacing: tuple = img.GetSpacing()
+    contour: imgproc.ContourPolyline = imgproc.ContourPolyline.from_binary_contour(
+        binary_contour
+    )
+    circumference: float = contour.length_with_spacing(img_spacing[0], img_spacing[1])
+    end: float = time.perf_counter()
+
+    return Measurement(
+        circumference,
+        get_physical_units(img),
+        (img_spacing[0], img_spacing[1]),
+        slice_num,
+        contour.num_contours,
+        Timings(
+            loaded - start, resampled - loaded, contoured - resampled, end - contoured
+        ),
+    )
@@ -2,9 +2,13 @@
 
 Command-line arguments override the values in the JSON."""
 
-from typing import Any
+from pathlib import Path
+from typing import Any, TYPE_CHECKING, Union
 import NeuroRuler.utils.global_vars as global_vars
-from NeuroRuler.utils.constants import ThresholdFilter
+from NeuroRuler.utils.constants import ThresholdFilter, Precision
+
+if TYPE_CHECKING:
+    from NeuroRuler.utils.sharding import Shard
 
 DEBUG: bool = False
 """Whether or not to print debugging information throughout execution."""
@@ -14,8 +18,17 @@ RAW: bool = False
 
 If false, it prints a \"pretty\", rounded output with units included."""
 
-FILE: str = ""
-"""The file path."""
+FILES: list[str] = []
+"""The file paths. More than one file, or ``OUTPUT``, runs the CLI in batch mode."""
+
+OUTPUT: Union[Path, None] = None
+"""Results file (``.jsonl`` or ``.csv``) that batch mode appends each measurement to. See ``results.py``."""
+
+RESUME: bool = False
+"""Skip files that already have a successful row with the same parameters in ``OUTPUT``."""
+
+SHARD: Union["Shard", None] = None
+"""Measure only this shard of ``FILES``, for array jobs. See ``sharding.py``."""
 
 THETA_X: int = global_vars.THETA_X
 """In degrees"""
@@ -48,6 +61,15 @@ UPPER_BINARY_THRESHOLD: float = global_vars.UPPER_BINARY_THRESHOLD
 If ``THRESHOLD_FILTER`` is ``ThresholdFilter.Otsu``, then this field will not be updated by CLI args
 or by ``cli_config.json``."""
 
+PRECISION: Precision = Precision.Float64
+"""Pixel type used for smoothing and thresholding. See ``constants.Precision``."""
+
+VOLUME_CACHE_DIR: Union[Path, None] = None
+"""Directory of the decoded volume cache. None disables the cache. See ``global_vars.VOLUME_CACHE_DIR``."""
+
+VOLUME_CACHE_MAX_MB: int = 4096
+"""Size limit of the decoded volume cache in MB."""
+
 
 def get_settings() -> dict[str, Any]:
     r"""Returns ``dict`` containing values of all variables in this file, used for debugging
@@ -57,7 +79,10 @@ def get_settings() -> dict[str, Any]:
     return {
         "DEBUG": DEBUG,
         "RAW": RAW,
-        "FILE": FILE,
+        "FILES": FILES,
+        "OUTPUT": OUTPUT,
+        "RESUME": RESUME,
+        "SHARD": SHARD,
         "THETA_X": THETA_X,
         "THETA_Y": THETA_Y,
         "THETA_Z": THETA_Z,
@@ -68,4 +93,7 @@ def get_settings() -> dict[str, Any]:
         "THRESHOLD_FILTER": THRESHOLD_FILTER,
         "LOWER_BINARY_THRESHOLD": LOWER_BINARY_THRESHOLD,
         "UPPER_BINARY_THRESHOLD": UPPER_BINARY_THRESHOLD,
+        "PRECISION": PRECISION,
+        "VOLUME_CACHE_DIR": VOLUME_CACHE_DIR,
+        "VOLUME_CACHE_MAX_MB": VOLUME_CACHE_MAX_MB,
     }
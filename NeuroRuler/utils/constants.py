@@ -1,21 +1,23 @@
 """Constant values and functions. DO NOT MUTATE ANY VARIABLE IN THIS FILE FROM OUTSIDE OF THIS FILE!
 
-This file should not import any module in this repo to avoid circular imports."""
+This file should not import any module in this repo to avoid circular imports.
+
+The CLI imports this file, so importing it must stay cheap. Constants that are expensive to compute and
+used only by the GUI (``THEME_DIR``, ``THEMES``, ``PRIMARY_MONITOR_DIMENSIONS``) are computed on first access
+by ``__getattr__``. Access them as ``constants.THEMES``, not through a ``from`` import at the top of a module
+the CLI imports."""
 
 import re
+import sys
 from pathlib import Path
 import warnings
 import functools
-from screeninfo import get_monitors, ScreenInfoError
-from numpy import pi
-from typing import Union
+from math import pi
+from typing import Any, Union
 from enum import Enum
-import pkg_resources
 
 OUTPUT_DIR: Path = Path("output")
-"""Directory for storing output."""
-if not OUTPUT_DIR.exists():
-    OUTPUT_DIR.mkdir()
+"""Directory for storing output. Not created until something is exported."""
 
 JSON_CLI_CONFIG_PATH: Path = Path("cli_config.json")
 """Settings that configure cli_settings.py.
@@ -41,30 +43,75 @@ SUPPORTED_IMAGE_EXTENSIONS_REGEX: tuple[re.Pattern, ...] = tuple(
 )
 """Tuple of ``re.Pattern`` for supported image extensions."""
 
-THEME_DIR: Path = Path("NeuroRuler") / "GUI" / "themes"
-"""themes/ directory where .qss stylesheets and resources.py files are stored."""
-if not THEME_DIR.exists():
+LAZY_CONSTANTS: tuple[str, ...] = ("THEME_DIR", "THEMES", "PRIMARY_MONITOR_DIMENSIONS")
+"""Constants computed on first access. See ``__getattr__``."""
+
+
+def _get_theme_dir() -> Path:
+    """themes/ directory where .qss stylesheets and resources.py files are stored.
+
+    :return: THEME_DIR
+    :rtype: Path"""
+    theme_dir: Path = Path("NeuroRuler") / "GUI" / "themes"
+    if not theme_dir.exists():
+        # pkg_resources is slow to import, and only needed when running the installed package
+        import pkg_resources
+
+        theme_dir = Path(pkg_resources.resource_filename("NeuroRuler.GUI", "themes"))
+    return theme_dir
+
+
+def _get_themes() -> list[str]:
+    """List of themes, i.e. the names of the directories in THEME_DIR.
+
+    :return: THEMES
+    :rtype: list[str]"""
+    # Module attribute access, since __getattr__ isn't called for global names used within this module
+    theme_dir: Path = sys.modules[__name__].THEME_DIR
+    # Without this, autodocumentation might crash
+    # THEME_DIR obviously exists at this point, except maybe in autodocumentation code
+    if not theme_dir.exists():
+        return []
+    return sorted(path.name for path in theme_dir.iterdir() if path.is_dir())
+
+
+def _get_primary_monitor_dimensions() -> tuple[int, int]:
+    """User's primary monitor's dimensions, or (500, 500) (dummy values) if there's no monitor.
+
+    :return: PRIMARY_MONITOR_DIMENSIONS
+    :rtype: tuple[int, int]"""
+    from screeninfo import get_monitors, ScreenInfoError
+
     try:
-        THEME_DIR = Path(pkg_resources.resource_filename("NeuroRuler.GUI", "themes"))
-    # This will occur on circular import, which will occur when running
-    # from NeuroRuler.CLI import CLI
-    # but CLI doesn't care about THEME_DIR
-    # This is a janky way to avoid circular import
-    except ImportError:
+        for monitor in get_monitors():
+            if monitor.is_primary:
+                return monitor.width, monitor.height
+    except ScreenInfoError:
+        # This will occur in GH automated tests.
         pass
+    return 500, 500
+
 
-THEMES: list[str] = []
-"""List of themes, i.e. the names of the directories in THEME_DIR."""
+def __getattr__(name: str) -> Any:
+    """Compute a constant in ``LAZY_CONSTANTS`` on first access. Called only for names not found in this module.
 
-# Without this, autodocumentation might crash
-# THEME_DIR obviously exists at this point, except maybe in autodocumentation code
-if THEME_DIR.exists():
-    for path in THEME_DIR.iterdir():
-        if path.is_dir():
-            THEMES.append(path.name)
-    THEMES = sorted(THEMES)
-else:
-    pass
+    The value is stored in this module's globals, so later accesses don't call this.
+
+    :param name:
+    :type name: str
+    :raise AttributeError: If ``name`` isn't a constant in this module
+    :return: Value of the constant
+    :rtype: Any"""
+    getters: dict[str, Any] = {
+        "THEME_DIR": _get_theme_dir,
+        "THEMES": _get_themes,
+        "PRIMARY_MONITOR_DIMENSIONS": _get_primary_monitor_dimensions,
+    }
+    if name not in getters:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value: Any = getters[name]()
+    globals()[name] = value
+    return value
 
 
 class View(Enum):
@@ -78,10 +125,50 @@ class View(Enum):
 
 
 class ThresholdFilter(Enum):
-    """Determines the threshold filter (Otsu or binary) used in imgproc.contour()."""
+    """Determines the threshold filter (Otsu or binary) used in imgproc.contour().
+
+    VolumeOtsu uses the Otsu threshold of the whole volume's histogram (see ``histogram.py``)
+    as a fixed threshold for every slice, instead of computing Otsu's threshold per slice.
+    """
 
     Otsu = 0
     Binary = 1
+    VolumeOtsu = 2
+
+
+class Precision(Enum):
+    """Floating point type that slices are cast to before smoothing and thresholding.
+
+    Float64 is the reference and the default. Float32 halves the memory of the smoothed slice.
+    Run ``benchmarks/precision_validation.py`` to compare their circumferences and speed on your data and machine.
+    """
+
+    Float32 = 0
+    Float64 = 1
+
+
+PRECISION_NAMES: dict[str, Precision] = {
+    "float32": Precision.Float32,
+    "float64": Precision.Float64,
+}
+"""Values of the PRECISION config field and the --precision CLI option"""
+
+THRESHOLD_FILTER_NAMES: dict[str, ThresholdFilter] = {
+    "otsu": ThresholdFilter.Otsu,
+    "volume-otsu": ThresholdFilter.VolumeOtsu,
+    "binary": ThresholdFilter.Binary,
+}
+"""Values of the --filter CLI option, lowercase"""
+
+
+class LoadStatus(Enum):
+    """Status of an image yielded by img_helpers.iter_update_images().
+
+    Loaded means the image was added to IMAGE_DICT. Differing means its properties differ from those
+    of the loaded group, so it was not added."""
+
+    Loaded = 0
+    Differing = 1
 
 
 class BinaryColor(Enum):
@@ -150,18 +237,6 @@ ORIENTATION_STRINGS: tuple[str, str, str] = (
 
 Intended to be indexed using View.X.value, View.Y.value, and View.Z.value."""
 
-PRIMARY_MONITOR_DIMENSIONS: tuple[int, int] = (500, 500)
-"""Set to user's primary monitor's dimensions. 500, 500 are dummy values"""
-
-try:
-    for monitor in get_monitors():
-        if monitor.is_primary:
-            PRIMARY_MONITOR_DIMENSIONS = (monitor.width, monitor.height)
-            break
-except ScreenInfoError:
-    # This will occur in GH automated tests.
-    pass
-
 
 MESSAGE_TO_SHOW_IF_UNITS_NOT_FOUND: str = "millimeters (mm)"
 """We assume units are millimeters if we can't find units in metadata"""
@@ -197,6 +272,18 @@ def degrees_to_radians(angle: Union[int, float]) -> float:
     return angle * pi / 180
 
 
+def circumference_message(circumference: float, units: Union[str, None]) -> str:
+    """Message printed by the CLI (unless ``-r``) and by ``neuroruler client``.
+
+    :param circumference:
+    :type circumference: float
+    :param units: Units from the image's metadata, or None if not found
+    :type units: str or None
+    :return: Rounded circumference with units
+    :rtype: str"""
+    return f"Calculated Circumference: {round(circumference, NUM_DIGITS_TO_ROUND_TO)} {units if units is not None else MESSAGE_TO_SHOW_IF_UNITS_NOT_FOUND}"
+
+
 def get_path_stem(path: Path) -> str:
     """Get true stem of ``path``.
 
@@ -51,6 +51,30 @@ class RotationOutOfBounds(Exception):
         super().__init__(self.message)
 
 
+class SliceOutOfBounds(Exception):
+    """Slice index passed to ``NeuroRuler.measure`` is out of bounds."""
+
+    def __init__(self, slice_num: int, num_slices: int):
+        self.message = f"Slice {slice_num} out of bounds. The image has {num_slices} slices (0-indexed)."
+        super().__init__(self.message)
+
+
+class InvalidRequest(Exception):
+    """Request sent to the ``neuroruler serve`` daemon is malformed or has invalid options."""
+
+    def __init__(self, reason: str):
+        self.message = f"Invalid request: {reason}"
+        super().__init__(self.message)
+
+
+class InvalidResultsFile(Exception):
+    """Results file passed to ``results.ResultsWriter`` can't be appended to, e.g. a CSV with different columns."""
+
+    def __init__(self, path, reason: str):
+        self.message = f"Can't write results to {path}: {reason}"
+        super().__init__(self.message)
+
+
 class InvalidJSONField(Exception):
     def __init__(self, field: str, expected: str):
         """``field`` is the name of the invalid field
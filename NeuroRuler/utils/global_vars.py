@@ -2,7 +2,12 @@
 
 import SimpleITK as sitk
 from pathlib import Path
-from NeuroRuler.utils.constants import View
+from typing import TYPE_CHECKING, Union
+from NeuroRuler.utils.constants import View, Precision
+
+if TYPE_CHECKING:
+    # histogram.py imports imgproc.py, which imports this file
+    from NeuroRuler.utils.histogram import VolumeHistogram
 
 IMAGE_DICT: dict[Path, sitk.Image] = dict()
 """The group of images that has been loaded.
@@ -17,6 +22,11 @@ in the GUI for insertion and deletion operations, which is fine.
 All images in the dictionary have matching properties, as defined by img_helpers.ImageProperties
 (there is a threshold for pixel spacing)."""
 
+HISTOGRAM_DICT: dict[Path, "VolumeHistogram"] = dict()
+"""Intensity histogram of each image in IMAGE_DICT, computed when the image is loaded.
+
+Histograms don't depend on orientation, so they stay valid when images in IMAGE_DICT are re-oriented."""
+
 GROUP_MAX_SPACING_DIFF: float = 0.0001
 """The maximum difference in pixel spacing (in mm) between two images of the global group,
 such that they are considered to have the same spacing."""
@@ -30,6 +40,13 @@ functions)."""
 READER: sitk.ImageFileReader = sitk.ImageFileReader()
 """Global ``sitk.ImageFileReader``."""
 
+VOLUME_CACHE_DIR: Union[Path, None] = None
+"""Directory of the decoded volume cache (see ``volume_cache.py``). None disables the cache.
+
+Set from ``cli_settings.VOLUME_CACHE_DIR`` or ``gui_settings.VOLUME_CACHE_DIR`` at startup."""
+VOLUME_CACHE_MAX_BYTES: int = 4096 * 1024 * 1024
+"""Size limit of the decoded volume cache. Least recently used volumes are evicted beyond this."""
+
 ORIENT_FILTER: sitk.DICOMOrientImageFilter = sitk.DICOMOrientImageFilter()
 """Global ``sitk.DICOMOrientImageFilter`` for orienting images.
 
@@ -79,6 +96,11 @@ TIME_STEP: float = 0.0625
 The time step depends on the dimensionality of the image.
 In Slicer, the images are 3D and the default (.0625) time step will provide a stable solution."""
 
+PRECISION: Precision = Precision.Float64
+"""Pixel type of slices passed to the smoothing and threshold filters.
+
+Set from ``gui_settings.PRECISION`` at startup."""
+
 OTSU_THRESHOLD_FILTER: sitk.OtsuThresholdImageFilter = sitk.OtsuThresholdImageFilter()
 """Global Otsu threshold filter."""
 
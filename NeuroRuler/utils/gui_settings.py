@@ -8,6 +8,8 @@ because if parsing the GUI json fails (e.g., doesn't exist),
 then we need an actual working value here."""
 
 from pathlib import Path
+from typing import Union
+from NeuroRuler.utils.constants import Precision
 
 DEBUG: bool = False
 """Whether or not to print debugging information throughout execution."""
@@ -41,3 +43,24 @@ DISPLAY_ADVANCED_MENU_MESSAGES_IN_TERMINAL: bool = False
 GROUP_MAX_SPACING_DIFF: float = 0.0001
 """The maximum difference in pixel spacing (in mm) between two images of the global group,
 such that they are considered to have the same spacing. See ``global_vars.GROUP_MAX_SPACING_DIFF``."""
+
+VOLUME_CACHE_DIR: Union[Path, None] = None
+"""Directory of the decoded volume cache. None disables the cache. See ``global_vars.VOLUME_CACHE_DIR``."""
+
+VOLUME_CACHE_MAX_MB: int = 4096
+"""Size limit of the decoded volume cache in MB."""
+
+PREFETCH_DEPTH: int = 2
+"""Number of images on each side of the current image to prepare in the background. 0 disables prefetching."""
+
+PREFETCH_MAX_MB: int = 512
+"""Memory limit of prefetched results in MB."""
+
+PYRAMID_MAX_MB: int = 256
+"""Memory limit of the multi-resolution pyramids of loaded images in MB. 0 disables them. See ``pyramid.py``."""
+
+PRECISION: Precision = Precision.Float64
+"""Pixel type used for smoothing and thresholding. See ``constants.Precision``."""
+
+MEMORY_BUDGET_MB: int = 0
+"""Memory limit of loaded images and caches in MB. 0 means half of physical memory. See ``memory.py``."""
@@ -0,0 +1,112 @@
+"""Per-volume intensity histograms and the threshold statistics derived from them.
+
+A volume's histogram doesn't depend on its orientation, rotation, or slice, so it's computed once when
+the volume is loaded (``global_vars.HISTOGRAM_DICT``) instead of on every slice like ``sitk.OtsuThreshold``.
+
+``otsu_threshold`` gives the Otsu threshold of the whole volume, used by ``ThresholdFilter.VolumeOtsu``
+as a fixed threshold for any plane. ``suggest_binary_thresholds`` turns it into (lower, upper) values
+for the binary threshold inputs."""
+
+from typing import NamedTuple
+
+import numpy as np
+import SimpleITK as sitk
+
+from NeuroRuler.utils.imgproc import array_view_of_image
+
+NUM_BINS: int = 256
+"""Number of bins of the histogram of a floating point volume, or of an integer volume with a wide range."""
+
+MAX_EXACT_BINS: int = 65536
+"""Integer volumes with at most this many distinct possible values get one bin per value."""
+
+VOXELS_PER_CHUNK: int = 1 << 20
+"""Integer volumes are counted this many voxels at a time to bound the memory of temporary arrays."""
+
+
+class VolumeHistogram(NamedTuple):
+    """Intensity histogram of a volume. Bin ``i`` holds the voxels in [``bin_edges[i]``, ``bin_edges[i + 1]``)."""
+
+    counts: np.ndarray
+    """Number of voxels in each bin"""
+    bin_edges: np.ndarray
+    """``len(counts) + 1`` edges. For integer volumes, edges are halfway between values,
+    so a threshold at an edge never equals a voxel's value."""
+
+
+def compute_histogram(img: sitk.Image) -> VolumeHistogram:
+    """Return the intensity histogram of every voxel in ``img``.
+
+    Doesn't copy the volume. Integer volumes are counted exactly (one bin per value) if their range allows it.
+
+    :param img: Scalar image
+    :type img: sitk.Image
+    :return: Histogram of ``img``
+    :rtype: VolumeHistogram"""
+    voxels: np.ndarray = array_view_of_image(img).reshape(-1)
+    low = voxels.min()
+    high = voxels.max()
+
+    if (
+        np.issubdtype(voxels.dtype, np.integer)
+        and int(high) - int(low) < MAX_EXACT_BINS
+    ):
+        num_values: int = int(high) - int(low) + 1
+        counts: np.ndarray = np.zeros(num_values, dtype=np.int64)
+        for start in range(0, voxels.size, VOXELS_PER_CHUNK):
+            counts += np.bincount(
+                np.subtract(
+                    voxels[start : start + VOXELS_PER_CHUNK], int(low), dtype=np.intp
+                ),
+                minlength=num_values,
+            )
+        return VolumeHistogram(
+            counts, np.arange(num_values + 1, dtype=np.float64) + (int(low) - 0.5)
+        )
+
+    counts, bin_edges = np.histogram(
+        voxels, bins=NUM_BINS, range=(float(low), float(high))
+    )
+    return VolumeHistogram(counts, bin_edges)
+
+
+def otsu_threshold(histogram: VolumeHistogram) -> float:
+    """Return the threshold that maximizes the between-class variance of ``histogram`` (Otsu's method).
+
+    Voxels below the threshold are background. Unlike ``sitk.OtsuThreshold`` on a slice,
+    this takes microseconds, since it only reads the histogram.
+
+    :param histogram:
+    :type histogram: VolumeHistogram
+    :return: Upper edge of the last background bin
+    :rtype: float"""
+    centers: np.ndarray = (histogram.bin_edges[:-1] + histogram.bin_edges[1:]) / 2
+    # Voxel count and intensity sum of the background class for each candidate threshold.
+    # Counts are integers, so the foreground count is exactly 0 only for the last bin.
+    background_counts: np.ndarray = np.cumsum(histogram.counts)
+    background_sums: np.ndarray = np.cumsum(histogram.counts * centers)
+    total_count: int = int(background_counts[-1])
+    foreground_counts: np.ndarray = total_count - background_counts
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Proportional to the between-class variance
+        between_class_variance: np.ndarray = (
+            total_count * background_sums - background_counts * background_sums[-1]
+        ) ** 2 / (background_counts * foreground_counts)
+    # Empty classes give nan. The last bin can't be a threshold since the foreground would be empty.
+    if np.all(np.isnan(between_class_variance[:-1])):
+        # Constant volume
+        return float(histogram.bin_edges[-1])
+    last_background_bin: int = int(np.nanargmax(between_class_variance[:-1]))
+    return float(histogram.bin_edges[last_background_bin + 1])
+
+
+def suggest_binary_thresholds(histogram: VolumeHistogram) -> tuple[float, float]:
+    """Return (lower, upper) binary thresholds that select the background of the volume, like Otsu does.
+
+    The binary threshold filter with these thresholds gives the same result as ``ThresholdFilter.VolumeOtsu``.
+
+    :param histogram:
+    :type histogram: VolumeHistogram
+    :return: (lower, upper), i.e. (minimum intensity, ``otsu_threshold``)
+    :rtype: tuple[float, float]"""
+    return float(histogram.bin_edges[0]), otsu_threshold(histogram)
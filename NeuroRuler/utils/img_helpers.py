@@ -3,12 +3,20 @@
 Mostly holds helper functions for working with ``IMAGE_DICT`` in ``global_vars.py``."""
 
 from __future__ import annotations
-from typing import NamedTuple, Union
+from typing import Iterator, NamedTuple, Union
 import SimpleITK as sitk
+import numpy as np
 from pathlib import Path
 import NeuroRuler.utils.global_vars as global_vars
-from NeuroRuler.utils.constants import degrees_to_radians, View
+from NeuroRuler.utils.constants import degrees_to_radians, View, LoadStatus
 import NeuroRuler.utils.constants as constants
+import NeuroRuler.utils.volume_cache as volume_cache
+from NeuroRuler.utils.histogram import (
+    VolumeHistogram,
+    compute_histogram,
+    suggest_binary_thresholds,
+)
+from NeuroRuler.utils.imgproc import PRECISION_PIXEL_TYPES
 
 
 class ImageProperties(NamedTuple):
@@ -22,77 +30,184 @@ class ImageProperties(NamedTuple):
     spacing: tuple[float, float, float]
 
 
-def update_images(path_list: list[Path]) -> list[Path]:
-    """Initialize IMAGE_DICT. See the docstring for IMAGE_DICT in global_vars.py for more info.
+def read_z_oriented_image(path: Path) -> sitk.Image:
+    """Read the image at ``path`` and orient it for the Z view.
 
-    All images are oriented for the axial view when loaded. When calling this, make sure global_vars.VIEW = Z.
+    Uses the procedural interface rather than global_vars.READER and global_vars.ORIENT_FILTER,
+    so it's safe to call from several threads at once.
 
-    If the images at path(s) in path_list don't match the properties of previously saved images,
-    then this method returns the paths of the images that don't match, and
-    IMAGE_DICT is updated only with the non-differing images.
+    If the decoded volume cache is enabled (``global_vars.VOLUME_CACHE_DIR``) and ``path`` is compressed,
+    returns the cached volume if there is one, else stores the result in the cache.
+
+    :param path:
+    :type path: Path
+    :return: Image oriented for the Z view
+    :rtype: sitk.Image"""
+    return load_z_oriented_image(
+        path, global_vars.VOLUME_CACHE_DIR, global_vars.VOLUME_CACHE_MAX_BYTES
+    )
 
-    :param path_list:
-    :type path_list: list[Path]
-    :raise: Exception if path_list is empty (disallow this in GUI)
-    :return: List of paths of images with properties that differ from those of the images currently in IMAGE_DICT
-    :rtype: list[Path]"""
-    if not path_list:
-        raise Exception("update_images assumes path_list isn't empty.")
+
+def load_z_oriented_image(
+    path: Path, cache_dir: Union[Path, None] = None, cache_max_bytes: int = 0
+) -> sitk.Image:
+    """Same as ``read_z_oriented_image`` but takes the volume cache settings as arguments. Doesn't use global variables.
+
+    :param path:
+    :type path: Path
+    :param cache_dir: Directory of the decoded volume cache. None disables the cache.
+    :type cache_dir: Path or None
+    :param cache_max_bytes: Size limit of the cache
+    :type cache_max_bytes: int
+    :return: Image oriented for the Z view
+    :rtype: sitk.Image"""
+    use_cache: bool = cache_dir is not None and volume_cache.is_compressed(path)
+    if use_cache:
+        cached: Union[sitk.Image, None] = volume_cache.load(
+            path, constants.Z_ORIENTATION_STR, cache_dir
+        )
+        if cached is not None:
+            return cached
 
     # On load, orient the image for Z view by default
     # If we don't do this, then the misaligned image's GetSize()[2] won't actually be the inferior-superior axis
     # Then the max slice value would not be correct because it would use some other axis
-    global_vars.ORIENT_FILTER.SetDesiredCoordinateOrientation(
-        constants.Z_ORIENTATION_STR
+    img: sitk.Image = sitk.DICOMOrient(
+        sitk.ReadImage(str(path)), constants.Z_ORIENTATION_STR
     )
 
-    comparison_properties_tuple: ImageProperties
-    if global_vars.IMAGE_DICT:
-        comparison_properties_tuple = get_curr_properties_tuple()
-    else:
-        first_path: Path = path_list[0]
-        comparison_properties_tuple = get_properties_from_path(first_path)
-        global_vars.READER.SetFileName(str(first_path))
-        first_img: sitk.Image = global_vars.READER.Execute()
-        first_img_axial: sitk.Image = global_vars.ORIENT_FILTER.Execute(first_img)
-        global_vars.IMAGE_DICT[first_path] = first_img_axial
-        # Don't need to look at first image again
-        path_list = path_list[1:]
+    if use_cache:
+        volume_cache.store(
+            path,
+            img,
+            constants.Z_ORIENTATION_STR,
+            cache_dir,
+            cache_max_bytes,
+        )
+    return img
+
+
+def iter_update_images(
+    path_list: list[Path],
+) -> Iterator[tuple[Path, ImageProperties, LoadStatus]]:
+    """Generator version of ``update_images``. Reads one image per iteration and yields
+    ``(path, properties, status)`` as soon as that image is read.
 
-    differing_image_paths: list[Path] = []
+    All images are oriented for the axial view when loaded. When calling this, make sure global_vars.VIEW = Z.
+
+    Images whose properties match those of the images in IMAGE_DICT are added to IMAGE_DICT
+    and their histograms to HISTOGRAM_DICT (status ``LoadStatus.Loaded``). Otherwise, the image isn't added (status ``LoadStatus.Differing``).
+    If IMAGE_DICT is empty, the first image is always loaded and determines the properties of the group.
+
+    Nothing is read until the generator is advanced, so the GUI can advance it one image at a time
+    without blocking. Closing the generator early leaves the images read so far in IMAGE_DICT.
+
+    :param path_list:
+    :type path_list: list[Path]
+    :raise: Exception if path_list is empty (disallow this in GUI)
+    :return: Generator of (path, properties of the image at path, load status)
+    :rtype: Iterator[tuple[Path, ImageProperties, LoadStatus]]"""
+    if not path_list:
+        raise Exception("iter_update_images assumes path_list isn't empty.")
 
     for path in path_list:
-        global_vars.READER.SetFileName(str(path))
-        new_img: sitk.Image = global_vars.READER.Execute()
-        new_img = global_vars.ORIENT_FILTER.Execute(new_img)
-        new_img_properties: ImageProperties = get_properties_from_sitk_image(new_img)
+        new_img, histogram = read_for_image_dict(
+            path, global_vars.VOLUME_CACHE_DIR, global_vars.VOLUME_CACHE_MAX_BYTES
+        )
+        yield (path, *add_to_image_dict(path, new_img, histogram))
 
-        if not are_properties_eq(comparison_properties_tuple, new_img_properties):
-            differing_image_paths.append(path)
-        else:
-            new_img_axial: sitk.Image = global_vars.ORIENT_FILTER.Execute(new_img)
-            global_vars.IMAGE_DICT[path] = new_img_axial
-    return differing_image_paths
 
+def read_for_image_dict(
+    path: Path, cache_dir: Union[Path, None] = None, cache_max_bytes: int = 0
+) -> tuple[sitk.Image, VolumeHistogram]:
+    """Read the image at ``path`` like ``load_z_oriented_image`` and compute its histogram,
+    ready for ``add_to_image_dict``.
 
-def initialize_globals(path_list: list[Path]) -> list[Path]:
-    """After pressing File > Open, the global variables need to be cleared and (re)initialized.
+    Doesn't use global variables, so the GUI calls it on a worker thread.
 
-    If loading images with different properties, then this method returns
-    False, and IMAGE_DICT isn't updated with the differing images.
+    :param path:
+    :type path: Path
+    :param cache_dir: Directory of the decoded volume cache. None disables the cache.
+    :type cache_dir: Path or None
+    :param cache_max_bytes: Size limit of the cache
+    :type cache_max_bytes: int
+    :return: (image oriented for the Z view, its histogram)
+    :rtype: tuple[sitk.Image, VolumeHistogram]"""
+    img: sitk.Image = load_z_oriented_image(path, cache_dir, cache_max_bytes)
+    return img, compute_histogram(img)
+
+
+def add_to_image_dict(
+    path: Path, img: sitk.Image, histogram: VolumeHistogram
+) -> tuple[ImageProperties, LoadStatus]:
+    """Add an image returned by ``read_for_image_dict`` to IMAGE_DICT and its histogram to HISTOGRAM_DICT
+    if its properties match those of the images in IMAGE_DICT. If IMAGE_DICT is empty, it's always added.
+
+    :param path:
+    :type path: Path
+    :param img: Image at ``path``, oriented for the Z view
+    :type img: sitk.Image
+    :param histogram: Histogram of ``img``
+    :type histogram: VolumeHistogram
+    :return: (properties of ``img``, ``LoadStatus.Loaded`` if it was added else ``LoadStatus.Differing``)
+    :rtype: tuple[ImageProperties, LoadStatus]"""
+    properties: ImageProperties = get_properties_from_sitk_image(img)
+    if global_vars.IMAGE_DICT and not are_properties_eq(
+        get_curr_properties_tuple(), properties
+    ):
+        return properties, LoadStatus.Differing
+    global_vars.IMAGE_DICT[path] = img
+    global_vars.HISTOGRAM_DICT[path] = histogram
+    return properties, LoadStatus.Loaded
 
-    Mutated global variables: IMAGE_DICT, CURR_IMAGE_INDEX,
-    READER, THETA_X, THETA_Y, THETA_Z, SLICE, EULER_3D_TRANSFORM.
 
-    Specifically, clears IMAGE_DICT and then populates it.
+def update_images(path_list: list[Path]) -> list[Path]:
+    """Initialize IMAGE_DICT. See the docstring for IMAGE_DICT in global_vars.py for more info.
+
+    All images are oriented for the axial view when loaded. When calling this, make sure global_vars.VIEW = Z.
+
+    If the images at path(s) in path_list don't match the properties of previously saved images,
+    then this method returns the paths of the images that don't match, and
+    IMAGE_DICT is updated only with the non-differing images.
+
+    Blocks until every image is read. See ``iter_update_images`` for the streaming version.
 
     :param path_list:
     :type path_list: list[Path]
+    :raise: Exception if path_list is empty (disallow this in GUI)
     :return: List of paths of images with properties that differ from those of the images currently in IMAGE_DICT
     :rtype: list[Path]"""
+    return [
+        path
+        for path, _, status in iter_update_images(path_list)
+        if status == LoadStatus.Differing
+    ]
+
+
+def iter_initialize_globals(
+    path_list: list[Path],
+) -> Iterator[tuple[Path, ImageProperties, LoadStatus]]:
+    """Generator version of ``initialize_globals``.
+
+    The first iteration clears IMAGE_DICT, reads the first image, and (re)initializes the global variables
+    from it, so the first image can be rendered as soon as the first tuple is yielded.
+    Later iterations read the remaining images like ``iter_update_images``.
+
+    Mutated global variables: IMAGE_DICT, HISTOGRAM_DICT, CURR_IMAGE_INDEX,
+    READER, THETA_X, THETA_Y, THETA_Z, SLICE, EULER_3D_TRANSFORM.
+
+    :param path_list:
+    :type path_list: list[Path]
+    :return: Generator of (path, properties of the image at path, load status)
+    :rtype: Iterator[tuple[Path, ImageProperties, LoadStatus]]"""
     global_vars.CURR_IMAGE_INDEX = 0
     global_vars.IMAGE_DICT.clear()
-    differing_image_paths: list[Path] = update_images(path_list)
+    global_vars.HISTOGRAM_DICT.clear()
+    loader: Iterator[tuple[Path, ImageProperties, LoadStatus]] = iter_update_images(
+        path_list
+    )
+    # IMAGE_DICT is empty, so the first image is always loaded
+    first: tuple[Path, ImageProperties, LoadStatus] = next(loader)
     global_vars.THETA_X = 0
     global_vars.THETA_Y = 0
     global_vars.THETA_Z = 0
@@ -111,7 +226,32 @@ def initialize_globals(path_list: list[Path]) -> list[Path]:
     global_vars.Y_CENTER = get_middle_dimension(curr_img, View.Y)
     global_vars.BINARY_THRESHOLD_FILTER.SetLowerThreshold(100)
     global_vars.BINARY_THRESHOLD_FILTER.SetUpperThreshold(200)
-    return differing_image_paths
+    yield first
+    yield from loader
+
+
+def initialize_globals(path_list: list[Path]) -> list[Path]:
+    """After pressing File > Open, the global variables need to be cleared and (re)initialized.
+
+    If loading images with different properties, then this method returns
+    False, and IMAGE_DICT isn't updated with the differing images.
+
+    Mutated global variables: IMAGE_DICT, HISTOGRAM_DICT, CURR_IMAGE_INDEX,
+    READER, THETA_X, THETA_Y, THETA_Z, SLICE, EULER_3D_TRANSFORM.
+
+    Specifically, clears IMAGE_DICT and then populates it.
+
+    Blocks until every image is read. See ``iter_initialize_globals`` for the streaming version.
+
+    :param path_list:
+    :type path_list: list[Path]
+    :return: List of paths of images with properties that differ from those of the images currently in IMAGE_DICT
+    :rtype: list[Path]"""
+    return [
+        path
+        for path, _, status in iter_initialize_globals(path_list)
+        if status == LoadStatus.Differing
+    ]
 
 
 def clear_globals() -> None:
@@ -122,6 +262,7 @@ def clear_globals() -> None:
     :return: None
     :rtype: None"""
     global_vars.IMAGE_DICT.clear()
+    global_vars.HISTOGRAM_DICT.clear()
     global_vars.CURR_IMAGE_INDEX = 0
     global_vars.THETA_X = 0
     global_vars.THETA_Y = 0
@@ -160,6 +301,14 @@ def get_curr_image() -> sitk.Image:
     return global_vars.IMAGE_DICT[get_curr_path()]
 
 
+def get_curr_histogram() -> VolumeHistogram:
+    """Return the intensity histogram of the current image, computed when it was loaded.
+
+    :return: Histogram of the current image
+    :rtype: VolumeHistogram"""
+    return global_vars.HISTOGRAM_DICT[get_curr_path()]
+
+
 # TODO: Add more properties?
 def get_properties_from_sitk_image(img: sitk.Image) -> ImageProperties:
     """Tuple of properties of a sitk.Image.
@@ -265,19 +414,18 @@ def orient_curr_image(view: View) -> None:
         raise Exception(
             "Expected View.X, View.Y, or View.Z but did not get one of those."
         )
-    global_vars.ORIENT_FILTER.SetDesiredCoordinateOrientation(
-        constants.ORIENTATION_STRINGS[view.value]
-    )
-    oriented: sitk.Image = global_vars.ORIENT_FILTER.Execute(get_curr_image())
-    set_curr_image(oriented)
+    # No copy if already oriented
+    set_curr_image(orient_image(get_curr_image(), view))
 
 
 def get_curr_rotated_slice() -> sitk.Image:
-    """Return 2D rotated slice of the current image determined by global rotation and slice settings.
+    """Return 2D rotated slice of the current image determined by global rotation, view, and slice settings.
 
     Sets global_vars.EULER_3D_TRANSFORM's rotation values but not its center since all loaded images should
     have the same center.
 
+    The current image doesn't have to be oriented for global_vars.VIEW (see ``get_rotated_plane``).
+
     :return: 2D rotated slice
     :rtype: sitk.Image"""
     global_vars.EULER_3D_TRANSFORM.SetRotation(
@@ -285,18 +433,290 @@ def get_curr_rotated_slice() -> sitk.Image:
         degrees_to_radians(global_vars.THETA_Y),
         degrees_to_radians(global_vars.THETA_Z),
     )
-    rotated_image: sitk.Image = sitk.Resample(
-        get_curr_image(), global_vars.EULER_3D_TRANSFORM
+    return get_rotated_plane(
+        get_curr_image(),
+        global_vars.EULER_3D_TRANSFORM,
+        global_vars.VIEW,
+        get_view_index(
+            global_vars.VIEW,
+            global_vars.SLICE,
+            global_vars.X_CENTER,
+            global_vars.Y_CENTER,
+        ),
     )
-    rotated_slice: sitk.Image
-    if global_vars.VIEW == constants.View.X:
-        rotated_slice = rotated_image[global_vars.X_CENTER, :, :]
-    elif global_vars.VIEW == constants.View.Y:
-        rotated_slice = rotated_image[:, global_vars.Y_CENTER, :]
+
+
+def get_view_index(view: View, slice_num: int, x_center: int, y_center: int) -> int:
+    """Return the index of the plane shown in ``view``: ``x_center`` for View.X, ``y_center`` for View.Y,
+    and ``slice_num`` for View.Z.
+
+    :param view:
+    :type view: View
+    :param slice_num:
+    :type slice_num: int
+    :param x_center:
+    :type x_center: int
+    :param y_center:
+    :type y_center: int
+    :return: Index along ``view``'s axis
+    :rtype: int"""
+    if view == constants.View.X:
+        return x_center
+    if view == constants.View.Y:
+        return y_center
+    return slice_num
+
+
+def get_oriented_geometry(
+    img: sitk.Image, view: View
+) -> tuple[tuple[float, float, float], tuple[float, ...]]:
+    """Return the origin and direction that ``orient_image(img, view)`` would have, without orienting ``img``.
+
+    The orientations of the three views differ only in the signs of their axes, so for an image in one of them
+    (e.g. any image in ``IMAGE_DICT``), orienting only flips axes. Flipping an axis negates its direction
+    and moves the origin to the last voxel along it. Size and spacing don't change.
+
+    Falls back to orienting a copy of ``img`` if its axes are in a different order.
+
+    :param img:
+    :type img: sitk.Image
+    :param view:
+    :type view: View
+    :return: (origin, direction) of ``img`` oriented for ``view``
+    :rtype: tuple[tuple[float, float, float], tuple[float, ...]]"""
+    current: str = sitk.DICOMOrientImageFilter.GetOrientationFromDirectionCosines(
+        img.GetDirection()
+    )
+    desired: str = constants.ORIENTATION_STRINGS[view.value]
+    if current == desired:
+        return img.GetOrigin(), img.GetDirection()
+    if any(
+        {current_axis, desired_axis}
+        not in ({"L", "R"}, {"P", "A"}, {"S", "I"}, {current_axis})
+        for current_axis, desired_axis in zip(current, desired)
+    ):
+        oriented: sitk.Image = orient_image(img, view)
+        return oriented.GetOrigin(), oriented.GetDirection()
+
+    direction: np.ndarray = np.array(img.GetDirection()).reshape(3, 3)
+    origin: np.ndarray = np.array(img.GetOrigin())
+    for axis in range(3):
+        if current[axis] != desired[axis]:
+            origin += (
+                (img.GetSize()[axis] - 1) * img.GetSpacing()[axis] * direction[:, axis]
+            )
+            direction[:, axis] = -direction[:, axis]
+    return tuple(origin.tolist()), tuple(direction.flatten().tolist())
+
+
+def get_rotated_plane(
+    img: sitk.Image,
+    transform: sitk.Euler3DTransform,
+    view: View,
+    index: int,
+    shrink: int = 1,
+    source: Union[sitk.Image, None] = None,
+) -> sitk.Image:
+    """Return the 2D plane at ``index`` along ``view``'s axis of ``img`` oriented for ``view`` and resampled
+    with ``transform``. Doesn't use global variables.
+
+    Only the plane is resampled, onto a one-voxel-thick grid with the geometry of that plane
+    (see ``get_oriented_geometry``), so neither the volume nor the rest of the resampled volume is ever allocated.
+    ``img`` can be in the orientation of any view.
+
+    The result is the same as ``sitk.Resample(orient_image(img, view), transform)`` sliced at ``index``.
+    For View.Z and an image oriented for View.Z, it's identical. Otherwise, interpolated pixels can differ
+    by floating point rounding, since ITK computes the physical points of the grid from a different origin.
+
+    With ``shrink`` > 1, the plane is sampled on a coarser grid: each pixel replaces a ``shrink`` x ``shrink`` block
+    of the full resolution plane and is centered on it, like ``sitk.BinShrink``. The plane stays at ``index``.
+    Pixels are interpolated from ``source``, e.g. a level of ``pyramid.build(img)``, which only needs to cover
+    the same physical space as ``img``.
+
+    :param img: 3D image. Determines the plane's grid.
+    :type img: sitk.Image
+    :param transform: Rotation, centered at the center of rotation of the loaded group
+    :type transform: sitk.Euler3DTransform
+    :param view: Determines which axis is sliced
+    :type view: View
+    :param index: Index of the plane along ``view``'s axis
+    :type index: int
+    :param shrink: Factor by which the in-plane spacing is multiplied
+    :type shrink: int
+    :param source: 3D image that pixels are interpolated from. Defaults to ``img``.
+    :type source: sitk.Image or None
+    :return: 2D rotated slice
+    :rtype: sitk.Image"""
+    if source is None:
+        source = img
+    origin, direction = get_oriented_geometry(img, view)
+    axis: int = view.value
+    plane_size: list[int] = [size // shrink for size in img.GetSize()]
+    plane_size[axis] = 1
+    plane_spacing: list[float] = [spacing * shrink for spacing in img.GetSpacing()]
+    plane_spacing[axis] = img.GetSpacing()[axis]
+    # One voxel with the oriented geometry, so the plane's origin is computed by ITK exactly like the
+    # physical point of that index in the oriented image
+    geometry: sitk.Image = sitk.Image([1, 1, 1], sitk.sitkUInt8)
+    geometry.SetOrigin(origin)
+    geometry.SetSpacing(img.GetSpacing())
+    geometry.SetDirection(direction)
+    if shrink == 1:
+        plane_index: list[int] = [0, 0, 0]
+        plane_index[axis] = index
+        plane_origin: tuple[float, ...] = geometry.TransformIndexToPhysicalPoint(
+            plane_index
+        )
     else:
-        rotated_slice = rotated_image[:, :, global_vars.SLICE]
+        continuous_index: list[float] = [(shrink - 1) / 2] * 3
+        continuous_index[axis] = index
+        plane_origin: tuple[
+            float, ...
+        ] = geometry.TransformContinuousIndexToPhysicalPoint(continuous_index)
+    plane: sitk.Image = sitk.Resample(
+        source,
+        plane_size,
+        transform,
+        sitk.sitkLinear,
+        plane_origin,
+        plane_spacing,
+        direction,
+        0.0,
+        source.GetPixelID(),
+    )
+    if view == constants.View.X:
+        return plane[0, :, :]
+    if view == constants.View.Y:
+        return plane[:, 0, :]
+    return plane[:, :, 0]
+
+
+def get_rotated_slice(
+    img: sitk.Image,
+    transform: sitk.Euler3DTransform,
+    view: View,
+    slice_num: int,
+    x_center: int,
+    y_center: int,
+) -> sitk.Image:
+    """Return 2D slice of ``img`` resampled with ``transform``. Doesn't use global variables.
+
+    ``img`` should already be oriented for ``view``. Only the slice is resampled (see ``get_rotated_plane``).
 
-    return rotated_slice
+    :param img: 3D image
+    :type img: sitk.Image
+    :param transform: Rotation, centered at the center of rotation of the loaded group
+    :type transform: sitk.Euler3DTransform
+    :param view: Determines which axis is sliced
+    :type view: View
+    :param slice_num: Slice index used for View.Z
+    :type slice_num: int
+    :param x_center: Slice index used for View.X
+    :type x_center: int
+    :param y_center: Slice index used for View.Y
+    :type y_center: int
+    :return: 2D rotated slice
+    :rtype: sitk.Image"""
+    return get_rotated_plane(
+        img, transform, view, get_view_index(view, slice_num, x_center, y_center)
+    )
+
+
+def get_rotated_slab(
+    img: sitk.Image, transform: sitk.Euler3DTransform, start: int, stop: int
+) -> sitk.Image:
+    """Return Z slices [``start``, ``stop``) of ``img`` resampled with ``transform``. Doesn't use global variables.
+
+    Resamples the whole volume, so it's only worth it over ``get_rotated_slice`` when many slices are needed.
+    ``get_rotated_slab(...)[:, :, k]`` equals ``get_rotated_slice`` for slice ``start + k``.
+
+    ``img`` should already be oriented for View.Z.
+
+    :param img: 3D image
+    :type img: sitk.Image
+    :param transform: Rotation, centered at the center of rotation of the loaded group
+    :type transform: sitk.Euler3DTransform
+    :param start: First slice index
+    :type start: int
+    :param stop: One past the last slice index
+    :type stop: int
+    :return: 3D rotated slab
+    :rtype: sitk.Image"""
+    return sitk.Resample(img, transform)[:, :, start:stop]
+
+
+def orient_image(img: sitk.Image, view: View) -> sitk.Image:
+    """Return ``img`` oriented for ``view``. Doesn't use global variables.
+
+    Returns ``img`` itself (no copy) if it's already oriented for ``view``.
+
+    :param img:
+    :type img: sitk.Image
+    :param view:
+    :type view: View
+    :return: Image oriented for ``view``
+    :rtype: sitk.Image"""
+    orientation: str = constants.ORIENTATION_STRINGS[view.value]
+    if (
+        sitk.DICOMOrientImageFilter.GetOrientationFromDirectionCosines(
+            img.GetDirection()
+        )
+        == orientation
+    ):
+        return img
+    return sitk.DICOMOrient(img, orientation)
+
+
+def image_from_array(
+    array: np.ndarray,
+    spacing: Union[tuple[float, float, float], None] = None,
+    origin: Union[tuple[float, float, float], None] = None,
+    direction: Union[tuple[float, ...], None] = None,
+) -> sitk.Image:
+    """Return a 3D image with the voxels of ``array`` and the given physical metadata. Doesn't use global variables.
+
+    ``array`` is indexed [z, y, x], the same as ``sitk.GetArrayFromImage``.
+    The voxels are copied into the image's buffer once, straight from ``array``, even if ``array``
+    isn't contiguous. SimpleITK has no zero-copy way to wrap a numpy array (only the reverse,
+    ``sitk.GetArrayViewFromImage``), but the one copy is much cheaper than writing and reading a file.
+
+    :param array: 3D array of a pixel type supported by SimpleITK (not bool)
+    :type array: np.ndarray
+    :param spacing: (x, y, z) spacing. Defaults to (1, 1, 1).
+    :type spacing: tuple[float, float, float] or None
+    :param origin: (x, y, z) origin. Defaults to (0, 0, 0).
+    :type origin: tuple[float, float, float] or None
+    :param direction: 9 direction cosines, row-major. Defaults to identity, which is already oriented for the Z view.
+    :type direction: tuple[float, ...] or None
+    :raise ValueError: If ``array`` isn't 3D
+    :return: Image
+    :rtype: sitk.Image"""
+    if array.ndim != 3:
+        raise ValueError(
+            f"Expected a 3D array indexed [z, y, x], got shape {array.shape}"
+        )
+    img: sitk.Image = sitk.GetImageFromArray(array, isVector=False)
+    if spacing is not None:
+        img.SetSpacing(spacing)
+    if origin is not None:
+        img.SetOrigin(origin)
+    if direction is not None:
+        img.SetDirection(direction)
+    return img
+
+
+def image_nbytes(img: sitk.Image) -> int:
+    """Number of bytes of ``img``'s pixel buffer, computed from ``GetSize()`` and pixel size.
+
+    :param img:
+    :type img: sitk.Image
+    :return: Size of the pixel buffer in bytes
+    :rtype: int"""
+    return (
+        img.GetNumberOfPixels()
+        * img.GetNumberOfComponentsPerPixel()
+        * img.GetSizeOfPixelComponent()
+    )
 
 
 def get_curr_smooth_slice() -> sitk.Image:
@@ -307,7 +727,7 @@ def get_curr_smooth_slice() -> sitk.Image:
     rotated_slice: sitk.Image = get_curr_rotated_slice()
     # The cast is necessary, otherwise get sitk::ERROR: Pixel type: 16-bit signed integer is not supported in 2D
     smooth_slice: sitk.Image = global_vars.SMOOTHING_FILTER.Execute(
-        sitk.Cast(rotated_slice, sitk.sitkFloat64)
+        sitk.Cast(rotated_slice, PRECISION_PIXEL_TYPES[global_vars.PRECISION])
     )
     return smooth_slice
 
@@ -320,7 +740,7 @@ def get_curr_binary_thresholded_slice() -> sitk.Image:
     :rtype: sitk.Image"""
     rotated_slice: sitk.Image = get_curr_rotated_slice()
     filter_slice: sitk.Image = global_vars.BINARY_THRESHOLD_FILTER.Execute(
-        sitk.Cast(rotated_slice, sitk.sitkFloat64)
+        sitk.Cast(rotated_slice, PRECISION_PIXEL_TYPES[global_vars.PRECISION])
     )
     return filter_slice
 
@@ -332,11 +752,28 @@ def get_curr_otsu_slice() -> sitk.Image:
     :rtype: sitk.Image"""
     rotated_slice: sitk.Image = get_curr_rotated_slice()
     filter_slice: sitk.Image = global_vars.OTSU_THRESHOLD_FILTER.Execute(
-        sitk.Cast(rotated_slice, sitk.sitkFloat64)
+        sitk.Cast(rotated_slice, PRECISION_PIXEL_TYPES[global_vars.PRECISION])
     )
     return filter_slice
 
 
+def get_curr_volume_otsu_slice() -> sitk.Image:
+    """Return the current slice thresholded at the Otsu threshold of the whole image (``ThresholdFilter.VolumeOtsu``).
+
+    Unlike ``get_curr_otsu_slice``, the threshold comes from the cached histogram, not the slice.
+
+    :return: Binary (background 1) 2D rotated slice
+    :rtype: sitk.Image"""
+    lower, upper = suggest_binary_thresholds(get_curr_histogram())
+    return sitk.BinaryThreshold(
+        sitk.Cast(
+            get_curr_rotated_slice(), PRECISION_PIXEL_TYPES[global_vars.PRECISION]
+        ),
+        lower,
+        upper,
+    )
+
+
 def get_curr_metadata() -> dict[str, str]:
     """Computes and returns currently displayed image's metadata.
 
@@ -361,10 +798,21 @@ def get_curr_physical_units() -> Union[str, None]:
 
     :return: units or None
     :rtype: str or None"""
-    curr_img: sitk.Image = get_curr_image()
-    if constants.NIFTI_METADATA_UNITS_KEY in curr_img.GetMetaDataKeys():
+    return get_physical_units(get_curr_image())
+
+
+def get_physical_units(img: sitk.Image) -> Union[str, None]:
+    """Return ``img``'s physical units from sitk.GetMetaData if it exists, else None.
+
+    TODO works only for NIFTI, not NRRD.
+
+    :param img:
+    :type img: sitk.Image
+    :return: units or None
+    :rtype: str or None"""
+    if constants.NIFTI_METADATA_UNITS_KEY in img.GetMetaDataKeys():
         return constants.NIFTI_METADATA_UNITS_VALUE_TO_PHYSICAL_UNITS[
-            curr_img.GetMetaData(constants.NIFTI_METADATA_UNITS_KEY)
+            img.GetMetaData(constants.NIFTI_METADATA_UNITS_KEY)
         ]
     return None
 
@@ -391,7 +839,9 @@ def del_curr_img() -> None:
         print("Can't remove from empty list!")
         return
 
-    del global_vars.IMAGE_DICT[get_curr_path()]
+    path: Path = get_curr_path()
+    del global_vars.IMAGE_DICT[path]
+    global_vars.HISTOGRAM_DICT.pop(path, None)
 
     # Just deleted the last image. Index must decrease by 1
     if global_vars.CURR_IMAGE_INDEX == len(global_vars.IMAGE_DICT):
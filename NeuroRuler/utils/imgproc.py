@@ -1,5 +1,7 @@
 """Helper functions for image processing. Main algorithm."""
 
+from typing import Union
+
 import SimpleITK as sitk
 import cv2
 import numpy as np
@@ -9,11 +11,11 @@ from NeuroRuler.utils.constants import (
     NUM_CONTOURS_IN_INVALID_SLICE,
     ThresholdFilter,
     BinaryColor,
+    Precision,
 )
 import NeuroRuler.utils.gui_settings as settings
 from NeuroRuler.utils.global_vars import (
     SMOOTHING_FILTER,
-    OTSU_THRESHOLD_FILTER,
     BINARY_THRESHOLD_FILTER,
 )
 
@@ -22,13 +24,24 @@ NUM_PIXELS_TO_CHECK_ON_EACH_EDGE_FOR_BACKGROUND_COLOR_DETECTION: int = 25
 MAX_NUM_MISMATCHED_PIXELS_FOR_BACKGROUND_COLOR_DETECTION: int = 3
 """At most this many edge pixels can be different from the pixel at (0, 0)."""
 
+PRECISION_PIXEL_TYPES: dict[Precision, int] = {
+    Precision.Float32: sitk.sitkFloat32,
+    Precision.Float64: sitk.sitkFloat64,
+}
+"""sitk pixel type of each ``Precision``"""
+
 
 # The RV is a np array, not sitk.Image
 # because we can't actually use a sitk.Image contour in the rest of the process
 # To compute arc length, we need a np array
 # To overlay the contour on top of the base image in the GUI, we need a np array
 def contour(
-    img_2d: sitk.Image, threshold_filter: ThresholdFilter = ThresholdFilter.Otsu
+    img_2d: sitk.Image,
+    threshold_filter: ThresholdFilter = ThresholdFilter.Otsu,
+    smoothing_filter: Union[sitk.GradientAnisotropicDiffusionImageFilter, None] = None,
+    binary_threshold_filter: Union[sitk.BinaryThresholdImageFilter, None] = None,
+    precision: Precision = Precision.Float64,
+    writable: bool = True,
 ) -> np.ndarray:
     r"""Generate the contour of a 2D slice by applying smoothing, Otsu threshold or binary threshold,
     hole filling, and island removal (select largest component). Return a binary (0|1) numpy
@@ -37,24 +50,52 @@ def contour(
     Calls sitk.GetArrayFromImage() at the end, which will return the transpose of the sitk.Image.
     Consider whether to re-transpose the result or not.
 
+    Uses the global smoothing and threshold filters unless other filters are passed in.
+    Filters can't be shared between threads, so pass in filters when calling from a background thread.
+
     :param img_2d:
     :type img_2d: sitk.Image
-    :param threshold_filter: ThresholdFilter.Otsu or ThresholdFilter.Binary. Defaults to ThresholdFilter.Otsu
+    :param threshold_filter: ThresholdFilter.Otsu, ThresholdFilter.Binary, or ThresholdFilter.VolumeOtsu.
+        Defaults to ThresholdFilter.Otsu
     :type threshold_filter: ThresholdFilter
+    :param smoothing_filter: Defaults to global_vars.SMOOTHING_FILTER
+    :type smoothing_filter: sitk.GradientAnisotropicDiffusionImageFilter or None
+    :param binary_threshold_filter: Defaults to global_vars.BINARY_THRESHOLD_FILTER. Required for
+        ThresholdFilter.VolumeOtsu, set to the volume's ``histogram.suggest_binary_thresholds``.
+    :type binary_threshold_filter: sitk.BinaryThresholdImageFilter or None
+    :param precision: Pixel type of the slice passed to the smoothing and threshold filters. Defaults to Precision.Float64
+    :type precision: Precision
+    :param writable: If False, return a read-only view of the contour image (see ``array_view_of_image``)
+        instead of a copy. For callers that only read the result, like the GUI's renders. Defaults to True
+    :type writable: bool
+    :raise ValueError: If threshold_filter is ThresholdFilter.VolumeOtsu and binary_threshold_filter is None
     :return: binary (0|1) numpy array with only the points on the contour = 1
     :rtype: np.ndarray"""
-    smooth_slice: sitk.Image = SMOOTHING_FILTER.Execute(
-        sitk.Cast(img_2d, sitk.sitkFloat64)
+    if smoothing_filter is None:
+        smoothing_filter = SMOOTHING_FILTER
+    if binary_threshold_filter is None:
+        if threshold_filter == ThresholdFilter.VolumeOtsu:
+            raise ValueError(
+                "ThresholdFilter.VolumeOtsu needs a binary threshold filter set to the volume's thresholds"
+            )
+        binary_threshold_filter = BINARY_THRESHOLD_FILTER
+
+    smooth_slice: sitk.Image = smoothing_filter.Execute(
+        sitk.Cast(img_2d, PRECISION_PIXEL_TYPES[precision])
     )
 
     if threshold_filter == ThresholdFilter.Otsu:
         # This always results in fg = 0 (black), bg = 1 (white)
-        thresholded: sitk.Image = OTSU_THRESHOLD_FILTER.Execute(smooth_slice)
+        # OtsuThreshold has no settings, so the procedural interface is equivalent to global_vars.OTSU_THRESHOLD_FILTER
+        thresholded: sitk.Image = sitk.OtsuThreshold(smooth_slice)
+    elif threshold_filter == ThresholdFilter.VolumeOtsu:
+        # The thresholds select the background, so this is always fg = 0 (black), bg = 1 (white) like Otsu
+        thresholded: sitk.Image = binary_threshold_filter.Execute(smooth_slice)
     else:
         # This sometimes results in fg = 0 (black), bg = 1 (white)
         # other times fg = 1 (white), bg = 0 (black)
         # Depends on the lower and upper threshold settings
-        thresholded: sitk.Image = BINARY_THRESHOLD_FILTER.Execute(smooth_slice)
+        thresholded: sitk.Image = binary_threshold_filter.Execute(smooth_slice)
         if (
             background_color_of_binary_thresholded_slice(thresholded)
             == BinaryColor.Black
@@ -72,8 +113,35 @@ def contour(
 
     contour: sitk.Image = sitk.BinaryContourImageFilter().Execute(largest_component)
 
-    # GetArrayFromImage returns the transpose of the sitk representation
-    return sitk.GetArrayFromImage(contour)
+    if writable:
+        return sitk.GetArrayFromImage(contour)
+    # Like GetArrayFromImage, returns the transpose of the sitk representation, but without copying
+    return array_view_of_image(contour)
+
+
+class _ImageBuffer:
+    """Exposes a ``sitk.Image``'s pixel buffer through the numpy array interface while holding a reference
+    to the image, so arrays created from it keep the image alive."""
+
+    def __init__(self, img: sitk.Image):
+        self.image: sitk.Image = img
+        view: np.ndarray = sitk.GetArrayViewFromImage(img)
+        self.__array_interface__: dict = dict(view.__array_interface__)
+        # Read-only, like GetArrayViewFromImage
+        self.__array_interface__["data"] = (view.__array_interface__["data"][0], True)
+
+
+def array_view_of_image(img: sitk.Image) -> np.ndarray:
+    """Return a read-only numpy view of ``img``'s pixels without copying them.
+
+    Unlike ``sitk.GetArrayViewFromImage``, the view keeps ``img`` alive, so it's safe to return
+    the view of a temporary image. Indexed like ``sitk.GetArrayFromImage``, i.e. [y, x] for a 2D image.
+
+    :param img:
+    :type img: sitk.Image
+    :return: Read-only view of ``img``'s pixel buffer
+    :rtype: np.ndarray"""
+    return np.asarray(_ImageBuffer(img))
 
 
 # Credit: https://discourse.itk.org/t/simpleitk-extract-largest-connected-component-from-binary-image/4958
@@ -145,6 +213,140 @@ def length_of_contour(
     return arc_length
 
 
+def find_contours(binary_contour_slice: np.ndarray) -> tuple:
+    r"""Return the contours of a 2D binary slice (i.e., RV of contour()) found by ``cv2.findContours``.
+
+    ``contours[0]`` is the parent contour if the slice has no islands.
+
+    :param binary_contour_slice:
+    :type binary_contour_slice: np.ndarray
+    :return: contours, each an array of boundary points
+    :rtype: tuple"""
+    contours, hierarchy = cv2.findContours(
+        # TC89_L1 works better than SIMPLE
+        # That is, when (a, a, a) pixel spacing image is converted to (a, b, c) pixel spacing via Slicer,
+        # The arc length is closer to the (a, a, a) arc length if using TC89_L1 than when using SIMPLE
+        binary_contour_slice,
+        cv2.RETR_TREE,
+        cv2.CHAIN_APPROX_TC89_L1,
+    )
+    return contours
+
+
+class ContourPolyline:
+    """Parent contour of a processed slice (i.e., RV of ``contour()``), found once by ``find_contours``.
+
+    Holds the contour as an int32 (N, 2) array of (x, y) = (column, row) points plus the number of contours found,
+    instead of the full-size binary slice. A few KB instead of one byte per pixel, so it's what gets cached and
+    passed around for computing the length, drawing the overlay, and exporting."""
+
+    __slots__ = ("points", "num_contours", "num_children", "shape")
+
+    def __init__(
+        self,
+        points: np.ndarray,
+        num_contours: int,
+        num_children: int,
+        shape: tuple[int, int],
+    ):
+        """:param points: (N, 2) (x, y) points of the parent contour, as returned by ``cv2.findContours``
+        :type points: np.ndarray
+        :param num_contours: Number of contours in the slice, including the parent contour
+        :type num_contours: int
+        :param num_children: Number of contours directly inside the parent contour
+        :type num_children: int
+        :param shape: (rows, columns) of the slice the contour was found in
+        :type shape: tuple[int, int]"""
+        self.points: np.ndarray = np.ascontiguousarray(points, dtype=np.int32).reshape(
+            -1, 2
+        )
+        self.num_contours: int = num_contours
+        self.num_children: int = num_children
+        self.shape: tuple[int, int] = shape
+
+    @classmethod
+    def from_binary_contour(cls, binary_contour_slice: np.ndarray) -> "ContourPolyline":
+        """Find the contours of ``binary_contour_slice`` and keep the parent contour.
+
+        :param binary_contour_slice: RV of ``contour()``
+        :type binary_contour_slice: np.ndarray
+        :return: Parent contour, empty if the slice has no contours
+        :rtype: ContourPolyline"""
+        contours, hierarchy = cv2.findContours(
+            binary_contour_slice, cv2.RETR_TREE, cv2.CHAIN_APPROX_TC89_L1
+        )
+        shape: tuple[int, int] = binary_contour_slice.shape[:2]
+        if not contours:
+            return cls(np.empty((0, 2), np.int32), 0, 0, shape)
+        # hierarchy[0][i] is [next, previous, first child, parent] of contours[i]
+        num_children: int = int(np.count_nonzero(hierarchy[0][:, 3] == 0))
+        return cls(contours[0], len(contours), num_children, shape)
+
+    @property
+    def nbytes(self) -> int:
+        """:return: Memory held by the points
+        :rtype: int"""
+        return self.points.nbytes
+
+    def is_valid(self) -> bool:
+        """:return: False if the slice isn't a valid brain slice, in which case ``length_with_spacing`` raises
+        :rtype: bool"""
+        return 0 < self.num_contours < NUM_CONTOURS_IN_INVALID_SLICE
+
+    def length_with_spacing(self, x_spacing: float, y_spacing: float) -> float:
+        """Arc length of the closed contour, accounting for ``x_spacing`` and ``y_spacing``.
+        Same as ``length_of_contour_with_spacing`` on the binary slice.
+
+        :param x_spacing:
+        :type x_spacing: float
+        :param y_spacing:
+        :type y_spacing: float
+        :raise: exceptions.ComputeCircumferenceOfInvalidSlice if there are no contours or
+            contours detected >= constants.NUM_CONTOURS_IN_INVALID_SLICE
+        :return: arc length of parent contour
+        :rtype: float"""
+        if settings.DEBUG:
+            print(
+                f"Number of contours detected after processing: {self.num_contours} (in imgproc.length_of_contour())"
+            )
+        if not self.is_valid():
+            raise exceptions.ComputeCircumferenceOfInvalidSlice(self.num_contours)
+        return polyline_length_with_spacing(self.points, x_spacing, y_spacing)
+
+    def to_list(self) -> list[list[int]]:
+        """:return: [[x, y], ...] points, for JSON export
+        :rtype: list[list[int]]"""
+        return self.points.tolist()
+
+
+def polyline_length_with_spacing(
+    points: np.ndarray, x_spacing: float, y_spacing: float
+) -> float:
+    r"""Length of the closed polyline through (N, 2) (x, y) ``points``, accounting for x and y spacing.
+
+    The distances between consecutive points are computed at once, then added in order,
+    so the result is the same as adding ``distance_2d_with_spacing`` of each pair.
+
+    :param points: (N, 2) integer points
+    :type points: np.ndarray
+    :param x_spacing:
+    :type x_spacing: float
+    :param y_spacing:
+    :type y_spacing: float
+    :return: length of the closed polyline
+    :rtype: float"""
+    # The last segment goes from the last point back to the first
+    deltas: np.ndarray = np.roll(points, -1, axis=0) - points
+    distances: np.ndarray = np.sqrt(
+        (x_spacing * deltas[:, 0]) ** 2 + (y_spacing * deltas[:, 1]) ** 2
+    )
+    arc_length: float = 0.0
+    # Not sum() or np.sum(), which add in a different order and can differ in the last bits
+    for distance in distances.tolist():
+        arc_length += distance
+    return arc_length
+
+
 def length_of_contour_with_spacing(
     binary_contour_slice: np.ndarray, x_spacing: float, y_spacing: float
 ) -> float:
@@ -167,15 +369,27 @@ def length_of_contour_with_spacing(
     :return: arc length of parent contour
     :rtype: float
     """
-    contours, hierarchy = cv2.findContours(
-        # TC89_L1 works better than SIMPLE
-        # That is, when (a, a, a) pixel spacing image is converted to (a, b, c) pixel spacing via Slicer,
-        # The arc length is closer to the (a, a, a) arc length if using TC89_L1 than when using SIMPLE
-        binary_contour_slice,
-        cv2.RETR_TREE,
-        cv2.CHAIN_APPROX_TC89_L1,
+    return length_of_parent_contour_with_spacing(
+        find_contours(binary_contour_slice), x_spacing, y_spacing
     )
 
+
+def length_of_parent_contour_with_spacing(
+    contours: tuple, x_spacing: float, y_spacing: float
+) -> float:
+    r"""Same as ``length_of_contour_with_spacing`` but takes the contours returned by ``find_contours``,
+    for callers that also need the number of contours.
+
+    :param contours: RV of ``find_contours``
+    :type contours: tuple
+    :param x_spacing:
+    :type x_spacing: float
+    :param y_spacing:
+    :type y_spacing: float
+    :raise: exceptions.ComputeCircumferenceOfInvalidSlice if contours detected >= constants.NUM_CONTOURS_IN_INVALID_SLICE
+    :return: arc length of parent contour
+    :rtype: float
+    """
     num_contours: int = len(contours)
     if settings.DEBUG:
         print(
@@ -185,20 +399,10 @@ def length_of_contour_with_spacing(
     if num_contours >= NUM_CONTOURS_IN_INVALID_SLICE:
         raise exceptions.ComputeCircumferenceOfInvalidSlice(num_contours)
 
-    parent_contour: np.ndarray = contours[0]
-
-    arc_length: float = 0
-
-    for i in range(len(parent_contour) - 1):
-        # contours[0] would return [[x y]], so need to do an additional [0] index to just get [x y]
-        arc_length += distance_2d_with_spacing(
-            parent_contour[i][0], parent_contour[i + 1][0], x_spacing, y_spacing
-        )
-    # Get distance between first and last points
-    arc_length += distance_2d_with_spacing(
-        parent_contour[-1][0], parent_contour[0][0], x_spacing, y_spacing
+    # contours[0] has shape (N, 1, 2)
+    return polyline_length_with_spacing(
+        contours[0].reshape(-1, 2), x_spacing, y_spacing
     )
-    return arc_length
 
 
 def distance_2d_with_spacing(p1, p2, x_spacing: float, y_spacing: float) -> float:
@@ -0,0 +1,191 @@
+"""Latency telemetry of GUI interactions.
+
+An interaction (e.g. moving a rotation slider) is timed from the signal that started it to when the
+updated image is painted, so it includes resampling, contouring, scaling, and waiting for the event loop.
+``LatencyTelemetry`` keeps the latest ``WINDOW_SIZE`` latencies of each type of interaction and reports
+their percentiles, which is what a user notices: a slider that's usually fast but stalls every
+twentieth move shows up in p95, not in the mean.
+
+Stages of an interaction (resampling, contouring, scaling) are timed separately with ``LatencyTelemetry.stage``,
+so a slow interaction can be attributed to one of them.
+
+Only used from the GUI thread."""
+
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+
+INTERACTION_TARGET_MS: float = 100.0
+"""Interactions slower than this feel sluggish. Counted separately in summaries."""
+WINDOW_SIZE: int = 500
+"""Number of latest latencies kept for each interaction and stage"""
+PERCENTILES: tuple[int, ...] = (50, 95, 99)
+HISTOGRAM_EDGES_MS: tuple[float, ...] = (8, 16, 33, 50, 100, 200, 500, 1000)
+"""Upper edges of the histogram buckets in summaries. Latencies above the last edge are counted in one more bucket."""
+
+
+class LatencyHistogram:
+    """Latest latencies of one interaction or stage."""
+
+    def __init__(self, window_size: int = WINDOW_SIZE):
+        """:param window_size: Number of latest latencies kept
+        :type window_size: int"""
+        self._samples: deque[float] = deque(maxlen=window_size)
+        self.count: int = 0
+        """Number of latencies recorded, including ones no longer in the window"""
+
+    def record(self, ms: float) -> None:
+        """:param ms: Latency in milliseconds
+        :type ms: float
+        :return: None"""
+        self._samples.append(ms)
+        self.count += 1
+
+    def percentile(self, p: float) -> float:
+        """:param p: Percentile in [0, 100]
+        :type p: float
+        :return: ``p``-th percentile of the latencies in the window, or 0 if there are none
+        :rtype: float"""
+        if not self._samples:
+            return 0.0
+        return float(np.percentile(self._samples, p))
+
+    def summary(self) -> dict[str, Any]:
+        """:return: Count, percentiles, max, number over ``INTERACTION_TARGET_MS``, and histogram of the window.
+            Latencies are in milliseconds.
+        :rtype: dict[str, Any]"""
+        samples: np.ndarray = np.array(self._samples)
+        summary: dict[str, Any] = {"count": self.count, "window": len(samples)}
+        for p in PERCENTILES:
+            summary[f"p{p}_ms"] = round(self.percentile(p), 2)
+        summary["max_ms"] = round(float(samples.max()), 2) if len(samples) else 0.0
+        summary["over_target"] = int((samples > INTERACTION_TARGET_MS).sum())
+        counts: np.ndarray = np.bincount(
+            np.searchsorted(HISTOGRAM_EDGES_MS, samples, side="left"),
+            minlength=len(HISTOGRAM_EDGES_MS) + 1,
+        )
+        buckets: list[str] = [f"<={edge:g}" for edge in HISTOGRAM_EDGES_MS]
+        buckets.append(f">{HISTOGRAM_EDGES_MS[-1]:g}")
+        summary["histogram"] = dict(zip(buckets, counts.tolist()))
+        return summary
+
+
+class LatencyTelemetry:
+    """Latency histograms of interactions and their stages."""
+
+    def __init__(self, window_size: int = WINDOW_SIZE):
+        """:param window_size: Number of latest latencies kept for each interaction and stage
+        :type window_size: int"""
+        self.window_size: int = window_size
+        self.interactions: dict[str, LatencyHistogram] = {}
+        self.stages: dict[str, LatencyHistogram] = {}
+        self._pending: dict[str, float] = {}
+        self.started_at: datetime = datetime.now()
+
+    def begin(self, interaction: str) -> None:
+        """Start timing ``interaction``. If one of the same type is pending (e.g. several slider moves
+        were handled before the next paint), its start time is kept, since the user has been waiting since then.
+
+        :param interaction: Type of interaction, e.g. rotate
+        :type interaction: str
+        :return: None"""
+        self._pending.setdefault(interaction, time.perf_counter())
+
+    def is_pending(self) -> bool:
+        """:return: Whether ``begin`` was called since the last ``end``
+        :rtype: bool"""
+        return bool(self._pending)
+
+    def end(self) -> list[str]:
+        """Record the latencies of all pending interactions. Called when their result is painted.
+
+        :return: Types of the interactions recorded
+        :rtype: list[str]"""
+        now: float = time.perf_counter()
+        for interaction, start in self._pending.items():
+            self._histogram(self.interactions, interaction).record((now - start) * 1000)
+        ended: list[str] = list(self._pending)
+        self._pending.clear()
+        return ended
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Context manager that records how long its body takes as stage ``name``.
+
+        :param name: e.g. resample
+        :type name: str"""
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._histogram(self.stages, name).record(
+                (time.perf_counter() - start) * 1000
+            )
+
+    def count(self) -> int:
+        """:return: Number of interactions recorded
+        :rtype: int"""
+        return sum(histogram.count for histogram in self.interactions.values())
+
+    def readout(self, interaction: str) -> str:
+        """:param interaction: Type of a recorded interaction
+        :type interaction: str
+        :return: One line with the percentiles of ``interaction``, for the status bar
+        :rtype: str"""
+        histogram: LatencyHistogram = self.interactions[interaction]
+        percentiles: str = ", ".join(
+            f"p{p} {histogram.percentile(p):.0f}" for p in PERCENTILES
+        )
+        return f"{interaction}: {percentiles} ms"
+
+    def summary(self) -> dict[str, Any]:
+        """:return: Summaries (see ``LatencyHistogram.summary``) of every interaction and stage
+        :rtype: dict[str, Any]"""
+        return {
+            "target_ms": INTERACTION_TARGET_MS,
+            "window_size": self.window_size,
+            "interactions": {
+                name: histogram.summary()
+                for name, histogram in sorted(self.interactions.items())
+            },
+            "stages": {
+                name: histogram.summary()
+                for name, histogram in sorted(self.stages.items())
+            },
+        }
+
+    def export_json(self, output_dir: Path, metadata: dict[str, Any]) -> Path:
+        """Write the summary to ``output_dir/latency_<start time>.json``.
+
+        :param output_dir: Created if it doesn't exist
+        :type output_dir: Path
+        :param metadata: JSON-serializable details written before the summary, e.g. environment
+        :type metadata: dict[str, Any]
+        :return: Path of the JSON file
+        :rtype: Path"""
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path: Path = (
+            output_dir / f"latency_{self.started_at.strftime('%Y%m%d-%H%M%S')}.json"
+        )
+        contents: dict[str, Any] = {
+            "started": self.started_at.isoformat(timespec="seconds"),
+            "ended": datetime.now().isoformat(timespec="seconds"),
+            **metadata,
+            **self.summary(),
+        }
+        with open(path, "w") as f:
+            json.dump(contents, f, indent=4, default=str)
+        return path
+
+    def _histogram(
+        self, histograms: dict[str, LatencyHistogram], name: str
+    ) -> LatencyHistogram:
+        if name not in histograms:
+            histograms[name] = LatencyHistogram(self.window_size)
+        return histograms[name]
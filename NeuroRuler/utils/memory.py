@@ -0,0 +1,218 @@
+"""Live accounting of the memory held by loaded images and caches, and a global memory budget.
+
+``MemoryGovernor`` adds up the bytes reported by each holder of memory (``IMAGE_DICT``, ``HISTOGRAM_DICT``,
+the prefetch cache, the displayed QImage/QPixmap buffers, ...). Image sizes are computed from ``GetSize()``
+and the pixel size (``img_helpers.image_nbytes``), not measured from the process, so they're exact and cheap.
+
+When the total exceeds the budget, ``enforce`` evicts from the registered caches in the order they were added,
+cheapest to rebuild first. Loaded images themselves are never evicted, so the GUI stops loading more images
+once the caches are empty and the budget is still exceeded.
+
+The budget is ``MEMORY_BUDGET_MB`` in ``gui_config.json`` or ``--memory-budget`` for ``gui.py``.
+0 means half of the computer's physical memory (``default_budget_bytes``)."""
+
+import os
+import sys
+from pathlib import Path
+from typing import Callable, NamedTuple, Protocol, Union
+
+import SimpleITK as sitk
+
+import NeuroRuler.utils.global_vars as global_vars
+from NeuroRuler.utils.img_helpers import image_nbytes
+
+DEFAULT_BUDGET_FRACTION: float = 0.5
+"""Fraction of physical memory used as the budget when ``MEMORY_BUDGET_MB`` is 0."""
+
+BYTE_UNITS: tuple[str, ...] = ("B", "KB", "MB", "GB", "TB")
+
+
+class EvictableCache(Protocol):
+    """A cache that ``MemoryGovernor`` can evict from, e.g. ``prefetch.Prefetcher``."""
+
+    def nbytes(self) -> int:
+        """:return: Memory held by the cache"""
+        ...
+
+    def evict(self, nbytes: int) -> int:
+        """Evict entries, least recently used first, until at least ``nbytes`` have been freed or the cache is empty.
+
+        :return: Bytes freed"""
+        ...
+
+
+class FunctionCache(NamedTuple):
+    """Adapts a pair of functions to ``EvictableCache``, for caches kept in module-level variables."""
+
+    nbytes: Callable[[], int]
+    evict: Callable[[int], int]
+
+
+class MemoryGovernor:
+    """Adds up the memory held by named sources and caches, and evicts from the caches to stay within ``max_bytes``.
+
+    Sources and caches are queried every time usage is computed, so the totals are always current.
+    Call from the GUI thread only, since sources may read ``global_vars`` or Qt objects.
+    Caches must be safe to query and evict from that thread (``prefetch.Prefetcher`` is).
+    """
+
+    def __init__(self, max_bytes: Union[int, None]):
+        """:param max_bytes: Memory budget. None means no budget (accounting only).
+        :type max_bytes: int or None"""
+        self.max_bytes: Union[int, None] = max_bytes
+        self._sources: dict[str, Callable[[], int]] = {}
+        self._caches: dict[str, EvictableCache] = {}
+
+    def add_source(self, name: str, nbytes: Callable[[], int]) -> None:
+        """Account for memory that can't be evicted, e.g. loaded images.
+
+        :param name: Shown in ``summary``
+        :type name: str
+        :param nbytes: Returns the memory currently held by the source
+        :type nbytes: Callable[[], int]
+        :return: None"""
+        self._sources[name] = nbytes
+
+    def add_cache(self, name: str, cache: EvictableCache) -> None:
+        """Account for a cache and evict from it when over budget. Caches are evicted in the order they're added.
+
+        :param name: Shown in ``summary``
+        :type name: str
+        :param cache:
+        :type cache: EvictableCache
+        :return: None"""
+        self._caches[name] = cache
+
+    def usage(self) -> dict[str, int]:
+        """:return: Bytes held by each source and cache, in the order they were added (sources first)
+        :rtype: dict[str, int]"""
+        rv: dict[str, int] = {name: nbytes() for name, nbytes in self._sources.items()}
+        rv.update({name: cache.nbytes() for name, cache in self._caches.items()})
+        return rv
+
+    def total(self) -> int:
+        """:return: Bytes held by all sources and caches
+        :rtype: int"""
+        return sum(self.usage().values())
+
+    def enforce(self) -> int:
+        """Evict from caches, in the order they were added, until the total is within ``max_bytes``.
+
+        :return: Bytes still over budget after evicting everything possible. 0 if within budget or there's no budget.
+        :rtype: int"""
+        if self.max_bytes is None:
+            return 0
+        over: int = self.total() - self.max_bytes
+        for cache in self._caches.values():
+            if over <= 0:
+                break
+            over -= cache.evict(over)
+        return max(over, 0)
+
+    def summary(self) -> str:
+        """Return e.g. ``Memory: 1.2 GB of 8.0 GB (images 1.1 GB, histograms 1.0 MB, prefetch 96.0 MB)``.
+
+        :return: Human-readable usage, for the status bar and debug output
+        :rtype: str"""
+        usage: dict[str, int] = self.usage()
+        budget: str = (
+            "" if self.max_bytes is None else f" of {format_bytes(self.max_bytes)}"
+        )
+        details: str = ", ".join(
+            f"{name} {format_bytes(nbytes)}" for name, nbytes in usage.items()
+        )
+        return f"Memory: {format_bytes(sum(usage.values()))}{budget} ({details})"
+
+
+def format_bytes(nbytes: int) -> str:
+    """Return ``nbytes`` in the largest unit (1024-based) that keeps the value >= 1, e.g. ``1.5 GB``.
+
+    :param nbytes:
+    :type nbytes: int
+    :return: Human-readable size
+    :rtype: str"""
+    value: float = float(nbytes)
+    for unit in BYTE_UNITS[:-1]:
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}" if unit != "B" else f"{nbytes} B"
+        value /= 1024
+    return f"{value:.1f} {BYTE_UNITS[-1]}"
+
+
+def image_dict_usage() -> dict[Path, int]:
+    """Return the bytes held by each image in ``IMAGE_DICT``, computed from ``GetSize()`` and pixel size.
+
+    :return: Bytes of each loaded image
+    :rtype: dict[Path, int]"""
+    return {path: image_nbytes(img) for path, img in global_vars.IMAGE_DICT.items()}
+
+
+def image_dict_nbytes() -> int:
+    """:return: Bytes held by all images in ``IMAGE_DICT``
+    :rtype: int"""
+    return sum(image_dict_usage().values())
+
+
+def histogram_dict_nbytes() -> int:
+    """:return: Bytes held by all histograms in ``HISTOGRAM_DICT``
+    :rtype: int"""
+    return sum(
+        histogram.counts.nbytes + histogram.bin_edges.nbytes
+        for histogram in global_vars.HISTOGRAM_DICT.values()
+    )
+
+
+def file_image_nbytes(path: Path) -> int:
+    """Return the bytes that the image at ``path`` takes once loaded, reading only the file's header.
+
+    :param path:
+    :type path: Path
+    :return: Product of size, components per pixel, and bytes per component
+    :rtype: int"""
+    reader: sitk.ImageFileReader = sitk.ImageFileReader()
+    reader.SetFileName(str(path))
+    reader.ReadImageInformation()
+    num_pixels: int = 1
+    for dimension in reader.GetSize():
+        num_pixels *= dimension
+    # A temporary 1-pixel image gives the size of a pixel component for the file's pixel type
+    pixel: sitk.Image = sitk.Image([1] * reader.GetDimension(), reader.GetPixelID())
+    return num_pixels * reader.GetNumberOfComponents() * pixel.GetSizeOfPixelComponent()
+
+
+def physical_memory_bytes() -> Union[int, None]:
+    """Return the computer's physical memory, or None if it can't be determined (e.g. on Windows).
+
+    :return: Physical memory in bytes or None
+    :rtype: int or None"""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_budget_bytes(budget_mb: int) -> Union[int, None]:
+    """Return the memory budget for ``MEMORY_BUDGET_MB``.
+
+    :param budget_mb: Budget in MB. 0 means ``DEFAULT_BUDGET_FRACTION`` of physical memory.
+    :type budget_mb: int
+    :return: Budget in bytes, or None (no budget) if ``budget_mb`` is 0 and physical memory is unknown
+    :rtype: int or None"""
+    if budget_mb > 0:
+        return budget_mb * 1024 * 1024
+    physical: Union[int, None] = physical_memory_bytes()
+    return None if physical is None else int(physical * DEFAULT_BUDGET_FRACTION)
+
+
+def peak_rss_bytes() -> Union[int, None]:
+    """Return the peak resident set size of this process, or None if it can't be determined (e.g. on Windows).
+
+    :return: Peak RSS in bytes or None
+    :rtype: int or None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak if sys.platform.startswith("darwin") else peak * 1024
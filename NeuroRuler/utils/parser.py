@@ -14,16 +14,25 @@ import NeuroRuler.utils.cli_settings as cli_settings
 import NeuroRuler.utils.gui_settings as gui_settings
 import NeuroRuler.utils.constants as constants
 import NeuroRuler.utils.exceptions as exceptions
+import NeuroRuler.utils.results as results
+import NeuroRuler.utils.sharding as sharding
 
 JSON_SETTINGS: dict = dict()
 """Dict of settings resulting from JSON file parsing. Global within this file."""
 
 
-def parse_cli() -> None:
-    """Parse CLI (non-GUI) args and set settings in ``cli_settings.py``.
+def get_cli_argument_parser(
+    prog: Union[str, None] = None,
+) -> argparse.ArgumentParser:
+    """Return the parser of the measurement CLI's arguments. ``neuroruler client`` accepts the same measurement
+    options (see ``client.get_argument_parser``), so keep them in sync.
 
-    :return: None"""
+    :param prog: Program name shown in usage, defaults to ``sys.argv[0]``
+    :type prog: str or None
+    :return: Parser of CLI arguments
+    :rtype: argparse.ArgumentParser"""
     parser = argparse.ArgumentParser(
+        prog=prog,
         description="A program that calculates head circumference from MRI data (``.nii``, ``.nii.gz``, ``.nrrd``).",
     )
 
@@ -43,7 +52,10 @@ def parse_cli() -> None:
         "-t", "--step", type=float, help="time step (smoothing parameter)"
     )
     parser.add_argument(
-        "-f", "--filter", help="which filter to use (Otsu or binary), default is Otsu"
+        "-f",
+        "--filter",
+        help="which filter to use (Otsu, volume-otsu, or binary), default is Otsu. "
+        "volume-otsu uses one Otsu threshold computed from the whole volume's histogram",
     )
     parser.add_argument(
         "-l", "--lower", type=float, help="lower threshold for binary threshold"
@@ -51,11 +63,43 @@ def parse_cli() -> None:
     parser.add_argument(
         "-u", "--upper", type=float, help="upper threshold for binary threshold"
     )
+    parser.add_argument(
+        "--precision",
+        choices=tuple(constants.PRECISION_NAMES),
+        help="pixel type used for smoothing and thresholding, overrides PRECISION",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="directory for caching decoded .nii.gz and gzip NRRD images, overrides VOLUME_CACHE_DIR",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="results file (.jsonl or .csv) to append each measurement to as soon as it finishes",
+    )
+    parser.add_argument(
+        "--resume",
+        help="skip files that already have a successful row with the same settings in --output",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--shard",
+        help="measure only shard i of N (0-indexed) of the files, which are sorted and dealt out in turn, written i/N. "
+        "Just N takes i from the array job's environment (Slurm, Grid Engine, LSF, PBS, AWS Batch)",
+    )
     parser.add_argument(
         "file",
-        help=f"file to compute circumference from, file format must be {iterable_of_str_to_str(constants.SUPPORTED_IMAGE_EXTENSIONS)}",
+        nargs="+",
+        help=f"file(s) to compute circumference from, file format must be {iterable_of_str_to_str(constants.SUPPORTED_IMAGE_EXTENSIONS)}",
     )
-    args = parser.parse_args()
+    return parser
+
+
+def parse_cli() -> None:
+    """Parse CLI (non-GUI) args and set settings in ``cli_settings.py``.
+
+    :return: None"""
+    args = get_cli_argument_parser().parse_args()
 
     # store_true option is True or False, never None
     # Don't do `if args.debug is not None`
@@ -88,6 +132,12 @@ def parse_cli() -> None:
     if args.step is not None:
         cli_settings.TIME_STEP = args.step
 
+    if args.cache_dir is not None:
+        cli_settings.VOLUME_CACHE_DIR = Path(args.cache_dir)
+
+    if args.precision is not None:
+        cli_settings.PRECISION = constants.PRECISION_NAMES[args.precision]
+
     if args.filter is not None:
         if args.filter.lower() == "otsu":
             if args.lower is not None or args.upper is not None:
@@ -96,6 +146,13 @@ def parse_cli() -> None:
                 )
                 exit(1)
             cli_settings.THRESHOLD_FILTER = constants.ThresholdFilter.Otsu
+        elif args.filter.lower() == "volume-otsu":
+            if args.lower is not None or args.upper is not None:
+                print(
+                    "Volume Otsu threshold filter automatically calculates threshold values. The values you specified would not be used. Exiting."
+                )
+                exit(1)
+            cli_settings.THRESHOLD_FILTER = constants.ThresholdFilter.VolumeOtsu
         elif args.filter.lower() == "binary":
             if args.lower is None or args.upper is None:
                 print(
@@ -109,18 +166,39 @@ def parse_cli() -> None:
             print("Invalid setting entered for CLI filter option.")
             exit(1)
 
-    if not any(
-        [
-            pattern.match(args.file)
-            for pattern in constants.SUPPORTED_IMAGE_EXTENSIONS_REGEX
-        ]
-    ):
-        print(
-            f"Invalid file extension. Supported file formats are {iterable_of_str_to_str(constants.SUPPORTED_IMAGE_EXTENSIONS)}"
-        )
-        exit(1)
+    for file in args.file:
+        if not any(
+            [
+                pattern.match(file)
+                for pattern in constants.SUPPORTED_IMAGE_EXTENSIONS_REGEX
+            ]
+        ):
+            print(
+                f"Invalid file extension. Supported file formats are {iterable_of_str_to_str(constants.SUPPORTED_IMAGE_EXTENSIONS)}"
+            )
+            exit(1)
 
-    cli_settings.FILE = args.file
+    if args.output is not None:
+        if Path(args.output).suffix.lower() not in results.SUFFIXES:
+            print(
+                f"Invalid results file extension. Supported formats are {iterable_of_str_to_str(results.SUFFIXES)}"
+            )
+            exit(1)
+        cli_settings.OUTPUT = Path(args.output)
+    if args.resume:
+        if args.output is None:
+            print("--resume needs the results file given by --output")
+            exit(1)
+        cli_settings.RESUME = True
+
+    if args.shard is not None:
+        try:
+            cli_settings.SHARD = sharding.parse_shard(args.shard)
+        except ValueError as e:
+            print(f"Invalid --shard: {e}")
+            exit(1)
+
+    cli_settings.FILES = args.file
 
 
 def parse_gui_cli() -> None:
@@ -139,6 +217,12 @@ def parse_gui_cli() -> None:
         "--color",
         help="contour color as name (e.g. red) or hex color code rrggbb",
     )
+    parser.add_argument(
+        "-m",
+        "--memory-budget",
+        type=int,
+        help="memory limit of loaded images and caches in MB (0 means half of physical memory), overrides MEMORY_BUDGET_MB",
+    )
     args = parser.parse_args()
 
     if args.debug:
@@ -162,6 +246,12 @@ def parse_gui_cli() -> None:
             f"Contour color is {'#' if not args.color.isalpha() else ''}{args.color}."
         )
 
+    if args.memory_budget is not None:
+        if args.memory_budget < 0:
+            print("Memory budget must be >= 0")
+            exit(1)
+        gui_settings.MEMORY_BUDGET_MB = args.memory_budget
+
 
 def parse_cli_config() -> None:
     """Parse CLI JSON config and set user settings in gui_settings.py.
@@ -190,6 +280,8 @@ def parse_cli_config() -> None:
         # if "LOWER_BINARY_THRESHOLD" in JSON_SETTINGS or "UPPER_BINARY_THRESHOLD" in JSON_SETTINGS:
         #     print(
         #         "NOTE: Otsu threshold filter automatically computes lower and upper threshold values. The values you entered in the JSON will be ignored.", file=sys.stderr)
+    elif parse_str("THRESHOLD_FILTER").lower() == "volumeotsu":
+        cli_settings.THRESHOLD_FILTER = constants.ThresholdFilter.VolumeOtsu
     elif parse_str("THRESHOLD_FILTER").lower() == "binary":
         cli_settings.THRESHOLD_FILTER = constants.ThresholdFilter.Binary
         if (
@@ -203,7 +295,19 @@ def parse_cli_config() -> None:
         cli_settings.LOWER_BINARY_THRESHOLD = parse_float("LOWER_BINARY_THRESHOLD")
         cli_settings.UPPER_BINARY_THRESHOLD = parse_float("UPPER_BINARY_THRESHOLD")
     else:
-        raise exceptions.InvalidJSONField("THRESHOLD_FILTER", "Otsu or Binary")
+        raise exceptions.InvalidJSONField(
+            "THRESHOLD_FILTER", "Otsu, VolumeOtsu, or Binary"
+        )
+
+    (
+        cli_settings.VOLUME_CACHE_DIR,
+        cli_settings.VOLUME_CACHE_MAX_MB,
+    ) = parse_volume_cache_fields(
+        cli_settings.VOLUME_CACHE_DIR, cli_settings.VOLUME_CACHE_MAX_MB
+    )
+    # Optional since config files created before this field existed don't have it
+    if "PRECISION" in JSON_SETTINGS:
+        cli_settings.PRECISION = parse_precision("PRECISION")
 
 
 def parse_gui_config() -> None:
@@ -246,6 +350,50 @@ def parse_gui_config() -> None:
         "DISPLAY_ADVANCED_MENU_MESSAGES_IN_TERMINAL"
     )
     gui_settings.GROUP_MAX_SPACING_DIFF = parse_float("GROUP_MAX_SPACING_DIFF")
+    (
+        gui_settings.VOLUME_CACHE_DIR,
+        gui_settings.VOLUME_CACHE_MAX_MB,
+    ) = parse_volume_cache_fields(
+        gui_settings.VOLUME_CACHE_DIR, gui_settings.VOLUME_CACHE_MAX_MB
+    )
+    # Optional since config files created before these fields existed don't have them
+    if "PREFETCH_DEPTH" in JSON_SETTINGS:
+        gui_settings.PREFETCH_DEPTH = parse_int("PREFETCH_DEPTH")
+        if gui_settings.PREFETCH_DEPTH < 0:
+            raise exceptions.InvalidJSONField("PREFETCH_DEPTH", "Integer >= 0")
+    if "PREFETCH_MAX_MB" in JSON_SETTINGS:
+        gui_settings.PREFETCH_MAX_MB = parse_int("PREFETCH_MAX_MB")
+    if "PYRAMID_MAX_MB" in JSON_SETTINGS:
+        gui_settings.PYRAMID_MAX_MB = parse_int("PYRAMID_MAX_MB")
+        if gui_settings.PYRAMID_MAX_MB < 0:
+            raise exceptions.InvalidJSONField("PYRAMID_MAX_MB", "Integer >= 0")
+    if "PRECISION" in JSON_SETTINGS:
+        gui_settings.PRECISION = parse_precision("PRECISION")
+    if "MEMORY_BUDGET_MB" in JSON_SETTINGS:
+        gui_settings.MEMORY_BUDGET_MB = parse_int("MEMORY_BUDGET_MB")
+        if gui_settings.MEMORY_BUDGET_MB < 0:
+            raise exceptions.InvalidJSONField("MEMORY_BUDGET_MB", "Integer >= 0")
+
+
+def parse_volume_cache_fields(
+    cache_dir: Union[Path, None], max_mb: int
+) -> tuple[Union[Path, None], int]:
+    """Parse the optional VOLUME_CACHE_DIR and VOLUME_CACHE_MAX_MB fields shared by both JSON configs.
+
+    Config files created before these fields existed don't have them, so missing fields keep the passed-in defaults.
+
+    :param cache_dir: Default cache directory
+    :type cache_dir: Path or None
+    :param max_mb: Default size limit in MB
+    :type max_mb: int
+    :return: (cache directory or None if "" (disabled), size limit in MB)
+    :rtype: tuple[Path or None, int]"""
+    if "VOLUME_CACHE_DIR" in JSON_SETTINGS:
+        cache_dir_str: str = parse_str("VOLUME_CACHE_DIR")
+        cache_dir = Path(cache_dir_str) if cache_dir_str != "" else None
+    if "VOLUME_CACHE_MAX_MB" in JSON_SETTINGS:
+        max_mb = parse_int("VOLUME_CACHE_MAX_MB")
+    return cache_dir, max_mb
 
 
 def parse_main_color_from_theme_json() -> str:
@@ -364,6 +512,22 @@ def parse_float(field: str) -> float:
         raise exceptions.InvalidJSONField(field, "float")
 
 
+def parse_precision(field: str) -> constants.Precision:
+    """For precision field "float32" or "float64", return the ``Precision``.
+
+    :param field: JSON field
+    :type field: str
+    :raise: exceptions.InvalidJSONField
+    :return:
+    :rtype: constants.Precision"""
+    value: str = parse_str(field)
+    if value not in constants.PRECISION_NAMES:
+        raise exceptions.InvalidJSONField(
+            field, iterable_of_str_to_str(tuple(constants.PRECISION_NAMES))
+        )
+    return constants.PRECISION_NAMES[value]
+
+
 def iterable_of_str_to_str(iterable: Union[list[str], tuple[str]]) -> str:
     """``', '.join(iterable)``
 
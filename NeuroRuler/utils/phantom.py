@@ -0,0 +1,258 @@
+"""Synthetic head phantoms with analytically known circumferences, for scaling and accuracy benchmarks.
+
+A phantom is nested ellipsoid shells that look like a T1-weighted head to the pipeline: bright scalp,
+dark skull, CSF, and bright brain, with Rician noise, a smooth multiplicative bias field, and small bright islands
+outside the head (which ``imgproc.select_largest_component`` should remove). Unlike the scans in ``data/``,
+phantoms can have any size and spacing, e.g. 512x512x512 or anisotropic 0.5x0.5x2 mm.
+
+The outer surface of the scalp is an ellipsoid, so its intersection with any plane is an ellipse whose perimeter
+is known (``circumference``). That's what ``api.measure`` should compute on the same plane, so the difference is
+the measurement error of the pipeline.
+
+Used by ``benchmarks/phantom_scaling.py``::
+
+    phantom = generate((256, 256, 256))
+    measured = NeuroRuler.measure(phantom.image, theta=(10, 0, 5)).circumference
+    expected = circumference(phantom, theta=(10, 0, 5))"""
+
+import math
+from typing import NamedTuple, Union
+
+import numpy as np
+import SimpleITK as sitk
+
+from NeuroRuler.utils.constants import View, degrees_to_radians
+from NeuroRuler.utils.img_helpers import get_center_of_rotation, get_middle_dimension
+
+HEAD_RADII_MM: tuple[float, float, float] = (75.0, 95.0, 85.0)
+"""(x, y, z) semi-axes of the outer surface of the scalp, about the size of an adult head"""
+FIELD_OF_VIEW_MM: float = 256.0
+"""Physical extent along each axis when ``generate`` isn't given a spacing"""
+SHELLS: tuple[tuple[float, float], ...] = (
+    (0.0, 700.0),
+    (5.0, 120.0),
+    (11.0, 250.0),
+    (14.0, 900.0),
+)
+"""(depth below the outer surface in mm, intensity) of the scalp, skull, CSF, and brain, from the outside in"""
+NOISE_SIGMA: float = 20.0
+BIAS_AMPLITUDE: float = 0.2
+"""The bias field varies from ``1 - BIAS_AMPLITUDE`` to ``1 + BIAS_AMPLITUDE`` across the field of view"""
+NUM_ISLANDS: int = 6
+ISLAND_RADII_MM: tuple[float, float] = (3.0, 6.0)
+ISLAND_MARGIN_MM: float = 10.0
+"""Minimum distance between an island and the outer surface of the scalp"""
+CHUNK_VOXELS: int = 1 << 21
+"""Voxels generated at once, which limits the memory used on top of the image itself"""
+
+
+class Ellipsoid(NamedTuple):
+    """Axis-aligned ellipsoid in physical coordinates (mm)."""
+
+    center: tuple[float, float, float]
+    radii: tuple[float, float, float]
+
+
+class Phantom(NamedTuple):
+    image: sitk.Image
+    """16-bit signed integer image, oriented for the Z view (LPS, identity direction)"""
+    head: Ellipsoid
+    """Outer surface of the scalp, whose circumference is measured"""
+
+
+def generate(
+    size: tuple[int, int, int],
+    spacing: Union[tuple[float, float, float], None] = None,
+    head_radii: tuple[float, float, float] = HEAD_RADII_MM,
+    noise_sigma: float = NOISE_SIGMA,
+    bias_amplitude: float = BIAS_AMPLITUDE,
+    num_islands: int = NUM_ISLANDS,
+    seed: int = 0,
+) -> Phantom:
+    """Generate a head phantom centered in the field of view.
+
+    :param size: (x, y, z) number of voxels
+    :type size: tuple[int, int, int]
+    :param spacing: (x, y, z) spacing in mm. Defaults to ``FIELD_OF_VIEW_MM`` divided by ``size``.
+    :type spacing: tuple[float, float, float] or None
+    :param head_radii: (x, y, z) semi-axes of the outer surface of the scalp in mm
+    :type head_radii: tuple[float, float, float]
+    :param noise_sigma: Standard deviation of the Gaussian noise in each channel of the Rician noise
+    :type noise_sigma: float
+    :param bias_amplitude: See ``BIAS_AMPLITUDE``
+    :type bias_amplitude: float
+    :param num_islands: Number of islands outside the head
+    :type num_islands: int
+    :param seed: Seed of the noise and the positions of the islands
+    :type seed: int
+    :raise ValueError: If the head doesn't fit in the field of view
+    :return: Phantom
+    :rtype: Phantom"""
+    if spacing is None:
+        spacing = tuple(FIELD_OF_VIEW_MM / dimension for dimension in size)
+    extent: np.ndarray = (np.array(size) - 1) * np.array(spacing)
+    if np.any(np.array(head_radii) + ISLAND_MARGIN_MM > extent / 2):
+        raise ValueError(
+            f"A head with radii {head_radii} mm doesn't fit in a field of view of {tuple(extent.tolist())} mm"
+        )
+    rng: np.random.Generator = np.random.default_rng(seed)
+    head: Ellipsoid = Ellipsoid((0.0, 0.0, 0.0), head_radii)
+    islands: list[tuple[np.ndarray, float]] = _place_islands(
+        head, extent, num_islands, rng
+    )
+
+    origin: np.ndarray = -extent / 2
+    x: np.ndarray = origin[0] + np.arange(size[0]) * spacing[0]
+    y: np.ndarray = origin[1] + np.arange(size[1]) * spacing[1]
+    array: np.ndarray = np.empty((size[2], size[1], size[0]), dtype=np.int16)
+    chunk_slices: int = max(1, CHUNK_VOXELS // (size[0] * size[1]))
+    for start in range(0, size[2], chunk_slices):
+        stop: int = min(size[2], start + chunk_slices)
+        z: np.ndarray = origin[2] + np.arange(start, stop) * spacing[2]
+        zz, yy, xx = np.meshgrid(z, y, x, indexing="ij", sparse=True)
+        intensity: np.ndarray = np.zeros((stop - start, size[1], size[0]), np.float32)
+        for depth, shell_intensity in SHELLS:
+            radii: np.ndarray = np.array(head_radii) - depth
+            inside: np.ndarray = (
+                (xx / radii[0]) ** 2 + (yy / radii[1]) ** 2 + (zz / radii[2]) ** 2
+            ) <= 1
+            intensity[inside] = shell_intensity
+        for center, radius in islands:
+            inside = (
+                (xx - center[0]) ** 2 + (yy - center[1]) ** 2 + (zz - center[2]) ** 2
+            ) <= radius**2
+            intensity[inside] = SHELLS[0][1]
+        # Smooth bias field, linear in each axis plus a cross term
+        xn, yn, zn = xx / (extent[0] / 2), yy / (extent[1] / 2), zz / (extent[2] / 2)
+        bias: np.ndarray = (
+            1 + bias_amplitude * (0.5 * xn + 0.3 * yn - 0.4 * zn + 0.3 * xn * yn) / 1.5
+        )
+        intensity *= bias
+        # Rician noise, like the magnitude of an MRI signal
+        real: np.ndarray = intensity + rng.normal(0, noise_sigma, intensity.shape)
+        imaginary: np.ndarray = rng.normal(0, noise_sigma, intensity.shape)
+        array[start:stop] = np.clip(
+            np.hypot(real, imaginary), 0, np.iinfo(np.int16).max
+        )
+
+    image: sitk.Image = sitk.GetImageFromArray(array, isVector=False)
+    image.SetSpacing(tuple(float(s) for s in spacing))
+    image.SetOrigin(tuple(float(o) for o in origin))
+    return Phantom(image, head)
+
+
+def _place_islands(
+    head: Ellipsoid, extent: np.ndarray, num_islands: int, rng: np.random.Generator
+) -> list[tuple[np.ndarray, float]]:
+    """Return (center, radius) of islands in the field of view at least ``ISLAND_MARGIN_MM`` outside the head."""
+    islands: list[tuple[np.ndarray, float]] = []
+    # Without a limit, a field of view barely larger than the head would loop forever
+    for _ in range(1000 * max(1, num_islands)):
+        if len(islands) == num_islands:
+            break
+        radius: float = rng.uniform(*ISLAND_RADII_MM)
+        center: np.ndarray = rng.uniform(-extent / 2 + radius, extent / 2 - radius)
+        margin: float = radius + ISLAND_MARGIN_MM
+        grown: np.ndarray = np.array(head.radii) + margin
+        if np.sum((center / grown) ** 2) > 1:
+            islands.append((center, radius))
+    return islands
+
+
+def ellipse_perimeter(a: float, b: float) -> float:
+    """Ramanujan's second approximation, with relative error below 1e-7 for axis ratios above 1/3.
+
+    :param a: Semi-axis
+    :type a: float
+    :param b: Semi-axis
+    :type b: float
+    :return: Perimeter of the ellipse
+    :rtype: float"""
+    h: float = ((a - b) / (a + b)) ** 2
+    return math.pi * (a + b) * (1 + 3 * h / (10 + math.sqrt(4 - 3 * h)))
+
+
+def plane_circumference(
+    ellipsoid: Ellipsoid,
+    point: tuple[float, float, float],
+    normal: tuple[float, float, float],
+) -> float:
+    """Perimeter of the intersection of ``ellipsoid`` and a plane.
+
+    :param ellipsoid:
+    :type ellipsoid: Ellipsoid
+    :param point: Point on the plane
+    :type point: tuple[float, float, float]
+    :param normal: Normal of the plane, need not be normalized
+    :type normal: tuple[float, float, float]
+    :return: Perimeter of the intersection, or 0 if the plane doesn't intersect ``ellipsoid``
+    :rtype: float"""
+    n: np.ndarray = np.array(normal, dtype=float)
+    n /= np.linalg.norm(n)
+    # Orthonormal basis (u, v) of the plane
+    helper: np.ndarray = np.eye(3)[np.argmin(np.abs(n))]
+    u: np.ndarray = np.cross(n, helper)
+    u /= np.linalg.norm(u)
+    v: np.ndarray = np.cross(n, u)
+    # The ellipsoid is x^T D x = 1 relative to its center. On the plane, x = w + s u + t v.
+    d: np.ndarray = np.diag(1 / np.array(ellipsoid.radii, dtype=float) ** 2)
+    w: np.ndarray = np.array(point, dtype=float) - np.array(ellipsoid.center)
+    basis: np.ndarray = np.stack([u, v])
+    quadratic: np.ndarray = basis @ d @ basis.T
+    linear: np.ndarray = basis @ d @ w
+    constant: float = w @ d @ w
+    # Completing the square gives (y - m)^T quadratic (y - m) = 1 - k
+    k: float = constant - linear @ np.linalg.solve(quadratic, linear)
+    if k >= 1:
+        return 0.0
+    eigenvalues: np.ndarray = np.linalg.eigvalsh(quadratic)
+    a, b = np.sqrt((1 - k) / eigenvalues)
+    return ellipse_perimeter(float(a), float(b))
+
+
+def rotated_slice_plane(
+    img: sitk.Image, theta: tuple[int, int, int], slice_num: int
+) -> tuple[tuple[float, float, float], tuple[float, float, float]]:
+    """The plane of ``img`` sampled by ``img_helpers.get_rotated_slice`` for the Z view, like ``api.measure`` does.
+
+    :param img: Image oriented for the Z view
+    :type img: sitk.Image
+    :param theta: (x, y, z) rotation in degrees
+    :type theta: tuple[int, int, int]
+    :param slice_num: Slice along the Z axis
+    :type slice_num: int
+    :return: (point on the plane, normal) in physical coordinates
+    :rtype: tuple[tuple[float, float, float], tuple[float, float, float]]"""
+    transform: sitk.Euler3DTransform = sitk.Euler3DTransform()
+    transform.SetCenter(get_center_of_rotation(img))
+    transform.SetRotation(*(degrees_to_radians(angle) for angle in theta))
+    # The slice is the plane at index slice_num of the output grid, mapped into img by the transform
+    point: tuple = transform.TransformPoint(
+        img.TransformContinuousIndexToPhysicalPoint((0.0, 0.0, float(slice_num)))
+    )
+    matrix: np.ndarray = np.array(transform.GetMatrix()).reshape(3, 3)
+    direction: np.ndarray = np.array(img.GetDirection()).reshape(3, 3)
+    normal: np.ndarray = matrix @ direction[:, 2]
+    return point, tuple(normal)
+
+
+def circumference(
+    phantom: Phantom,
+    theta: tuple[int, int, int] = (0, 0, 0),
+    slice_num: Union[int, None] = None,
+) -> float:
+    """Exact circumference of the head of ``phantom`` on the plane measured by ``api.measure`` with
+    the same ``theta`` and ``slice``.
+
+    :param phantom:
+    :type phantom: Phantom
+    :param theta: (x, y, z) rotation in degrees
+    :type theta: tuple[int, int, int]
+    :param slice_num: Slice along the Z axis. None means the middle slice.
+    :type slice_num: int or None
+    :return: Circumference in mm, or 0 if the plane doesn't intersect the head
+    :rtype: float"""
+    if slice_num is None:
+        slice_num = get_middle_dimension(phantom.image, View.Z)
+    point, normal = rotated_slice_plane(phantom.image, theta, slice_num)
+    return plane_circumference(phantom.head, point, normal)
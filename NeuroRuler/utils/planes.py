@@ -0,0 +1,157 @@
+"""Cache of rotated 2D planes shared by the GUI's views.
+
+Every view of the GUI (the main image and the other two views of the tri-planar layout) gets its slice from
+``PlaneCache.get_or_sample``, which resamples only that plane with ``img_helpers.get_rotated_plane``.
+A rotation change therefore resamples three planes instead of orienting and resampling three volumes,
+and going back to a rotation, slice, or view that was shown recently doesn't resample anything.
+
+Planes are keyed by image path and every setting that affects them (``PlaneKey``), like ``prefetch.PrefetchKey``,
+so a stale plane is never returned. The cache is only used from the GUI thread."""
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple, Union
+
+import SimpleITK as sitk
+
+import NeuroRuler.utils.global_vars as global_vars
+from NeuroRuler.utils.constants import View, degrees_to_radians
+from NeuroRuler.utils.img_helpers import get_rotated_plane, get_view_index, image_nbytes
+
+
+class PlaneKey(NamedTuple):
+    """Identifies a rotated plane. Includes every setting that affects it."""
+
+    path: Path
+    view: View
+    theta_x: int
+    theta_y: int
+    theta_z: int
+    index: int
+    """Index of the plane along ``view``'s axis, see ``img_helpers.get_view_index``"""
+    center: tuple[float, float, float]
+    """Center of rotation"""
+    level: int = 0
+    """Level of the image's pyramid the plane is sampled from, see ``pyramid.py``. 0 is full resolution."""
+
+
+def key_from_globals(path: Path, view: View, level: int = 0) -> PlaneKey:
+    """Return the key of the plane of the image at ``path`` shown in ``view`` with the current settings.
+
+    :param path: Path of an image in ``IMAGE_DICT``
+    :type path: Path
+    :param view: Need not be ``global_vars.VIEW``
+    :type view: View
+    :param level: Pyramid level, 0 for full resolution
+    :type level: int
+    :return: Key for ``path`` and ``view``
+    :rtype: PlaneKey"""
+    return PlaneKey(
+        path,
+        view,
+        global_vars.THETA_X,
+        global_vars.THETA_Y,
+        global_vars.THETA_Z,
+        get_view_index(
+            view, global_vars.SLICE, global_vars.X_CENTER, global_vars.Y_CENTER
+        ),
+        global_vars.EULER_3D_TRANSFORM.GetCenter(),
+        level,
+    )
+
+
+def sample(
+    key: PlaneKey, img: sitk.Image, source: Union[sitk.Image, None] = None
+) -> sitk.Image:
+    """Resample the plane described by ``key``. Doesn't use global variables.
+
+    :param key:
+    :type key: PlaneKey
+    :param img: Image at ``key.path``, in any orientation
+    :type img: sitk.Image
+    :param source: Level ``key.level`` of ``img``'s pyramid. Only used if ``key.level`` > 0.
+    :type source: sitk.Image or None
+    :return: 2D rotated slice, ``2 ** key.level`` times coarser than full resolution
+    :rtype: sitk.Image"""
+    transform: sitk.Euler3DTransform = sitk.Euler3DTransform()
+    transform.SetCenter(key.center)
+    transform.SetRotation(
+        degrees_to_radians(key.theta_x),
+        degrees_to_radians(key.theta_y),
+        degrees_to_radians(key.theta_z),
+    )
+    if key.level == 0:
+        return get_rotated_plane(img, transform, key.view, key.index)
+    return get_rotated_plane(
+        img, transform, key.view, key.index, 2**key.level, source
+    )
+
+
+class PlaneCache:
+    """LRU cache of rotated planes, limited by memory."""
+
+    def __init__(self, max_bytes: int):
+        """:param max_bytes: Memory limit of cached planes
+        :type max_bytes: int"""
+        self.max_bytes: int = max_bytes
+        self._cache: OrderedDict[PlaneKey, sitk.Image] = OrderedDict()
+        self._cache_nbytes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get_or_sample(
+        self, key: PlaneKey, img: sitk.Image, source: Union[sitk.Image, None] = None
+    ) -> sitk.Image:
+        """Return the cached plane for ``key``, or resample and cache it.
+
+        :param key:
+        :type key: PlaneKey
+        :param img: Image at ``key.path``, in any orientation
+        :type img: sitk.Image
+        :param source: Level ``key.level`` of ``img``'s pyramid, see ``sample``
+        :type source: sitk.Image or None
+        :return: 2D rotated slice
+        :rtype: sitk.Image"""
+        plane: Union[sitk.Image, None] = self._cache.get(key)
+        if plane is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return plane
+        self.misses += 1
+        plane = sample(key, img, source)
+        nbytes: int = image_nbytes(plane)
+        if nbytes <= self.max_bytes:
+            self._cache[key] = plane
+            self._cache_nbytes += nbytes
+            while self._cache_nbytes > self.max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_nbytes -= image_nbytes(evicted)
+        return plane
+
+    def nbytes(self) -> int:
+        """:return: Memory held by cached planes
+        :rtype: int"""
+        return self._cache_nbytes
+
+    def evict(self, nbytes: int) -> int:
+        """Evict least recently used planes until at least ``nbytes`` have been freed or the cache is empty.
+        Called by ``memory.MemoryGovernor`` when the GUI is over its memory budget.
+
+        :param nbytes:
+        :type nbytes: int
+        :return: Bytes freed
+        :rtype: int"""
+        freed: int = 0
+        while freed < nbytes and self._cache:
+            _, evicted = self._cache.popitem(last=False)
+            evicted_nbytes: int = image_nbytes(evicted)
+            self._cache_nbytes -= evicted_nbytes
+            freed += evicted_nbytes
+        return freed
+
+    def clear(self) -> None:
+        """Remove all cached planes. Called when a new batch is opened.
+
+        :return: None"""
+        self._cache.clear()
+        self._cache_nbytes = 0
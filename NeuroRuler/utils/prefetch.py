@@ -0,0 +1,377 @@
+"""Background prefetch of the images next to the current one in the GUI's batch.
+
+While the user looks at an image, a low-priority worker thread resamples the current slice of the
+neighboring images and (in circumference mode) computes their contour and circumference,
+all with the current settings. Pressing Next or Previous can then display a cached result
+instead of doing that work on the GUI thread.
+
+Results are keyed by image path and every setting that affects them (``PrefetchKey``), so stale results
+are never used after a setting changes. They simply stop matching and are evicted, least recently used first,
+once the cache exceeds its memory limit.
+
+Nothing here reads or writes ``global_vars`` from a worker thread. Each job gets its own transform and filters,
+since sitk filter objects can't be shared between threads. SimpleITK releases the GIL while filters execute,
+so the GUI thread stays responsive."""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import NamedTuple, Union
+
+import numpy as np
+import SimpleITK as sitk
+
+import NeuroRuler.utils.exceptions as exceptions
+import NeuroRuler.utils.global_vars as global_vars
+import NeuroRuler.utils.imgproc as imgproc
+from NeuroRuler.utils.constants import (
+    View,
+    ThresholdFilter,
+    Precision,
+    degrees_to_radians,
+)
+from NeuroRuler.utils.histogram import suggest_binary_thresholds
+from NeuroRuler.utils.img_helpers import get_rotated_plane, get_view_index, image_nbytes
+
+NUM_WORKERS: int = 1
+"""ITK filters are already multithreaded, so one worker is enough to keep ahead of the user."""
+
+WORKER_NICENESS: int = 10
+"""Added to the niceness of worker threads (Linux only) so prefetching yields to the GUI thread."""
+
+
+class ContourSettings(NamedTuple):
+    """Settings that affect the contour. Part of ``PrefetchKey`` in circumference mode."""
+
+    threshold_filter: ThresholdFilter
+    conductance: float
+    iterations: int
+    time_step: float
+    lower_threshold: float
+    """For ThresholdFilter.VolumeOtsu, the volume's ``histogram.suggest_binary_thresholds``"""
+    upper_threshold: float
+    precision: Precision = Precision.Float64
+
+
+class PrefetchKey(NamedTuple):
+    """Identifies a prefetched slice. Includes every setting that affects the result."""
+
+    path: Path
+    view: View
+    theta_x: int
+    theta_y: int
+    theta_z: int
+    slice_num: int
+    x_center: int
+    y_center: int
+    center: tuple[float, float, float]
+    """Center of rotation"""
+    contour_settings: Union[ContourSettings, None]
+    """None in settings mode, where no contour is computed"""
+
+
+class PrefetchedSlice(NamedTuple):
+    """Result of ``compute``."""
+
+    rotated_slice: sitk.Image
+    contour: Union[imgproc.ContourPolyline, None]
+    """None if the key has no contour settings"""
+    circumference: Union[float, None]
+    """None if the key has no contour settings or the slice is invalid"""
+    nbytes: int
+    """Memory held by this entry"""
+
+
+def key_from_globals(
+    path: Path, threshold_filter: Union[ThresholdFilter, None]
+) -> PrefetchKey:
+    """Return the key of the slice of the image at ``path`` that the GUI would render with the current settings.
+
+    Must be called from the GUI thread.
+
+    :param path: Path of an image in ``IMAGE_DICT``
+    :type path: Path
+    :param threshold_filter: Filter selected in the GUI in circumference mode, None in settings mode
+    :type threshold_filter: ThresholdFilter or None
+    :return: Key for ``path``
+    :rtype: PrefetchKey"""
+    contour_settings: Union[ContourSettings, None] = None
+    if threshold_filter is not None:
+        thresholds: tuple[float, float] = (
+            suggest_binary_thresholds(global_vars.HISTOGRAM_DICT[path])
+            if threshold_filter == ThresholdFilter.VolumeOtsu
+            else (
+                global_vars.LOWER_BINARY_THRESHOLD,
+                global_vars.UPPER_BINARY_THRESHOLD,
+            )
+        )
+        contour_settings = ContourSettings(
+            threshold_filter,
+            global_vars.CONDUCTANCE_PARAMETER,
+            global_vars.SMOOTHING_ITERATIONS,
+            global_vars.TIME_STEP,
+            *thresholds,
+            global_vars.PRECISION,
+        )
+    return PrefetchKey(
+        path,
+        global_vars.VIEW,
+        global_vars.THETA_X,
+        global_vars.THETA_Y,
+        global_vars.THETA_Z,
+        global_vars.SLICE,
+        global_vars.X_CENTER,
+        global_vars.Y_CENTER,
+        global_vars.EULER_3D_TRANSFORM.GetCenter(),
+        contour_settings,
+    )
+
+
+def compute(
+    key: PrefetchKey, img: sitk.Image, raise_invalid_slice: bool = False
+) -> PrefetchedSlice:
+    """Resample the slice described by ``key`` and compute its contour and circumference
+    if ``key`` has contour settings.
+
+    Gives the same results as the GUI's own rendering code. Safe to call from any thread.
+
+    :param key:
+    :type key: PrefetchKey
+    :param img: Image at ``key.path``, in any orientation
+    :type img: sitk.Image
+    :param raise_invalid_slice: If False, ``circumference`` is None for an invalid slice
+    :type raise_invalid_slice: bool
+    :raise exceptions.ComputeCircumferenceOfInvalidSlice: If the slice is invalid and ``raise_invalid_slice``
+    :return: Prefetched slice
+    :rtype: PrefetchedSlice"""
+    transform: sitk.Euler3DTransform = sitk.Euler3DTransform()
+    transform.SetCenter(key.center)
+    transform.SetRotation(
+        degrees_to_radians(key.theta_x),
+        degrees_to_radians(key.theta_y),
+        degrees_to_radians(key.theta_z),
+    )
+    rotated_slice: sitk.Image = get_rotated_plane(
+        img,
+        transform,
+        key.view,
+        get_view_index(key.view, key.slice_num, key.x_center, key.y_center),
+    )
+    nbytes: int = image_nbytes(rotated_slice)
+
+    contour: Union[imgproc.ContourPolyline, None] = None
+    circumference: Union[float, None] = None
+    if key.contour_settings is not None:
+        contour = imgproc.ContourPolyline.from_binary_contour(
+            contour_with_settings(rotated_slice, key.contour_settings, writable=False)
+        )
+        nbytes += contour.nbytes
+        spacing: tuple = img.GetSpacing()
+        try:
+            circumference = contour.length_with_spacing(spacing[0], spacing[1])
+        except exceptions.ComputeCircumferenceOfInvalidSlice:
+            if raise_invalid_slice:
+                raise
+            # The GUI recomputes and reports the error if the user navigates here
+
+    return PrefetchedSlice(rotated_slice, contour, circumference, nbytes)
+
+
+def contour_with_settings(
+    rotated_slice: sitk.Image, settings: ContourSettings, writable: bool = True
+) -> np.ndarray:
+    """``imgproc.contour`` with filters configured from ``settings`` instead of the global filters.
+    Safe to call from any thread.
+
+    :param rotated_slice:
+    :type rotated_slice: sitk.Image
+    :param settings:
+    :type settings: ContourSettings
+    :param writable: See ``imgproc.contour``
+    :type writable: bool
+    :return: binary (0|1) numpy array with only the points on the contour = 1
+    :rtype: np.ndarray"""
+    smoothing_filter: sitk.GradientAnisotropicDiffusionImageFilter = (
+        sitk.GradientAnisotropicDiffusionImageFilter()
+    )
+    smoothing_filter.SetConductanceParameter(settings.conductance)
+    smoothing_filter.SetNumberOfIterations(settings.iterations)
+    smoothing_filter.SetTimeStep(settings.time_step)
+    binary_threshold_filter: sitk.BinaryThresholdImageFilter = (
+        sitk.BinaryThresholdImageFilter()
+    )
+    binary_threshold_filter.SetLowerThreshold(settings.lower_threshold)
+    binary_threshold_filter.SetUpperThreshold(settings.upper_threshold)
+    return imgproc.contour(
+        rotated_slice,
+        settings.threshold_filter,
+        smoothing_filter=smoothing_filter,
+        binary_threshold_filter=binary_threshold_filter,
+        precision=settings.precision,
+        writable=writable,
+    )
+
+
+def neighbor_indices(curr_index: int, num_images: int, depth: int) -> list[int]:
+    """Indices of the images within ``depth`` of ``curr_index``, nearest first, wrapping like Next and Previous.
+
+    :param curr_index:
+    :type curr_index: int
+    :param num_images:
+    :type num_images: int
+    :param depth: Number of images to include in each direction
+    :type depth: int
+    :return: Indices, excluding ``curr_index`` and without duplicates
+    :rtype: list[int]"""
+    rv: list[int] = []
+    for offset in range(1, depth + 1):
+        for index in (
+            (curr_index + offset) % num_images,
+            (curr_index - offset) % num_images,
+        ):
+            if index != curr_index and index not in rv:
+                rv.append(index)
+    return rv
+
+
+def lower_thread_priority() -> None:
+    """Initializer of worker threads. On Linux, niceness applies per thread, so this doesn't affect the GUI thread.
+
+    :return: None"""
+    if not sys.platform.startswith("linux"):
+        return
+    try:
+        os.setpriority(
+            os.PRIO_PROCESS,
+            threading.get_native_id(),
+            os.getpriority(os.PRIO_PROCESS, 0) + WORKER_NICENESS,
+        )
+    except OSError:
+        pass
+
+
+class Prefetcher:
+    """Thread-safe LRU cache of ``PrefetchedSlice`` filled by a low-priority worker pool."""
+
+    def __init__(self, max_bytes: int):
+        """:param max_bytes: Memory limit of cached results
+        :type max_bytes: int"""
+        self.max_bytes: int = max_bytes
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=NUM_WORKERS,
+            thread_name_prefix="NeuroRuler-prefetch",
+            initializer=lower_thread_priority,
+        )
+        # Reentrant because a future canceled while holding the lock runs its done callback immediately
+        self._lock: threading.RLock = threading.RLock()
+        self._cache: OrderedDict[PrefetchKey, PrefetchedSlice] = OrderedDict()
+        self._cache_nbytes: int = 0
+        self._pending: dict[PrefetchKey, Future] = {}
+        self._generation: int = 0
+        """Incremented by ``clear``, so jobs that were already running don't fill the cleared cache"""
+
+    def get(self, key: PrefetchKey) -> Union[PrefetchedSlice, None]:
+        """Return the cached result for ``key`` and mark it as recently used, or None if it isn't cached.
+
+        :param key:
+        :type key: PrefetchKey
+        :return: Cached result or None
+        :rtype: PrefetchedSlice or None"""
+        with self._lock:
+            entry: Union[PrefetchedSlice, None] = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+            return entry
+
+    def schedule(self, jobs: list[tuple[PrefetchKey, sitk.Image]]) -> None:
+        """Compute the results of ``jobs`` in the background, in order, skipping cached or pending keys.
+
+        Queued jobs that aren't in ``jobs`` are canceled since the user has moved on.
+
+        :param jobs: (key, image at ``key.path``)
+        :type jobs: list[tuple[PrefetchKey, sitk.Image]]
+        :return: None"""
+        wanted: set[PrefetchKey] = {key for key, _ in jobs}
+        with self._lock:
+            for key, future in list(self._pending.items()):
+                if key not in wanted:
+                    future.cancel()
+            for key, img in jobs:
+                if key in self._cache or key in self._pending:
+                    continue
+                future: Future = self._executor.submit(compute, key, img)
+                self._pending[key] = future
+                future.add_done_callback(partial(self._store, key, self._generation))
+
+    def _store(self, key: PrefetchKey, generation: int, future: Future) -> None:
+        """Done callback of a job. Caches its result and evicts least recently used results beyond ``max_bytes``.
+
+        :param key:
+        :type key: PrefetchKey
+        :param generation: Value of ``_generation`` when the job was scheduled
+        :type generation: int
+        :param future:
+        :type future: Future
+        :return: None"""
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+            if (
+                generation != self._generation
+                or future.cancelled()
+                or future.exception() is not None
+            ):
+                return
+            entry: PrefetchedSlice = future.result()
+            if entry.nbytes > self.max_bytes or key in self._cache:
+                return
+            self._cache[key] = entry
+            self._cache_nbytes += entry.nbytes
+            while self._cache_nbytes > self.max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_nbytes -= evicted.nbytes
+
+    def nbytes(self) -> int:
+        """:return: Memory held by cached results
+        :rtype: int"""
+        with self._lock:
+            return self._cache_nbytes
+
+    def evict(self, nbytes: int) -> int:
+        """Evict least recently used results until at least ``nbytes`` have been freed or the cache is empty.
+        Called by ``memory.MemoryGovernor`` when the GUI is over its memory budget.
+
+        :param nbytes:
+        :type nbytes: int
+        :return: Bytes freed
+        :rtype: int"""
+        freed: int = 0
+        with self._lock:
+            while freed < nbytes and self._cache:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_nbytes -= evicted.nbytes
+                freed += evicted.nbytes
+        return freed
+
+    def clear(self) -> None:
+        """Cancel queued jobs and remove all cached results. Called when a new batch is opened.
+
+        :return: None"""
+        with self._lock:
+            for future in list(self._pending.values()):
+                future.cancel()
+            self._pending.clear()
+            self._generation += 1
+            self._cache.clear()
+            self._cache_nbytes = 0
+
+    def shutdown(self) -> None:
+        """Cancel queued jobs and stop the worker threads without waiting for the running job.
+
+        :return: None"""
+        self.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,113 @@
+"""Profile the GUI while a user reproduces a slow interaction (Advanced > Profile Interactions).
+
+``InteractionProfiler`` runs ``cProfile`` on the GUI thread between ``start`` and ``stop``, then writes
+
+- ``<name>.pstats``, which can be sorted and browsed with ``python -m pstats <name>.pstats`` or ``snakeviz``, and
+- ``<name>.txt``, a report with the image path, settings, and environment, then the most expensive functions
+  sorted by cumulative and by own time.
+
+``<name>`` contains the image's stem and the time the profile was started, so reports from the field
+can be matched with their image. Time spent in SimpleITK and Qt shows up as the builtin that called them
+(e.g. ``SimpleITK._SimpleITK.Resample``). Prefetch worker threads aren't profiled."""
+
+import cProfile
+import io
+import json
+import platform
+import pstats
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Union
+
+import SimpleITK as sitk
+
+REPORT_SORT_KEYS: tuple[str, ...] = ("cumulative", "tottime")
+"""``pstats`` sort keys of the sections of the text report"""
+REPORT_NUM_FUNCTIONS: int = 40
+"""Number of functions listed in each section of the text report"""
+
+
+def environment() -> dict[str, str]:
+    """Versions that affect performance, included in every report.
+
+    :return: Name to version
+    :rtype: dict[str, str]"""
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "python": platform.python_version(),
+        "SimpleITK": sitk.Version.VersionString(),
+    }
+
+
+class InteractionProfiler:
+    """Profiles the thread that calls ``start`` until ``stop``. Not thread-safe."""
+
+    def __init__(self):
+        self._profile: Union[cProfile.Profile, None] = None
+        self._started_at: datetime = datetime.now()
+        self._start_time: float = 0.0
+
+    def is_running(self) -> bool:
+        """:return: Whether ``start`` was called without a matching ``stop``
+        :rtype: bool"""
+        return self._profile is not None
+
+    def start(self) -> None:
+        """Start profiling. Does nothing if already running.
+
+        :return: None"""
+        if self._profile is not None:
+            return
+        self._started_at = datetime.now()
+        self._start_time = time.perf_counter()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop(
+        self, output_dir: Path, name: str, metadata: dict[str, Any]
+    ) -> tuple[Path, Path]:
+        """Stop profiling and write the ``.pstats`` file and text report to ``output_dir``.
+
+        :param output_dir: Created if it doesn't exist
+        :type output_dir: Path
+        :param name: Prefix of the file names, e.g. the image's stem. The start time is appended.
+        :type name: str
+        :param metadata: JSON-serializable details written at the top of the report, e.g. image path and settings
+        :type metadata: dict[str, Any]
+        :raise RuntimeError: If not running
+        :return: (``.pstats`` path, report path)
+        :rtype: tuple[Path, Path]"""
+        if self._profile is None:
+            raise RuntimeError("The profiler isn't running")
+        self._profile.disable()
+        profile: cProfile.Profile = self._profile
+        self._profile = None
+        duration: float = time.perf_counter() - self._start_time
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        stem: str = f"profile_{name}_{self._started_at.strftime('%Y%m%d-%H%M%S')}"
+        pstats_path: Path = output_dir / f"{stem}.pstats"
+        report_path: Path = output_dir / f"{stem}.txt"
+        profile.dump_stats(str(pstats_path))
+
+        header: dict[str, Any] = {
+            "started": self._started_at.isoformat(timespec="seconds"),
+            "duration_seconds": round(duration, 3),
+            "pstats": str(pstats_path),
+            **metadata,
+            "environment": environment(),
+        }
+        with open(report_path, "w") as report:
+            report.write("NeuroRuler interaction profile\n\n")
+            report.write(json.dumps(header, indent=4, default=str))
+            report.write("\n")
+            for sort_key in REPORT_SORT_KEYS:
+                stream: io.StringIO = io.StringIO()
+                pstats.Stats(profile, stream=stream).sort_stats(sort_key).print_stats(
+                    REPORT_NUM_FUNCTIONS
+                )
+                report.write(f"\n=== Sorted by {sort_key} ===\n")
+                report.write(stream.getvalue())
+        return pstats_path, report_path
@@ -0,0 +1,312 @@
+"""Multi-resolution pyramids of loaded images, for browsing very large scans in the GUI.
+
+Level k of an image's pyramid is the image smoothed with a Gaussian and shrunk by 2 along every axis,
+k times. While the user browses in settings mode, each view samples its plane from the coarsest level that
+still has at least as many pixels as the label it's shown in (``level_for_display``), so moving a slider through
+a 512^3 scan at 0.5 mm touches an eighth of the memory (or less) that sampling it at full resolution does.
+Contouring and measurement always use full resolution.
+
+Pyramids are built by ``PyramidBuilder`` on a low-priority worker thread once the user pauses, like prefetching
+(see ``prefetch.py``), so they never delay displaying an image. Until an image's pyramid is built, its views are
+sampled at full resolution. Building can be canceled between chunks of slices, and each level is built a chunk
+at a time, so building one never needs more memory than a chunk of the full resolution image as floats.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from math import floor, log2
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import SimpleITK as sitk
+
+from NeuroRuler.utils.img_helpers import image_nbytes
+from NeuroRuler.utils.prefetch import lower_thread_priority
+
+MIN_LEVEL_SIZE: int = 128
+"""Levels are built while the longest axis of the next one is at least this long"""
+MAX_LEVELS: int = 4
+"""Levels built beyond full resolution"""
+GAUSSIAN_SIGMA_VOXELS: float = 0.5
+"""Standard deviation of the Gaussian applied before shrinking, in voxels of the level being shrunk.
+``sitk.BinShrink`` averages 2 x 2 x 2 blocks, which smooths a bit more."""
+CHUNK_SLICES: int = 32
+"""Z slices smoothed and shrunk at a time. Even, so chunks are shrunk in whole blocks."""
+MARGIN_SLICES: int = 4
+"""Z slices smoothed on each side of a chunk, so chunks match smoothing the whole image"""
+
+
+def level_sizes(size: tuple[int, int, int]) -> list[tuple[int, int, int]]:
+    """:param size: Size of a full resolution image
+    :type size: tuple[int, int, int]
+    :return: Sizes of the levels of its pyramid, excluding full resolution. Empty if it's too small to need one.
+    :rtype: list[tuple[int, int, int]]"""
+    sizes: list[tuple[int, int, int]] = []
+    while len(sizes) < MAX_LEVELS:
+        next_size: tuple[int, int, int] = tuple(axis // 2 for axis in size)
+        if max(next_size) < MIN_LEVEL_SIZE or min(next_size) < 1:
+            break
+        sizes.append(next_size)
+        size = next_size
+    return sizes
+
+
+def pyramid_nbytes(img: sitk.Image) -> int:
+    """:param img: Full resolution image
+    :type img: sitk.Image
+    :return: Memory that its pyramid will use
+    :rtype: int"""
+    bytes_per_voxel: int = image_nbytes(img) // int(np.prod(img.GetSize()))
+    return sum(
+        int(np.prod(size)) * bytes_per_voxel for size in level_sizes(img.GetSize())
+    )
+
+
+def downsample(
+    img: sitk.Image, cancelled: Union[threading.Event, None] = None
+) -> Union[sitk.Image, None]:
+    """Return ``img`` smoothed with a Gaussian and shrunk by 2 along every axis, with the same pixel type.
+
+    Each pixel of the result is centered on the 2 x 2 x 2 block of ``img`` it replaces, like ``sitk.BinShrink``,
+    so the result covers the same physical space. Odd sizes lose their last slice.
+
+    :param img: 3D image
+    :type img: sitk.Image
+    :param cancelled: Checked between chunks of slices. If set, stops and returns None.
+    :type cancelled: threading.Event or None
+    :return: Downsampled image, or None if canceled
+    :rtype: sitk.Image or None"""
+    size: tuple[int, int, int] = img.GetSize()
+    num_slices: int = size[2] - size[2] % 2
+    sigma: list[float] = [
+        GAUSSIAN_SIGMA_VOXELS * spacing for spacing in img.GetSpacing()
+    ]
+    dtype: np.dtype = sitk.GetArrayViewFromImage(img[:, :, :1]).dtype
+    downsampled: np.ndarray = np.empty(
+        (num_slices // 2, size[1] // 2, size[0] // 2), dtype=dtype
+    )
+    for start in range(0, num_slices, CHUNK_SLICES):
+        if cancelled is not None and cancelled.is_set():
+            return None
+        stop: int = min(start + CHUNK_SLICES, num_slices)
+        margin_start: int = max(start - MARGIN_SLICES, 0)
+        margin_stop: int = min(stop + MARGIN_SLICES, size[2])
+        smoothed: sitk.Image = sitk.SmoothingRecursiveGaussian(
+            img[:, :, margin_start:margin_stop], sigma
+        )
+        chunk: np.ndarray = sitk.GetArrayFromImage(
+            sitk.BinShrink(
+                smoothed[:, :, start - margin_start : stop - margin_start], [2, 2, 2]
+            )
+        )
+        if np.issubdtype(dtype, np.integer):
+            chunk = np.rint(chunk)
+        downsampled[start // 2 : stop // 2] = chunk
+    result: sitk.Image = sitk.GetImageFromArray(downsampled)
+    result.SetSpacing([2 * spacing for spacing in img.GetSpacing()])
+    result.SetDirection(img.GetDirection())
+    result.SetOrigin(img.TransformContinuousIndexToPhysicalPoint([0.5, 0.5, 0.5]))
+    return result
+
+
+def build(
+    img: sitk.Image, cancelled: Union[threading.Event, None] = None
+) -> Union[list[sitk.Image], None]:
+    """Build the pyramid of ``img``. Doesn't use global variables.
+
+    :param img: Full resolution image
+    :type img: sitk.Image
+    :param cancelled: If set while building, stops and returns None
+    :type cancelled: threading.Event or None
+    :return: Levels 1, 2, ... (see ``level_sizes``), or None if canceled
+    :rtype: list[sitk.Image] or None"""
+    levels: list[sitk.Image] = []
+    for _ in level_sizes(img.GetSize()):
+        level: Union[sitk.Image, None] = downsample(
+            levels[-1] if levels else img, cancelled
+        )
+        if level is None:
+            return None
+        levels.append(level)
+    return levels
+
+
+def level_for_display(
+    plane_size: tuple[int, int], display_size: tuple[int, int], num_levels: int
+) -> int:
+    """Return the coarsest level whose plane has at least as many pixels as it's displayed with.
+
+    The plane is scaled to fit ``display_size``, keeping its aspect ratio.
+
+    :param plane_size: (width, height) of the full resolution plane
+    :type plane_size: tuple[int, int]
+    :param display_size: (width, height) of the label the plane is shown in
+    :type display_size: tuple[int, int]
+    :param num_levels: Number of levels built, excluding full resolution
+    :type num_levels: int
+    :return: Level in [0, ``num_levels``], 0 being full resolution
+    :rtype: int"""
+    if min(display_size) <= 0:
+        return 0
+    reduction: float = max(
+        plane_size[0] / display_size[0], plane_size[1] / display_size[1]
+    )
+    if reduction < 2:
+        return 0
+    return min(floor(log2(reduction)), num_levels)
+
+
+class PyramidBuilder:
+    """Thread-safe LRU cache of pyramids (see ``build``) filled by a low-priority worker thread."""
+
+    def __init__(self, max_bytes: int):
+        """:param max_bytes: Memory limit of built pyramids. Pyramids bigger than this aren't built.
+        :type max_bytes: int"""
+        self.max_bytes: int = max_bytes
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="NeuroRuler-pyramid",
+            initializer=lower_thread_priority,
+        )
+        # Reentrant because a future canceled while holding the lock runs its done callback immediately
+        self._lock: threading.RLock = threading.RLock()
+        self._cache: OrderedDict[Path, list[sitk.Image]] = OrderedDict()
+        self._cache_nbytes: int = 0
+        self._pending: dict[Path, tuple[Future, threading.Event]] = {}
+        self._generation: int = 0
+        """Incremented by ``clear``, so builds that were already running don't fill the cleared cache"""
+
+    def levels(self, path: Path) -> list[sitk.Image]:
+        """Return the levels of the pyramid of the image at ``path`` and mark it as recently used.
+
+        :param path:
+        :type path: Path
+        :return: Levels 1, 2, ..., or an empty list if the pyramid isn't built
+        :rtype: list[sitk.Image]"""
+        with self._lock:
+            levels: Union[list[sitk.Image], None] = self._cache.get(path)
+            if levels is None:
+                return []
+            self._cache.move_to_end(path)
+            return levels
+
+    def schedule(self, jobs: list[tuple[Path, sitk.Image]]) -> None:
+        """Build the pyramids of ``jobs`` in the background, in order, skipping built or pending ones
+        and ones that need no levels or more than ``max_bytes``.
+
+        Queued builds that aren't in ``jobs`` are canceled since the user has moved on.
+        A running build is finished.
+
+        :param jobs: (path, image at ``path``)
+        :type jobs: list[tuple[Path, sitk.Image]]
+        :return: None"""
+        wanted: set[Path] = {path for path, _ in jobs}
+        with self._lock:
+            for path, (future, _) in list(self._pending.items()):
+                if path not in wanted:
+                    future.cancel()
+            for path, img in jobs:
+                if path in self._cache or path in self._pending:
+                    continue
+                nbytes: int = pyramid_nbytes(img)
+                if nbytes == 0 or nbytes > self.max_bytes:
+                    continue
+                cancelled: threading.Event = threading.Event()
+                future: Future = self._executor.submit(build, img, cancelled)
+                self._pending[path] = (future, cancelled)
+                future.add_done_callback(partial(self._store, path, self._generation))
+
+    def _store(self, path: Path, generation: int, future: Future) -> None:
+        """Done callback of a build. Caches its result and evicts least recently used pyramids beyond ``max_bytes``.
+
+        :param path:
+        :type path: Path
+        :param generation: Value of ``_generation`` when the build was scheduled
+        :type generation: int
+        :param future:
+        :type future: Future
+        :return: None"""
+        with self._lock:
+            if path in self._pending and self._pending[path][0] is future:
+                del self._pending[path]
+            if (
+                generation != self._generation
+                or future.cancelled()
+                or future.exception() is not None
+                or future.result() is None
+            ):
+                return
+            levels: list[sitk.Image] = future.result()
+            self._cache[path] = levels
+            self._cache_nbytes += sum(map(image_nbytes, levels))
+            while self._cache_nbytes > self.max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_nbytes -= sum(map(image_nbytes, evicted))
+
+    def is_pending(self, path: Path) -> bool:
+        """:param path:
+        :type path: Path
+        :return: Whether the pyramid of the image at ``path`` is queued or being built
+        :rtype: bool"""
+        with self._lock:
+            return path in self._pending
+
+    def discard(self, path: Path) -> None:
+        """Cancel building and remove the pyramid of the image at ``path``. Called when the image is removed.
+
+        :param path:
+        :type path: Path
+        :return: None"""
+        with self._lock:
+            if path in self._pending:
+                future, cancelled = self._pending.pop(path)
+                cancelled.set()
+                future.cancel()
+            if path in self._cache:
+                self._cache_nbytes -= sum(map(image_nbytes, self._cache.pop(path)))
+
+    def nbytes(self) -> int:
+        """:return: Memory held by built pyramids
+        :rtype: int"""
+        with self._lock:
+            return self._cache_nbytes
+
+    def evict(self, nbytes: int) -> int:
+        """Evict least recently used pyramids until at least ``nbytes`` have been freed or the cache is empty.
+        Called by ``memory.MemoryGovernor`` when the GUI is over its memory budget.
+
+        :param nbytes:
+        :type nbytes: int
+        :return: Bytes freed
+        :rtype: int"""
+        freed: int = 0
+        with self._lock:
+            while freed < nbytes and self._cache:
+                _, evicted = self._cache.popitem(last=False)
+                evicted_nbytes: int = sum(map(image_nbytes, evicted))
+                self._cache_nbytes -= evicted_nbytes
+                freed += evicted_nbytes
+        return freed
+
+    def clear(self) -> None:
+        """Cancel queued and running builds and remove all pyramids. Called when a new batch is opened.
+
+        :return: None"""
+        with self._lock:
+            for future, cancelled in list(self._pending.values()):
+                cancelled.set()
+                future.cancel()
+            self._pending.clear()
+            self._generation += 1
+            self._cache.clear()
+            self._cache_nbytes = 0
+
+    def shutdown(self) -> None:
+        """Cancel builds and stop the worker thread. A running build stops at its next chunk.
+
+        :return: None"""
+        self.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,392 @@
+"""Streaming results file for batch measurements, written by ``python cli.py -o`` and the GUI's JSON export.
+
+Each measurement is appended as one line (JSON Lines for ``.jsonl``, CSV for ``.csv``) as soon as it finishes,
+so a crash or Ctrl+C late in a long batch loses at most the rows that weren't yet synced to disk:
+
+- Each row is a single ``write`` to a file opened with ``O_APPEND``, so rows are never interleaved,
+  even if several processes append to the same file.
+- ``os.fsync`` runs every ``FSYNC_EVERY_ROWS`` rows or ``FSYNC_INTERVAL_SECONDS`` seconds, whichever comes first,
+  and when the writer is closed. Syncing every row would cost a disk flush per image.
+- A row cut off by a crash (no trailing newline) is removed when the file is opened again.
+
+``completed_keys`` reads a results file back for ``--resume``: an input is skipped if a row with status ``ok``
+has the same ``result_key``, i.e. the same file fingerprint (``volume_cache.fingerprint``) and parameters.
+
+Functions here take every setting as an argument and never read global variables."""
+
+import csv
+import io
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator, Union
+
+import NeuroRuler.utils.exceptions as exceptions
+from NeuroRuler.utils.constants import (
+    PRECISION_NAMES,
+    THRESHOLD_FILTER_NAMES,
+    Precision,
+    ThresholdFilter,
+)
+
+PARAMETER_NAMES: tuple[str, ...] = (
+    "x",
+    "y",
+    "z",
+    "slice",
+    "conductance",
+    "iterations",
+    "step",
+    "filter",
+    "lower",
+    "upper",
+    "precision",
+)
+"""Measurement parameters of a row. Same names and values as the long options of ``python cli.py``."""
+
+FIELDS: tuple[str, ...] = (
+    "path",
+    "fingerprint",
+    "status",
+    "circumference",
+    "units",
+    "error",
+    *PARAMETER_NAMES,
+    "timestamp",
+)
+"""Fields of a row, in the order of the CSV columns"""
+
+STATUS_OK: str = "ok"
+STATUS_ERROR: str = "error"
+
+SUFFIXES: tuple[str, ...] = (".jsonl", ".csv")
+"""Supported results file formats"""
+
+FSYNC_EVERY_ROWS: int = 32
+FSYNC_INTERVAL_SECONDS: float = 5.0
+
+
+def make_parameters(
+    theta: tuple[int, int, int],
+    slice_num: int,
+    smoothing: tuple[float, int, float],
+    threshold_filter: ThresholdFilter,
+    lower: float,
+    upper: float,
+    precision: Precision,
+) -> dict[str, Any]:
+    """Return the parameters of a row, named like the CLI options.
+
+    :param theta: (x, y, z) rotation in degrees
+    :type theta: tuple[int, int, int]
+    :param slice_num: -1 means the middle slice
+    :type slice_num: int
+    :param smoothing: (conductance, iterations, time step)
+    :type smoothing: tuple[float, int, float]
+    :param threshold_filter:
+    :type threshold_filter: ThresholdFilter
+    :param lower: Binary threshold, left empty unless ``threshold_filter`` is ThresholdFilter.Binary
+    :type lower: float
+    :param upper: Binary threshold, left empty unless ``threshold_filter`` is ThresholdFilter.Binary
+    :type upper: float
+    :param precision:
+    :type precision: Precision
+    :return: Values of ``PARAMETER_NAMES``
+    :rtype: dict[str, Any]"""
+    is_binary: bool = threshold_filter == ThresholdFilter.Binary
+    return {
+        "x": theta[0],
+        "y": theta[1],
+        "z": theta[2],
+        "slice": slice_num,
+        "conductance": smoothing[0],
+        "iterations": smoothing[1],
+        "step": smoothing[2],
+        "filter": next(
+            name
+            for name, value in THRESHOLD_FILTER_NAMES.items()
+            if value == threshold_filter
+        ),
+        "lower": lower if is_binary else None,
+        "upper": upper if is_binary else None,
+        "precision": next(
+            name for name, value in PRECISION_NAMES.items() if value == precision
+        ),
+    }
+
+
+def make_row(
+    path: Path,
+    fingerprint: str,
+    parameters: dict[str, Any],
+    circumference: Union[float, None] = None,
+    units: Union[str, None] = None,
+    error: Union[str, None] = None,
+) -> dict[str, Any]:
+    """Return a row for ``ResultsWriter.write``. The status is ``error`` if ``error`` is given, else ``ok``.
+
+    :param path: Input image
+    :type path: Path
+    :param fingerprint: ``volume_cache.fingerprint`` of ``path``, or "" if it couldn't be computed
+    :type fingerprint: str
+    :param parameters: Returned by ``make_parameters``
+    :type parameters: dict[str, Any]
+    :param circumference:
+    :type circumference: float or None
+    :param units:
+    :type units: str or None
+    :param error: Error message if the measurement failed
+    :type error: str or None
+    :return: Dict with every key in ``FIELDS``
+    :rtype: dict[str, Any]"""
+    row: dict[str, Any] = {
+        "path": str(path),
+        "fingerprint": fingerprint,
+        "status": STATUS_OK if error is None else STATUS_ERROR,
+        "circumference": circumference,
+        "units": units,
+        # Multiline messages would make CSV rows span lines
+        "error": None if error is None else " ".join(error.split()),
+    }
+    for name in PARAMETER_NAMES:
+        row[name] = parameters.get(name)
+    row["timestamp"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    return row
+
+
+def result_key(row: dict[str, Any]) -> tuple[str, ...]:
+    """Return the fingerprint and parameters of ``row`` as strings, so a row read from CSV (all strings)
+    has the same key as the row that was written.
+
+    :param row: Row passed to ``ResultsWriter.write`` or returned by ``read_rows``
+    :type row: dict[str, Any]
+    :return: (fingerprint, parameters in ``PARAMETER_NAMES`` order)
+    :rtype: tuple[str, ...]"""
+    return tuple(
+        "" if row.get(name) is None else str(row[name])
+        for name in ("fingerprint", *PARAMETER_NAMES)
+    )
+
+
+def read_rows(path: Path) -> Iterator[dict[str, Any]]:
+    """Yield the rows of a results file. Skips a final row without a trailing newline and lines that can't be parsed,
+    which can only come from a crash during a write.
+
+    :param path: ``.jsonl`` or ``.csv`` file written by ``ResultsWriter``
+    :type path: Path
+    :return: Rows. CSV values are strings, with "" for missing values.
+    :rtype: Iterator[dict[str, Any]]"""
+    with open(path, "r", newline="") as f:
+        lines: list[str] = f.read().split("\n")
+    # The last element is "" if the file ends with a newline, else a partial row
+    lines = lines[:-1]
+    if path.suffix.lower() == ".csv":
+        if not lines:
+            return
+        for values in csv.reader(lines[1:]):
+            if len(values) == len(FIELDS):
+                yield dict(zip(FIELDS, values))
+        return
+    for line in lines:
+        try:
+            row: Any = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(row, dict):
+            yield row
+
+
+def completed_keys(path: Path) -> set[tuple[str, ...]]:
+    """Return the ``result_key`` of every successful row in the results file at ``path``, for ``--resume``.
+
+    :param path: Results file. If it doesn't exist, nothing is completed.
+    :type path: Path
+    :return: Keys of rows with status ``ok``
+    :rtype: set[tuple[str, ...]]"""
+    if not path.exists():
+        return set()
+    return {
+        result_key(row) for row in read_rows(path) if row.get("status") == STATUS_OK
+    }
+
+
+def fsync_directory(directory: Path) -> None:
+    """Sync ``directory``, so files created in it survive a crash. Best effort.
+
+    Only done on POSIX. Windows can't open directories with ``os.open``, and some file systems
+    don't support syncing them, in which case the error is ignored.
+
+    :param directory:
+    :type directory: Path
+    :return: None"""
+    if os.name != "posix":
+        return
+    try:
+        dir_fd: int = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+class ResultsWriter:
+    """Appends rows to a results file. Use as a context manager so the last rows are synced on exit::
+
+        with ResultsWriter(Path("results.csv")) as writer:
+            writer.write(make_row(...))
+
+    Thread-safe."""
+
+    def __init__(
+        self,
+        path: Path,
+        fsync_every_rows: int = FSYNC_EVERY_ROWS,
+        fsync_interval_seconds: float = FSYNC_INTERVAL_SECONDS,
+    ):
+        """Open ``path`` for appending, creating it (and its directory) if needed.
+
+        :param path: ``.jsonl`` or ``.csv`` file
+        :type path: Path
+        :param fsync_every_rows: Sync after this many rows
+        :type fsync_every_rows: int
+        :param fsync_interval_seconds: Sync when a row is written this long after the last sync
+        :type fsync_interval_seconds: float
+        :raise exceptions.InvalidResultsFile: If the suffix isn't supported or a CSV file has different columns
+        """
+        if path.suffix.lower() not in SUFFIXES:
+            raise exceptions.InvalidResultsFile(
+                path, f"file extension must be {' or '.join(SUFFIXES)}"
+            )
+        self.path: Path = path
+        self.is_csv: bool = path.suffix.lower() == ".csv"
+        self.fsync_every_rows: int = fsync_every_rows
+        self.fsync_interval_seconds: float = fsync_interval_seconds
+        self._lock: threading.Lock = threading.Lock()
+        self._unsynced_rows: int = 0
+        self._last_sync: float = time.monotonic()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        is_new: bool = not path.exists()
+        self._fd: int = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            self._remove_partial_row()
+            if self.is_csv:
+                self._check_or_write_header()
+            if is_new:
+                # Make the new directory entry durable too
+                fsync_directory(path.parent)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def _remove_partial_row(self) -> None:
+        """Truncate the file after its last newline, removing a row cut off by a crash.
+
+        :return: None"""
+        size: int = os.fstat(self._fd).st_size
+        if size == 0:
+            return
+        with open(self.path, "rb") as f:
+            position: int = size
+            while position > 0:
+                start: int = max(0, position - 4096)
+                f.seek(start)
+                chunk: bytes = f.read(position - start)
+                newline: int = chunk.rfind(b"\n")
+                if newline != -1:
+                    end: int = start + newline + 1
+                    break
+                position = start
+            else:
+                end = 0
+        if end != size:
+            os.ftruncate(self._fd, end)
+            os.fsync(self._fd)
+
+    def _check_or_write_header(self) -> None:
+        """Write the CSV header to an empty file, or check that an existing file has the same columns.
+
+        :raise exceptions.InvalidResultsFile: If the existing header is different
+        :return: None"""
+        if os.fstat(self._fd).st_size == 0:
+            os.write(self._fd, self._format_csv(FIELDS))
+            return
+        with open(self.path, "r", newline="") as f:
+            header: list[str] = next(csv.reader(f), [])
+        if tuple(header) != FIELDS:
+            raise exceptions.InvalidResultsFile(
+                self.path, f"existing columns {header} aren't {list(FIELDS)}"
+            )
+
+    @staticmethod
+    def _format_csv(values) -> bytes:
+        buffer: io.StringIO = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerow(values)
+        return buffer.getvalue().encode()
+
+    def write(self, row: dict[str, Any]) -> None:
+        """Append ``row`` as one line. Syncs to disk if enough rows or time have passed since the last sync.
+
+        :param row: Returned by ``make_row``
+        :type row: dict[str, Any]
+        :return: None"""
+        if self.is_csv:
+            line: bytes = self._format_csv(
+                "" if row.get(name) is None else row[name] for name in FIELDS
+            )
+        else:
+            line = (
+                json.dumps({name: row.get(name) for name in FIELDS}) + "\n"
+            ).encode()
+        with self._lock:
+            written: int = os.write(self._fd, line)
+            # Regular files only get short writes if the disk is full, which the next write reports
+            while written < len(line):
+                written += os.write(self._fd, line[written:])
+            self._unsynced_rows += 1
+            if (
+                self._unsynced_rows >= self.fsync_every_rows
+                or time.monotonic() - self._last_sync >= self.fsync_interval_seconds
+            ):
+                self._sync()
+
+    def _sync(self) -> None:
+        """Caller holds ``self._lock``.
+
+        :return: None"""
+        os.fsync(self._fd)
+        self._unsynced_rows = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self) -> None:
+        """Sync every written row to disk.
+
+        :return: None"""
+        with self._lock:
+            if self._unsynced_rows:
+                self._sync()
+
+    def close(self) -> None:
+        """Sync and close the file.
+
+        :return: None"""
+        with self._lock:
+            if self._fd == -1:
+                return
+            if self._unsynced_rows:
+                self._sync()
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self) -> "ResultsWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,165 @@
+"""Split a batch of input files between the tasks of a cluster array job (``python cli.py --shard i/N``).
+
+Every task gets the same file list, and ``shard_files`` picks each task's part without any coordination:
+it depends only on the sorted list of distinct paths, dealing them out to the shards in turn. File sizes and
+modification times aren't used, since a node can see stale metadata (e.g. while a shared file system is still
+syncing), and tasks that disagree would measure some files twice and others never. Tasks must therefore be given
+the same paths, spelled the same way (e.g. the same glob run from the same directory).
+
+``merge_rows`` combines the shards' results files (``neuroruler merge``) and checks that every input
+was measured by exactly one shard.
+
+Functions here take every setting as an argument and never read global variables."""
+
+import os
+from pathlib import Path
+from typing import Any, Iterable, Mapping, NamedTuple, Union
+
+ARRAY_TASK_ENVIRONMENT_VARIABLES: tuple[tuple[str, Union[str, None], int], ...] = (
+    # Slurm: --array=1-8 gives IDs 1..8, so subtract the first ID
+    ("SLURM_ARRAY_TASK_ID", "SLURM_ARRAY_TASK_MIN", 0),
+    # Grid Engine: -t 1-8
+    ("SGE_TASK_ID", "SGE_TASK_FIRST", 1),
+    # LSF: job arrays start at 1
+    ("LSB_JOBINDEX", None, 1),
+    # AWS Batch: starts at 0
+    ("AWS_BATCH_JOB_ARRAY_INDEX", None, 0),
+    # PBS Pro and Torque: used as is, so start the array at 0
+    ("PBS_ARRAY_INDEX", None, 0),
+    ("PBS_ARRAYID", None, 0),
+)
+"""(variable holding the task's ID, variable holding the array's first ID or None, default first ID)
+for the schedulers ``shard_index_from_environment`` recognizes, in the order they're checked"""
+
+
+class Shard(NamedTuple):
+    """Shard ``index`` (0-indexed) of ``count``"""
+
+    index: int
+    count: int
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+
+def parse_shard(text: str, environment: Union[Mapping[str, str], None] = None) -> Shard:
+    """Parse ``i/N`` (0-indexed), or ``N`` to take the index from the array job's environment variables.
+
+    :param text: Value of ``--shard``
+    :type text: str
+    :param environment: Defaults to ``os.environ``
+    :type environment: Mapping[str, str] or None
+    :raise ValueError: If ``text`` is malformed, the index is out of range, or ``N`` is given outside an array job
+    :return: Shard
+    :rtype: Shard"""
+    index_text, _, count_text = text.rpartition("/")
+    try:
+        count: int = int(count_text)
+        index: int = (
+            int(index_text)
+            if index_text
+            else shard_index_from_environment(
+                os.environ if environment is None else environment
+            )
+        )
+    except ValueError as e:
+        raise ValueError(f"invalid shard {text!r}, expected i/N or N: {e}") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(
+            f"invalid shard {text!r}, the index must be from 0 to N - 1 (got index {index} of {count})"
+        )
+    return Shard(index, count)
+
+
+def shard_index_from_environment(environment: Mapping[str, str]) -> int:
+    """Return the 0-indexed task index of the current array job task.
+
+    :param environment: Environment variables
+    :type environment: Mapping[str, str]
+    :raise ValueError: If none of ``ARRAY_TASK_ENVIRONMENT_VARIABLES`` is set, or it isn't an integer
+    :return: Index of this task
+    :rtype: int"""
+    for id_variable, first_variable, default_first in ARRAY_TASK_ENVIRONMENT_VARIABLES:
+        task_id: Union[str, None] = environment.get(id_variable)
+        # Grid Engine sets SGE_TASK_ID to "undefined" outside array jobs
+        if task_id is None or not task_id.strip().lstrip("-").isdigit():
+            continue
+        first: str = (
+            environment.get(first_variable, str(default_first))
+            if first_variable is not None
+            else str(default_first)
+        )
+        return int(task_id) - int(first)
+    raise ValueError(
+        "no array job task ID found in "
+        + ", ".join(variable for variable, _, _ in ARRAY_TASK_ENVIRONMENT_VARIABLES)
+    )
+
+
+def shard_files(files: Iterable[str], shard: Shard) -> list[str]:
+    """Return the files of ``shard``, sorted. Duplicates in ``files`` are measured once.
+
+    The distinct paths are sorted and file ``k`` goes to shard ``k mod count``, so every file is assigned to
+    exactly one shard, shards differ in size by at most one file, and the result depends only on the paths.
+    Files that don't exist are assigned like the others, and their shard reports the error.
+
+    :param files: All input files of the array job, in any order
+    :type files: Iterable[str]
+    :param shard:
+    :type shard: Shard
+    :return: Files this task should measure
+    :rtype: list[str]"""
+    return sorted(set(files))[shard.index :: shard.count]
+
+
+class MergeReport(NamedTuple):
+    """Problems found by ``merge_rows``. The merge is complete if all are empty."""
+
+    missing: list[str]
+    """Inputs without a row in any results file"""
+    duplicated: dict[str, list[Path]]
+    """Inputs with rows in more than one results file -> those files"""
+    unexpected: list[str]
+    """Paths with rows that aren't inputs"""
+
+    @property
+    def ok(self) -> bool:
+        return not (self.missing or self.duplicated or self.unexpected)
+
+
+def merge_rows(
+    rows_by_file: Mapping[Path, Iterable[dict[str, Any]]],
+    inputs: Union[Iterable[str], None] = None,
+) -> tuple[list[dict[str, Any]], MergeReport]:
+    """Combine the rows of several results files into one row per input, sorted by path.
+
+    Paths are compared after resolving them against the current directory, so run the merge from the directory
+    the shards ran in if they were given relative paths. If a results file has several rows for a path
+    (e.g. a failure, then a success after ``--resume``), the last one is kept.
+
+    :param rows_by_file: Results file -> its rows (``results.read_rows``)
+    :type rows_by_file: Mapping[Path, Iterable[dict[str, Any]]]
+    :param inputs: Every input of the array job. If None, coverage isn't checked.
+    :type inputs: Iterable[str] or None
+    :return: (merged rows, report)
+    :rtype: tuple[list[dict[str, Any]], MergeReport]"""
+    latest: dict[str, dict[str, Any]] = {}
+    sources: dict[str, list[Path]] = {}
+    for results_file, rows in rows_by_file.items():
+        for row in rows:
+            key: str = str(Path(row["path"]).resolve())
+            latest[key] = row
+            if results_file not in sources.setdefault(key, []):
+                sources[key].append(results_file)
+
+    duplicated: dict[str, list[Path]] = {
+        key: files for key, files in sources.items() if len(files) > 1
+    }
+    missing: list[str] = []
+    unexpected: list[str] = []
+    if inputs is not None:
+        expected: set[str] = {str(Path(file).resolve()) for file in inputs}
+        missing = sorted(expected - latest.keys())
+        unexpected = sorted(latest.keys() - expected)
+    merged: list[dict[str, Any]] = [latest[key] for key in sorted(latest)]
+    return merged, MergeReport(missing, duplicated, unexpected)
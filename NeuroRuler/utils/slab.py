@@ -0,0 +1,399 @@
+"""Contour many slices at once, e.g. for slice sweeps and multi-slice QC.
+
+``imgproc.contour`` runs 7+ SimpleITK filters per slice, and each call has a fixed cost (threads, region
+splitting) that dominates on 2D slices: smoothing one 160x256 slice takes about 130 ms, almost all overhead.
+``contour_slab`` takes a 3D slab whose z slices are the 2D slices and runs each stage once for the whole slab:
+
+- Smoothing, thresholding, and contour extraction are vectorized numpy over the stack of slices.
+  The smoothing is the same finite difference scheme as ``sitk.GradientAnisotropicDiffusionImageFilter``,
+  including its per-slice conductance scaling, so it can't be done by running the 3D filter with no diffusion
+  along z: the 3D filter scales conductance by the average gradient of the whole slab, not of each slice.
+- Hole filling and connected components run once, on a mosaic of the slices separated by background rows,
+  so nothing connects across slices.
+
+The result is the same as calling ``prefetch.contour_with_settings`` on every slice (see ``tests/test_slab.py``
+and ``benchmarks/slab_validation.py``). Smoothed values can differ from SimpleITK's in the last bit,
+since numpy's ``exp`` isn't the C library's, which doesn't change any contour in ``data/``.
+
+Memory is about 20 float64 copies of the slab at the peak of smoothing, so pass slabs of tens of slices
+rather than whole volumes."""
+
+import numpy as np
+import SimpleITK as sitk
+
+from NeuroRuler.utils.constants import BinaryColor, Precision, ThresholdFilter
+from NeuroRuler.utils.imgproc import (
+    MAX_NUM_MISMATCHED_PIXELS_FOR_BACKGROUND_COLOR_DETECTION,
+    NUM_PIXELS_TO_CHECK_ON_EACH_EDGE_FOR_BACKGROUND_COLOR_DETECTION,
+    array_view_of_image,
+)
+from NeuroRuler.utils.prefetch import ContourSettings
+
+PRECISION_DTYPES: dict[Precision, np.dtype] = {
+    Precision.Float32: np.dtype(np.float32),
+    Precision.Float64: np.dtype(np.float64),
+}
+"""numpy dtype of each ``Precision``, matching ``imgproc.PRECISION_PIXEL_TYPES``"""
+
+OTSU_NUM_BINS: int = 128
+"""Number of histogram bins used by ``sitk.OtsuThreshold``"""
+OTSU_MARGINAL_SCALE: float = 100.0
+"""The upper bound of ``sitk.OtsuThreshold``'s histogram is the maximum plus (max - min) / bins / this"""
+
+
+def contour_slab(slab: sitk.Image, settings: ContourSettings) -> np.ndarray:
+    """Return the contour of every z slice of ``slab``.
+
+    ``contour_slab(slab, settings)[k]`` equals ``prefetch.contour_with_settings(slab[:, :, k], settings)``.
+
+    :param slab: 3D image whose z slices are the 2D slices to contour, e.g. from ``img_helpers.get_rotated_slab``
+    :type slab: sitk.Image
+    :param settings:
+    :type settings: ContourSettings
+    :raise Exception: If ``settings`` uses ThresholdFilter.Binary and the background color of a slice can't be
+        detected, like ``imgproc.background_color_of_binary_thresholded_slice``
+    :return: binary (0|1) uint8 array indexed [slice, y, x] with only the points on each contour = 1
+    :rtype: np.ndarray"""
+    dtype: np.dtype = PRECISION_DTYPES[settings.precision]
+    stack: np.ndarray = array_view_of_image(slab).astype(dtype)
+    spacing: tuple = slab.GetSpacing()
+    smooth: np.ndarray = smooth_stack(
+        stack,
+        settings.conductance,
+        settings.iterations,
+        settings.time_step,
+        spacing[0],
+        spacing[1],
+    )
+
+    # fg = 0 (black), bg = 1 (white), like imgproc.contour
+    if settings.threshold_filter == ThresholdFilter.Otsu:
+        thresholded: np.ndarray = smooth <= otsu_thresholds(smooth)[:, None, None]
+    else:
+        thresholded = (smooth >= dtype.type(settings.lower_threshold)) & (
+            smooth <= dtype.type(settings.upper_threshold)
+        )
+        if settings.threshold_filter == ThresholdFilter.Binary:
+            thresholded[
+                background_colors(thresholded) == BinaryColor.Black.value
+            ] ^= True
+
+    # Separator rows are background, so they connect every slice's edges to the border of the mosaic
+    hole_filling: np.ndarray = from_mosaic(
+        array_view_of_image(
+            sitk.BinaryGrindPeak(sitk.GetImageFromArray(to_mosaic(thresholded, 1)))
+        ),
+        len(thresholded),
+    )
+    # After inverting, separator rows are 0, so no component spans two slices
+    labels: np.ndarray = from_mosaic(
+        array_view_of_image(
+            sitk.ConnectedComponent(
+                sitk.GetImageFromArray(to_mosaic(hole_filling == 0, 0))
+            )
+        ),
+        len(thresholded),
+    )
+    return contour_of_mask(largest_component_per_slice(labels))
+
+
+def smooth_stack(
+    stack: np.ndarray,
+    conductance: float,
+    iterations: int,
+    time_step: float,
+    x_spacing: float,
+    y_spacing: float,
+) -> np.ndarray:
+    """Apply ``sitk.GradientAnisotropicDiffusionImageFilter`` with the given settings to every slice of ``stack``.
+
+    Same scheme as ITK's ``GradientNDAnisotropicDiffusionFunction`` in 2D: at each iteration, the conductance
+    is scaled by the slice's average squared gradient magnitude, and each pixel moves by ``time_step`` times
+    the difference of the conductance-weighted forward and backward differences along x and y.
+    Pixels outside the slice repeat the edge (zero flux).
+
+    :param stack: Slices indexed [slice, y, x]. Float32 or float64.
+    :type stack: np.ndarray
+    :param conductance:
+    :type conductance: float
+    :param iterations:
+    :type iterations: int
+    :param time_step:
+    :type time_step: float
+    :param x_spacing: Differences are divided by the spacing, like the ITK filter
+    :type x_spacing: float
+    :param y_spacing:
+    :type y_spacing: float
+    :return: Smoothed slices, same shape and dtype as ``stack``
+    :rtype: np.ndarray"""
+    x_scale: float = 1.0 / x_spacing
+    y_scale: float = 1.0 / y_spacing
+    num_pixels: int = stack.shape[1] * stack.shape[2]
+    # Like ITK, differences are computed in the pixel type and everything else in float64
+    smooth: np.ndarray = stack.copy()
+    for _ in range(iterations):
+        padded: np.ndarray = np.pad(smooth, ((0, 0), (1, 1), (1, 1)), mode="edge")
+        # Forward differences between neighbors. Row/column i + 1 of padded is pixel i.
+        x_diffs: np.ndarray = (
+            np.diff(padded[:, 1:-1, :], axis=2).astype(np.float64, copy=False) * x_scale
+        )
+        y_diffs: np.ndarray = (
+            np.diff(padded[:, :, 1:-1], axis=1).astype(np.float64, copy=False) * y_scale
+        )
+        # Centered differences, including the padded rows and columns for the neighboring pixels
+        x_centered: np.ndarray = (padded[:, :, 2:] - padded[:, :, :-2]).astype(
+            np.float64, copy=False
+        ) * (0.5 * x_scale)
+        y_centered: np.ndarray = (padded[:, 2:, :] - padded[:, :-2, :]).astype(
+            np.float64, copy=False
+        ) * (0.5 * y_scale)
+        dx: np.ndarray = x_centered[:, 1:-1, :]
+        dy: np.ndarray = y_centered[:, :, 1:-1]
+
+        average_gradient_squared: np.ndarray = (
+            np.sum(dx * dx, axis=(1, 2)) + np.sum(dy * dy, axis=(1, 2))
+        ) / num_pixels
+        k: np.ndarray = (
+            (average_gradient_squared * conductance * conductance * -2.0)
+            .astype(smooth.dtype)
+            .astype(np.float64)[:, None, None]
+        )
+
+        forward_x: np.ndarray = x_diffs[:, :, 1:]
+        backward_x: np.ndarray = x_diffs[:, :, :-1]
+        forward_y: np.ndarray = y_diffs[:, 1:, :]
+        backward_y: np.ndarray = y_diffs[:, :-1, :]
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            update: np.ndarray = forward_x * np.exp(
+                (forward_x * forward_x + 0.25 * (dy + y_centered[:, :, 2:]) ** 2) / k
+            ) - backward_x * np.exp(
+                (backward_x * backward_x + 0.25 * (dy + y_centered[:, :, :-2]) ** 2) / k
+            )
+            update += forward_y * np.exp(
+                (forward_y * forward_y + 0.25 * (dx + x_centered[:, 2:, :]) ** 2) / k
+            ) - backward_y * np.exp(
+                (backward_y * backward_y + 0.25 * (dx + x_centered[:, :-2, :]) ** 2) / k
+            )
+        # ITK skips the exponential (no diffusion) for a slice with no gradient
+        update[k[:, 0, 0] == 0] = 0
+        smooth = smooth + (time_step * update.astype(smooth.dtype, copy=False)).astype(
+            smooth.dtype, copy=False
+        )
+    return smooth
+
+
+def otsu_thresholds(stack: np.ndarray) -> np.ndarray:
+    """Return the threshold ``sitk.OtsuThreshold`` would compute for every slice of ``stack``.
+
+    Uses the same histogram (``OTSU_NUM_BINS`` bins from the minimum to just above the maximum) and the same
+    search as ITK's ``OtsuMultipleThresholdsCalculator`` with one threshold, which returns the upper edge
+    of the bin that maximizes the between-class variance.
+
+    :param stack: Slices indexed [slice, y, x]
+    :type stack: np.ndarray
+    :return: Threshold of each slice. Pixels <= the threshold are background.
+    :rtype: np.ndarray"""
+    num_slices: int = len(stack)
+    pixels: np.ndarray = stack.reshape(num_slices, -1)
+    # The histogram is in the pixel type, the statistics in float64
+    lows: np.ndarray = pixels.min(axis=1)
+    highs: np.ndarray = pixels.max(axis=1)
+    highs = highs + (highs - lows) / stack.dtype.type(OTSU_NUM_BINS) / stack.dtype.type(
+        OTSU_MARGINAL_SCALE
+    )
+    intervals: np.ndarray = (highs - lows) / stack.dtype.type(OTSU_NUM_BINS)
+    edges: np.ndarray = np.empty((num_slices, OTSU_NUM_BINS + 1), dtype=stack.dtype)
+    edges[:, :-1] = (
+        lows[:, None] + np.arange(OTSU_NUM_BINS, dtype=stack.dtype) * intervals[:, None]
+    )
+    edges[:, -1] = highs
+
+    # Bin of each pixel, i.e. the last edge <= the pixel. The estimate from the interval can be off by one.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bins: np.ndarray = np.floor((pixels - lows[:, None]) / intervals[:, None])
+    bins = np.nan_to_num(bins, nan=0.0, posinf=0.0, neginf=0.0).astype(np.intp)
+    np.clip(bins, 0, OTSU_NUM_BINS - 1, out=bins)
+    rows: np.ndarray = np.arange(num_slices)[:, None]
+    bins -= pixels < edges[rows, bins]
+    bins += (bins < OTSU_NUM_BINS - 1) & (pixels >= edges[rows, bins + 1])
+    counts: np.ndarray = np.bincount(
+        (bins + rows * OTSU_NUM_BINS).ravel(), minlength=num_slices * OTSU_NUM_BINS
+    ).reshape(num_slices, OTSU_NUM_BINS)
+    # ITK drops pixels at or above the upper bound, so a constant slice has an empty histogram
+    counts[highs <= lows] = 0
+
+    centers: np.ndarray = ((edges[:, :-1] + edges[:, 1:]) / stack.dtype.type(2)).astype(
+        np.float64
+    )
+    frequencies: np.ndarray = counts.astype(np.float64)
+    totals: np.ndarray = counts.sum(axis=1).astype(np.float64)
+
+    # Same order of operations as ITK, one slice per element
+    with np.errstate(divide="ignore", invalid="ignore"):
+        global_means: np.ndarray = np.zeros(num_slices)
+        for i in range(OTSU_NUM_BINS):
+            global_means += centers[:, i] * frequencies[:, i]
+        global_means /= totals
+
+        def upper_class_mean(lower_frequency, lower_mean):
+            upper_frequency = totals - lower_frequency
+            upper_mean = (
+                global_means * totals - lower_mean * lower_frequency
+            ) / upper_frequency
+            return upper_frequency, np.where(upper_frequency > 0, upper_mean, 0.0)
+
+        def between_class_variance(
+            lower_frequency, lower_mean, upper_frequency, upper_mean
+        ):
+            return (
+                0.0
+                + lower_frequency * (lower_mean * lower_mean)
+                + upper_frequency * (upper_mean * upper_mean)
+            ) / totals
+
+        lower_frequency: np.ndarray = frequencies[:, 0].copy()
+        lower_mean: np.ndarray = np.where(lower_frequency > 0, centers[:, 0], 0.0)
+        upper_frequency, upper_mean = upper_class_mean(lower_frequency, lower_mean)
+        max_variance: np.ndarray = between_class_variance(
+            lower_frequency, lower_mean, upper_frequency, upper_mean
+        )
+        best_bins: np.ndarray = np.zeros(num_slices, dtype=np.intp)
+        for i in range(1, OTSU_NUM_BINS - 1):
+            old_frequency: np.ndarray = lower_frequency
+            lower_frequency = lower_frequency + frequencies[:, i]
+            lower_mean = np.where(
+                lower_frequency > 0,
+                (lower_mean * old_frequency + centers[:, i] * frequencies[:, i])
+                / lower_frequency,
+                0.0,
+            )
+            upper_frequency, upper_mean = upper_class_mean(lower_frequency, lower_mean)
+            variance: np.ndarray = between_class_variance(
+                lower_frequency, lower_mean, upper_frequency, upper_mean
+            )
+            better: np.ndarray = variance > max_variance
+            max_variance = np.where(better, variance, max_variance)
+            best_bins[better] = i
+    return edges[np.arange(num_slices), best_bins + 1]
+
+
+def background_colors(thresholded: np.ndarray) -> np.ndarray:
+    """``imgproc.background_color_of_binary_thresholded_slice`` for every slice of a binary stack.
+
+    :param thresholded: Binary slices indexed [slice, y, x]
+    :type thresholded: np.ndarray
+    :raise Exception: If more than ``MAX_NUM_MISMATCHED_PIXELS_FOR_BACKGROUND_COLOR_DETECTION`` edge pixels
+        of a slice don't match its pixel at (0, 0)
+    :return: ``BinaryColor`` value of each slice's background
+    :rtype: np.ndarray"""
+    _, height, width = thresholded.shape
+    columns: range = range(
+        1,
+        width,
+        width // NUM_PIXELS_TO_CHECK_ON_EACH_EDGE_FOR_BACKGROUND_COLOR_DETECTION,
+    )
+    rows: range = range(
+        1,
+        height,
+        height // NUM_PIXELS_TO_CHECK_ON_EACH_EDGE_FOR_BACKGROUND_COLOR_DETECTION,
+    )
+    edge_pixels: np.ndarray = np.concatenate(
+        [
+            thresholded[:, 0, columns],
+            thresholded[:, height - 1, columns],
+            thresholded[:, rows, 0],
+            thresholded[:, rows, width - 1],
+        ],
+        axis=1,
+    )
+    colors: np.ndarray = thresholded[:, 0, 0]
+    mismatched_pixels: np.ndarray = np.count_nonzero(
+        edge_pixels != colors[:, None], axis=1
+    )
+    if np.any(
+        mismatched_pixels > MAX_NUM_MISMATCHED_PIXELS_FOR_BACKGROUND_COLOR_DETECTION
+    ):
+        raise Exception(
+            f"Could not successfully detect background color after executing binary threshold.\nMore than {MAX_NUM_MISMATCHED_PIXELS_FOR_BACKGROUND_COLOR_DETECTION} pixels on the top, bottom, left, or right edge don't match the pixel at the top left corner."
+        )
+    return colors.astype(np.uint8)
+
+
+def to_mosaic(stack: np.ndarray, separator: int) -> np.ndarray:
+    """Stack the slices of ``stack`` vertically into one 2D uint8 image, with a row of ``separator`` after each.
+
+    :param stack: Binary slices indexed [slice, y, x]
+    :type stack: np.ndarray
+    :param separator: Value of the separator rows
+    :type separator: int
+    :return: Array indexed [y, x] with ``len(stack) * (height + 1)`` rows
+    :rtype: np.ndarray"""
+    num_slices, height, width = stack.shape
+    mosaic: np.ndarray = np.full(
+        (num_slices, height + 1, width), separator, dtype=np.uint8
+    )
+    mosaic[:, :height, :] = stack
+    return mosaic.reshape(num_slices * (height + 1), width)
+
+
+def from_mosaic(mosaic: np.ndarray, num_slices: int) -> np.ndarray:
+    """Inverse of ``to_mosaic``. Returns a view.
+
+    :param mosaic: Array indexed [y, x]
+    :type mosaic: np.ndarray
+    :param num_slices:
+    :type num_slices: int
+    :return: Slices indexed [slice, y, x], without the separator rows
+    :rtype: np.ndarray"""
+    return mosaic.reshape(num_slices, -1, mosaic.shape[1])[:, :-1, :]
+
+
+def largest_component_per_slice(labels: np.ndarray) -> np.ndarray:
+    """``imgproc.select_largest_component`` for every slice, given connected component labels
+    that don't span slices.
+
+    Like ``sitk.RelabelComponent``, ties go to the lowest label, i.e. the component whose first pixel
+    comes first in raster order.
+
+    :param labels: Component labels (0 is background) indexed [slice, y, x]
+    :type labels: np.ndarray
+    :return: Binary (0|1) uint8 slices with only each slice's largest component
+    :rtype: np.ndarray"""
+    num_slices: int = len(labels)
+    flat_labels: np.ndarray = labels.reshape(num_slices, -1)
+    sizes: np.ndarray = np.bincount(flat_labels.ravel())
+    sizes[0] = 0
+    # Slice of each label
+    label_slices: np.ndarray = np.zeros(len(sizes), dtype=np.intp)
+    label_slices[flat_labels] = np.arange(num_slices)[:, None]
+    # Largest label of each slice, ties going to the lowest label. Slices without components keep label 0.
+    order: np.ndarray = np.lexsort((np.arange(len(sizes)), -sizes))
+    largest: np.ndarray = np.zeros(num_slices, dtype=labels.dtype)
+    chosen: np.ndarray = np.zeros(num_slices, dtype=bool)
+    for label in order:
+        if sizes[label] == 0:
+            break
+        if not chosen[label_slices[label]]:
+            chosen[label_slices[label]] = True
+            largest[label_slices[label]] = label
+    mask: np.ndarray = labels == largest[:, None, None]
+    mask &= labels != 0
+    return mask.astype(np.uint8)
+
+
+def contour_of_mask(mask: np.ndarray) -> np.ndarray:
+    """``sitk.BinaryContour`` for every slice: foreground pixels with a background pixel above, below,
+    left, or right. Pixels outside the slice count as foreground, so the slice's edges aren't contours.
+
+    :param mask: Binary (0|1) uint8 slices indexed [slice, y, x]
+    :type mask: np.ndarray
+    :return: Binary (0|1) uint8 slices with only the contour pixels = 1
+    :rtype: np.ndarray"""
+    padded: np.ndarray = np.pad(mask, ((0, 0), (1, 1), (1, 1)), constant_values=1)
+    interior: np.ndarray = (
+        padded[:, :-2, 1:-1]
+        & padded[:, 2:, 1:-1]
+        & padded[:, 1:-1, :-2]
+        & padded[:, 1:-1, 2:]
+    )
+    return mask & (interior ^ 1)
@@ -0,0 +1,243 @@
+"""Opt-in on-disk cache of decoded, Z-oriented volumes.
+
+Reading a ``.nii.gz`` or gzip-encoded ``.nrrd`` file pays for single-threaded gzip inflation every time.
+The first time such a file is read, the decoded volume (already oriented for the Z view)
+is stored in the cache directory as an uncompressed ``.npy`` array with a small ``.json`` header
+holding spacing, origin, direction, and metadata. Later reads memory-map the ``.npy`` file
+and copy it straight into the buffer of a new ``sitk.Image``, skipping decompression and orientation.
+
+Entries are keyed by a fingerprint of the source file (resolved path, size, modification time),
+so editing or replacing a file invalidates its entry.
+
+The cache is disabled unless ``global_vars.VOLUME_CACHE_DIR`` is set (``VOLUME_CACHE_DIR``
+in ``cli_config.json`` or ``gui_config.json``). Functions here take the cache directory explicitly
+and never read global variables."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Union
+
+import numpy as np
+import SimpleITK as sitk
+
+CACHE_FORMAT_VERSION: int = 1
+"""Bump this when the format of cache entries changes. Old entries then stop matching."""
+
+ARRAY_SUFFIX: str = ".npy"
+HEADER_SUFFIX: str = ".json"
+
+COMPRESSED_NRRD_ENCODINGS: tuple[str, ...] = ("gzip", "gz", "bzip2", "bz2")
+"""NRRD ``encoding`` field values that make a file worth caching."""
+
+MAX_NRRD_HEADER_BYTES: int = 65536
+"""Stop looking for the end of a NRRD header after this many bytes."""
+
+STALE_TMP_SECONDS: int = 3600
+"""``prune`` removes temporary files older than this, which were left behind by an interrupted ``store``."""
+
+
+def is_compressed(path: Path) -> bool:
+    """Return True if ``path`` is a ``.gz`` file (e.g. ``.nii.gz``) or a NRRD file with compressed encoding.
+
+    Only compressed files are cached since uncompressed files are already cheap to read.
+
+    :param path:
+    :type path: Path
+    :return: Whether the image data at ``path`` is compressed
+    :rtype: bool"""
+    name: str = path.name.lower()
+    if name.endswith(".gz"):
+        return True
+    if not name.endswith(".nrrd"):
+        return False
+    with open(path, "rb") as f:
+        header: bytes = f.read(MAX_NRRD_HEADER_BYTES)
+    # The header ends at the first blank line
+    for line in header.split(b"\n\n")[0].splitlines():
+        key, _, value = line.decode("latin-1").partition(":")
+        if key.strip().lower() == "encoding":
+            return value.strip().lower() in COMPRESSED_NRRD_ENCODINGS
+    return False
+
+
+def fingerprint(path: Path, orientation: str) -> str:
+    """Key of the cache entry for the image at ``path`` oriented with ``orientation``.
+
+    Uses only ``os.stat``, so it doesn't read the file.
+
+    :param path:
+    :type path: Path
+    :param orientation: Orientation string passed to sitk.DICOMOrientImageFilter, e.g. constants.Z_ORIENTATION_STR
+    :type orientation: str
+    :return: Hex digest identifying the file's current contents
+    :rtype: str"""
+    stat: os.stat_result = path.stat()
+    source: str = "\0".join(
+        (
+            str(path.resolve()),
+            str(stat.st_size),
+            str(stat.st_mtime_ns),
+            orientation,
+            str(CACHE_FORMAT_VERSION),
+        )
+    )
+    return hashlib.sha1(source.encode()).hexdigest()
+
+
+def load(path: Path, orientation: str, cache_dir: Path) -> Union[sitk.Image, None]:
+    """Return the cached image for ``path``, or None if it isn't cached.
+
+    Marks the entry as recently used.
+
+    :param path: Path of the source image
+    :type path: Path
+    :param orientation: Orientation the cached image must have
+    :type orientation: str
+    :param cache_dir:
+    :type cache_dir: Path
+    :return: Cached image or None
+    :rtype: sitk.Image or None"""
+    key: str = fingerprint(path, orientation)
+    array_path: Path = cache_dir / (key + ARRAY_SUFFIX)
+    header_path: Path = cache_dir / (key + HEADER_SUFFIX)
+    # The header is written last, so an entry without a header is incomplete
+    if not header_path.exists() or not array_path.exists():
+        return None
+    with open(header_path, "r") as f:
+        header: dict[str, Any] = json.load(f)
+
+    array: np.ndarray = np.load(array_path, mmap_mode="r")
+    # Single copy from the page cache into the image buffer.
+    # SimpleITK can't wrap foreign memory, so the image has to own its buffer.
+    img: sitk.Image = sitk.GetImageFromArray(array, isVector=header["components"] > 1)
+    del array
+    img.SetSpacing(header["spacing"])
+    img.SetOrigin(header["origin"])
+    img.SetDirection(header["direction"])
+    for meta_key, meta_value in header["metadata"].items():
+        img.SetMetaData(meta_key, meta_value)
+
+    os.utime(header_path)
+    return img
+
+
+def store(
+    path: Path, img: sitk.Image, orientation: str, cache_dir: Path, max_bytes: int
+) -> None:
+    """Store ``img``, read from ``path`` and oriented with ``orientation``, in the cache.
+
+    Files are written to temporary names and renamed, so a crash never leaves a partial entry.
+    Afterward, prunes the cache to ``max_bytes``.
+
+    :param path: Path of the source image
+    :type path: Path
+    :param img: Decoded image
+    :type img: sitk.Image
+    :param orientation: Orientation of ``img``
+    :type orientation: str
+    :param cache_dir: Created if it doesn't exist
+    :type cache_dir: Path
+    :param max_bytes: Size limit of the cache
+    :type max_bytes: int
+    :return: None
+    :rtype: None"""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    key: str = fingerprint(path, orientation)
+    array_path: Path = cache_dir / (key + ARRAY_SUFFIX)
+    header_path: Path = cache_dir / (key + HEADER_SUFFIX)
+    header: dict[str, Any] = {
+        "source": str(path.resolve()),
+        "pixel_id": img.GetPixelID(),
+        "components": img.GetNumberOfComponentsPerPixel(),
+        "size": list(img.GetSize()),
+        "spacing": list(img.GetSpacing()),
+        "origin": list(img.GetOrigin()),
+        "direction": list(img.GetDirection()),
+        "metadata": {k: img.GetMetaData(k) for k in img.GetMetaDataKeys()},
+    }
+
+    # Temporary names are unique per process and thread since several processes or threads may share the cache
+    tmp_suffix: str = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    tmp_array_path: Path = cache_dir / (key + ARRAY_SUFFIX + tmp_suffix)
+    with open(tmp_array_path, "wb") as f:
+        np.save(f, sitk.GetArrayViewFromImage(img))
+    os.replace(tmp_array_path, array_path)
+    tmp_header_path: Path = cache_dir / (key + HEADER_SUFFIX + tmp_suffix)
+    with open(tmp_header_path, "w") as f:
+        json.dump(header, f)
+    os.replace(tmp_header_path, header_path)
+
+    prune(cache_dir, max_bytes)
+
+
+def entries(cache_dir: Path) -> list[tuple[float, int, str]]:
+    """Return ``(last used time, size in bytes, key)`` for every entry in ``cache_dir``,
+    least recently used first.
+
+    :param cache_dir:
+    :type cache_dir: Path
+    :return: Entries sorted by last used time
+    :rtype: list[tuple[float, int, str]]"""
+    if not cache_dir.exists():
+        return []
+    rv: list[tuple[float, int, str]] = []
+    for header_path in cache_dir.glob("*" + HEADER_SUFFIX):
+        key: str = header_path.name[: -len(HEADER_SUFFIX)]
+        array_path: Path = cache_dir / (key + ARRAY_SUFFIX)
+        try:
+            last_used: float = header_path.stat().st_mtime
+            entry_size: int = header_path.stat().st_size + array_path.stat().st_size
+        except FileNotFoundError:
+            # Removed by another process
+            continue
+        rv.append((last_used, entry_size, key))
+    return sorted(rv)
+
+
+def size(cache_dir: Path) -> int:
+    """:param cache_dir:
+    :type cache_dir: Path
+    :return: Total size of the entries in ``cache_dir`` in bytes
+    :rtype: int"""
+    return sum(entry_size for _, entry_size, _ in entries(cache_dir))
+
+
+def prune(cache_dir: Path, max_bytes: int) -> int:
+    """Remove least recently used entries until the cache is at most ``max_bytes``.
+
+    Also removes stale temporary files left over by an interrupted ``store``.
+
+    :param cache_dir:
+    :type cache_dir: Path
+    :param max_bytes: 0 removes every entry
+    :type max_bytes: int
+    :return: Number of bytes freed
+    :rtype: int"""
+    if not cache_dir.exists():
+        return 0
+    freed: int = 0
+    now: float = time.time()
+    for tmp_path in cache_dir.glob("*.tmp"):
+        try:
+            tmp_stat: os.stat_result = tmp_path.stat()
+        except FileNotFoundError:
+            continue
+        if now - tmp_stat.st_mtime > STALE_TMP_SECONDS:
+            tmp_path.unlink(missing_ok=True)
+            freed += tmp_stat.st_size
+
+    cached: list[tuple[float, int, str]] = entries(cache_dir)
+    total: int = sum(entry_size for _, entry_size, _ in cached)
+    for _, entry_size, key in cached:
+        if total <= max_bytes:
+            break
+        # Remove the header first so a concurrent load never sees a header without an array
+        (cache_dir / (key + HEADER_SUFFIX)).unlink(missing_ok=True)
+        (cache_dir / (key + ARRAY_SUFFIX)).unlink(missing_ok=True)
+        total -= entry_size
+        freed += entry_size
+    return freed
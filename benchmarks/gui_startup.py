@@ -0,0 +1,122 @@
+"""GUI startup benchmark: time from launching the process to the first window shown.
+
+Compares the ways of loading a theme's icons:
+
+- ``rcc``: register the compiled ``resources.rcc`` bundle (what ``GUI.main.main()`` does)
+- ``py``: import the generated ``resources.py`` module, with its bytecode cached in ``__pycache__``
+- ``py-cold``: same, but ``__pycache__`` is deleted first, like the first launch after installing
+
+Run from the repository root::
+
+    python benchmarks/gui_startup.py [--runs N] [--theme THEME]
+
+Uses the offscreen Qt platform if there's no display."""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT: Path = Path(__file__).resolve().parent.parent
+
+MODES: tuple[str, ...] = ("rcc", "py", "py-cold")
+
+# Same steps as GUI.main.main() up to showing the window, except for how resources are loaded.
+# Prints the time the window was shown once the event loop has processed the show event.
+CHILD: str = """
+import importlib, json, sys, time
+mode, theme = sys.argv[1], sys.argv[2]
+import NeuroRuler.utils.parser as parser
+parser.parse_gui_config()
+import NeuroRuler.utils.gui_settings as settings
+import NeuroRuler.utils.constants as constants
+settings.THEME_NAME = theme
+from PyQt6.QtCore import QSize, QTimer
+from PyQt6.QtWidgets import QApplication
+import NeuroRuler.GUI.main as gui_main
+
+start = time.time()
+if mode == "rcc":
+    gui_main.register_theme_resources(theme)
+else:
+    importlib.import_module(f"NeuroRuler.GUI.themes.{theme}.resources")
+resources = time.time() - start
+
+app = QApplication(sys.argv[:1])
+window = gui_main.MainWindow()
+with open(constants.THEME_DIR / theme / "stylesheet.qss", "r") as f:
+    window.setStyleSheet(f.read())
+window.setMinimumSize(QSize(1, 1))
+window.resize(
+    int(settings.STARTUP_WIDTH_RATIO * constants.PRIMARY_MONITOR_DIMENSIONS[0]),
+    int(settings.STARTUP_HEIGHT_RATIO * constants.PRIMARY_MONITOR_DIMENSIONS[1]),
+)
+window.show()
+
+
+def report():
+    print(json.dumps({"shown": time.time(), "resources": resources}))
+    app.quit()
+
+
+QTimer.singleShot(0, report)
+app.exec()
+"""
+
+
+def run_once(mode: str, theme: str) -> tuple[float, float]:
+    """:return: (seconds from launch to window shown, seconds spent loading resources)"""
+    if mode == "py-cold":
+        shutil.rmtree(
+            REPO_ROOT / "NeuroRuler" / "GUI" / "themes" / theme / "__pycache__",
+            ignore_errors=True,
+        )
+    env: dict[str, str] = dict(os.environ)
+    env["PYTHONPATH"] = str(REPO_ROOT)
+    # Otherwise "py" would recompile resources.py every run, same as "py-cold"
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    if (
+        "DISPLAY" not in env
+        and "WAYLAND_DISPLAY" not in env
+        and sys.platform.startswith("linux")
+    ):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    launched: float = time.time()
+    output: str = subprocess.run(
+        [sys.executable, "-c", CHILD, "py" if mode == "py-cold" else mode, theme],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    result: dict = json.loads(output.strip().splitlines()[-1])
+    return result["shown"] - launched, result["resources"]
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--theme", default="dark-nr")
+    args = arg_parser.parse_args()
+
+    # Warm the OS file cache and bytecode caches of everything else
+    run_once("py", args.theme)
+    run_once("rcc", args.theme)
+    for mode in MODES:
+        results: list[tuple[float, float]] = [
+            run_once(mode, args.theme) for _ in range(args.runs)
+        ]
+        print(
+            f"{mode:>8}: first window shown after {1000 * statistics.median(r[0] for r in results):.0f} ms "
+            f"(median of {args.runs}), loading resources took {1000 * statistics.median(r[1] for r in results):.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
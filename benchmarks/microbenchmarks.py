@@ -0,0 +1,407 @@
+"""Microbenchmarks of the core image processing functions and GUI helpers, with stored baselines.
+
+Times ``update_images``, ``get_curr_rotated_slice``, ``imgproc.contour``, ``imgproc.select_largest_component``,
+``imgproc.length_of_contour_with_spacing``, ``sitk_slice_to_qimage``, and ``mask_QImage`` on scans in ``data/``.
+Each benchmark has two variants:
+
+- ``warm``: the inputs are prepared once and the function is called once before timing, so buffers are reused
+  and caches (e.g. the decoded volume cache for ``update_images``) are populated.
+- ``cold``: the inputs are prepared again before every call, reusable buffers are dropped, the decoded volume cache
+  starts empty, and the CPU caches are flushed by writing a large buffer. The OS file cache isn't dropped.
+
+SimpleITK and OpenCV are pinned to ``--threads`` threads (default 1), so results don't depend on the load
+of the machine's other cores. Results are keyed by machine (CPU model, core count, OS, and library versions,
+see ``machine_key``) since timings from different machines can't be compared.
+
+Run from the repository root::
+
+    python benchmarks/microbenchmarks.py run [--threads N] [--repeats N] [--filter NAME] [--save-baseline] [images...]
+    python benchmarks/microbenchmarks.py compare output/microbenchmarks_<machine>_<time>.json [--baseline FILE]
+
+``run`` writes the samples to ``output/``, and with ``--save-baseline`` also to
+``benchmarks/baselines/<machine>.json``. ``compare`` checks each benchmark against the baseline of the same machine
+with a one-sided Mann-Whitney U test and exits with status 1 if any is significantly slower
+(p < ``--alpha``) by more than ``--min-slowdown``.
+
+Uses the offscreen Qt platform if there's no display."""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, NamedTuple
+
+REPO_ROOT: Path = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+if sys.platform.startswith("linux") and not (
+    os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")
+):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+import SimpleITK as sitk  # noqa: E402
+from PyQt6.QtGui import QColor, QGuiApplication, QImage  # noqa: E402
+
+import NeuroRuler.utils.global_vars as global_vars  # noqa: E402
+import NeuroRuler.utils.imgproc as imgproc  # noqa: E402
+from NeuroRuler.GUI.helpers import (  # noqa: E402
+    evict_display_buffers,
+    mask_QImage,
+    sitk_slice_to_qimage,
+)
+from NeuroRuler.utils.constants import ThresholdFilter  # noqa: E402
+from NeuroRuler.utils.img_helpers import (  # noqa: E402
+    get_curr_rotated_slice,
+    initialize_globals,
+    update_images,
+)
+from NeuroRuler.utils.profiling import environment  # noqa: E402
+
+DEFAULT_IMAGES: list[Path] = sorted((REPO_ROOT / "data").glob("*.nrrd"))[:3]
+BASELINE_DIR: Path = REPO_ROOT / "benchmarks" / "baselines"
+OUTPUT_DIR: Path = REPO_ROOT / "output"
+VARIANTS: tuple[str, ...] = ("cold", "warm")
+CACHE_FLUSH_BYTES: int = 64 * 1024 * 1024
+"""Larger than the last-level cache of current CPUs"""
+DEFAULT_ALPHA: float = 0.01
+DEFAULT_MIN_SLOWDOWN: float = 0.05
+"""Slowdowns of the median smaller than this (5%) aren't flagged even if they're significant"""
+
+_FLUSH_BUFFER: np.ndarray = np.zeros(CACHE_FLUSH_BYTES, dtype=np.uint8)
+_CACHE_DIRS: list[Path] = []
+"""Decoded volume cache directories created by ``setup_update_images``, deleted after running"""
+
+
+def cpu_model() -> str:
+    """:return: CPU model name, e.g. from ``/proc/cpuinfo`` on Linux"""
+    cpuinfo: Path = Path("/proc/cpuinfo")
+    if cpuinfo.exists():
+        for line in cpuinfo.read_text().splitlines():
+            if line.startswith("model name"):
+                return line.partition(":")[2].strip()
+    return platform.processor() or platform.machine()
+
+
+def machine_description() -> dict[str, Any]:
+    """:return: Everything about this machine that affects timings"""
+    return {
+        **environment(),
+        "cpu": cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+    }
+
+
+def machine_key(description: dict[str, Any]) -> str:
+    """:return: File-name-safe key of a machine, e.g. ``Linux-x86_64-8cpu-1a2b3c4d``"""
+    digest: str = hashlib.sha1(
+        json.dumps(description, sort_keys=True).encode()
+    ).hexdigest()[:8]
+    return f"{platform.system()}-{platform.machine()}-{description['cpu_count']}cpu-{digest}"
+
+
+def pin_threads(threads: int) -> None:
+    sitk.ProcessObject.SetGlobalDefaultNumberOfThreads(threads)
+    cv2.setNumThreads(threads)
+
+
+def flush_cpu_caches() -> None:
+    np.add(_FLUSH_BUFFER, 1, out=_FLUSH_BUFFER)
+
+
+def display_path(path: Path) -> str:
+    return (
+        str(path.relative_to(REPO_ROOT))
+        if path.is_relative_to(REPO_ROOT)
+        else str(path)
+    )
+
+
+def rotated_slice(path: Path) -> sitk.Image:
+    """Load ``path`` into the global variables and return a rotated slice like the GUI's."""
+    initialize_globals([path])
+    global_vars.THETA_X = 10
+    global_vars.THETA_Z = -5
+    return get_curr_rotated_slice()
+
+
+def binary_slice(img_2d: sitk.Image) -> sitk.Image:
+    """The input of ``select_largest_component`` in ``imgproc.contour`` with Otsu."""
+    thresholded: sitk.Image = sitk.OtsuThreshold(
+        global_vars.SMOOTHING_FILTER.Execute(sitk.Cast(img_2d, sitk.sitkFloat64))
+    )
+    return sitk.Not(sitk.BinaryGrindPeak(thresholded))
+
+
+def setup_update_images(path: Path, variant: str) -> Callable[[], Any]:
+    # A new cache directory per setup, so cold calls decode the file and warm calls read the decoded volume
+    cache_dir: Path = Path(tempfile.mkdtemp(prefix="microbenchmarks_"))
+    _CACHE_DIRS.append(cache_dir)
+    global_vars.VOLUME_CACHE_DIR = cache_dir
+    global_vars.IMAGE_DICT.clear()
+    global_vars.HISTOGRAM_DICT.clear()
+    return lambda: update_images([path])
+
+
+def setup_rotated_slice(path: Path, variant: str) -> Callable[[], Any]:
+    rotated_slice(path)
+    return get_curr_rotated_slice
+
+
+def setup_contour(path: Path, variant: str) -> Callable[[], Any]:
+    img_2d: sitk.Image = rotated_slice(path)
+    return lambda: imgproc.contour(img_2d, ThresholdFilter.Otsu)
+
+
+def setup_select_largest_component(path: Path, variant: str) -> Callable[[], Any]:
+    binary: sitk.Image = binary_slice(rotated_slice(path))
+    return lambda: imgproc.select_largest_component(binary)
+
+
+def setup_length_of_contour(path: Path, variant: str) -> Callable[[], Any]:
+    contour: np.ndarray = np.array(imgproc.contour(rotated_slice(path)))
+    spacing: tuple[float, ...] = global_vars.IMAGE_DICT[path].GetSpacing()
+    return lambda: imgproc.length_of_contour_with_spacing(
+        contour, spacing[0], spacing[1]
+    )
+
+
+def setup_sitk_slice_to_qimage(path: Path, variant: str) -> Callable[[], Any]:
+    img_2d: sitk.Image = rotated_slice(path)
+    if variant == "cold":
+        # Allocate the QImage and normalization buffers again
+        evict_display_buffers(sys.maxsize)
+    return lambda: sitk_slice_to_qimage(img_2d)
+
+
+def setup_mask_qimage(path: Path, variant: str) -> Callable[[], Any]:
+    img_2d: sitk.Image = rotated_slice(path)
+    contour: np.ndarray = np.array(imgproc.contour(img_2d))
+    q_img: QImage = sitk_slice_to_qimage(img_2d).copy()
+    color: QColor = QColor(255, 0, 0)
+    return lambda: mask_QImage(q_img, contour, color)
+
+
+class Benchmark(NamedTuple):
+    name: str
+    setup: Callable[[Path, str], Callable[[], Any]]
+    """Given an image path and variant, prepares the inputs and returns the function to time"""
+
+
+BENCHMARKS: tuple[Benchmark, ...] = (
+    Benchmark("update_images", setup_update_images),
+    Benchmark("get_curr_rotated_slice", setup_rotated_slice),
+    Benchmark("contour", setup_contour),
+    Benchmark("select_largest_component", setup_select_largest_component),
+    Benchmark("length_of_contour_with_spacing", setup_length_of_contour),
+    Benchmark("sitk_slice_to_qimage", setup_sitk_slice_to_qimage),
+    Benchmark("mask_QImage", setup_mask_qimage),
+)
+
+
+def time_call(function: Callable[[], Any]) -> float:
+    """:return: Duration of ``function()`` in milliseconds"""
+    start: float = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+def run_benchmark(
+    benchmark: Benchmark, variant: str, images: list[Path], repeats: int
+) -> list[float]:
+    """:return: ``repeats`` durations in milliseconds per image"""
+    samples: list[float] = []
+    for path in images:
+        if variant == "cold":
+            for _ in range(repeats):
+                function: Callable[[], Any] = benchmark.setup(path, variant)
+                flush_cpu_caches()
+                samples.append(time_call(function))
+        else:
+            function = benchmark.setup(path, variant)
+            function()
+            samples.extend(time_call(function) for _ in range(repeats))
+    return samples
+
+
+def summarize(samples: list[float]) -> dict[str, Any]:
+    quartiles: list[float] = statistics.quantiles(samples, n=4)
+    return {
+        "median_ms": round(statistics.median(samples), 4),
+        "iqr_ms": round(quartiles[2] - quartiles[0], 4),
+        "samples_ms": [round(sample, 4) for sample in samples],
+    }
+
+
+def mann_whitney_greater(current: list[float], baseline: list[float]) -> float:
+    """One-sided Mann-Whitney U test with the normal approximation and tie correction.
+
+    :return: p-value of the null hypothesis that ``current`` isn't stochastically greater (slower) than ``baseline``
+    """
+    n1, n2 = len(current), len(baseline)
+    combined: np.ndarray = np.concatenate([current, baseline])
+    order: np.ndarray = np.argsort(combined, kind="mergesort")
+    ranks: np.ndarray = np.empty(len(combined))
+    ranks[order] = np.arange(1, len(combined) + 1)
+    # Average the ranks of ties
+    _, inverse, counts = np.unique(combined, return_inverse=True, return_counts=True)
+    ranks = (np.bincount(inverse, weights=ranks) / counts)[inverse]
+    u: float = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    n: int = n1 + n2
+    tie_term: float = float((counts**3 - counts).sum()) / (n * (n - 1))
+    sigma: float = math.sqrt(n1 * n2 / 12 * (n + 1 - tie_term))
+    if sigma == 0:
+        return 1.0
+    # Continuity correction
+    z: float = (u - n1 * n2 / 2 - 0.5) / sigma
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def run(args: argparse.Namespace) -> None:
+    pin_threads(args.threads)
+    QGuiApplication(sys.argv[:1])
+    description: dict[str, Any] = machine_description()
+    key: str = machine_key(description)
+    results: dict[str, Any] = {
+        "machine": key,
+        "description": description,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "threads": args.threads,
+        "repeats": args.repeats,
+        "images": [display_path(path) for path in args.images],
+        "benchmarks": {},
+    }
+    volume_cache_dir = global_vars.VOLUME_CACHE_DIR
+    print(f"Machine {key}, {args.threads} thread(s), {len(args.images)} image(s)")
+    print(f"{'benchmark':<44} {'median ms':>10} {'IQR ms':>9}")
+    try:
+        for benchmark in BENCHMARKS:
+            if args.filter and args.filter not in benchmark.name:
+                continue
+            for variant in VARIANTS:
+                name: str = f"{benchmark.name}[{variant}]"
+                summary: dict[str, Any] = summarize(
+                    run_benchmark(benchmark, variant, args.images, args.repeats)
+                )
+                global_vars.VOLUME_CACHE_DIR = volume_cache_dir
+                results["benchmarks"][name] = summary
+                print(
+                    f"{name:<44} {summary['median_ms']:>10.3f} {summary['iqr_ms']:>9.3f}"
+                )
+    finally:
+        for cache_dir in _CACHE_DIRS:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        global_vars.VOLUME_CACHE_DIR = volume_cache_dir
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    output: Path = args.output or (
+        OUTPUT_DIR
+        / f"microbenchmarks_{key}_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.write_text(json.dumps(results, indent=4))
+    print(f"Results: {output}")
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(parents=True, exist_ok=True)
+        baseline: Path = BASELINE_DIR / f"{key}.json"
+        baseline.write_text(json.dumps(results, indent=4))
+        print(f"Baseline: {baseline}")
+
+
+def compare(args: argparse.Namespace) -> None:
+    current: dict[str, Any] = json.loads(args.results.read_text())
+    baseline_path: Path = args.baseline or BASELINE_DIR / f"{current['machine']}.json"
+    if not baseline_path.exists():
+        print(f"No baseline {baseline_path}. Save one with run --save-baseline.")
+        exit(2)
+    baseline: dict[str, Any] = json.loads(baseline_path.read_text())
+    if baseline["machine"] != current["machine"]:
+        print(
+            f"Warning: comparing results of {current['machine']} with a baseline of {baseline['machine']}"
+        )
+    if baseline["threads"] != current["threads"]:
+        print(
+            f"Baseline used {baseline['threads']} thread(s) but results used {current['threads']}. Exiting."
+        )
+        exit(2)
+
+    slower: list[str] = []
+    print(
+        f"{'benchmark':<44} {'baseline ms':>11} {'current ms':>11} {'change':>8} {'p':>8}"
+    )
+    for name, result in current["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            print(f"{name:<44} {'(new)':>11}")
+            continue
+        reference: dict[str, Any] = baseline["benchmarks"][name]
+        change: float = result["median_ms"] / reference["median_ms"] - 1
+        p: float = mann_whitney_greater(result["samples_ms"], reference["samples_ms"])
+        flagged: bool = p < args.alpha and change > args.min_slowdown
+        if flagged:
+            slower.append(name)
+        print(
+            f"{name:<44} {reference['median_ms']:>11.3f} {result['median_ms']:>11.3f} "
+            f"{change:>+8.1%} {p:>8.4f}{'  SLOWER' if flagged else ''}"
+        )
+    if slower:
+        print(f"\n{len(slower)} significant slowdown(s): {', '.join(slower)}")
+        exit(1)
+    print("\nNo significant slowdowns")
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    subparsers = arg_parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("images", nargs="*", type=Path, default=DEFAULT_IMAGES)
+    run_parser.add_argument(
+        "--threads", type=int, default=1, help="SimpleITK and OpenCV threads"
+    )
+    run_parser.add_argument(
+        "--repeats", type=int, default=10, help="timed calls per image and variant"
+    )
+    run_parser.add_argument(
+        "--filter", help="only run benchmarks whose name contains this"
+    )
+    run_parser.add_argument("-o", "--output", type=Path, help="results JSON file")
+    run_parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="also save the results as this machine's baseline",
+    )
+    run_parser.set_defaults(function=run)
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="compare results with a baseline"
+    )
+    compare_parser.add_argument("results", type=Path, help="results JSON file of run")
+    compare_parser.add_argument(
+        "--baseline",
+        type=Path,
+        help="defaults to benchmarks/baselines/<machine of results>.json",
+    )
+    compare_parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA)
+    compare_parser.add_argument(
+        "--min-slowdown", type=float, default=DEFAULT_MIN_SLOWDOWN
+    )
+    compare_parser.set_defaults(function=compare)
+
+    args = arg_parser.parse_args()
+    if args.command == "run":
+        args.images = [path.resolve() for path in args.images]
+    args.function(args)
+
+
+if __name__ == "__main__":
+    main()
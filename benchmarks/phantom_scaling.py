@@ -0,0 +1,238 @@
+"""Scaling and accuracy benchmark on synthetic head phantoms (``NeuroRuler.utils.phantom``).
+
+For each size, generates a phantom with a 256 mm field of view (or ``--spacing``), then
+
+- runs the microbenchmarks of ``benchmarks/microbenchmarks.py`` on it,
+- measures its circumference with ``NeuroRuler.measure`` at several rotations and slices and compares each with
+  the exact circumference, and
+- records the peak memory (RSS) of the process.
+
+Each size runs in its own process so the peak memory of one size doesn't hide the next one's.
+Prints a table, writes the results to ``output/``, and with ``--chart`` (needs matplotlib) plots time, memory,
+and measurement error against voxel count.
+
+Run from the repository root::
+
+    python benchmarks/phantom_scaling.py [--sizes 128 256 384 512] [--spacing X Y Z] [--repeats N] [--chart FILE]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Union
+
+import microbenchmarks
+from microbenchmarks import REPO_ROOT, OUTPUT_DIR
+
+import SimpleITK as sitk
+from PyQt6.QtGui import QGuiApplication
+
+import NeuroRuler
+import NeuroRuler.utils.phantom as phantom
+from NeuroRuler.utils.constants import View
+from NeuroRuler.utils.img_helpers import get_middle_dimension
+from NeuroRuler.utils.memory import peak_rss_bytes
+
+DEFAULT_SIZES: list[int] = [128, 256, 384, 512]
+ERROR_THETAS: tuple[tuple[int, int, int], ...] = (
+    (0, 0, 0),
+    (10, 0, 5),
+    (0, -8, 0),
+    (15, 10, -10),
+)
+ERROR_SLICE_OFFSETS_MM: tuple[float, ...] = (-20.0, 0.0, 20.0)
+"""Offsets of the measured slices from the middle slice"""
+
+
+def measurement_errors(generated: phantom.Phantom) -> list[float]:
+    """:return: Relative error of ``NeuroRuler.measure`` for each rotation in ``ERROR_THETAS`` and slice offset"""
+    z_spacing: float = generated.image.GetSpacing()[2]
+    middle: int = get_middle_dimension(generated.image, View.Z)
+    errors: list[float] = []
+    for theta in ERROR_THETAS:
+        for offset in ERROR_SLICE_OFFSETS_MM:
+            slice_num: int = middle + round(offset / z_spacing)
+            measured: float = NeuroRuler.measure(
+                generated.image, theta=theta, slice=slice_num
+            ).circumference
+            expected: float = phantom.circumference(generated, theta, slice_num)
+            errors.append(measured / expected - 1)
+    return errors
+
+
+def run_size(
+    size: int, spacing: Union[tuple[float, float, float], None], repeats: int
+) -> dict[str, Any]:
+    """Benchmark one phantom size in this process."""
+    start: float = time.perf_counter()
+    generated: phantom.Phantom = phantom.generate((size, size, size), spacing)
+    generate_seconds: float = time.perf_counter() - start
+
+    result: dict[str, Any] = {
+        "size": size,
+        "voxels": size**3,
+        "spacing": list(generated.image.GetSpacing()),
+        "generate_seconds": round(generate_seconds, 3),
+        "benchmarks": {},
+    }
+    errors: list[float] = measurement_errors(generated)
+    result["errors"] = [round(error, 5) for error in errors]
+    result["mean_abs_error"] = round(statistics.mean(map(abs, errors)), 5)
+    result["max_abs_error"] = round(max(map(abs, errors)), 5)
+
+    with tempfile.TemporaryDirectory(prefix="phantom_scaling_") as directory:
+        # A compressed file, like the scans, so update_images decodes it
+        path: Path = Path(directory) / f"phantom_{size}.nrrd"
+        sitk.WriteImage(generated.image, str(path), useCompression=True)
+        del generated
+        QGuiApplication(sys.argv[:1])
+        for benchmark in microbenchmarks.BENCHMARKS:
+            samples: list[float] = microbenchmarks.run_benchmark(
+                benchmark, "warm", [path], repeats
+            )
+            result["benchmarks"][benchmark.name] = round(statistics.median(samples), 4)
+    result["peak_rss_mb"] = round((peak_rss_bytes() or 0) / 1024**2, 1)
+    return result
+
+
+def chart(results: list[dict[str, Any]], path: Path) -> None:
+    try:
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print(
+            "matplotlib isn't installed, so no chart was made. The results JSON has the same data."
+        )
+        return
+    voxels: list[int] = [result["voxels"] for result in results]
+    figure, (time_axes, memory_axes, error_axes) = plt.subplots(1, 3, figsize=(18, 5))
+    for name in results[0]["benchmarks"]:
+        time_axes.loglog(
+            voxels, [result["benchmarks"][name] for result in results], "o-", label=name
+        )
+    time_axes.set(xlabel="voxels", ylabel="median ms (warm)", title="Time")
+    time_axes.legend(fontsize="small")
+    memory_axes.loglog(voxels, [result["peak_rss_mb"] for result in results], "o-")
+    memory_axes.set(xlabel="voxels", ylabel="peak RSS (MB)", title="Memory")
+    error_axes.semilogx(
+        voxels,
+        [100 * result["mean_abs_error"] for result in results],
+        "o-",
+        label="mean",
+    )
+    error_axes.semilogx(
+        voxels, [100 * result["max_abs_error"] for result in results], "o-", label="max"
+    )
+    error_axes.set(
+        xlabel="voxels", ylabel="|relative error| (%)", title="Measurement error"
+    )
+    error_axes.legend()
+    figure.tight_layout()
+    figure.savefig(path)
+    print(f"Chart: {path}")
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    arg_parser.add_argument(
+        "--spacing",
+        type=float,
+        nargs=3,
+        help="(x, y, z) spacing in mm. Defaults to a 256 mm field of view.",
+    )
+    arg_parser.add_argument("--threads", type=int, default=1)
+    arg_parser.add_argument(
+        "--repeats", type=int, default=5, help="timed calls per benchmark"
+    )
+    arg_parser.add_argument("--chart", type=Path, help="PNG file of the chart")
+    # Internal: benchmark one size and print its results as JSON
+    arg_parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+    spacing: Union[tuple[float, float, float], None] = (
+        None if args.spacing is None else tuple(args.spacing)
+    )
+
+    if args.child is not None:
+        microbenchmarks.pin_threads(args.threads)
+        print(json.dumps(run_size(args.child, spacing, args.repeats)))
+        return
+
+    description: dict[str, Any] = microbenchmarks.machine_description()
+    key: str = microbenchmarks.machine_key(description)
+    results: list[dict[str, Any]] = []
+    print(f"Machine {key}, {args.threads} thread(s)")
+    print(
+        f"{'size':>5} {'voxels':>12} {'generate s':>11} {'peak MB':>9} {'mean |err|':>11} {'max |err|':>10}"
+    )
+    for size in args.sizes:
+        command: list[str] = [
+            sys.executable,
+            __file__,
+            "--child",
+            str(size),
+            "--threads",
+            str(args.threads),
+            "--repeats",
+            str(args.repeats),
+        ]
+        if spacing is not None:
+            command += ["--spacing", *map(str, spacing)]
+        child: subprocess.CompletedProcess = subprocess.run(
+            command, capture_output=True, text=True, cwd=REPO_ROOT
+        )
+        if child.returncode != 0:
+            # e.g. the head doesn't fit in the field of view with --spacing
+            print(f"{size:>5} failed: {child.stderr.strip().splitlines()[-1]}")
+            continue
+        result: dict[str, Any] = json.loads(child.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print(
+            f"{size:>5} {result['voxels']:>12} {result['generate_seconds']:>11.2f} {result['peak_rss_mb']:>9.0f} "
+            f"{result['mean_abs_error']:>11.2%} {result['max_abs_error']:>10.2%}"
+        )
+
+    if not results:
+        exit(1)
+    print(
+        f"\nMedian ms (warm) by size\n{'benchmark':<32}"
+        + "".join(f"{result['size']:>10}" for result in results)
+    )
+    for name in results[0]["benchmarks"]:
+        print(
+            f"{name:<32}"
+            + "".join(f"{result['benchmarks'][name]:>10.2f}" for result in results)
+        )
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    path: Path = (
+        OUTPUT_DIR
+        / f"phantom_scaling_{key}_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    path.write_text(
+        json.dumps(
+            {
+                "machine": key,
+                "description": description,
+                "threads": args.threads,
+                "repeats": args.repeats,
+                "results": results,
+            },
+            indent=4,
+        )
+    )
+    print(f"\nResults: {path}")
+    if args.chart is not None:
+        chart(results, args.chart)
+
+
+if __name__ == "__main__":
+    main()
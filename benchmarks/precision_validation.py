@@ -0,0 +1,97 @@
+"""Validate float32 processing against the float64 reference.
+
+Measures every image with both ``Precision`` values and the same settings, then reports each circumference delta
+and the speedup of the smoothing and threshold step (``Timings.contour``), which is the step precision affects.
+Exits with status 1 if any relative delta exceeds ``--max-relative-delta``, so it can gate adopting float32
+in batch runs.
+
+Run from the repository root::
+
+    python benchmarks/precision_validation.py [--max-relative-delta 0.001] [--repeats N] [images...]
+
+By default, measures every ``data/*.nrrd`` with Otsu and default smoothing at the middle slice."""
+
+import argparse
+import statistics
+import sys
+from pathlib import Path
+
+REPO_ROOT: Path = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import SimpleITK as sitk  # noqa: E402
+
+import NeuroRuler.utils.exceptions as exceptions  # noqa: E402
+from NeuroRuler.utils.api import Measurement, measure  # noqa: E402
+from NeuroRuler.utils.constants import Precision  # noqa: E402
+from NeuroRuler.utils.img_helpers import read_z_oriented_image  # noqa: E402
+
+DEFAULT_IMAGES: list[Path] = sorted((REPO_ROOT / "data").glob("*.nrrd"))
+DEFAULT_MAX_RELATIVE_DELTA: float = 0.001
+"""0.1%, i.e. about 0.4 mm on a 400 mm head circumference"""
+
+
+def best_of(img: sitk.Image, precision: Precision, repeats: int) -> Measurement:
+    """Measure ``repeats`` times and return the measurement with the fastest contour step."""
+    results: list[Measurement] = [
+        measure(img, precision=precision) for _ in range(repeats)
+    ]
+    return min(results, key=lambda result: result.timings.contour)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    arg_parser.add_argument("images", nargs="*", type=Path, default=DEFAULT_IMAGES)
+    arg_parser.add_argument(
+        "--max-relative-delta", type=float, default=DEFAULT_MAX_RELATIVE_DELTA
+    )
+    arg_parser.add_argument(
+        "--repeats", type=int, default=3, help="timing runs per image and precision"
+    )
+    args = arg_parser.parse_args()
+
+    relative_deltas: list[float] = []
+    speedups: list[float] = []
+    failures: list[str] = []
+    print(f"{'image':<44} {'float64':>10} {'float32':>10} {'delta':>9} {'speedup':>8}")
+    for path in args.images:
+        # Read once so only the filters are compared
+        img: sitk.Image = read_z_oriented_image(path)
+        try:
+            reference: Measurement = best_of(img, Precision.Float64, args.repeats)
+        except exceptions.ComputeCircumferenceOfInvalidSlice:
+            print(f"{path.name:<44} invalid slice, skipped")
+            continue
+        try:
+            fast: Measurement = best_of(img, Precision.Float32, args.repeats)
+        except exceptions.ComputeCircumferenceOfInvalidSlice:
+            failures.append(f"{path.name}: valid slice with float64 but not float32")
+            print(f"{path.name:<44} {reference.circumference:>10.3f} {'invalid':>10}")
+            continue
+        delta: float = fast.circumference - reference.circumference
+        relative_deltas.append(abs(delta) / reference.circumference)
+        speedups.append(reference.timings.contour / fast.timings.contour)
+        if relative_deltas[-1] > args.max_relative_delta:
+            failures.append(f"{path.name}: relative delta {relative_deltas[-1]:.2e}")
+        print(
+            f"{path.name:<44} {reference.circumference:>10.3f} {fast.circumference:>10.3f} "
+            f"{delta:>+9.4f} {speedups[-1]:>7.2f}x"
+        )
+
+    if relative_deltas:
+        print(
+            f"\n{len(relative_deltas)} images: max relative delta {max(relative_deltas):.2e}, "
+            f"median {statistics.median(relative_deltas):.2e}; "
+            f"contour step speedup median {statistics.median(speedups):.2f}x"
+        )
+    if failures:
+        print(
+            f"\nExceeded max relative delta {args.max_relative_delta:.0e} or changed validity:"
+        )
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Allocation benchmark of the slice -> contour -> QImage -> QPixmap path used by ``render_curr_slice``.
+
+Compares the current path with the previous one, which copied the slice and contour out of SimpleITK,
+built a new QImage per render, masked it pixel by pixel, and converted the full-size QImage to a QPixmap.
+
+For each render, reports the peak memory allocated by Python and numpy on top of what was allocated before
+the render (``tracemalloc``), in bytes and in slice-sized buffers. SimpleITK's and Qt's own allocations
+aren't visible to ``tracemalloc``, so the filters themselves aren't counted.
+
+Run from the repository root::
+
+    python benchmarks/render_allocations.py [--renders N] [image]
+
+Uses the offscreen Qt platform if there's no display."""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+REPO_ROOT: Path = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+if sys.platform.startswith("linux") and not (
+    os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")
+):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np  # noqa: E402
+import SimpleITK as sitk  # noqa: E402
+from PyQt6.QtCore import QSize, Qt  # noqa: E402
+from PyQt6.QtGui import QColor, QImage, QPixmap  # noqa: E402
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+import qimage2ndarray  # noqa: E402
+
+from NeuroRuler.GUI.helpers import mask_QImage, sitk_slice_to_qimage  # noqa: E402
+from NeuroRuler.utils.api import Smoothing  # noqa: E402
+from NeuroRuler.utils.constants import ThresholdFilter, View  # noqa: E402
+from NeuroRuler.utils.img_helpers import (  # noqa: E402
+    get_middle_dimension,
+    read_z_oriented_image,
+)
+from NeuroRuler.utils.prefetch import (
+    ContourSettings,
+    contour_with_settings,
+)  # noqa: E402
+
+DEFAULT_IMAGE: Path = REPO_ROOT / "data" / "IBIS_Case1_V06_t1w_RAI.nrrd"
+DISPLAY_SIZE: QSize = QSize(800, 600)
+COLOR: QColor = QColor(255, 0, 0)
+CONTOUR_SETTINGS: ContourSettings = ContourSettings(
+    ThresholdFilter.Otsu, *Smoothing(), 0.0, 0.0
+)
+
+
+def legacy_render(rotated_slice: sitk.Image) -> QPixmap:
+    """The path before it was made copy-free."""
+    q_img: QImage = qimage2ndarray.array2qimage(
+        sitk.GetArrayFromImage(rotated_slice), normalize=True
+    )
+    # Copies the contour out of SimpleITK, like imgproc.contour by default
+    binary_contour: np.ndarray = contour_with_settings(rotated_slice, CONTOUR_SETTINGS)
+    mask: np.ndarray = np.transpose(binary_contour)
+    for i in range(mask.shape[0]):
+        for j in range(mask.shape[1]):
+            if mask[i][j]:
+                q_img.setPixelColor(i, j, COLOR)
+    unscaled: QPixmap = QPixmap(q_img)
+    return unscaled.scaled(
+        DISPLAY_SIZE,
+        aspectRatioMode=Qt.AspectRatioMode.KeepAspectRatio,
+        transformMode=Qt.TransformationMode.SmoothTransformation,
+    )
+
+
+def current_render(rotated_slice: sitk.Image) -> QPixmap:
+    """The path used by ``render_curr_slice`` and ``render_scaled_qpixmap_from_qimage``."""
+    q_img: QImage = sitk_slice_to_qimage(rotated_slice)
+    mask_QImage(
+        q_img,
+        contour_with_settings(rotated_slice, CONTOUR_SETTINGS, writable=False),
+        COLOR,
+    )
+    return QPixmap.fromImage(
+        q_img.scaled(
+            DISPLAY_SIZE,
+            aspectRatioMode=Qt.AspectRatioMode.KeepAspectRatio,
+            transformMode=Qt.TransformationMode.SmoothTransformation,
+        )
+    )
+
+
+def measure(
+    render: Callable[[sitk.Image], QPixmap], slices: list[sitk.Image]
+) -> tuple[list[int], list[float]]:
+    """:return: (peak bytes allocated during each render, seconds per render)"""
+    render(slices[0])  # Warm up, e.g. allocate reusable buffers
+    peaks: list[int] = []
+    times: list[float] = []
+    for rotated_slice in slices:
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        start: float = time.perf_counter()
+        pixmap: QPixmap = render(rotated_slice)
+        times.append(time.perf_counter() - start)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak - before)
+        del pixmap
+    return peaks, times
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    arg_parser.add_argument("image", nargs="?", type=Path, default=DEFAULT_IMAGE)
+    arg_parser.add_argument("--renders", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    app: QApplication = QApplication(sys.argv[:1])
+    img: sitk.Image = read_z_oriented_image(args.image)
+    middle: int = get_middle_dimension(img, View.Z)
+    # Consecutive slices, like scrolling through the image
+    slices: list[sitk.Image] = [
+        img[:, :, middle + i - args.renders // 2] for i in range(args.renders)
+    ]
+    slice_bytes: int = (
+        slices[0].GetNumberOfPixels() * slices[0].GetSizeOfPixelComponent()
+    )
+    print(
+        f"{args.image.name}: {slices[0].GetWidth()}x{slices[0].GetHeight()} slices "
+        f"of {slice_bytes} bytes, {args.renders} renders"
+    )
+
+    for name, render in (("before", legacy_render), ("after", current_render)):
+        peaks, times = measure(render, slices)
+        peak: float = statistics.median(peaks)
+        print(
+            f"{name:>6}: peak {peak / 1024:.0f} KiB allocated per render "
+            f"({peak / slice_bytes:.1f} slice-sized buffers), "
+            f"{1000 * statistics.median(times):.1f} ms per render"
+        )
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Load test for ``neuroruler serve``.
+
+Sends measure requests from several concurrent clients and reports throughput and latency percentiles.
+With ``--compare-cli``, also times one-shot ``python cli.py`` invocations of the same files for comparison.
+
+Run from the repository root::
+
+    python benchmarks/serve_load_test.py --spawn --clients 4 --requests 200
+    python benchmarks/serve_load_test.py --port 8765 data/IBIS_Case1_V06_t1w_RAI.nrrd
+
+``--spawn`` starts a server on a free port and stops it afterward. Otherwise, a server must already be running."""
+
+import argparse
+import http.client
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Union
+
+REPO_ROOT: Path = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from NeuroRuler.CLI.client import (  # noqa: E402
+    DEFAULT_HOST,
+    DEFAULT_PORT,
+    connect,
+    send_request,
+)
+
+DEFAULT_FILES: list[Path] = sorted((REPO_ROOT / "data").glob("*_t1w.nrrd"))[:5]
+SPAWN_TIMEOUT_SECONDS: float = 60.0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind((DEFAULT_HOST, 0))
+        return s.getsockname()[1]
+
+
+def wait_until_healthy(
+    host: str, port: int, socket_path: Union[str, None], timeout: float
+) -> None:
+    deadline: float = time.monotonic() + timeout
+    while True:
+        connection: http.client.HTTPConnection = connect(
+            host, port, socket_path, timeout=5
+        )
+        try:
+            status, _ = send_request(connection, "GET", "/health")
+            if status == 200:
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+        finally:
+            connection.close()
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    return sorted_values[
+        min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    ]
+
+
+def run_load(
+    host: str,
+    port: int,
+    socket_path: Union[str, None],
+    files: list[Path],
+    num_clients: int,
+    num_requests: int,
+) -> None:
+    latencies: list[float] = []
+    errors: list[str] = []
+    lock: threading.Lock = threading.Lock()
+    next_request: list[int] = [0]
+
+    def client() -> None:
+        connection: http.client.HTTPConnection = connect(host, port, socket_path)
+        while True:
+            with lock:
+                i: int = next_request[0]
+                next_request[0] += 1
+            if i >= num_requests:
+                break
+            body: dict = {"path": str(files[i % len(files)])}
+            start: float = time.perf_counter()
+            status, response = send_request(connection, "POST", "/measure", body)
+            elapsed: float = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if status != 200:
+                    errors.append(response.get("error", str(status)))
+        connection.close()
+
+    threads: list[threading.Thread] = [
+        threading.Thread(target=client) for _ in range(num_clients)
+    ]
+    start: float = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall: float = time.perf_counter() - start
+
+    latencies.sort()
+    print(
+        f"{num_requests} requests, {num_clients} clients, {len(files)} distinct files"
+    )
+    print(f"  throughput: {num_requests / wall:.1f} requests/s ({wall:.2f} s total)")
+    print(
+        f"  latency ms: mean {1000 * statistics.mean(latencies):.1f}, "
+        f"p50 {1000 * percentile(latencies, 0.50):.1f}, "
+        f"p95 {1000 * percentile(latencies, 0.95):.1f}, "
+        f"p99 {1000 * percentile(latencies, 0.99):.1f}, "
+        f"max {1000 * latencies[-1]:.1f}"
+    )
+    print(f"  errors: {len(errors)}" + (f" (first: {errors[0]})" if errors else ""))
+
+
+def run_cli(files: list[Path], num_runs: int) -> None:
+    times: list[float] = []
+    for i in range(num_runs):
+        start: float = time.perf_counter()
+        subprocess.run(
+            [
+                sys.executable,
+                str(REPO_ROOT / "cli.py"),
+                "-r",
+                str(files[i % len(files)]),
+            ],
+            cwd=REPO_ROOT,
+            check=True,
+            capture_output=True,
+        )
+        times.append(time.perf_counter() - start)
+    print(f"{num_runs} sequential python cli.py invocations")
+    print(
+        f"  latency ms: mean {1000 * statistics.mean(times):.1f}, min {1000 * min(times):.1f}"
+    )
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    arg_parser.add_argument(
+        "files",
+        nargs="*",
+        type=Path,
+        default=DEFAULT_FILES,
+        help="images to measure, default is the first 5 data/*_t1w.nrrd",
+    )
+    arg_parser.add_argument("--host", default=DEFAULT_HOST)
+    arg_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    arg_parser.add_argument("--socket", help="Unix socket of the server")
+    arg_parser.add_argument(
+        "--spawn", action="store_true", help="start a server for the test"
+    )
+    arg_parser.add_argument(
+        "--workers", type=int, help="--workers of the spawned server"
+    )
+    arg_parser.add_argument("--clients", type=int, default=4)
+    arg_parser.add_argument("--requests", type=int, default=100)
+    arg_parser.add_argument(
+        "--compare-cli",
+        type=int,
+        default=0,
+        metavar="N",
+        help="also time N one-shot CLI invocations",
+    )
+    args = arg_parser.parse_args()
+    files: list[Path] = [path.resolve() for path in args.files]
+
+    server: Union[subprocess.Popen, None] = None
+    if args.spawn:
+        command: list[str] = [sys.executable, str(REPO_ROOT / "cli.py"), "serve"]
+        if args.socket is not None:
+            command += ["--socket", args.socket]
+        else:
+            args.port = free_port()
+            command += ["--host", args.host, "--port", str(args.port)]
+        if args.workers is not None:
+            command += ["--workers", str(args.workers)]
+        server = subprocess.Popen(command, cwd=REPO_ROOT, stdout=subprocess.DEVNULL)
+    try:
+        wait_until_healthy(
+            args.host,
+            args.port,
+            args.socket,
+            SPAWN_TIMEOUT_SECONDS if args.spawn else 0,
+        )
+        # Warm the server's image cache so the test measures steady state
+        run_load(args.host, args.port, args.socket, files, 1, len(files))
+        print()
+        run_load(args.host, args.port, args.socket, files, args.clients, args.requests)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.compare_cli:
+        print()
+        run_cli(files, args.compare_cli)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Validate and time ``slab.contour_slab`` against contouring each slice with ``prefetch.contour_with_settings``.
+
+For every image, rotates the volume once, takes a slab of slices around the middle slice, and contours it
+both ways with Otsu (float64 and float32), VolumeOtsu, and Binary thresholds (the volume's suggested
+thresholds). Reports the number of differing contour pixels, the largest circumference delta, and the
+speedup per slice. Exits with status 1 if any contour differs.
+
+Run from the repository root::
+
+    python benchmarks/slab_validation.py [--slices 16] [--theta 4 -3 0] [images...]
+
+By default, validates every ``data/*.nrrd``."""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT: Path = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import numpy as np  # noqa: E402
+import SimpleITK as sitk  # noqa: E402
+
+import NeuroRuler.utils.exceptions as exceptions  # noqa: E402
+import NeuroRuler.utils.imgproc as imgproc  # noqa: E402
+from NeuroRuler.utils.constants import (  # noqa: E402
+    Precision,
+    ThresholdFilter,
+    View,
+    degrees_to_radians,
+)
+from NeuroRuler.utils.histogram import (  # noqa: E402
+    compute_histogram,
+    suggest_binary_thresholds,
+)
+from NeuroRuler.utils.img_helpers import (  # noqa: E402
+    get_center_of_rotation,
+    get_middle_dimension,
+    get_rotated_slab,
+    read_z_oriented_image,
+)
+from NeuroRuler.utils.prefetch import (
+    ContourSettings,
+    contour_with_settings,
+)  # noqa: E402
+from NeuroRuler.utils.slab import contour_slab  # noqa: E402
+
+DEFAULT_IMAGES: list[Path] = sorted((REPO_ROOT / "data").glob("*.nrrd"))
+
+MODES: list[tuple[ThresholdFilter, Precision]] = [
+    (ThresholdFilter.Otsu, Precision.Float64),
+    (ThresholdFilter.Otsu, Precision.Float32),
+    (ThresholdFilter.VolumeOtsu, Precision.Float64),
+    (ThresholdFilter.Binary, Precision.Float64),
+]
+
+
+def circumference(binary_contour: np.ndarray, spacing: tuple) -> float:
+    """Circumference of a contoured slice, or 0 if it isn't a valid brain slice."""
+    try:
+        return imgproc.length_of_parent_contour_with_spacing(
+            imgproc.find_contours(binary_contour), spacing[0], spacing[1]
+        )
+    except exceptions.ComputeCircumferenceOfInvalidSlice:
+        return 0.0
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    arg_parser.add_argument("images", nargs="*", type=Path, default=DEFAULT_IMAGES)
+    arg_parser.add_argument("--slices", type=int, default=16, help="slices per slab")
+    arg_parser.add_argument(
+        "--theta",
+        type=int,
+        nargs=3,
+        default=[4, -3, 0],
+        help="(x, y, z) rotation in degrees",
+    )
+    args = arg_parser.parse_args()
+
+    # The first SimpleITK filter calls in a process are much slower (thread pool setup), so warm up first
+    contour_with_settings(
+        sitk.Image([64, 64], sitk.sitkFloat64),
+        ContourSettings(
+            ThresholdFilter.Otsu, 3.0, 5, 0.0625, 0.0, 0.0, Precision.Float64
+        ),
+    )
+
+    speedups: list[float] = []
+    failures: list[str] = []
+    print(
+        f"{'image':<34} {'mode':<19} {'pixels':>6} {'max delta':>10} "
+        f"{'per slice':>10} {'slab':>8} {'speedup':>8}"
+    )
+    for path in args.images:
+        img: sitk.Image = read_z_oriented_image(path)
+        transform: sitk.Euler3DTransform = sitk.Euler3DTransform()
+        transform.SetCenter(get_center_of_rotation(img))
+        transform.SetRotation(*(degrees_to_radians(theta) for theta in args.theta))
+        middle: int = get_middle_dimension(img, View.Z)
+        start: int = max(0, middle - args.slices // 2)
+        stop: int = min(img.GetSize()[View.Z.value], start + args.slices)
+        slab: sitk.Image = get_rotated_slab(img, transform, start, stop)
+        spacing: tuple = slab.GetSpacing()
+        lower, upper = suggest_binary_thresholds(compute_histogram(img))
+
+        for threshold_filter, precision in MODES:
+            mode: str = f"{threshold_filter.name} {precision.name}"
+            settings: ContourSettings = ContourSettings(
+                threshold_filter, 3.0, 5, 0.0625, lower, upper, precision
+            )
+            try:
+                begin: float = time.perf_counter()
+                reference: list[np.ndarray] = [
+                    contour_with_settings(slab[:, :, k], settings)
+                    for k in range(stop - start)
+                ]
+                per_slice: float = (time.perf_counter() - begin) / (stop - start)
+            except Exception as e:
+                # E.g., background color detection fails. The slab must fail the same way.
+                try:
+                    contour_slab(slab, settings)
+                    failures.append(
+                        f"{path.name} {mode}: per-slice raised {e!r}, slab didn't"
+                    )
+                except Exception:
+                    pass
+                print(f"{path.name:<34} {mode:<19} raised {type(e).__name__} both ways")
+                continue
+            begin = time.perf_counter()
+            contours: np.ndarray = contour_slab(slab, settings)
+            slab_time: float = (time.perf_counter() - begin) / (stop - start)
+
+            differing_pixels: int = sum(
+                int(np.count_nonzero(contours[k] != reference[k]))
+                for k in range(stop - start)
+            )
+            max_delta: float = max(
+                abs(
+                    circumference(contours[k], spacing)
+                    - circumference(reference[k], spacing)
+                )
+                for k in range(stop - start)
+            )
+            speedups.append(per_slice / slab_time)
+            if differing_pixels:
+                failures.append(
+                    f"{path.name} {mode}: {differing_pixels} contour pixels differ"
+                )
+            print(
+                f"{path.name:<34} {mode:<19} {differing_pixels:>6} {max_delta:>10.4f} "
+                f"{per_slice * 1000:>8.1f}ms {slab_time * 1000:>6.1f}ms {speedups[-1]:>7.2f}x"
+            )
+
+    if speedups:
+        print(
+            f"\n{len(speedups)} slabs of up to {args.slices} slices: "
+            f"speedup median {statistics.median(speedups):.2f}x, min {min(speedups):.2f}x"
+        )
+    if failures:
+        print("\nContours differ:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
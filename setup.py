@@ -41,6 +41,11 @@ setup(
         "PyQt6",
     ],
     install_requires=install_requires,
+    entry_points={
+        "console_scripts": [
+            "neuroruler = NeuroRuler.CLI:cli",
+        ],
+    },
     tests_require=install_requires + ["tox", "pytest", "pytest-cov"],
     # See https://setuptools.pypa.io/en/latest/userguide/package_discovery.html
     package_dir={"NeuroRuler": "NeuroRuler"},
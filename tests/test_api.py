@@ -0,0 +1,93 @@
+"""Test ``NeuroRuler.measure``, the global-free Python API in api.py."""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+import SimpleITK as sitk
+
+import NeuroRuler
+import NeuroRuler.utils.exceptions as exceptions
+import NeuroRuler.utils.global_vars as global_vars
+import NeuroRuler.utils.imgproc as imgproc
+from NeuroRuler.utils.constants import DATA_DIR, ThresholdFilter
+from NeuroRuler.utils.img_helpers import (
+    initialize_globals,
+    get_curr_image,
+    get_curr_rotated_slice,
+)
+
+IMAGE: Path = DATA_DIR / "IBIS_Case1_V06_t1w_RAI.nrrd"
+
+
+def test_measure_matches_global_pipeline():
+    result: NeuroRuler.Measurement = NeuroRuler.measure(
+        IMAGE, theta=(4, 0, 0), smoothing=NeuroRuler.Smoothing(conductance=2.0)
+    )
+
+    initialize_globals([IMAGE])
+    global_vars.THETA_X = 4
+    global_vars.SMOOTHING_FILTER.SetConductanceParameter(2.0)
+    try:
+        contour = imgproc.contour(get_curr_rotated_slice(), ThresholdFilter.Otsu)
+    finally:
+        global_vars.THETA_X = 0
+        global_vars.SMOOTHING_FILTER.SetConductanceParameter(
+            global_vars.CONDUCTANCE_PARAMETER
+        )
+    spacing: tuple = get_curr_image().GetSpacing()
+    assert result.circumference == imgproc.length_of_contour_with_spacing(
+        contour, spacing[0], spacing[1]
+    )
+    assert result.spacing == spacing[:2]
+    assert result.slice_num == global_vars.SLICE
+    assert 0 < result.num_contours
+    assert result.timings.total > 0
+
+
+def test_measure_is_thread_safe():
+    settings: list[dict] = [
+        {"theta": (theta_x, 0, 0), "threshold": threshold}
+        for theta_x in (0, 5)
+        for threshold in (ThresholdFilter.Otsu, (100.0, 2000.0))
+    ]
+    expected: list[float] = [
+        NeuroRuler.measure(IMAGE, **kwargs).circumference for kwargs in settings
+    ]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(
+            executor.map(
+                lambda kwargs: NeuroRuler.measure(IMAGE, **kwargs).circumference,
+                settings * 2,
+            )
+        )
+    assert results == expected * 2
+
+
+def test_measure_rejects_out_of_bounds_slice():
+    with pytest.raises(exceptions.SliceOutOfBounds):
+        NeuroRuler.measure(IMAGE, slice=10000)
+
+
+def test_measure_in_memory_inputs_match_file():
+    expected: float = NeuroRuler.measure(IMAGE, theta=(5, 0, 0)).circumference
+    img: sitk.Image = sitk.ReadImage(str(IMAGE))
+    assert NeuroRuler.measure(img, theta=(5, 0, 0)).circumference == expected
+    assert (
+        NeuroRuler.measure(
+            sitk.GetArrayViewFromImage(img),
+            spacing=img.GetSpacing(),
+            origin=img.GetOrigin(),
+            direction=img.GetDirection(),
+            theta=(5, 0, 0),
+        ).circumference
+        == expected
+    )
+
+
+def test_measure_float32_matches_float64():
+    reference: float = NeuroRuler.measure(IMAGE, theta=(4, 0, 0)).circumference
+    result: float = NeuroRuler.measure(
+        IMAGE, theta=(4, 0, 0), precision=NeuroRuler.Precision.Float32
+    ).circumference
+    assert result == pytest.approx(reference, rel=1e-3)
@@ -0,0 +1,72 @@
+"""Test loading images on a worker thread after File > Open and File > Add Images.
+
+Uses GUI. GUI imports and tests will not run in CI. See note in tests/README.md."""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+import SimpleITK as sitk
+
+import NeuroRuler.utils.global_vars as global_vars
+from tests.constants import UBUNTU_GITHUB_ACTIONS_CI
+
+if not UBUNTU_GITHUB_ACTIONS_CI:
+    from PyQt6.QtWidgets import QApplication
+
+    import NeuroRuler.GUI.main as main
+    import NeuroRuler.utils.phantom as phantom
+
+pytestmark = pytest.mark.skipif(
+    UBUNTU_GITHUB_ACTIONS_CI, reason="No GUI on Ubuntu GitHub Actions CI environment"
+)
+
+
+@pytest.fixture
+def window(tmp_path: Path):
+    for name in ("a", "b"):
+        sitk.WriteImage(
+            phantom.generate((48, 48, 48)).image, str(tmp_path / f"{name}.nrrd")
+        )
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    window = main.MainWindow()
+    window.browse_files(False, tmp_path / "a.nrrd")
+    yield window
+    window.cancel_loading_images()
+    window.load_executor.shutdown()
+    window.pyramids.shutdown()
+    window.prefetcher.shutdown()
+    window.close()
+
+
+def process_events_until_read(window) -> None:
+    """Process events until the image being read has been delivered to the GUI thread."""
+    future = window.load_future
+    future.exception(timeout=30)
+    deadline: float = time.perf_counter() + 30
+    while window.load_future is future:
+        assert time.perf_counter() < deadline
+        QApplication.processEvents()
+
+
+def test_added_image_is_read_in_background(window, tmp_path: Path):
+    window.browse_files(True, tmp_path / "b.nrrd")
+    # Delivered by the event loop, so not before browse_files returns
+    assert tmp_path / "b.nrrd" not in global_vars.IMAGE_DICT
+    assert window.load_future is not None
+    process_events_until_read(window)
+    assert list(global_vars.IMAGE_DICT) == [tmp_path / "a.nrrd", tmp_path / "b.nrrd"]
+    assert tmp_path / "b.nrrd" in global_vars.HISTOGRAM_DICT
+    assert window.load_future is None
+
+
+def test_canceled_read_is_dropped(window, tmp_path: Path):
+    window.browse_files(True, tmp_path / "b.nrrd")
+    future = window.load_future
+    window.cancel_loading_images()
+    assert window.load_future is None
+    if not future.cancelled():
+        future.exception(timeout=30)
+    QApplication.processEvents()
+    assert list(global_vars.IMAGE_DICT) == [tmp_path / "a.nrrd"]
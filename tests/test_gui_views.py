@@ -0,0 +1,68 @@
+"""Test the display buffers shared by the GUI's views.
+
+Uses GUI. GUI imports and tests will not run in CI. See note in tests/README.md."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+import SimpleITK as sitk
+
+from tests.constants import UBUNTU_GITHUB_ACTIONS_CI
+
+if not UBUNTU_GITHUB_ACTIONS_CI:
+    from PyQt6.QtWidgets import QApplication
+    import qimage2ndarray
+
+    import NeuroRuler.GUI.helpers as helpers
+    import NeuroRuler.GUI.main as main
+    import NeuroRuler.utils.phantom as phantom
+
+pytestmark = pytest.mark.skipif(
+    UBUNTU_GITHUB_ACTIONS_CI, reason="No GUI on Ubuntu GitHub Actions CI environment"
+)
+
+
+def test_displayed_qimage_isnt_counted_or_evicted_as_a_display_buffer():
+    """The displayed QImage is one of the buffers of sitk_slice_to_qimage, but it's counted as displayed."""
+    helpers.evict_display_buffers(helpers.display_buffers_nbytes())
+    displayed = helpers.sitk_slice_to_qimage(sitk.Image([30, 20], sitk.sitkInt16))
+    other = helpers.sitk_slice_to_qimage(sitk.Image([40, 20], sitk.sitkInt16))
+    # float64 normalization buffers
+    scratch_nbytes: int = (30 * 20 + 40 * 20) * 8
+    assert (
+        helpers.display_buffers_nbytes(displayed)
+        == helpers.display_buffers_nbytes() - displayed.sizeInBytes()
+        == scratch_nbytes + other.sizeInBytes()
+    )
+    freed: int = helpers.evict_display_buffers(10**9, displayed)
+    assert freed == scratch_nbytes + other.sizeInBytes()
+    assert helpers.display_buffers_nbytes(displayed) == 0
+    # Still reused, since it wasn't dropped
+    assert (
+        helpers.sitk_slice_to_qimage(sitk.Image([30, 20], sitk.sitkInt16)) is displayed
+    )
+
+
+def test_tri_planar_views_dont_change_main_view(tmp_path: Path):
+    """In an isotropic volume, every plane has the main slice's size, so they must not share its QImage."""
+    path: Path = tmp_path / "cube.nrrd"
+    sitk.WriteImage(phantom.generate((64, 64, 64)).image, str(path))
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    window = main.MainWindow()
+    try:
+        window.browse_files(False, path)
+        main_view: np.ndarray = qimage2ndarray.rgb_view(main.UNSCALED_QIMAGE).copy()
+        window.action_tri_planar.setChecked(True)
+        window.render_tri_planar_views()
+        assert all(q_img is not None for q_img in window.plane_qimages)
+        assert np.array_equal(qimage2ndarray.rgb_view(main.UNSCALED_QIMAGE), main_view)
+        # The Y view differs from the Z view, so it really was drawn into another QImage
+        assert not np.array_equal(
+            qimage2ndarray.rgb_view(window.plane_qimages[1]), main_view
+        )
+    finally:
+        window.pyramids.shutdown()
+        window.prefetcher.shutdown()
+        window.close()
@@ -0,0 +1,66 @@
+"""Test per-volume histograms and volume Otsu in histogram.py."""
+
+from pathlib import Path
+import SimpleITK as sitk
+import numpy as np
+import pytest
+import NeuroRuler
+import NeuroRuler.utils.global_vars as global_vars
+import NeuroRuler.utils.histogram as histogram
+import NeuroRuler.utils.prefetch as prefetch
+from NeuroRuler.utils.constants import DATA_DIR, ThresholdFilter
+from NeuroRuler.utils.img_helpers import (
+    initialize_globals,
+    get_curr_image,
+    read_z_oriented_image,
+)
+
+IMAGE: Path = DATA_DIR / "IBIS_Case1_V06_t1w_RAI.nrrd"
+
+
+def test_integer_histogram_is_exact():
+    img: sitk.Image = read_z_oriented_image(IMAGE)
+    result: histogram.VolumeHistogram = histogram.compute_histogram(img)
+    voxels: np.ndarray = sitk.GetArrayViewFromImage(img)
+    low: int = int(voxels.min())
+    assert result.counts.sum() == voxels.size
+    assert np.array_equal(
+        result.counts, np.bincount(voxels.ravel().astype(np.int64) - low)
+    )
+    assert result.bin_edges[0] == low - 0.5
+
+
+def test_otsu_threshold_matches_sitk():
+    img: sitk.Image = read_z_oriented_image(IMAGE)
+    otsu_filter: sitk.OtsuThresholdImageFilter = sitk.OtsuThresholdImageFilter()
+    otsu_filter.Execute(img)
+    # sitk uses 128 bins, so the thresholds differ by up to a bin
+    intensity_range: float = float(sitk.GetArrayViewFromImage(img).max())
+    assert histogram.otsu_threshold(histogram.compute_histogram(img)) == pytest.approx(
+        otsu_filter.GetThreshold(), abs=intensity_range / 128
+    )
+
+
+def test_histograms_are_cached_at_load():
+    initialize_globals([IMAGE])
+    assert list(global_vars.HISTOGRAM_DICT) == [IMAGE]
+    key: prefetch.PrefetchKey = prefetch.key_from_globals(
+        IMAGE, ThresholdFilter.VolumeOtsu
+    )
+    assert (
+        key.contour_settings.lower_threshold,
+        key.contour_settings.upper_threshold,
+    ) == histogram.suggest_binary_thresholds(global_vars.HISTOGRAM_DICT[IMAGE])
+    prefetched: prefetch.PrefetchedSlice = prefetch.compute(key, get_curr_image())
+    assert (
+        prefetched.circumference
+        == NeuroRuler.measure(IMAGE, threshold=ThresholdFilter.VolumeOtsu).circumference
+    )
+
+
+def test_volume_otsu_is_close_to_slice_otsu():
+    otsu: float = NeuroRuler.measure(IMAGE).circumference
+    volume_otsu: float = NeuroRuler.measure(
+        IMAGE, threshold=ThresholdFilter.VolumeOtsu
+    ).circumference
+    assert volume_otsu == pytest.approx(otsu, rel=0.01)
@@ -63,3 +63,20 @@ def test_del_curr_img_delete_last():
     global_vars.CURR_IMAGE_INDEX = len(global_vars.IMAGE_DICT) - 1
     del_curr_img()
     assert global_vars.CURR_IMAGE_INDEX == len(global_vars.IMAGE_DICT) - 1
+
+
+def test_iter_update_images_matches_update_images():
+    """The streaming loader yields one tuple per path and loads the same images as update_images."""
+    clear_globals()
+    differing: list[Path] = initialize_globals(IMAGE_PATHS)
+    loaded: list[Path] = get_all_paths()
+
+    clear_globals()
+    statuses: dict[Path, LoadStatus] = {
+        path: status for path, _, status in iter_initialize_globals(IMAGE_PATHS)
+    }
+    assert list(statuses.keys()) == IMAGE_PATHS
+    assert get_all_paths() == loaded
+    assert [
+        path for path, status in statuses.items() if status == LoadStatus.Differing
+    ] == differing
@@ -10,8 +10,14 @@ import numpy as np
 import cv2
 import pytest
 from pathlib import Path
-from NeuroRuler.utils.imgproc import contour, length_of_contour
+from NeuroRuler.utils.imgproc import (
+    ContourPolyline,
+    contour,
+    length_of_contour,
+    length_of_contour_with_spacing,
+)
 import NeuroRuler.utils.exceptions as exceptions
+import NeuroRuler.utils.phantom as phantom
 from NeuroRuler.utils.constants import (
     DATA_DIR,
     SUPPORTED_IMAGE_EXTENSIONS,
@@ -276,3 +282,46 @@ def test_rotation_doesnt_affect_spacing():
                 )
                 new_img = sitk.Resample(img, e3d)
                 assert new_img.GetSpacing() == spacing
+
+
+def test_contour_polyline_length_same_as_binary_contour():
+    """The polyline keeps only the parent contour but gives exactly the same length as the binary slice."""
+    for img in list(EXAMPLE_IMAGES.values())[:5]:
+        for theta_x in (0, 10):
+            rotated_slice: sitk.Image = get_rotated_slice_hardcoded(
+                img, theta_x, 0, 0, img.GetSize()[2] // 2
+            )
+            binary_contour: np.ndarray = contour(rotated_slice)
+            polyline: ContourPolyline = ContourPolyline.from_binary_contour(
+                binary_contour
+            )
+            assert polyline.points.dtype == np.int32
+            assert polyline.points.shape[1] == 2
+            assert polyline.shape == binary_contour.shape
+            assert polyline.nbytes < binary_contour.nbytes / 10
+            try:
+                expected: float = length_of_contour_with_spacing(
+                    binary_contour, 0.9, 1.1
+                )
+            except exceptions.ComputeCircumferenceOfInvalidSlice:
+                assert not polyline.is_valid()
+                continue
+            assert polyline.length_with_spacing(0.9, 1.1) == expected
+
+
+def test_contour_polyline_of_empty_slice_is_invalid():
+    polyline: ContourPolyline = ContourPolyline.from_binary_contour(
+        np.zeros((20, 30), np.uint8)
+    )
+    assert polyline.num_contours == 0 and polyline.to_list() == []
+    with pytest.raises(exceptions.ComputeCircumferenceOfInvalidSlice):
+        polyline.length_with_spacing(1.0, 1.0)
+
+
+def test_contour_is_writable_unless_a_view_is_requested():
+    slice_2d: sitk.Image = phantom.generate((64, 64, 64)).image[:, :, 32]
+    binary_contour: np.ndarray = contour(slice_2d)
+    view: np.ndarray = contour(slice_2d, writable=False)
+    assert binary_contour.flags.writeable
+    assert not view.flags.writeable
+    assert np.array_equal(binary_contour, view) and binary_contour.any()
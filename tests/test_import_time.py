@@ -0,0 +1,97 @@
+"""Check the CLI's cold-start import cost with ``python -X importtime``.
+
+SimpleITK, numpy, and cv2 are needed for measurement, so their import time isn't counted.
+Everything else (our modules and whatever they import) must fit in ``CLI_IMPORT_BUDGET_MS``.
+
+``neuroruler client`` doesn't measure anything, so it must not import them at all."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT: Path = Path(__file__).resolve().parent.parent
+
+CLI_MODULES: str = "NeuroRuler.CLI.main, NeuroRuler.utils.parser"
+"""Modules ``NeuroRuler.CLI.cli`` imports to measure"""
+
+CLI_IMPORT_BUDGET_MS: float = 150
+"""Budget for importing ``CLI_MODULES``, excluding ``MEASUREMENT_PACKAGES``.
+About 80 ms on a typical machine; about 200 ms before GUI-only imports were made lazy."""
+
+CLIENT_IMPORT_BUDGET_MS: float = 60
+"""Budget for importing ``NeuroRuler.CLI.client``. About 35 ms, mostly ``http.client`` and ``argparse``;
+about 300 ms when it imported SimpleITK through ``parser``."""
+
+MEASUREMENT_PACKAGES: tuple[str, ...] = ("SimpleITK", "numpy", "cv2")
+"""Packages the CLI needs to measure anything. Not counted against the budget."""
+
+GUI_ONLY_PACKAGES: tuple[str, ...] = (
+    "PyQt6",
+    "qimage2ndarray",
+    "screeninfo",
+    "pkg_resources",
+)
+"""Packages the CLI must not import."""
+
+NUM_RUNS: int = 3
+"""The fastest of this many runs is compared to the budget, to reduce noise."""
+
+
+def import_times_ms(module: str) -> dict[str, float]:
+    """Import ``module`` in a new interpreter.
+
+    :param module: Module, or modules separated by commas
+    :type module: str
+    :return: Self import time of each imported module in ms
+    :rtype: dict[str, float]"""
+    stderr: str = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    rv: dict[str, float] = {}
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        rv[name.strip()] = int(self_us) / 1000
+    return rv
+
+
+def test_cli_import_budget():
+    totals: list[float] = []
+    for _ in range(NUM_RUNS):
+        times: dict[str, float] = import_times_ms(CLI_MODULES)
+        gui_only: list[str] = [
+            name for name in times if name.split(".")[0] in GUI_ONLY_PACKAGES
+        ]
+        assert not gui_only, f"CLI imports GUI-only modules {gui_only}"
+        totals.append(
+            sum(
+                ms
+                for name, ms in times.items()
+                if name.split(".")[0] not in MEASUREMENT_PACKAGES
+            )
+        )
+    assert (
+        min(totals) <= CLI_IMPORT_BUDGET_MS
+    ), f"CLI import took {min(totals):.0f} ms excluding {MEASUREMENT_PACKAGES}, budget is {CLI_IMPORT_BUDGET_MS} ms"
+
+
+def test_client_imports_only_standard_library():
+    totals: list[float] = []
+    for _ in range(NUM_RUNS):
+        times: dict[str, float] = import_times_ms("NeuroRuler.CLI.client")
+        heavy: list[str] = [
+            name
+            for name in times
+            if name.split(".")[0] in MEASUREMENT_PACKAGES + GUI_ONLY_PACKAGES
+        ]
+        assert not heavy, f"Client imports {heavy}"
+        totals.append(sum(times.values()))
+    assert (
+        min(totals) <= CLIENT_IMPORT_BUDGET_MS
+    ), f"Client import took {min(totals):.0f} ms, budget is {CLIENT_IMPORT_BUDGET_MS} ms"
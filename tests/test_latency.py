@@ -0,0 +1,54 @@
+"""Test latency telemetry in latency.py. Doesn't use the GUI."""
+
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+import NeuroRuler.utils.latency as latency
+
+
+def test_percentiles_and_window():
+    histogram: latency.LatencyHistogram = latency.LatencyHistogram(window_size=100)
+    assert histogram.percentile(50) == 0.0
+    for ms in range(1, 201):
+        histogram.record(float(ms))
+    # Only the latest 100 are kept
+    assert histogram.count == 200
+    assert histogram.percentile(0) == 101
+    assert histogram.percentile(50) == pytest.approx(150.5)
+
+    summary: dict = histogram.summary()
+    assert summary["count"] == 200 and summary["window"] == 100
+    assert summary["p99_ms"] == pytest.approx(199.01)
+    assert summary["max_ms"] == 200
+    assert summary["over_target"] == 100
+    assert summary["histogram"]["<=200"] == 100
+    assert sum(summary["histogram"].values()) == 100
+
+
+def test_interactions_and_stages(tmp_path: Path):
+    telemetry: latency.LatencyTelemetry = latency.LatencyTelemetry()
+    assert not telemetry.is_pending()
+    telemetry.begin("rotate")
+    time.sleep(0.01)
+    # A second slider move before the paint keeps the first start time
+    telemetry.begin("rotate")
+    with telemetry.stage("resample"):
+        time.sleep(0.005)
+    assert telemetry.is_pending()
+    assert telemetry.end() == ["rotate"]
+    assert not telemetry.is_pending()
+    assert telemetry.count() == 1
+    assert telemetry.interactions["rotate"].percentile(50) >= 15
+    assert telemetry.stages["resample"].percentile(50) >= 5
+    assert telemetry.readout("rotate").startswith("rotate: p50 ")
+
+    path: Path = telemetry.export_json(tmp_path / "output", {"tri_planar": False})
+    assert path.name.startswith("latency_") and path.suffix == ".json"
+    contents: dict = json.loads(path.read_text())
+    assert contents["tri_planar"] is False
+    assert contents["target_ms"] == latency.INTERACTION_TARGET_MS
+    assert contents["interactions"]["rotate"]["count"] == 1
+    assert contents["stages"]["resample"]["count"] == 1
@@ -0,0 +1,80 @@
+"""Test memory accounting and the memory budget in memory.py. Doesn't use the GUI."""
+
+from pathlib import Path
+import NeuroRuler.utils.global_vars as global_vars
+import NeuroRuler.utils.memory as memory
+from NeuroRuler.utils.constants import DATA_DIR
+from NeuroRuler.utils.img_helpers import (
+    initialize_globals,
+    get_curr_image,
+    image_nbytes,
+)
+
+IMAGE: Path = DATA_DIR / "IBIS_Case1_V06_t1w_RAI.nrrd"
+
+
+class FakeCache:
+    def __init__(self, entries: list[int]):
+        self.entries: list[int] = entries
+
+    def nbytes(self) -> int:
+        return sum(self.entries)
+
+    def evict(self, nbytes: int) -> int:
+        freed: int = 0
+        while freed < nbytes and self.entries:
+            freed += self.entries.pop(0)
+        return freed
+
+
+def test_image_accounting_matches_size_and_pixel_type():
+    initialize_globals([IMAGE])
+    img = get_curr_image()
+    size = img.GetSize()
+    expected: int = size[0] * size[1] * size[2] * img.GetSizeOfPixelComponent()
+    assert memory.image_dict_usage() == {IMAGE: expected}
+    assert memory.image_dict_nbytes() == expected == image_nbytes(img)
+    assert memory.file_image_nbytes(IMAGE) == expected
+    assert memory.histogram_dict_nbytes() > 0
+
+
+def test_enforce_evicts_caches_in_order():
+    first: FakeCache = FakeCache([10, 10, 10])
+    second: FakeCache = FakeCache([10, 10])
+    governor: memory.MemoryGovernor = memory.MemoryGovernor(60)
+    governor.add_source("images", lambda: 25)
+    governor.add_cache("first", first)
+    governor.add_cache("second", second)
+    assert governor.total() == 75
+
+    assert governor.enforce() == 0
+    assert first.entries == [10]
+    assert second.entries == [10, 10]
+    assert governor.total() == 55
+
+    # Images alone exceed the budget, so everything evictable is evicted
+    governor.max_bytes = 20
+    assert governor.enforce() == 5
+    assert governor.usage() == {"images": 25, "first": 0, "second": 0}
+
+
+def test_no_budget_never_evicts():
+    cache: FakeCache = FakeCache([1 << 40])
+    governor: memory.MemoryGovernor = memory.MemoryGovernor(None)
+    governor.add_cache("cache", cache)
+    assert governor.enforce() == 0
+    assert cache.entries == [1 << 40]
+    assert governor.summary() == "Memory: 1.0 TB (cache 1.0 TB)"
+
+
+def test_format_bytes():
+    assert memory.format_bytes(512) == "512 B"
+    assert memory.format_bytes(1536) == "1.5 KB"
+    assert memory.format_bytes(3 * 1024**3) == "3.0 GB"
+
+
+def test_default_budget_bytes():
+    assert memory.default_budget_bytes(100) == 100 * 1024 * 1024
+    physical = memory.physical_memory_bytes()
+    if physical is not None:
+        assert memory.default_budget_bytes(0) == physical // 2
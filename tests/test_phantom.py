@@ -0,0 +1,56 @@
+"""Test the synthetic head phantoms in phantom.py against the measurement pipeline. Doesn't use the GUI."""
+
+import math
+
+import numpy as np
+import pytest
+import SimpleITK as sitk
+
+import NeuroRuler
+import NeuroRuler.utils.phantom as phantom
+
+
+def test_plane_circumference():
+    sphere: phantom.Ellipsoid = phantom.Ellipsoid((1.0, 2.0, 3.0), (50.0, 50.0, 50.0))
+    assert phantom.plane_circumference(
+        sphere, (1.0, 2.0, 3.0), (1.0, 1.0, 0.0)
+    ) == pytest.approx(2 * math.pi * 50)
+    # 30 mm from the center, the circle's radius is 40 mm
+    assert phantom.plane_circumference(
+        sphere, (1.0, 2.0, 33.0), (0.0, 0.0, 2.0)
+    ) == pytest.approx(2 * math.pi * 40)
+    assert phantom.plane_circumference(sphere, (1.0, 2.0, 60.0), (0, 0, 1)) == 0.0
+
+    ellipsoid: phantom.Ellipsoid = phantom.Ellipsoid(
+        (0.0, 0.0, 0.0), (75.0, 95.0, 85.0)
+    )
+    assert phantom.plane_circumference(
+        ellipsoid, (0.0, 0.0, 0.0), (0.0, 1.0, 0.0)
+    ) == pytest.approx(phantom.ellipse_perimeter(75.0, 85.0))
+    # Circle, and a degenerate ellipse with perimeter 4a
+    assert phantom.ellipse_perimeter(3.0, 3.0) == pytest.approx(6 * math.pi)
+    assert phantom.ellipse_perimeter(1.0, 0.0) == pytest.approx(4.0, rel=1e-3)
+
+
+def test_generate():
+    generated: phantom.Phantom = phantom.generate((65, 81, 49), (4.0, 3.2, 5.0))
+    assert generated.image.GetSize() == (65, 81, 49)
+    assert generated.image.GetSpacing() == (4.0, 3.2, 5.0)
+    assert generated.image.GetPixelID() == sitk.sitkInt16
+    # Centered, so the middle slice goes through the center of the head
+    assert np.allclose(
+        generated.image.TransformIndexToPhysicalPoint((32, 40, 24)), (0, 0, 0)
+    )
+    assert phantom.circumference(generated) == pytest.approx(
+        phantom.ellipse_perimeter(*phantom.HEAD_RADII_MM[:2])
+    )
+    with pytest.raises(ValueError):
+        phantom.generate((32, 32, 32), (1.0, 1.0, 1.0))
+
+
+@pytest.mark.parametrize("theta", [(0, 0, 0), (10, 0, 5), (-12, 8, 0)])
+def test_measurement_error(theta: tuple[int, int, int]):
+    generated: phantom.Phantom = phantom.generate((128, 128, 128))
+    measured: float = NeuroRuler.measure(generated.image, theta=theta).circumference
+    expected: float = phantom.circumference(generated, theta)
+    assert abs(measured - expected) / expected < 0.02
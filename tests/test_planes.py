@@ -0,0 +1,89 @@
+"""Test plane sampling in img_helpers.py and the plane cache in planes.py. Doesn't use the GUI."""
+
+from pathlib import Path
+import SimpleITK as sitk
+import numpy as np
+import NeuroRuler.utils.global_vars as global_vars
+import NeuroRuler.utils.planes as planes
+from NeuroRuler.utils.constants import DATA_DIR, View, degrees_to_radians
+from NeuroRuler.utils.img_helpers import (
+    initialize_globals,
+    get_curr_image,
+    get_center_of_rotation,
+    get_middle_dimension,
+    get_oriented_geometry,
+    get_rotated_plane,
+    image_nbytes,
+    orient_image,
+)
+
+IMAGE: Path = DATA_DIR / "IBIS_Case1_V06_t1w_RAI.nrrd"
+
+
+def resampled_volume_slice(
+    img: sitk.Image, transform: sitk.Euler3DTransform, view: View, index: int
+) -> np.ndarray:
+    """The previous way of getting a rotated slice: orient and resample the whole volume, then slice it."""
+    rotated: sitk.Image = sitk.Resample(orient_image(img, view), transform)
+    if view == View.X:
+        return sitk.GetArrayFromImage(rotated[index, :, :])
+    if view == View.Y:
+        return sitk.GetArrayFromImage(rotated[:, index, :])
+    return sitk.GetArrayFromImage(rotated[:, :, index])
+
+
+def test_oriented_geometry_matches_orient_image():
+    initialize_globals([IMAGE])
+    img: sitk.Image = get_curr_image()
+    for view in View:
+        oriented: sitk.Image = orient_image(img, view)
+        origin, direction = get_oriented_geometry(img, view)
+        assert np.allclose(origin, oriented.GetOrigin())
+        assert np.allclose(direction, oriented.GetDirection())
+        # And back from the other orientation
+        origin, direction = get_oriented_geometry(oriented, View.Z)
+        assert np.allclose(origin, img.GetOrigin())
+        assert np.allclose(direction, img.GetDirection())
+
+
+def test_rotated_plane_matches_resampled_volume():
+    """Identical for the Z view, which is used for circumferences. Within rounding for the others."""
+    initialize_globals([IMAGE])
+    img: sitk.Image = get_curr_image()
+    transform: sitk.Euler3DTransform = sitk.Euler3DTransform()
+    transform.SetCenter(get_center_of_rotation(img))
+    for theta in ((0, 0, 0), (20, -10, 35)):
+        transform.SetRotation(*(degrees_to_radians(angle) for angle in theta))
+        for view in View:
+            for index in (0, get_middle_dimension(img, view)):
+                expected: np.ndarray = resampled_volume_slice(
+                    img, transform, view, index
+                )
+                actual: np.ndarray = sitk.GetArrayFromImage(
+                    get_rotated_plane(img, transform, view, index)
+                )
+                if view == View.Z:
+                    assert np.array_equal(actual, expected)
+                else:
+                    assert actual.shape == expected.shape
+                    # Integer pixels, so rounding can change a pixel by 1
+                    assert np.abs(actual.astype(int) - expected).max() <= 1
+
+
+def test_plane_cache():
+    initialize_globals([IMAGE])
+    global_vars.THETA_X = 5
+    key: planes.PlaneKey = planes.key_from_globals(IMAGE, View.Y)
+    assert key.index == global_vars.Y_CENTER
+
+    cache: planes.PlaneCache = planes.PlaneCache(1024 * 1024 * 1024)
+    plane: sitk.Image = cache.get_or_sample(key, get_curr_image())
+    assert cache.get_or_sample(key, get_curr_image()) is plane
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.nbytes() == image_nbytes(plane)
+
+    other: sitk.Image = cache.get_or_sample(key._replace(theta_x=6), get_curr_image())
+    assert cache.evict(1) == image_nbytes(plane)
+    # Least recently used was evicted
+    assert cache.get_or_sample(key, get_curr_image()) is not plane
+    assert cache.nbytes() == image_nbytes(plane) + image_nbytes(other)
@@ -0,0 +1,47 @@
+"""Test background prefetching in prefetch.py. Doesn't use the GUI."""
+
+from pathlib import Path
+import SimpleITK as sitk
+import numpy as np
+import NeuroRuler.utils.global_vars as global_vars
+import NeuroRuler.utils.imgproc as imgproc
+import NeuroRuler.utils.prefetch as prefetch
+from NeuroRuler.utils.constants import DATA_DIR, ThresholdFilter
+from NeuroRuler.utils.img_helpers import (
+    initialize_globals,
+    get_curr_image,
+    get_curr_rotated_slice,
+)
+
+IMAGE: Path = DATA_DIR / "IBIS_Case1_V06_t1w_RAI.nrrd"
+
+
+def test_compute_matches_global_pipeline():
+    """A prefetched slice and contour match the ones computed with the global settings and filters."""
+    initialize_globals([IMAGE])
+    global_vars.THETA_X = 7
+    global_vars.THETA_Z = -12
+    expected_slice: sitk.Image = get_curr_rotated_slice()
+    expected_contour: np.ndarray = imgproc.contour(expected_slice, ThresholdFilter.Otsu)
+
+    key: prefetch.PrefetchKey = prefetch.key_from_globals(IMAGE, ThresholdFilter.Otsu)
+    prefetched: prefetch.PrefetchedSlice = prefetch.compute(key, get_curr_image())
+
+    assert np.array_equal(
+        sitk.GetArrayViewFromImage(prefetched.rotated_slice),
+        sitk.GetArrayViewFromImage(expected_slice),
+    )
+    assert np.array_equal(
+        prefetched.contour.points,
+        imgproc.ContourPolyline.from_binary_contour(expected_contour).points,
+    )
+    spacing: tuple = get_curr_image().GetSpacing()
+    assert prefetched.circumference == imgproc.length_of_contour_with_spacing(
+        expected_contour, spacing[0], spacing[1]
+    )
+
+
+def test_neighbor_indices():
+    assert prefetch.neighbor_indices(0, 10, 2) == [1, 9, 2, 8]
+    assert prefetch.neighbor_indices(1, 3, 2) == [2, 0]
+    assert prefetch.neighbor_indices(0, 1, 2) == []
@@ -0,0 +1,46 @@
+"""Test the interaction profiler in profiling.py. Doesn't use the GUI."""
+
+import json
+import pstats
+from pathlib import Path
+
+import pytest
+
+import NeuroRuler.utils.profiling as profiling
+
+
+def busy_work() -> int:
+    return sum(i * i for i in range(10000))
+
+
+def test_profile_and_report(tmp_path: Path):
+    profiler: profiling.InteractionProfiler = profiling.InteractionProfiler()
+    assert not profiler.is_running()
+    with pytest.raises(RuntimeError):
+        profiler.stop(tmp_path, "image", {})
+
+    profiler.start()
+    assert profiler.is_running()
+    busy_work()
+    pstats_path, report_path = profiler.stop(
+        tmp_path / "output", "image", {"image_paths": ["data/image.nrrd"], "x": 5}
+    )
+    assert not profiler.is_running()
+
+    assert pstats_path.name.startswith("profile_image_")
+    assert pstats_path.suffix == ".pstats" and report_path.suffix == ".txt"
+    functions: list[str] = [
+        function for _, _, function in pstats.Stats(str(pstats_path)).stats
+    ]
+    assert "busy_work" in functions
+
+    report: str = report_path.read_text()
+    # The metadata is a JSON object between the title and the first section
+    header: dict = json.loads(report[report.index("{") : report.index("\n===")])
+    assert header["image_paths"] == ["data/image.nrrd"]
+    assert header["x"] == 5
+    assert header["pstats"] == str(pstats_path)
+    assert "SimpleITK" in header["environment"]
+    for sort_key in profiling.REPORT_SORT_KEYS:
+        assert f"=== Sorted by {sort_key} ===" in report
+    assert "busy_work" in report
@@ -0,0 +1,134 @@
+"""Test the multi-resolution pyramids in pyramid.py and sampling planes from them. Doesn't use the GUI."""
+
+import threading
+import time
+from pathlib import Path
+import SimpleITK as sitk
+import numpy as np
+import NeuroRuler.utils.pyramid as pyramid
+from NeuroRuler.utils.constants import View, degrees_to_radians
+from NeuroRuler.utils.img_helpers import (
+    get_center_of_rotation,
+    get_rotated_plane,
+    image_nbytes,
+)
+
+
+def ramp_image(size: tuple[int, int, int]) -> sitk.Image:
+    """Linear in every axis, so smoothing and averaging don't change it away from the borders."""
+    z, y, x = np.mgrid[0 : size[2], 0 : size[1], 0 : size[0]].astype(np.float32)
+    img: sitk.Image = sitk.GetImageFromArray(x + 2 * y + 3 * z)
+    img.SetSpacing((0.5, 0.6, 0.7))
+    img.SetOrigin((-20, -30, -40))
+    return img
+
+
+def wait_for(builder: pyramid.PyramidBuilder, path: Path) -> None:
+    deadline: float = time.perf_counter() + 30
+    while builder.is_pending(path):
+        assert time.perf_counter() < deadline
+        time.sleep(0.01)
+
+
+def test_level_sizes():
+    assert pyramid.level_sizes((512, 512, 512)) == [(256, 256, 256), (128, 128, 128)]
+    assert pyramid.level_sizes((1024, 1024, 300)) == [
+        (512, 512, 150),
+        (256, 256, 75),
+        (128, 128, 37),
+    ]
+    assert pyramid.level_sizes((200, 200, 200)) == []
+
+
+def test_downsample_matches_whole_image():
+    """Chunks of slices give the same result as smoothing the whole image. Odd sizes lose their last slice."""
+    img: sitk.Image = sitk.Cast(
+        ramp_image((41, 36, 2 * pyramid.CHUNK_SLICES + 7)), sitk.sitkInt16
+    )
+    img = sitk.AdditiveGaussianNoise(img, 5, seed=0)
+    downsampled: sitk.Image = pyramid.downsample(img)
+    assert downsampled.GetSize() == (20, 18, pyramid.CHUNK_SLICES + 3)
+    assert downsampled.GetPixelID() == img.GetPixelID()
+    assert downsampled.GetSpacing() == (1.0, 1.2, 1.4)
+
+    expected: sitk.Image = sitk.BinShrink(
+        sitk.SmoothingRecursiveGaussian(
+            img,
+            [pyramid.GAUSSIAN_SIGMA_VOXELS * spacing for spacing in img.GetSpacing()],
+        ),
+        [2, 2, 2],
+    )
+    assert np.allclose(downsampled.GetOrigin(), expected.GetOrigin())
+    assert (
+        np.abs(
+            sitk.GetArrayFromImage(downsampled) - sitk.GetArrayFromImage(expected)
+        ).max()
+        <= 0.5 + 1e-3
+    )
+
+
+def test_downsample_canceled():
+    cancelled: threading.Event = threading.Event()
+    cancelled.set()
+    assert pyramid.downsample(ramp_image((16, 16, 16)), cancelled) is None
+
+
+def test_level_plane_matches_full_resolution_plane():
+    """A plane sampled from a level is at the same place as the full resolution plane, on a grid of its blocks."""
+    img: sitk.Image = ramp_image((90, 80, 70))
+    level: sitk.Image = pyramid.downsample(img)
+    transform: sitk.Euler3DTransform = sitk.Euler3DTransform()
+    transform.SetCenter(get_center_of_rotation(img))
+    for theta in ((0, 0, 0), (6, 3, -6)):
+        transform.SetRotation(*(degrees_to_radians(angle) for angle in theta))
+        for view in View:
+            actual: np.ndarray = sitk.GetArrayFromImage(
+                get_rotated_plane(img, transform, view, 33, 2, level)
+            )
+            expected: np.ndarray = sitk.GetArrayFromImage(
+                sitk.BinShrink(get_rotated_plane(img, transform, view, 33), [2, 2])
+            )
+            assert actual.shape == expected.shape
+            assert np.allclose(actual[6:-6, 6:-6], expected[6:-6, 6:-6], atol=1e-3)
+
+
+def test_level_for_display():
+    assert pyramid.level_for_display((512, 512), (600, 600), 2) == 0
+    assert pyramid.level_for_display((512, 512), (256, 300), 2) == 1
+    # Fits by height
+    assert pyramid.level_for_display((512, 256), (600, 100), 2) == 1
+    assert pyramid.level_for_display((512, 512), (100, 100), 2) == 2
+    assert pyramid.level_for_display((512, 512), (0, 0), 2) == 0
+
+
+def test_pyramid_builder():
+    img: sitk.Image = sitk.Cast(ramp_image((256, 256, 16)), sitk.sitkInt16)
+    path: Path = Path("ramp.nrrd")
+    nbytes: int = pyramid.pyramid_nbytes(img)
+    assert nbytes == 128 * 128 * 8 * 2
+
+    builder: pyramid.PyramidBuilder = pyramid.PyramidBuilder(nbytes - 1)
+    builder.schedule([(path, img)])
+    assert not builder.is_pending(path)
+    assert builder.levels(path) == []
+
+    builder.max_bytes = nbytes
+    builder.schedule([(path, img)])
+    wait_for(builder, path)
+    levels: list[sitk.Image] = builder.levels(path)
+    assert [level.GetSize() for level in levels] == [(128, 128, 8)]
+    assert builder.nbytes() == nbytes == image_nbytes(levels[0])
+
+    assert builder.evict(1) == nbytes
+    assert builder.levels(path) == [] and builder.nbytes() == 0
+
+    builder.schedule([(path, img)])
+    wait_for(builder, path)
+    builder.discard(path)
+    assert builder.levels(path) == [] and builder.nbytes() == 0
+
+    builder.schedule([(path, img)])
+    builder.clear()
+    wait_for(builder, path)
+    assert builder.levels(path) == []
+    builder.shutdown()
@@ -0,0 +1,91 @@
+"""Test the streaming results file in results.py."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+import NeuroRuler.utils.exceptions as exceptions
+import NeuroRuler.utils.results as results
+from NeuroRuler.utils.constants import Precision, ThresholdFilter
+
+PARAMETERS: dict = results.make_parameters(
+    (0, 0, 0), -1, (3.0, 5, 0.0625), ThresholdFilter.Otsu, 0.0, 200.0, Precision.Float64
+)
+
+
+@pytest.mark.parametrize("suffix", results.SUFFIXES)
+def test_rows_round_trip_and_resume_keys(tmp_path: Path, suffix: str):
+    path: Path = tmp_path / f"results{suffix}"
+    ok: dict = results.make_row(Path("a.nrrd"), "fa", PARAMETERS, 433.2, "mm")
+    failed: dict = results.make_row(
+        Path("b.nrrd"), "fb", PARAMETERS, error="invalid\nslice"
+    )
+    with results.ResultsWriter(path) as writer:
+        writer.write(ok)
+        writer.write(failed)
+
+    rows: list = list(results.read_rows(path))
+    assert [row["path"] for row in rows] == ["a.nrrd", "b.nrrd"]
+    assert rows[1]["error"] == "invalid slice"
+    # Failed rows aren't completed, so --resume measures them again
+    assert results.completed_keys(path) == {results.result_key(ok)}
+    other: dict = results.make_parameters(
+        (1, 0, 0),
+        -1,
+        (3.0, 5, 0.0625),
+        ThresholdFilter.Otsu,
+        0.0,
+        200.0,
+        Precision.Float64,
+    )
+    assert results.result_key(
+        results.make_row(Path("a.nrrd"), "fa", other)
+    ) not in results.completed_keys(path)
+
+
+@pytest.mark.parametrize("suffix", results.SUFFIXES)
+def test_partial_row_is_removed_on_open(tmp_path: Path, suffix: str):
+    path: Path = tmp_path / f"results{suffix}"
+    with results.ResultsWriter(path) as writer:
+        writer.write(results.make_row(Path("a.nrrd"), "fa", PARAMETERS, 433.2, "mm"))
+    complete_size: int = path.stat().st_size
+    # A crash in the middle of a write
+    with open(path, "a") as f:
+        f.write('{"path": "b.nr' if suffix == ".jsonl" else "b.nrrd,fb,o")
+    assert len(list(results.read_rows(path))) == 1
+
+    with results.ResultsWriter(path) as writer:
+        assert path.stat().st_size == complete_size
+        writer.write(results.make_row(Path("c.nrrd"), "fc", PARAMETERS, 400.0, "mm"))
+    assert [row["path"] for row in results.read_rows(path)] == ["a.nrrd", "c.nrrd"]
+
+
+@pytest.mark.parametrize("suffix", results.SUFFIXES)
+def test_new_file_when_directory_cant_be_synced(
+    tmp_path: Path, suffix: str, monkeypatch: pytest.MonkeyPatch
+):
+    """Like on Windows, where directories can't be opened with os.open."""
+    os_open = os.open
+    opened_directories: list = []
+
+    def open_files_only(path, flags, *args):
+        if Path(path).is_dir():
+            opened_directories.append(path)
+            raise PermissionError(13, "Permission denied", str(path))
+        return os_open(path, flags, *args)
+
+    monkeypatch.setattr(results.os, "open", open_files_only)
+    path: Path = tmp_path / "new" / f"results{suffix}"
+    with results.ResultsWriter(path) as writer:
+        writer.write(results.make_row(Path("a.nrrd"), "fa", PARAMETERS, 433.2, "mm"))
+    assert [row["path"] for row in results.read_rows(path)] == ["a.nrrd"]
+    if os.name == "posix":
+        assert opened_directories == [path.parent]
+
+
+def test_csv_with_other_columns_is_rejected(tmp_path: Path):
+    path: Path = tmp_path / "results.csv"
+    path.write_text("path,circumference\na.nrrd,433.2\n")
+    with pytest.raises(exceptions.InvalidResultsFile):
+        results.ResultsWriter(path)
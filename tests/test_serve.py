@@ -0,0 +1,65 @@
+"""Test request handling of the ``neuroruler serve`` daemon in serve.py without starting a server."""
+
+import os
+import stat
+import sys
+from pathlib import Path
+import pytest
+import NeuroRuler.utils.exceptions as exceptions
+import NeuroRuler.utils.global_vars as global_vars
+import NeuroRuler.utils.imgproc as imgproc
+from NeuroRuler.CLI.serve import ImageCache, bind_unix_server, parse_request, measure
+from NeuroRuler.utils.constants import DATA_DIR, ThresholdFilter
+from NeuroRuler.utils.img_helpers import (
+    initialize_globals,
+    get_curr_image,
+    get_curr_rotated_slice,
+)
+
+IMAGE: Path = DATA_DIR / "IBIS_Case1_V06_t1w_RAI.nrrd"
+
+
+@pytest.mark.parametrize(
+    "request_body",
+    [
+        [str(IMAGE)],
+        {"x": 5},
+        {"path": str(IMAGE.with_suffix(".txt"))},
+        {"path": str(DATA_DIR / "missing.nrrd")},
+        {"path": str(IMAGE), "rotation": 5},
+        {"path": str(IMAGE), "x": 5.5},
+        {"path": str(IMAGE), "x": True},
+        {"path": str(IMAGE), "filter": "otsu", "lower": 100},
+        {"path": str(IMAGE), "filter": "binary", "lower": 100},
+        {"path": str(IMAGE), "filter": "canny"},
+    ],
+)
+def test_parse_request_rejects_invalid_requests(request_body):
+    with pytest.raises(exceptions.InvalidRequest):
+        parse_request(request_body)
+
+
+def test_measure_matches_global_pipeline():
+    """The server computes the same circumference as the CLI and GUI."""
+    path, options = parse_request({"path": str(IMAGE), "x": 4, "conductance": 3})
+    circumference, _ = measure(path, options, ImageCache(2**30).get(path))
+
+    initialize_globals([IMAGE])
+    global_vars.THETA_X = 4
+    contour = imgproc.contour(get_curr_rotated_slice(), ThresholdFilter.Otsu)
+    spacing: tuple = get_curr_image().GetSpacing()
+    assert circumference == imgproc.length_of_contour_with_spacing(
+        contour, spacing[0], spacing[1]
+    )
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Unix sockets")
+def test_unix_socket_is_private_and_umask_is_restored(tmp_path: Path):
+    old_umask: int = os.umask(0o022)
+    try:
+        server = bind_unix_server(tmp_path / "serve.sock")
+        server.server_close()
+        assert stat.S_IMODE((tmp_path / "serve.sock").stat().st_mode) == 0o600
+        assert os.umask(0o022) == 0o022
+    finally:
+        os.umask(old_umask)
@@ -0,0 +1,84 @@
+"""Test cohort sharding and merging in sharding.py."""
+
+from pathlib import Path
+
+import pytest
+
+import NeuroRuler.utils.results as results
+import NeuroRuler.utils.sharding as sharding
+from NeuroRuler.utils.sharding import Shard
+
+
+def test_parse_shard():
+    assert sharding.parse_shard("2/8") == Shard(2, 8)
+    assert sharding.parse_shard("8", {"SLURM_ARRAY_TASK_ID": "3"}) == Shard(3, 8)
+    assert sharding.parse_shard(
+        "8", {"SLURM_ARRAY_TASK_ID": "5", "SLURM_ARRAY_TASK_MIN": "1"}
+    ) == Shard(4, 8)
+    # Grid Engine and LSF start at 1
+    assert sharding.parse_shard("8", {"SGE_TASK_ID": "1"}) == Shard(0, 8)
+    assert sharding.parse_shard(
+        "8", {"SGE_TASK_ID": "undefined", "LSB_JOBINDEX": "8"}
+    ) == Shard(7, 8)
+    for text in ("8/8", "-1/8", "0/0", "a/8", "1/"):
+        with pytest.raises(ValueError):
+            sharding.parse_shard(text, {})
+    with pytest.raises(ValueError):
+        sharding.parse_shard("8", {})
+
+
+def test_shards_cover_each_file_once_and_ignore_file_metadata(tmp_path: Path):
+    files: list[str] = []
+    for i in range(10):
+        path: Path = tmp_path / f"{i}.nrrd"
+        path.write_bytes(b"\0" * (100 * i))
+        files.append(str(path))
+    # Doesn't exist, still assigned
+    files.append(str(tmp_path / "missing.nrrd"))
+
+    shards: list[list[str]] = [
+        sharding.shard_files(files, Shard(i, 3)) for i in range(3)
+    ]
+    assert sorted(file for shard in shards for file in shard) == sorted(files)
+    assert [len(shard) for shard in shards] == [4, 4, 3]
+    # Same assignment regardless of the order and duplicates of the arguments
+    assert shards == [
+        sharding.shard_files(list(reversed(files)) + files[:2], Shard(i, 3))
+        for i in range(3)
+    ]
+    # or of the files' sizes, which another node may see differently
+    for file in files[:5]:
+        Path(file).write_bytes(b"\0" * 5000)
+    assert shards == [sharding.shard_files(files, Shard(i, 3)) for i in range(3)]
+
+
+def test_merge_finds_missing_duplicated_and_unexpected():
+    def row(path: str, status: str = results.STATUS_OK) -> dict:
+        return {"path": path, "status": status}
+
+    merged, report = sharding.merge_rows(
+        {
+            Path("0.csv"): [
+                row("b.nrrd", results.STATUS_ERROR),
+                row("b.nrrd"),
+                row("c.nrrd"),
+            ],
+            Path("1.csv"): [row("a.nrrd"), row("c.nrrd"), row("x.nrrd")],
+        },
+        ["a.nrrd", "b.nrrd", "c.nrrd", "d.nrrd"],
+    )
+    assert [Path(row["path"]).name for row in merged] == [
+        "a.nrrd",
+        "b.nrrd",
+        "c.nrrd",
+        "x.nrrd",
+    ]
+    # The last row of a file wins, e.g. after --resume
+    assert merged[1]["status"] == results.STATUS_OK
+    assert not report.ok
+    assert [Path(path).name for path in report.missing] == ["d.nrrd"]
+    assert [Path(path).name for path in report.duplicated] == ["c.nrrd"]
+    assert [Path(path).name for path in report.unexpected] == ["x.nrrd"]
+
+    _, report = sharding.merge_rows({Path("0.csv"): [row("a.nrrd")]}, ["a.nrrd"])
+    assert report.ok
@@ -0,0 +1,68 @@
+"""Test that slab.py contours a stack of slices like contouring each slice."""
+
+import numpy as np
+import pytest
+import SimpleITK as sitk
+
+from NeuroRuler.utils.constants import (
+    DATA_DIR,
+    Precision,
+    ThresholdFilter,
+    View,
+    degrees_to_radians,
+)
+from NeuroRuler.utils.histogram import compute_histogram, suggest_binary_thresholds
+from NeuroRuler.utils.img_helpers import (
+    get_center_of_rotation,
+    get_rotated_slab,
+    get_rotated_slice,
+    read_z_oriented_image,
+)
+from NeuroRuler.utils.prefetch import ContourSettings, contour_with_settings
+from NeuroRuler.utils.slab import contour_slab
+
+IMG: sitk.Image = read_z_oriented_image(DATA_DIR / "IBIS_Case1_V06_t1w_RAI.nrrd")
+START: int = 78
+STOP: int = 82
+
+
+def rotation() -> sitk.Euler3DTransform:
+    transform: sitk.Euler3DTransform = sitk.Euler3DTransform()
+    transform.SetCenter(get_center_of_rotation(IMG))
+    transform.SetRotation(degrees_to_radians(4), degrees_to_radians(-3), 0)
+    return transform
+
+
+def test_rotated_slab_matches_rotated_slices():
+    transform: sitk.Euler3DTransform = rotation()
+    slab: sitk.Image = get_rotated_slab(IMG, transform, START, STOP)
+    for k in range(STOP - START):
+        assert np.array_equal(
+            sitk.GetArrayViewFromImage(slab[:, :, k]),
+            sitk.GetArrayViewFromImage(
+                get_rotated_slice(IMG, transform, View.Z, START + k, 0, 0)
+            ),
+        )
+
+
+@pytest.mark.parametrize(
+    "threshold_filter, precision",
+    [
+        (ThresholdFilter.Otsu, Precision.Float64),
+        (ThresholdFilter.Otsu, Precision.Float32),
+        (ThresholdFilter.VolumeOtsu, Precision.Float64),
+        (ThresholdFilter.Binary, Precision.Float64),
+    ],
+)
+def test_contour_slab_matches_contour_of_each_slice(threshold_filter, precision):
+    lower, upper = suggest_binary_thresholds(compute_histogram(IMG))
+    settings: ContourSettings = ContourSettings(
+        threshold_filter, 3.0, 5, 0.0625, lower, upper, precision
+    )
+    slab: sitk.Image = get_rotated_slab(IMG, rotation(), START, STOP)
+    contours: np.ndarray = contour_slab(slab, settings)
+    assert contours.shape == (STOP - START, *slab.GetSize()[1::-1])
+    for k in range(STOP - START):
+        assert np.array_equal(
+            contours[k], contour_with_settings(slab[:, :, k], settings)
+        )
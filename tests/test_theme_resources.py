@@ -0,0 +1,18 @@
+"""Check that the shipped ``resources.rcc`` bundles match the ``resources.py`` they're built from."""
+
+from pathlib import Path
+
+import pytest
+
+import NeuroRuler.utils.constants as constants
+from NeuroRuler.GUI.theme_resources import RCC_NAME, SOURCE_NAME, build_rcc
+
+
+@pytest.mark.parametrize("theme_name", constants.THEMES)
+def test_rcc_up_to_date(theme_name: str, tmp_path: Path):
+    theme_dir: Path = constants.THEME_DIR / theme_name
+    built: Path = tmp_path / RCC_NAME
+    build_rcc(theme_dir / SOURCE_NAME, built)
+    assert (
+        built.read_bytes() == (theme_dir / RCC_NAME).read_bytes()
+    ), f"{theme_dir / RCC_NAME} is out of date, run python -m NeuroRuler.GUI.theme_resources"
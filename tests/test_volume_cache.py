@@ -0,0 +1,64 @@
+"""Test the decoded volume cache in volume_cache.py."""
+
+import os
+import shutil
+from pathlib import Path
+import SimpleITK as sitk
+import numpy as np
+import NeuroRuler.utils.volume_cache as volume_cache
+from NeuroRuler.utils.constants import DATA_DIR, Z_ORIENTATION_STR
+
+COMPRESSED_IMAGE: Path = DATA_DIR / "IBIS_Case1_V06_t1w_RAI.nrrd"
+
+
+def test_round_trip_and_invalidation(tmp_path: Path):
+    """A cached image matches the decoded one, and modifying the source invalidates its entry."""
+    source: Path = tmp_path / COMPRESSED_IMAGE.name
+    shutil.copy(COMPRESSED_IMAGE, source)
+    cache_dir: Path = tmp_path / "cache"
+    assert volume_cache.is_compressed(source)
+
+    img: sitk.Image = sitk.ReadImage(str(source))
+    assert volume_cache.load(source, Z_ORIENTATION_STR, cache_dir) is None
+    volume_cache.store(source, img, Z_ORIENTATION_STR, cache_dir, 2**40)
+    cached: sitk.Image = volume_cache.load(source, Z_ORIENTATION_STR, cache_dir)
+
+    assert np.array_equal(
+        sitk.GetArrayViewFromImage(cached), sitk.GetArrayViewFromImage(img)
+    )
+    assert cached.GetPixelID() == img.GetPixelID()
+    assert cached.GetSpacing() == img.GetSpacing()
+    assert cached.GetOrigin() == img.GetOrigin()
+    assert cached.GetDirection() == img.GetDirection()
+    # Different orientation, different entry
+    assert volume_cache.load(source, "RPI", cache_dir) is None
+
+    source.write_bytes(source.read_bytes() + b"\0")
+    assert volume_cache.load(source, Z_ORIENTATION_STR, cache_dir) is None
+
+
+def test_prune_evicts_least_recently_used(tmp_path: Path):
+    cache_dir: Path = tmp_path / "cache"
+    img: sitk.Image = sitk.Image(16, 16, 16, sitk.sitkInt16)
+    sources: list[Path] = []
+    for i in range(3):
+        source: Path = tmp_path / f"{i}.nii.gz"
+        source.write_bytes(bytes([i]))
+        volume_cache.store(source, img, Z_ORIENTATION_STR, cache_dir, 2**40)
+        sources.append(source)
+    # Explicit times since stores in quick succession can share a timestamp
+    for i, source in enumerate(sources):
+        key: str = volume_cache.fingerprint(source, Z_ORIENTATION_STR)
+        header_path: Path = cache_dir / (key + volume_cache.HEADER_SUFFIX)
+        os.utime(header_path, (1000 + i, 1000 + i))
+    entry_size: int = volume_cache.size(cache_dir) // 3
+
+    # Use the first entry so the second becomes least recently used
+    volume_cache.load(sources[0], Z_ORIENTATION_STR, cache_dir)
+    freed: int = volume_cache.prune(cache_dir, 2 * entry_size)
+    assert freed == entry_size
+    assert volume_cache.load(sources[1], Z_ORIENTATION_STR, cache_dir) is None
+    assert volume_cache.load(sources[0], Z_ORIENTATION_STR, cache_dir) is not None
+
+    volume_cache.prune(cache_dir, 0)
+    assert volume_cache.size(cache_dir) == 0
@@ -0,0 +1,90 @@
+"""Test the ``neuroruler watch`` subcommand in CLI/watch.py."""
+
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import NeuroRuler.utils.results as results
+from NeuroRuler.CLI import watch
+from NeuroRuler.utils.constants import DATA_DIR
+
+IMAGE: Path = DATA_DIR / "IBIS_Case1_V06_t1w_RAI.nrrd"
+
+
+def test_debouncer_waits_until_file_is_unchanged(tmp_path: Path):
+    now: list[float] = [0.0]
+    debouncer: watch.Debouncer = watch.Debouncer(2.0, clock=lambda: now[0])
+    path: Path = tmp_path / "a.nrrd"
+    path.write_bytes(b"partial")
+    debouncer.touch(path)
+    assert list(debouncer.ready()) == []
+    now[0] = 1.5
+    path.write_bytes(b"partially written")
+    assert list(debouncer.ready()) == []
+    now[0] = 3.0
+    assert list(debouncer.ready()) == []
+    now[0] = 3.5
+    assert list(debouncer.ready()) == [path]
+    assert len(debouncer) == 0
+
+
+@pytest.mark.parametrize(
+    "use_inotify",
+    [
+        pytest.param(
+            True,
+            marks=pytest.mark.skipif(
+                not sys.platform.startswith("linux"), reason="inotify is Linux-only"
+            ),
+        ),
+        False,
+    ],
+)
+def test_watch_measures_new_files_once(tmp_path: Path, use_inotify: bool):
+    watched: Path = tmp_path / "scanner"
+    watched.mkdir()
+    (watched / "notes.txt").write_text("not an image")
+    output: Path = tmp_path / "results.jsonl"
+    watcher = (
+        watch.InotifyWatcher(watched)
+        if use_inotify
+        else watch.PollingWatcher(watched, 0.1)
+    )
+    stop: threading.Event = threading.Event()
+    with results.ResultsWriter(output) as writer:
+        ingester: watch.Ingester = watch.Ingester(writer, 1, 1)
+        thread: threading.Thread = threading.Thread(
+            target=watch.watch, args=(watched, ingester, watcher, 0.2, stop)
+        )
+        thread.start()
+        # Written in two parts, like a file that's still being exported
+        data: bytes = IMAGE.read_bytes()
+        with open(watched / "case1.nrrd", "wb") as f:
+            f.write(data[: len(data) // 2])
+            f.flush()
+            time.sleep(0.05)
+            f.write(data[len(data) // 2 :])
+        shutil.copy(IMAGE, watched / ".case1.nrrd.tmp")
+        deadline: float = time.monotonic() + 30
+        while (
+            ingester.num_measured + ingester.num_failed < 1
+            and time.monotonic() < deadline
+        ):
+            time.sleep(0.1)
+        # A duplicate event for the same, unchanged file doesn't measure it again
+        ingester.submit(watched / "case1.nrrd", stop)
+        ingester.queue.join()
+        stop.set()
+        thread.join()
+        watcher.close()
+        ingester.shutdown()
+
+    rows: list = list(results.read_rows(output))
+    assert [(Path(row["path"]).name, row["status"]) for row in rows] == [
+        ("case1.nrrd", "ok")
+    ]
+    assert rows[0]["circumference"] == pytest.approx(433.228, abs=1e-3)